@@ -1,37 +1,113 @@
 from __future__ import annotations
 
-"""CNN pattern detection inference utilities."""
+"""CNN pattern detection inference utilities.
 
+``predict`` scores a single RGB chart image (PIL grayscale + resize).
+``predict_batch`` scores many candle windows at once: every window is drawn
+by :func:`render_chart` (the chart the model was trained on) on a reused
+per-thread Agg canvas, converted to grayscale with NumPy straight from the
+canvas buffer (bit-identical to ``predict``'s PIL conversion) into a
+preallocated ``float32`` buffer of shape ``(N, 1, 128, 128)``.  The
+batch then goes through one forward pass under ``torch.inference_mode``, so
+``predict_batch`` returns the same probabilities as calling ``predict`` on
+each window.
+
+Environment variables:
+
+* ``CNN_NUM_THREADS`` – intra-op threads for torch / ONNX Runtime (0 = default)
+* ``CNN_BACKEND`` – ``torch`` (default) or ``onnx`` (ONNX Runtime, falls back
+  to torch when ``onnxruntime`` or the exported model is missing)
+* ``CNN_ONNX_PATH`` – exported model path (see :func:`export_onnx`)
+"""
+
+import logging
+import threading
 from pathlib import Path
+from typing import Iterable, Mapping, Sequence
 
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
 from PIL import Image
 
 import torch
 
+from backend.market_data.candle_frame import CandleFrame
+from backend.utils import env_loader
+
 from .model import PatternCNN
 
+logger = logging.getLogger(__name__)
+
 _MODEL_PATH = Path(__file__).resolve().parent / "export" / "pattern_cnn_v1.pt"
+_ONNX_PATH = Path(
+    env_loader.get_env("CNN_ONNX_PATH", str(_MODEL_PATH.with_suffix(".onnx")))
+)
 _model: PatternCNN | None = None
+_session = None
+_load_lock = threading.Lock()
+
+IMAGE_SIZE = 128
+_DPI = 100
+
+_local = threading.local()
+
+
+def _num_threads() -> int:
+    return int(env_loader.get_env("CNN_NUM_THREADS", "0"))
 
 
 def _load_model() -> PatternCNN:
     global _model
     if _model is None:
-        m = PatternCNN()
-        try:
-            state = torch.load(_MODEL_PATH, map_location="cpu")
-            m.load_state_dict(state)
-        except Exception:  # pragma: no cover - missing weight case
-            pass
-        m.eval()
-        _model = m
+        with _load_lock:
+            if _model is None:
+                threads = _num_threads()
+                if threads > 0:
+                    torch.set_num_threads(threads)
+                m = PatternCNN()
+                try:
+                    state = torch.load(_MODEL_PATH, map_location="cpu")
+                    m.load_state_dict(state)
+                except Exception:  # pragma: no cover - missing weight case
+                    pass
+                m.eval()
+                _model = m
     return _model
 
 
+def _load_session():
+    """Return an ONNX Runtime session or ``None`` when unavailable."""
+    global _session
+    if _session is None:
+        with _load_lock:
+            if _session is None:
+                try:
+                    import onnxruntime as ort  # type: ignore
+
+                    opts = ort.SessionOptions()
+                    threads = _num_threads()
+                    if threads > 0:
+                        opts.intra_op_num_threads = threads
+                        opts.inter_op_num_threads = 1
+                    _session = ort.InferenceSession(
+                        str(_ONNX_PATH), opts, providers=["CPUExecutionProvider"]
+                    )
+                except Exception as exc:
+                    logger.warning("ONNX Runtime unavailable, using torch: %s", exc)
+                    _session = False
+    return _session or None
+
+
+def _to_gray(img_np: np.ndarray, size: int = IMAGE_SIZE) -> np.ndarray:
+    """RGB chart → ``(size, size)`` float32 in ``[0, 1]`` (model input)."""
+    img = Image.fromarray(img_np).convert("L").resize((size, size))
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
 def _preprocess(img_np: np.ndarray) -> torch.Tensor:
-    img = Image.fromarray(img_np).convert("L").resize((128, 128))
-    arr = np.array(img, dtype=np.float32) / 255.0
+    arr = _to_gray(img_np)
     tensor = torch.from_numpy(arr).unsqueeze(0).unsqueeze(0)
     return tensor
 
@@ -39,10 +115,143 @@ def _preprocess(img_np: np.ndarray) -> torch.Tensor:
 def predict(img_np: np.ndarray) -> dict[str, float]:
     """Return pattern probability given an image array."""
     model = _load_model()
-    with torch.no_grad():
+    with torch.inference_mode():
         x = _preprocess(img_np)
         prob = float(model(x).item())
     return {"pattern": prob}
 
 
-__all__ = ["predict"]
+# ----------------------------------------------------------------------
+# Batched path
+# ----------------------------------------------------------------------
+
+
+def _buffer(n: int, size: int) -> np.ndarray:
+    """Return a per-thread ``(n, 1, size, size)`` float32 buffer."""
+    buf = getattr(_local, "buf", None)
+    if buf is None or buf.shape[0] < n or buf.shape[2] != size:
+        buf = np.empty((max(n, 8), 1, size, size), dtype=np.float32)
+        _local.buf = buf
+    return buf[:n]
+
+
+def _ohlc(window: Iterable[Mapping]) -> np.ndarray:
+    """Return a ``(4, L)`` float64 array of ``o, h, l, c``."""
+    if not isinstance(window, CandleFrame):
+        window = CandleFrame.from_candles(window)
+    return np.stack((window.o, window.h, window.l, window.c))
+
+
+def _canvas(size: int) -> tuple[Figure, FigureCanvasAgg]:
+    """Return this thread's Agg figure of ``size`` pixels (created once)."""
+    cached = getattr(_local, "canvas", None)
+    if cached is None or cached[0] != size:
+        fig = Figure(figsize=(size / _DPI, size / _DPI), dpi=_DPI)
+        cached = (size, fig, FigureCanvasAgg(fig))
+        _local.canvas = cached
+    return cached[1], cached[2]
+
+
+def _draw(window: Iterable[Mapping], size: int) -> np.ndarray:
+    """Draw ``window`` on the thread's canvas and return its RGBA buffer view."""
+    o, h, l, c = _ohlc(window)
+    fig, canvas = _canvas(size)
+    fig.clear()
+    ax = fig.add_subplot()
+    ax.axis("off")
+    for x in range(len(c)):
+        color = "green" if c[x] >= o[x] else "red"
+        ax.plot([x, x], [l[x], h[x]], color=color, linewidth=1)
+        ax.add_patch(
+            Rectangle((x - 0.3, min(o[x], c[x])), 0.6, abs(o[x] - c[x]), color=color)
+        )
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())
+
+
+def render_chart(window: Iterable[Mapping], *, size: int = IMAGE_SIZE) -> np.ndarray:
+    """Draw a candlestick chart and return it as a ``(size, size, 3)`` uint8 RGB.
+
+    This is the image the pattern model was trained on: green/red bodies of
+    width 0.6 and 1pt wicks on a white background, axes hidden.
+    """
+    return _draw(window, size)[:, :, :3].copy()
+
+
+def _gray_into(rgba: np.ndarray, dst: np.ndarray, size: int) -> None:
+    """Write :func:`_to_gray` of an RGBA canvas buffer into ``dst`` without PIL.
+
+    Uses Pillow's fixed-point ``L`` conversion (the 299/587/114 weights in
+    16-bit with rounding), so the values match ``predict`` bit for bit.
+    """
+    if rgba.shape != (size, size, 4) or not rgba.flags.c_contiguous:
+        # キャンバスが size 四方の RGBA でない場合のみ PIL で変換・リサイズする
+        dst[...] = _to_gray(np.ascontiguousarray(rgba[:, :, :3]), size)
+        return
+    # RGBA の 4 バイトを 1 画素の uint32 (R が下位バイト) として一度に読む
+    px = rgba.view("<u4")[:, :, 0]
+    lum = (px & 0xFF) * np.uint32(19595)
+    lum += ((px >> 8) & 0xFF) * np.uint32(38470)
+    lum += ((px >> 16) & 0xFF) * np.uint32(7471)
+    lum += 0x8000
+    lum >>= 16
+    dst[...] = lum
+    dst /= 255.0
+
+
+def render_windows(
+    windows: Sequence[Iterable[Mapping]], *, size: int = IMAGE_SIZE, out: np.ndarray | None = None
+) -> np.ndarray:
+    """Render candle windows into the grayscale ``float32`` model input.
+
+    Returns ``(N, 1, size, size)``; row ``i`` equals the tensor
+    :func:`predict` builds from ``render_chart(windows[i])``.  Windows may
+    differ in length; ``out`` is filled in place when given.
+    """
+    n = len(windows)
+    if out is None:
+        out = np.empty((n, 1, size, size), dtype=np.float32)
+    for i, window in enumerate(windows):
+        _gray_into(_draw(window, size), out[i, 0], size)
+    return out
+
+
+def _forward(batch: np.ndarray) -> np.ndarray:
+    if env_loader.get_env("CNN_BACKEND", "torch").lower() == "onnx":
+        session = _load_session()
+        if session is not None:
+            name = session.get_inputs()[0].name
+            return np.asarray(session.run(None, {name: batch})[0], dtype=np.float32).reshape(-1)
+    model = _load_model()
+    with torch.inference_mode():
+        return model(torch.from_numpy(batch)).numpy().reshape(-1)
+
+
+def predict_batch(windows: Sequence[Iterable[Mapping]]) -> list[dict[str, float]]:
+    """Return pattern probabilities for many candle windows in one pass."""
+    windows = list(windows)
+    if not windows:
+        return []
+    batch = render_windows(windows, out=_buffer(len(windows), IMAGE_SIZE))
+    probs = _forward(batch)
+    return [{"pattern": float(p)} for p in probs]
+
+
+def export_onnx(path: str | Path | None = None) -> Path:
+    """Export the loaded model to ONNX with a dynamic batch dimension."""
+    target = Path(path) if path is not None else _ONNX_PATH
+    model = _load_model()
+    dummy = torch.zeros((1, 1, IMAGE_SIZE, IMAGE_SIZE), dtype=torch.float32)
+    torch.onnx.export(
+        model,
+        dummy,
+        str(target),
+        input_names=["image"],
+        output_names=["prob"],
+        dynamic_axes={"image": {0: "batch"}, "prob": {0: "batch"}},
+        opset_version=17,
+    )
+    return target
+
+
+__all__ = ["export_onnx", "predict", "predict_batch", "render_chart", "render_windows"]
@@ -5,22 +5,32 @@ from __future__ import annotations
 from typing import Any, Sequence
 
 from backend.indicators.vwap_band import get_vwap_bias
+from backend.market_data.candle_frame import CandleFrame
 
 
 class AtmosphereFeatures:
     """Market feature extractor for atmosphere analysis."""
 
     def __init__(self, candles: Sequence[dict[str, Any]]) -> None:
-        self.candles = list(candles)
+        self.candles = candles if isinstance(candles, CandleFrame) else list(candles)
 
     def vwap_bias(self) -> float:
         """Return VWAP bias of the latest close price."""
+        if isinstance(self.candles, CandleFrame):
+            return get_vwap_bias(self.candles.c.tolist(), self.candles.volume.tolist())
         prices = [float(c.get("close", c.get("c", 0))) for c in self.candles]
         volumes = [float(c.get("volume", c.get("v", 0))) for c in self.candles]
         return get_vwap_bias(prices, volumes)
 
     def volume_delta(self) -> float:
         """Return normalized volume delta (up minus down volume)."""
+        if isinstance(self.candles, CandleFrame):
+            frame = self.candles
+            rising = frame.c >= frame.o
+            up = float(frame.volume[rising].sum())
+            down = float(frame.volume[~rising].sum())
+            total = up + down
+            return (up - down) / total if total else 0.0
         up = 0.0
         down = 0.0
         for c in self.candles:
@@ -3,17 +3,37 @@ from __future__ import annotations
 
 from typing import Sequence
 
+from backend.backtest.metrics import max_drawdown, sharpe_ratio
+
 
 def run_simple_backtest(prices: Sequence[float], signals: Sequence[int]) -> dict:
-    """Return equity curve and summary for long=1, short=-1 signals."""
+    """Return equity curve and summary for long=1, short=-1 signals.
+
+    ``signals[t]`` is the position held from ``prices[t]`` to ``prices[t+1]``,
+    so each step earns ``signals[t-1] * (prices[t] - prices[t-1])``.
+    """
     if len(prices) != len(signals):
         raise ValueError("prices and signals length mismatch")
     equity = 0.0
     curve = []
+    returns = []
+    prev_price = None
+    prev_sig = 0
     for price, sig in zip(prices, signals):
-        equity += sig * price
+        step = prev_sig * (price - prev_price) if prev_price is not None else 0.0
+        equity += step
         curve.append(equity)
-    trades = sum(1 for s in signals if s != 0)
-    return {"equity_curve": curve, "trades": trades, "final_equity": equity}
+        if prev_price:
+            returns.append(step / prev_price)
+        prev_price, prev_sig = price, sig
+    # ポジションが変化した回数を取引数とみなす
+    trades = sum(1 for a, b in zip([0, *signals], signals) if b != a and b != 0)
+    return {
+        "equity_curve": curve,
+        "trades": trades,
+        "final_equity": equity,
+        "max_drawdown": max_drawdown(curve),
+        "sharpe": sharpe_ratio(returns),
+    }
 
 __all__ = ["run_simple_backtest"]
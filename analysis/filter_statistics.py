@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import sqlite3
-from collections import Counter
 from pathlib import Path
 
 from backend.utils import db_helper, env_loader
@@ -14,11 +13,11 @@ def summarize(db_path: Path = DB_PATH) -> dict:
     """entry_skips と trades を読み込みフィルター発生回数を返す."""
     with sqlite3.connect(db_path) as conn:
         c = conn.cursor()
-        c.execute("SELECT reason FROM entry_skips")
-        reasons = [r[0] for r in c.fetchall()]
+        # idx_entry_skips_reason で集計のみ行い全行の転送を避ける
+        c.execute("SELECT reason, COUNT(*) FROM entry_skips GROUP BY reason")
+        counts = dict(c.fetchall())
         c.execute("SELECT COUNT(*) FROM trades")
         trade_total = c.fetchone()[0] or 0
-    counts = Counter(reasons)
     return {
         reason: {
             "count": cnt,
@@ -70,9 +70,11 @@ from apscheduler.schedulers.base import STATE_RUNNING
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 
+from backend.config import runtime_config
 from backend.orders.order_manager import OrderManager
 from backend.utils import env_loader
 from backend.utils.notification import send_line_message
+from maintenance.archive_logs import archive_old_logs
 from maintenance.archive_ticks import archive_old_ticks
 
 app = FastAPI()
@@ -167,30 +169,53 @@ logger.info(
 )
 
 
+_BACKTEST_STRATEGIES = ("rules", "recorded")
+
+
 @app.get("/strategy/backtest")
 def backtest(
     start_date: str,
     end_date: str,
-    strategy: str = "ema_cross",
+    strategy: str = "rules",
     capital: float = 10000.0,
     risk_pct: float = 1.0,
 ):
+    """Replay the entry/exit logic over stored candles.
+
+    Bars are read from ``BACKTEST_CANDLES_PATH`` (CSV/Parquet/JSON) and
+    limited to ``start_date``..``end_date`` (inclusive, ``YYYY-MM-DD``).
+    ``strategy="rules"`` uses the rule-based stand-in for the AI and
+    ``strategy="recorded"`` replays the AI decisions logged in the trades DB.
+    Each fill risks ``risk_pct`` percent of the running balance at its SL.
     """
-    Placeholder for backtest endpoint.
-    Returns a dummy equity curve and summary.
-    """
-    equity_curve = [
-        {"date": start_date, "equity": capital},
-        {"date": end_date, "equity": capital + 1000.0},
-    ]
-    summary = {
-        "trades": 0,
-        "total_pl": 0.0,
-        "win_rate": 0.0,
-        "max_dd": 0.0,
-        "sharpe": 0.0,
-    }
-    return {"equity_curve": equity_curve, "summary": summary}
+    from backend.backtest import BacktestConfig, RecordedLLM, load_candles, run_backtest
+
+    if strategy not in _BACKTEST_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"unsupported strategy {strategy!r}; use one of {', '.join(_BACKTEST_STRATEGIES)}",
+        )
+    if risk_pct <= 0:
+        raise HTTPException(status_code=400, detail="risk_pct must be positive")
+    path = env_loader.get_env("BACKTEST_CANDLES_PATH")
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="BACKTEST_CANDLES_PATH not found")
+    candles = load_candles(path)
+    days = [str(t)[:10] for t in candles.time]
+    lo = next((i for i, d in enumerate(days) if d >= start_date), len(days))
+    hi = next((i for i, d in enumerate(days) if d > end_date), len(days))
+    if hi <= lo:
+        raise HTTPException(status_code=400, detail="no candles in the requested range")
+
+    llm = None
+    if strategy == "recorded":
+        llm = RecordedLLM.from_sqlite(DATABASE_PATH)
+    result = run_backtest(
+        candles[lo:hi],
+        llm=llm,
+        config=BacktestConfig(initial_balance=capital, risk_pct=risk_pct / 100),
+    )
+    return {"equity_curve": result.equity_curve(), "summary": result.summary}
 
 
 @app.get("/strategy/analyze")
@@ -248,9 +273,15 @@ def schedule_weekly_tick_archive_job() -> None:
     scheduler.add_job(archive_old_ticks, "cron", day_of_week="mon", hour=0)
 
 
+def schedule_daily_log_archive_job() -> None:
+    """Register daily prompt/AI decision log archive job with the scheduler."""
+    scheduler.add_job(archive_old_logs, "cron", hour=0, minute=30)
+
+
 # Schedule the job to run every hour at minute 0
 schedule_hourly_summary_job()
 schedule_weekly_tick_archive_job()
+schedule_daily_log_archive_job()
 
 
 # Test endpoint: Get trade summary for the last hour (no notification)
@@ -357,6 +388,7 @@ def control_scheduler(action: str):
     scheduler = BackgroundScheduler()
     schedule_hourly_summary_job()
     schedule_weekly_tick_archive_job()
+    schedule_daily_log_archive_job()
     scheduler.start()
     return {"status": "restarted"}
 
@@ -396,6 +428,8 @@ def update_runtime_settings(settings: RuntimeSettings):
         if key in current_settings:
             current_settings[key] = value
             os.environ[key.upper()] = str(value)
+    # ループが次に参照するスナップショットをここで作り直す
+    runtime_config.refresh()
     try:
         jr = importlib.import_module("backend.scheduler.job_runner")
         runner = getattr(jr, "RUNNER_INSTANCE", None)
@@ -0,0 +1,17 @@
+"""Offline backtesting of the live decision logic."""
+
+from .broker import SimTrade, SimulatedOrderManager
+from .engine import BacktestConfig, BacktestEngine, BacktestResult, load_candles, run_backtest
+from .llm_stub import RecordedLLM, RuleBasedLLM
+
+__all__ = [
+    "BacktestConfig",
+    "BacktestEngine",
+    "BacktestResult",
+    "RecordedLLM",
+    "RuleBasedLLM",
+    "SimTrade",
+    "SimulatedOrderManager",
+    "load_candles",
+    "run_backtest",
+]
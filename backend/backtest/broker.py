@@ -0,0 +1,257 @@
+"""Simulated order manager used by the backtester.
+
+:class:`SimulatedOrderManager` exposes the subset of
+:class:`backend.orders.order_manager.OrderManager` that the decision logic
+needs (``enter_trade`` / ``close_position`` / ``update_trade_sl`` /
+``update_trade_tp``) but fills orders against historical bars instead of the
+OANDA REST API.
+
+Fill model
+----------
+* Bars carry mid prices; bid/ask are ``mid ∓ spread / 2``.
+* Market entries fill at the *next* bar open (the engine calls
+  :meth:`enter_trade` with that bar's prices) plus ``slippage_pips`` against
+  the trader.
+* TP/SL are checked on every bar's high/low.  When both levels lie inside the
+  same bar the stop loss is assumed to fill first (pessimistic).  A bar that
+  gaps through a level fills at the open.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from backend.risk_manager import validate_rrr_after_cost
+from backend.utils import env_loader
+from risk.tp_sl_manager import adjust_sl_for_rr
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimTrade:
+    """Single simulated position."""
+
+    trade_id: str
+    instrument: str
+    side: str
+    units: int
+    entry_time: Any
+    entry_price: float
+    tp_price: float | None = None
+    sl_price: float | None = None
+    tp_pips: float | None = None
+    sl_pips: float | None = None
+    exit_time: Any = None
+    exit_price: float | None = None
+    exit_reason: str | None = None
+    params: dict = field(default_factory=dict)
+
+    @property
+    def is_open(self) -> bool:
+        return self.exit_price is None
+
+    def pips(self, pip_size: float) -> float:
+        if self.exit_price is None:
+            return 0.0
+        diff = self.exit_price - self.entry_price
+        return (diff if self.side == "long" else -diff) / pip_size
+
+    def profit(self) -> float:
+        """Return P/L in quote currency (``units`` × price difference)."""
+        if self.exit_price is None:
+            return 0.0
+        return (self.exit_price - self.entry_price) * self.units
+
+    def as_dict(self, pip_size: float) -> dict:
+        return {
+            "trade_id": self.trade_id,
+            "instrument": self.instrument,
+            "side": self.side,
+            "units": self.units,
+            "entry_time": self.entry_time,
+            "entry_price": self.entry_price,
+            "exit_time": self.exit_time,
+            "exit_price": self.exit_price,
+            "exit_reason": self.exit_reason,
+            "tp_pips": self.tp_pips,
+            "sl_pips": self.sl_pips,
+            "pips": self.pips(pip_size),
+            "profit": self.profit(),
+        }
+
+
+class SimulatedOrderManager:
+    """Fill orders against historical bars instead of the broker API."""
+
+    def __init__(
+        self,
+        *,
+        pip_size: float | None = None,
+        spread_pips: float | None = None,
+        slippage_pips: float | None = None,
+    ) -> None:
+        if pip_size is None:
+            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        if spread_pips is None:
+            spread_pips = float(env_loader.get_env("BACKTEST_SPREAD_PIPS", "0.2"))
+        if slippage_pips is None:
+            slippage_pips = float(env_loader.get_env("ENTRY_SLIPPAGE_PIPS", "0"))
+        self.pip_size = pip_size
+        self.spread_pips = spread_pips
+        self.slippage_pips = slippage_pips
+        self.open_trades: list[SimTrade] = []
+        self.closed_trades: list[SimTrade] = []
+        self._ids = itertools.count(1)
+
+    # ------------------------------------------------------------------
+    def quote(self, mid: float) -> tuple[float, float]:
+        """Return ``(bid, ask)`` around ``mid``."""
+        half = self.spread_pips * self.pip_size / 2
+        return mid - half, mid + half
+
+    def market_data(self, instrument: str, mid: float) -> dict:
+        """Return a pricing payload shaped like OANDA's ``/pricing`` response."""
+        bid, ask = self.quote(mid)
+        return {
+            "prices": [
+                {
+                    "instrument": instrument,
+                    "bids": [{"price": str(bid)}],
+                    "asks": [{"price": str(ask)}],
+                    "tradeable": True,
+                }
+            ]
+        }
+
+    def get_position(self, instrument: str) -> SimTrade | None:
+        for trade in self.open_trades:
+            if trade.instrument == instrument:
+                return trade
+        return None
+
+    # ------------------------------------------------------------------
+    def enter_trade(
+        self,
+        lot_size,
+        market_data,
+        strategy_params,
+        side="long",
+        force_limit_only: bool = False,
+        *,
+        with_oco: bool = True,
+        forced: bool | None = None,
+        time=None,
+    ) -> SimTrade | None:
+        """Open a simulated position, applying the live RRR guards."""
+        min_lot = float(env_loader.get_env("MIN_TRADE_LOT", "0.01"))
+        max_lot = float(env_loader.get_env("MAX_TRADE_LOT", "0.1"))
+        lot_size = max(min_lot, min(lot_size, max_lot))
+
+        instrument = strategy_params["instrument"]
+        tp_pips = strategy_params.get("tp_pips")
+        sl_pips = strategy_params.get("sl_pips")
+        pip = self.pip_size
+
+        min_rrr = float(env_loader.get_env("MIN_RRR", "0.8"))
+        if tp_pips is not None and sl_pips is not None:
+            tp_pips, sl_pips = adjust_sl_for_rr(float(tp_pips), float(sl_pips), min_rrr)
+
+        bid = float(market_data["prices"][0]["bids"][0]["price"])
+        ask = float(market_data["prices"][0]["asks"][0]["price"])
+        if tp_pips is not None and sl_pips is not None:
+            spread_pips = (ask - bid) / pip
+            min_rrr_cost = float(env_loader.get_env("MIN_RRR_AFTER_COST", "1.2"))
+            if not validate_rrr_after_cost(
+                float(tp_pips), float(sl_pips), spread_pips + self.slippage_pips, min_rrr_cost
+            ):
+                logger.debug("RRR after cost below %.2f – entry skipped", min_rrr_cost)
+                return None
+
+        slip = self.slippage_pips * pip
+        if side == "long":
+            price = ask + slip
+            units = int(lot_size * 1000)
+        else:
+            price = bid - slip
+            units = -int(lot_size * 1000)
+
+        trade = SimTrade(
+            trade_id=str(next(self._ids)),
+            instrument=instrument,
+            side=side,
+            units=units,
+            entry_time=time,
+            entry_price=price,
+            tp_pips=tp_pips,
+            sl_pips=sl_pips,
+            params=dict(strategy_params),
+        )
+        sign = 1 if side == "long" else -1
+        if with_oco and tp_pips:
+            trade.tp_price = price + sign * float(tp_pips) * pip
+        if with_oco and sl_pips:
+            trade.sl_price = price - sign * float(sl_pips) * pip
+        self.open_trades.append(trade)
+        return trade
+
+    def update_trade_sl(self, trade_id, instrument, new_sl_price):
+        for trade in self.open_trades:
+            if trade.trade_id == str(trade_id):
+                trade.sl_price = float(new_sl_price)
+                return {"tradeID": trade.trade_id}
+        return None
+
+    def update_trade_tp(self, trade_id, instrument, new_tp_price):
+        for trade in self.open_trades:
+            if trade.trade_id == str(trade_id):
+                trade.tp_price = float(new_tp_price)
+                return {"tradeID": trade.trade_id}
+        return None
+
+    def close_position(self, instrument, side: str = "both", *, mid: float, time=None):
+        """Close matching positions at ``mid`` adjusted for spread."""
+        bid, ask = self.quote(mid)
+        closed = []
+        for trade in list(self.open_trades):
+            if trade.instrument != instrument or side not in ("both", trade.side):
+                continue
+            price = bid if trade.side == "long" else ask
+            closed.append(self._close(trade, price, time, "exit_signal"))
+        return closed
+
+    # ------------------------------------------------------------------
+    def on_bar(self, time, o: float, h: float, l: float) -> list[SimTrade]:
+        """Trigger TP/SL orders touched by the bar ``o``/``h``/``l`` (mid)."""
+        half = self.spread_pips * self.pip_size / 2
+        closed: list[SimTrade] = []
+        for trade in list(self.open_trades):
+            # ロングは bid、ショートは ask で決済される
+            off = -half if trade.side == "long" else half
+            bo, bh, bl = o + off, h + off, l + off
+            tp, sl = trade.tp_price, trade.sl_price
+            if trade.side == "long":
+                if sl is not None and bl <= sl:
+                    closed.append(self._close(trade, min(bo, sl), time, "sl"))
+                elif tp is not None and bh >= tp:
+                    closed.append(self._close(trade, max(bo, tp), time, "tp"))
+            else:
+                if sl is not None and bh >= sl:
+                    closed.append(self._close(trade, max(bo, sl), time, "sl"))
+                elif tp is not None and bl <= tp:
+                    closed.append(self._close(trade, min(bo, tp), time, "tp"))
+        return closed
+
+    def _close(self, trade: SimTrade, price: float, time, reason: str) -> SimTrade:
+        trade.exit_price = price
+        trade.exit_time = time
+        trade.exit_reason = reason
+        self.open_trades.remove(trade)
+        self.closed_trades.append(trade)
+        return trade
+
+
+__all__ = ["SimTrade", "SimulatedOrderManager"]
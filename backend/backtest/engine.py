@@ -0,0 +1,406 @@
+"""Event-driven backtester replaying the live entry/exit decision path.
+
+The engine walks historical bars one at a time and, at each bar close, runs
+the same pure decision functions the :class:`JobRunner` loop uses::
+
+    pass_entry_filter → decide_trade_mode_detail → LLM plan → TP/SL → enter
+    pass_exit_filter  → LLM exit decision                       → close
+
+LLM calls are served by a stub (:mod:`backend.backtest.llm_stub`) and orders
+by :class:`~backend.backtest.broker.SimulatedOrderManager`.  Orders decided at
+a bar close fill at the next bar's open, so no decision can see the price it
+trades at.
+
+Indicator series are computed once over the full history with
+:func:`~backend.indicators.calculate_indicators.compute_indicator_series`
+(the formulas behind ``calculate_indicators``) and exposed to the decision
+functions through zero-copy windows ending at the current bar.  The
+indicators are causal and gaps are only forward-filled, so the values seen at
+bar ``i`` equal ``calculate_indicators`` over the candles up to ``i``.
+
+Run from the command line::
+
+    python -m backend.backtest.engine candles.csv --instrument USD_JPY
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from backend.backtest.broker import SimulatedOrderManager
+from backend.backtest.llm_stub import RecordedLLM, RuleBasedLLM, _to_datetime
+from backend.backtest.metrics import summarize
+from backend.indicators.calculate_indicators import compute_indicator_series
+from backend.market_data.candle_frame import CandleFrame
+from backend.risk_manager import resolve_scalp_tp_sl, resolve_tp_sl
+from backend.strategy import signal_filter
+from backend.strategy.risk_manager import calc_lot_size
+from backend.utils import env_loader
+from signals import composite_mode
+
+logger = logging.getLogger(__name__)
+
+# 1 バーごとに INFO を出すモジュールはバックテスト中だけ黙らせる
+_NOISY_LOGGERS = (
+    "backend.strategy.signal_filter",
+    "signals.composite_mode",
+    "risk.tp_sl_manager",
+)
+_SCALP_MODES = ("scalp_momentum", "scalp_reversion", "micro_scalp")
+
+
+class _SeriesView:
+    """Read-only window over an indicator array mimicking ``pd.Series``.
+
+    Supports the accessors the decision functions use: ``len``,
+    ``iloc[-k]``, ``[-k]``, slicing and ``tolist``.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: np.ndarray) -> None:
+        self.values = values
+
+    @property
+    def iloc(self) -> "_SeriesView":
+        return self
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return _SeriesView(self.values[idx])
+        return float(self.values[idx])
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    def tolist(self) -> list:
+        return self.values.tolist()
+
+
+@dataclass
+class BacktestConfig:
+    """Run parameters (``None`` falls back to the live env settings)."""
+
+    instrument: str | None = None
+    initial_balance: float = 10000.0
+    lot_size: float | None = None
+    # 口座残高に対するリスク率 (0.01 = 1%)。指定時は SL 幅から毎回ロットを算出する
+    risk_pct: float | None = None
+    window: int = 200
+    warmup: int = 50
+    spread_pips: float | None = None
+    slippage_pips: float | None = None
+    use_entry_filter: bool = True
+    use_exit_filter: bool = True
+
+
+@dataclass
+class BacktestResult:
+    trades: list[dict]
+    times: list
+    equity: list[float]
+    summary: dict = field(default_factory=dict)
+
+    def equity_curve(self) -> list[dict]:
+        return [{"date": t, "equity": e} for t, e in zip(self.times, self.equity)]
+
+    def as_dict(self) -> dict:
+        return {
+            "equity_curve": self.equity_curve(),
+            "summary": self.summary,
+            "trades": self.trades,
+        }
+
+
+# ----------------------------------------------------------------------
+#  Data loading
+# ----------------------------------------------------------------------
+_COLUMN_ALIASES = {
+    "o": ("o", "open", "mid_o"),
+    "h": ("h", "high", "mid_h"),
+    "l": ("l", "low", "mid_l"),
+    "c": ("c", "close", "mid_c"),
+    "volume": ("volume", "v"),
+    "time": ("time", "timestamp", "datetime", "date"),
+}
+
+
+def _frame_from_df(df) -> CandleFrame:
+    cols = {c.lower(): c for c in df.columns}
+
+    def pick(key: str):
+        for alias in _COLUMN_ALIASES[key]:
+            if alias in cols:
+                return df[cols[alias]]
+        if key == "volume":
+            return None
+        raise ValueError(f"candle data lacks a '{key}' column")
+
+    vol = pick("volume")
+    n = len(df)
+    return CandleFrame(
+        pick("time").astype(str).to_numpy(dtype=object),
+        pick("o").to_numpy(dtype="float64"),
+        pick("h").to_numpy(dtype="float64"),
+        pick("l").to_numpy(dtype="float64"),
+        pick("c").to_numpy(dtype="float64"),
+        vol.to_numpy(dtype="float64") if vol is not None else np.zeros(n),
+        np.ones(n, dtype=bool),
+    )
+
+
+def load_candles(path: str | Path) -> CandleFrame:
+    """Load historical bars from CSV, Parquet or OANDA-style JSON/JSONL."""
+    import pandas as pd
+
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return _frame_from_df(pd.read_csv(path))
+    if suffix in (".parquet", ".pq"):
+        return _frame_from_df(pd.read_parquet(path))
+    if suffix == ".jsonl":
+        with open(path, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh if line.strip()]
+    else:
+        with open(path, encoding="utf-8") as fh:
+            rows = json.load(fh)
+        if isinstance(rows, dict):
+            rows = rows.get("candles", [])
+    frame = CandleFrame.from_candles(rows)
+    return frame.complete_only() if len(frame) and frame.complete.any() else frame
+
+
+# ----------------------------------------------------------------------
+#  Engine
+# ----------------------------------------------------------------------
+class BacktestEngine:
+    """Replay the decision pipeline bar by bar over ``candles``."""
+
+    def __init__(
+        self,
+        candles: CandleFrame,
+        llm: Any | None = None,
+        config: BacktestConfig | None = None,
+    ) -> None:
+        self.candles = candles
+        self.llm = llm or RuleBasedLLM()
+        self.config = config or BacktestConfig()
+        self.instrument = self.config.instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+        self.broker = SimulatedOrderManager(
+            spread_pips=self.config.spread_pips,
+            slippage_pips=self.config.slippage_pips,
+        )
+        self.pip_size = self.broker.pip_size
+        self.lot_size = (
+            self.config.lot_size
+            if self.config.lot_size is not None
+            else float(env_loader.get_env("BACKTEST_LOT_SIZE", "0.1"))
+        )
+        self._series: dict[str, np.ndarray] = {}
+
+    # ------------------------------------------------------------------
+    def _precompute(self) -> None:
+        c = self.candles
+        raw = compute_indicator_series(c.c.tolist(), c.h.tolist(), c.l.tolist(), n_wave=False)
+        for key, val in raw.items():
+            if val is None:
+                continue
+            if hasattr(val, "ffill"):
+                # live 側の bfill は未来値を使うため前方補完のみ行う
+                self._series[key] = val.ffill().to_numpy(dtype="float64", na_value=np.nan)
+            else:
+                self._series[key] = np.asarray(val, dtype="float64")
+
+    def indicators_at(self, i: int) -> dict:
+        """Return indicator windows ending at bar ``i`` (inclusive)."""
+        start = max(0, i + 1 - self.config.window)
+        ind = {k: _SeriesView(v[start : i + 1]) for k, v in self._series.items()}
+        ind["n_wave_target"] = None
+        return ind
+
+    def _lot_for(self, sl_pips, balance: float) -> float:
+        """Return the lot for a fill, sized by ``risk_pct`` when configured."""
+        risk_pct = self.config.risk_pct
+        if risk_pct is None or not sl_pips or float(sl_pips) <= 0:
+            return self.lot_size
+        # 1 lot = 1000 通貨なので 1pip の価値は pip_size × 1000 (決済通貨建て)
+        return calc_lot_size(balance, risk_pct, float(sl_pips), self.pip_size * 1000)
+
+    # ------------------------------------------------------------------
+    def _resolve_tp_sl(
+        self, plan: dict, mode: str, ind: dict, window: CandleFrame, side: str, price: float, now
+    ) -> tuple[float, float]:
+        """Return TP/SL pips through the same resolver ``process_entry`` uses."""
+        risk = plan.get("risk") or {}
+        if mode in _SCALP_MODES:
+            return resolve_scalp_tp_sl(risk, ind, mode, pip_size=self.pip_size)
+        tp, sl, _atr = resolve_tp_sl(
+            risk, ind, window, side, price, price, pip_size=self.pip_size, now=now
+        )
+        return tp, sl
+
+    def _decide_entry(self, i: int, now) -> dict | None:
+        ind = self.indicators_at(i)
+        price = float(self.candles.c[i])
+        if self.config.use_entry_filter and not signal_filter.pass_entry_filter(
+            ind, price, mode=None, context={}, now=now
+        ):
+            return None
+        window = self.candles[max(0, i + 1 - self.config.window) : i + 1]
+        mode, _score, _reasons = composite_mode.decide_trade_mode_detail(ind, window, now=now)
+        plan = self.llm.entry_plan(ind, window, mode, now)
+        entry = plan.get("entry") or {}
+        side = str(entry.get("side", "no")).lower()
+        if side not in ("long", "short"):
+            return None
+        tp, sl = self._resolve_tp_sl(plan, mode, ind, window, side, price, now)
+        return {
+            "side": side,
+            "instrument": self.instrument,
+            "tp_pips": tp,
+            "sl_pips": sl,
+            "mode": "market",
+            "trade_mode": mode,
+        }
+
+    def _decide_exit(self, i: int, trade, now) -> bool:
+        ind = self.indicators_at(i)
+        if self.config.use_exit_filter and not signal_filter.pass_exit_filter(ind, trade.side):
+            return False
+        decision = self.llm.exit_decision(trade, ind, now)
+        return str(decision.get("action", "HOLD")).upper() == "EXIT"
+
+    # ------------------------------------------------------------------
+    def run(self) -> BacktestResult:
+        c = self.candles
+        n = len(c)
+        composite_mode.reset_mode_state()
+        signal_filter.reset_filter_state()
+        self._precompute()
+
+        saved_levels = {}
+        for name in _NOISY_LOGGERS:
+            lg = logging.getLogger(name)
+            saved_levels[name] = lg.level
+            lg.setLevel(logging.ERROR)
+
+        pending_entry: dict | None = None
+        pending_exit = False
+        times: list = []
+        equity: list[float] = []
+        balance = self.config.initial_balance
+        try:
+            for i in range(n):
+                t = c.time[i]
+                o, h, l, close = float(c.o[i]), float(c.h[i]), float(c.l[i]), float(c.c[i])
+                # --- 前バーの決定を始値で約定 ---------------------------------
+                trade = self.broker.get_position(self.instrument)
+                if pending_exit and trade is not None:
+                    for done in self.broker.close_position(self.instrument, mid=o, time=t):
+                        balance += done.profit()
+                elif pending_entry is not None and trade is None:
+                    params = dict(pending_entry)
+                    side = params.pop("side")
+                    self.broker.enter_trade(
+                        self._lot_for(params.get("sl_pips"), balance),
+                        self.broker.market_data(self.instrument, o),
+                        params,
+                        side=side,
+                        time=t,
+                    )
+                pending_entry, pending_exit = None, False
+
+                for done in self.broker.on_bar(t, o, h, l):
+                    balance += done.profit()
+                signal_filter.update_overshoot_window(h, l)
+
+                # --- バー確定時に判断 ------------------------------------------
+                if i >= self.config.warmup and i + 1 < n:
+                    now = _to_datetime(c.time[i + 1])
+                    trade = self.broker.get_position(self.instrument)
+                    if trade is not None:
+                        pending_exit = self._decide_exit(i, trade, now)
+                    else:
+                        pending_entry = self._decide_entry(i, now)
+
+                unrealized = sum(
+                    (close - tr.entry_price) * tr.units for tr in self.broker.open_trades
+                )
+                times.append(t)
+                equity.append(balance + unrealized)
+
+            last = float(c.c[n - 1]) if n else 0.0
+            for done in self.broker.close_position(
+                self.instrument, mid=last, time=c.time[n - 1] if n else None
+            ):
+                done.exit_reason = "end_of_data"
+                balance += done.profit()
+            if equity:
+                equity[-1] = balance
+        finally:
+            for name, level in saved_levels.items():
+                logging.getLogger(name).setLevel(level)
+
+        trades = [t.as_dict(self.pip_size) for t in self.broker.closed_trades]
+        return BacktestResult(trades, times, equity, summarize(trades, times, equity))
+
+
+def run_backtest(
+    candles: CandleFrame | str | Path,
+    *,
+    llm: Any | None = None,
+    config: BacktestConfig | None = None,
+) -> BacktestResult:
+    """Convenience wrapper loading ``candles`` from a path when needed."""
+    if not isinstance(candles, CandleFrame):
+        candles = load_candles(candles)
+    return BacktestEngine(candles, llm=llm, config=config).run()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay the trading logic over historical bars")
+    parser.add_argument("candles", help="CSV / Parquet / JSON candle file")
+    parser.add_argument("--instrument", default=None)
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--lot", type=float, default=None)
+    parser.add_argument(
+        "--risk-pct", type=float, default=None, help="risk per trade in %% of balance"
+    )
+    parser.add_argument("--spread", type=float, default=None, help="spread in pips")
+    parser.add_argument("--decisions", help="trades.db or JSONL of recorded AI decisions")
+    parser.add_argument("--output", help="write the full result JSON here")
+    args = parser.parse_args(argv)
+
+    llm = None
+    if args.decisions:
+        if args.decisions.endswith(".jsonl"):
+            llm = RecordedLLM.from_jsonl(args.decisions, instrument=args.instrument)
+        else:
+            llm = RecordedLLM.from_sqlite(args.decisions, instrument=args.instrument)
+    config = BacktestConfig(
+        instrument=args.instrument,
+        initial_balance=args.balance,
+        lot_size=args.lot,
+        risk_pct=args.risk_pct / 100 if args.risk_pct is not None else None,
+        spread_pips=args.spread,
+    )
+    result = run_backtest(args.candles, llm=llm, config=config)
+    print(json.dumps(result.summary, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(result.as_dict(), fh, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Offline replacements for the entry/exit LLM calls.
+
+Both stubs implement the two hooks the engine needs:
+
+``entry_plan(indicators, candles, mode, time)``
+    Return a plan shaped like ``openai_analysis.get_trade_plan`` output
+    (``{"entry": {"side": ...}, "risk": {...}}``).
+``exit_decision(trade, indicators, time)``
+    Return ``{"action": "EXIT" | "HOLD"}`` like ``get_exit_decision``.
+
+:class:`RuleBasedLLM` decides from indicators only, so a backtest is fully
+deterministic.  :class:`RecordedLLM` replays the decisions that the live bot
+stored in the ``ai_decisions`` table (or an exported JSONL file), returning
+the latest decision made at or before the bar time.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+def _last(series) -> float | None:
+    try:
+        val = series.iloc[-1] if hasattr(series, "iloc") else series[-1]
+    except Exception:
+        return None
+    try:
+        val = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if val != val else val
+
+
+def _to_datetime(value: Any) -> datetime | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    text = str(value).replace("Z", "+00:00")
+    # OANDA はナノ秒まで返すため fromisoformat が読める桁に丸める
+    if "." in text:
+        head, _, tail = text.partition(".")
+        frac = "".join(ch for ch in tail if ch.isdigit())
+        tz = tail[len(frac):]
+        text = f"{head}.{frac[:6]}{tz}"
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class RuleBasedLLM:
+    """Deterministic EMA/RSI stand-in for the trade-plan and exit prompts."""
+
+    def __init__(self, *, rsi_upper: float = 70.0, rsi_lower: float = 30.0) -> None:
+        self.rsi_upper = rsi_upper
+        self.rsi_lower = rsi_lower
+
+    def entry_plan(self, indicators: dict, candles, mode: str, time) -> dict:
+        fast = _last(indicators.get("ema_fast"))
+        slow = _last(indicators.get("ema_slow"))
+        rsi = _last(indicators.get("rsi"))
+        side = "no"
+        if fast is not None and slow is not None and rsi is not None:
+            if fast > slow and rsi < self.rsi_upper:
+                side = "long"
+            elif fast < slow and rsi > self.rsi_lower:
+                side = "short"
+        return {"entry": {"side": side, "mode": "market"}, "risk": {}}
+
+    def exit_decision(self, trade, indicators: dict, time) -> dict:
+        fast = _last(indicators.get("ema_fast"))
+        slow = _last(indicators.get("ema_slow"))
+        if fast is None or slow is None:
+            return {"action": "HOLD"}
+        against = fast < slow if trade.side == "long" else fast > slow
+        return {"action": "EXIT" if against else "HOLD"}
+
+
+class RecordedLLM:
+    """Replay ``ENTRY`` / ``EXIT`` decisions recorded by the live bot.
+
+    ``max_age_sec`` bounds how stale a recorded decision may be relative to
+    the bar being evaluated; older decisions are ignored (no entry / hold).
+    """
+
+    def __init__(
+        self,
+        rows: list[tuple[Any, str, str]],
+        *,
+        instrument: str | None = None,
+        max_age_sec: float = 300.0,
+    ) -> None:
+        self.max_age_sec = max_age_sec
+        self._events: dict[str, tuple[list[float], list[dict]]] = {}
+        buckets: dict[str, list[tuple[float, dict]]] = {"ENTRY": [], "EXIT": []}
+        for ts, kind, payload in rows:
+            kind = str(kind).upper()
+            dt = _to_datetime(ts)
+            if kind not in buckets or dt is None:
+                continue
+            try:
+                data = json.loads(payload) if isinstance(payload, str) else payload
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                buckets[kind].append((dt.timestamp(), data))
+        for kind, items in buckets.items():
+            items.sort(key=lambda x: x[0])
+            self._events[kind] = ([t for t, _ in items], [d for _, d in items])
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_sqlite(
+        cls, path: str | Path, *, instrument: str | None = None, **kwargs
+    ) -> "RecordedLLM":
+        conn = sqlite3.connect(str(path))
+        try:
+            sql = (
+                "SELECT timestamp, decision_type, ai_response FROM ai_decisions "
+                "WHERE decision_type IN ('ENTRY', 'EXIT')"
+            )
+            params: tuple = ()
+            if instrument:
+                sql += " AND instrument = ?"
+                params = (instrument,)
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return cls(rows, instrument=instrument, **kwargs)
+
+    @classmethod
+    def from_jsonl(
+        cls, path: str | Path, *, instrument: str | None = None, **kwargs
+    ) -> "RecordedLLM":
+        rows = []
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if instrument and rec.get("instrument") not in (None, instrument):
+                    continue
+                rows.append(
+                    (rec.get("timestamp"), rec.get("decision_type", ""), rec.get("ai_response"))
+                )
+        return cls(rows, instrument=instrument, **kwargs)
+
+    # ------------------------------------------------------------------
+    def _lookup(self, kind: str, time) -> dict | None:
+        times, data = self._events.get(kind, ([], []))
+        dt = _to_datetime(time)
+        if dt is None or not times:
+            return None
+        ts = dt.timestamp()
+        idx = bisect.bisect_right(times, ts) - 1
+        if idx < 0 or ts - times[idx] > self.max_age_sec:
+            return None
+        return data[idx]
+
+    def entry_plan(self, indicators: dict, candles, mode: str, time) -> dict:
+        plan = self._lookup("ENTRY", time)
+        return plan if plan is not None else {"entry": {"side": "no"}}
+
+    def exit_decision(self, trade, indicators: dict, time) -> dict:
+        dec = self._lookup("EXIT", time)
+        return dec if dec is not None else {"action": "HOLD"}
+
+
+__all__ = ["RecordedLLM", "RuleBasedLLM"]
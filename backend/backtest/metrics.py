@@ -0,0 +1,62 @@
+"""Performance statistics for backtest results."""
+
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+
+def max_drawdown(equity: Sequence[float]) -> float:
+    """Return the largest peak-to-trough drop of ``equity`` (absolute)."""
+    peak = None
+    worst = 0.0
+    for val in equity:
+        if peak is None or val > peak:
+            peak = val
+        worst = max(worst, peak - val)
+    return worst
+
+
+def sharpe_ratio(returns: Sequence[float], periods_per_year: int = 252) -> float:
+    """Return the annualised Sharpe ratio of periodic ``returns`` (rf = 0)."""
+    n = len(returns)
+    if n < 2:
+        return 0.0
+    mean = sum(returns) / n
+    var = sum((r - mean) ** 2 for r in returns) / (n - 1)
+    if var <= 0:
+        return 0.0
+    return mean / math.sqrt(var) * math.sqrt(periods_per_year)
+
+
+def daily_returns(times: Sequence, equity: Sequence[float]) -> list[float]:
+    """Return relative equity changes between the last points of each day."""
+    closes: list[float] = []
+    last_day = None
+    for ts, val in zip(times, equity):
+        day = str(ts)[:10]
+        if day != last_day:
+            closes.append(val)
+            last_day = day
+        else:
+            closes[-1] = val
+    return [
+        (b - a) / a if a else 0.0 for a, b in zip(closes, closes[1:])
+    ]
+
+
+def summarize(trades: Sequence[dict], times: Sequence, equity: Sequence[float]) -> dict:
+    """Return the summary block used by the API and CLI."""
+    pnl = [t["profit"] for t in trades]
+    wins = sum(1 for p in pnl if p > 0)
+    return {
+        "trades": len(trades),
+        "total_pl": sum(pnl),
+        "total_pips": sum(t["pips"] for t in trades),
+        "win_rate": wins / len(trades) if trades else 0.0,
+        "max_dd": max_drawdown(equity),
+        "sharpe": sharpe_ratio(daily_returns(times, equity)),
+    }
+
+
+__all__ = ["daily_returns", "max_drawdown", "sharpe_ratio", "summarize"]
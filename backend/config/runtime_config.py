@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+"""Typed snapshot of the settings read inside the trading loop.
+
+``env_loader.get_env`` re-reads ``os.environ``, strips trailing comments and
+converts the string on every call; the runners did that well over a hundred
+times per loop.  :class:`RuntimeConfig` parses the loop settings once into
+typed attributes and :func:`current` hands out the same immutable object
+until a source changes:
+
+* the raw environment values of the declared keys (``params_loader``,
+  ``PUT /settings/runtime`` and tests all write ``os.environ``)
+* the modification time of watched files – the default ``.env`` files and
+  the YAML files last passed to ``params_loader.load_params``; a changed
+  file is re-loaded into the environment first
+
+A new snapshot is built completely before it replaces the old one.  If it
+fails validation the previous snapshot stays in use and the error is
+logged.
+
+The runners wrap each loop in :func:`pinned`, so every reader in that loop
+(including ``entry_logic``) sees the values the loop started with.  They
+pin ``pip_size`` to their own instrument, so runners for JPY and non-JPY
+pairs can share a process.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Union, get_args, get_origin, get_type_hints
+
+from backend.utils import env_loader
+
+logger = logging.getLogger(__name__)
+
+
+def _env(*keys: str, default=None):
+    """Declare a field read from the first non-empty of ``keys``."""
+    return field(default=default, metadata={"env": keys})
+
+
+@dataclass(frozen=True, slots=True)
+class RuntimeConfig:
+    """Loop settings as typed attributes (``None`` = unset, caller decides)."""
+
+    generation: int = 0
+
+    # 価格・ロット計算
+    pip_size: float = _env("PIP_SIZE", default=0.01)
+    pip_value_jpy: float = _env("PIP_VALUE_JPY", default=100.0)
+    entry_risk_pct: float = _env("ENTRY_RISK_PCT", default=0.01)
+    init_tp_pips: float = _env("INIT_TP_PIPS", default=30.0)
+    init_sl_pips: float = _env("INIT_SL_PIPS", default=20.0)
+    trade_lot_size: float = _env("TRADE_LOT_SIZE", default=1.0)
+    climax_tp_pips: float = _env("CLIMAX_TP_PIPS", default=7.0)
+    climax_sl_pips: float = _env("CLIMAX_SL_PIPS", default=10.0)
+    counter_trend_tp_ratio: float = _env("COUNTER_TREND_TP_RATIO", default=0.5)
+
+    # エントリー判定
+    scalp_cond_tf: Optional[str] = _env("SCALP_COND_TF")
+    trend_cond_tf: str = _env("TREND_COND_TF", default="M5")
+    strict_tf_align: bool = _env("ALIGN_STRICT", "STRICT_TF_ALIGN", default=False)
+    higher_tf_enabled: bool = _env("HIGHER_TF_ENABLED", default=True)
+    always_entry: bool = _env("ALWAYS_ENTRY", default=False)
+    force_entry_after_ai: bool = _env("FORCE_ENTRY_AFTER_AI", default=False)
+    block_counter_trend: bool = _env("BLOCK_COUNTER_TREND", default=True)
+    adx_min: float = _env("ADX_MIN", default=0.0)
+    max_ai_calls_per_loop: int = _env("MAX_AI_CALLS_PER_LOOP", default=1)
+    max_limit_retry: int = _env("MAX_LIMIT_RETRY", default=3)
+    limit_threshold_atr_ratio: float = _env("LIMIT_THRESHOLD_ATR_RATIO", default=0.3)
+
+    # クールダウン（未設定時はランナーの現在値を使う）
+    position_review_sec: Optional[int] = _env("POSITION_REVIEW_SEC")
+    ai_cooldown_sec_open: Optional[int] = _env("AI_COOLDOWN_SEC_OPEN")
+    ai_cooldown_sec_flat: Optional[int] = _env("AI_COOLDOWN_SEC_FLAT")
+    sl_cooldown_sec: Optional[int] = _env("SL_COOLDOWN_SEC")
+
+    # 建玉管理
+    min_hold_seconds: int = _env("MIN_HOLD_SECONDS", default=0)
+    be_trigger_pips: float = _env("BE_TRIGGER_PIPS", default=10.0)
+    be_atr_trigger_mult: float = _env("BE_ATR_TRIGGER_MULT", default=0.0)
+    be_trigger_r: float = _env("BE_TRIGGER_R", default=0.0)
+    be_vol_adx_min: float = _env("BE_VOL_ADX_MIN", default=30.0)
+    be_vol_sl_mult: float = _env("BE_VOL_SL_MULT", default=2.0)
+    ai_profit_trigger_ratio: float = _env("AI_PROFIT_TRIGGER_RATIO", default=0.3)
+    force_close_on_risk: bool = _env("FORCE_CLOSE_ON_RISK", default=False)
+
+    # トレーリング停止時間帯
+    trail_enabled: bool = _env("TRAIL_ENABLED", default=True)
+    calendar_volatility_level: int = _env("CALENDAR_VOLATILITY_LEVEL", default=0)
+    quiet_start_hour_jst: float = _env("QUIET_START_HOUR_JST", default=3.0)
+    quiet_end_hour_jst: float = _env("QUIET_END_HOUR_JST", default=7.0)
+    quiet2_enabled: bool = _env("QUIET2_ENABLED", default=False)
+    quiet2_start_hour_jst: float = _env("QUIET2_START_HOUR_JST", default=23.0)
+    quiet2_end_hour_jst: float = _env("QUIET2_END_HOUR_JST", default=1.0)
+
+    # 再起動
+    auto_restart: bool = _env("AUTO_RESTART", default=False)
+    restart_min_interval: float = _env("RESTART_MIN_INTERVAL", default=60.0)
+
+    @classmethod
+    def from_env(
+        cls, environ: Mapping[str, str] | None = None, *, generation: int = 0
+    ) -> "RuntimeConfig":
+        """Parse the declared keys; raise ``ValueError`` naming every bad one."""
+        environ = os.environ if environ is None else environ
+        values: dict[str, object] = {"generation": generation}
+        errors = []
+        for f, keys, kind in _SPEC:
+            raw = None
+            for key in keys:
+                raw = _clean(environ.get(key))
+                if raw is not None:
+                    break
+            if raw is None:
+                continue
+            try:
+                values[f] = _convert(kind, raw)
+            except ValueError:
+                errors.append(f"{key}={raw!r} is not a valid {kind.__name__}")
+        if errors:
+            raise ValueError("invalid runtime settings: " + ", ".join(errors))
+        return cls(**values)
+
+
+def _clean(val: str | None) -> str | None:
+    # env_loader.get_env と同じく行末コメントと空白を除く
+    if val is None:
+        return None
+    val = val.split("#", 1)[0].strip()
+    return val or None
+
+
+def _convert(kind: type, raw: str) -> object:
+    if kind is bool:
+        return raw.lower() == "true"
+    return kind(raw)
+
+
+def _build_spec() -> tuple[tuple[str, tuple[str, ...], type], ...]:
+    hints = get_type_hints(RuntimeConfig)
+    spec = []
+    for f in fields(RuntimeConfig):
+        keys = f.metadata.get("env")
+        if not keys:
+            continue
+        kind = hints[f.name]
+        if get_origin(kind) is Union:
+            kind = next(a for a in get_args(kind) if a is not type(None))
+        spec.append((f.name, keys, kind))
+    return tuple(spec)
+
+
+_SPEC = _build_spec()
+_ENV_KEYS = tuple(dict.fromkeys(k for _f, keys, _t in _SPEC for k in keys))
+
+# mtime の確認は高々この間隔で行う
+_STAT_INTERVAL_SEC = 1.0
+
+_lock = threading.RLock()
+_snapshot: RuntimeConfig | None = None
+_raw: tuple | None = None
+_generation = 0
+_checked_at = 0.0
+_watched: dict[str, tuple[Callable[[list[Path]], None], dict[Path, float | None]]] = {}
+_pinned: contextvars.ContextVar[RuntimeConfig | None] = contextvars.ContextVar(
+    "runtime_config", default=None
+)
+
+
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def watch(
+    name: str, paths: Iterable[str | Path], reload: Callable[[list[Path]], None]
+) -> None:
+    """Call ``reload(changed_paths)`` when one of ``paths`` changes.
+
+    Registering ``name`` again replaces its previous file set.
+    """
+    files = {Path(p): _mtime(Path(p)) for p in paths}
+    with _lock:
+        _watched[name] = (reload, files)
+
+
+def _check_files() -> None:
+    for name, (reload, files) in list(_watched.items()):
+        changed = []
+        for p, seen in files.items():
+            mtime = _mtime(p)
+            if mtime != seen:
+                files[p] = mtime
+                # 削除されたファイルは読み直す対象にしない
+                if mtime is not None:
+                    changed.append(p)
+        if not changed:
+            continue
+        logger.info("config source changed: %s", ", ".join(map(str, changed)))
+        try:
+            reload(changed)
+        except Exception as exc:
+            logger.error("reloading %s failed: %s", name, exc)
+
+
+def refresh() -> RuntimeConfig:
+    """Return the latest snapshot, rebuilding it if a source has changed."""
+    global _snapshot, _raw, _generation, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if now - _checked_at >= _STAT_INTERVAL_SEC:
+            _checked_at = now
+            _check_files()
+        environ = os.environ
+        raw = tuple(map(environ.get, _ENV_KEYS))
+        if _snapshot is not None and raw == _raw:
+            return _snapshot
+        _raw = raw
+        try:
+            snap = RuntimeConfig.from_env(environ, generation=_generation + 1)
+        except ValueError as exc:
+            if _snapshot is None:
+                raise
+            logger.error("%s – keeping generation %d", exc, _snapshot.generation)
+            return _snapshot
+        _generation = snap.generation
+        _snapshot = snap
+        return snap
+
+
+def current() -> RuntimeConfig:
+    """Snapshot pinned for this loop, or the latest one outside a loop."""
+    snap = _pinned.get()
+    return snap if snap is not None else refresh()
+
+
+@contextmanager
+def pinned(**overrides) -> Iterator[RuntimeConfig]:
+    """Use one snapshot for everything :func:`current` returns in the block.
+
+    ``overrides`` replace fields of the pinned copy only, e.g. the pip size
+    of the runner's instrument.
+    """
+    snap = refresh()
+    if overrides:
+        snap = replace(snap, **overrides)
+    token = _pinned.set(snap)
+    try:
+        yield _pinned.get()
+    finally:
+        _pinned.reset(token)
+
+
+watch(
+    "env",
+    env_loader._DEFAULT_FILES,
+    lambda changed: env_loader.load_env(changed, override=True),
+)
+
+
+__all__ = [
+    "RuntimeConfig",
+    "current",
+    "pinned",
+    "refresh",
+    "watch",
+]
@@ -1,6 +1,6 @@
 """H1 support/resistance level block filter."""
 
-from backend.utils import env_loader
+from backend.config import runtime_config
 
 
 def _last_low(indicators: dict) -> float | None:
@@ -50,7 +50,7 @@ def is_near_h1_support(indicators_h1: dict, price: float, rng: float) -> bool:
     """Return True if ``price`` is within ``rng`` pips of the last H1 low."""
     if not indicators_h1 or rng <= 0 or price is None:
         return False
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     low = _last_low(indicators_h1)
     if low is None or pip_size <= 0:
         return False
@@ -61,7 +61,7 @@ def is_near_h1_resistance(indicators_h1: dict, price: float, rng: float) -> bool
     """Return True if ``price`` is within ``rng`` pips of the last H1 high."""
     if not indicators_h1 or rng <= 0 or price is None:
         return False
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     high = _last_high(indicators_h1)
     if high is None or pip_size <= 0:
         return False
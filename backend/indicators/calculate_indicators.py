@@ -1,7 +1,3 @@
-from typing import Sequence
-
-import numpy as np
-
 from backend.utils import env_loader
 
 try:
@@ -30,48 +26,23 @@ from backend.indicators.macd import calculate_macd, calculate_macd_histogram
 from backend.indicators.n_wave import calculate_n_wave_target
 from backend.indicators.pivot import calculate_pivots
 from backend.indicators.polarity import calculate_polarity
+from backend.indicators.percentile_cache import daily_percentiles, percentile_rank_sorted
 from backend.market_data.candle_fetcher import fetch_candles
+from backend.market_data.candle_frame import CandleFrame
 
 
-def _percentile_rank(series: Sequence[float], value: float) -> float | None:
-    """Return percentile rank of ``value`` within ``series`` (0-100)."""
-    if not series:
-        return None
-    arr = pd.Series(series).dropna().to_numpy()
-    if arr.size == 0:
-        return None
-    rank = np.searchsorted(np.sort(arr), value, side="right")
-    return 100.0 * rank / arr.size
-
-def calculate_indicators(
-    market_data,
-    *,
-    pair: str | None = None,
-    history_days: int = 90,
-    allow_incomplete: bool | None = None,
-) -> dict:
-    """Calculate trading indicators and recent-percentile stats."""
-    if allow_incomplete is None:
-        allow_incomplete = env_loader.get_env("USE_INCOMPLETE_BARS", "false").lower() == "true"
-    close_prices = [
-        float(c['mid']['c'])
-        for c in market_data
-        if allow_incomplete or c.get('complete')
-    ]
-    high_prices = [
-        float(c['mid']['h'])
-        for c in market_data
-        if allow_incomplete or c.get('complete')
-    ]
-    low_prices = [
-        float(c['mid']['l'])
-        for c in market_data
-        if allow_incomplete or c.get('complete')
-    ]
-
+def _weight_last(market_data) -> float:
+    """Return the volume weight of the latest bar relative to recent bars."""
     # --- 出来高関連の計算 -------------------------------------------
     vol_last = 0.0
-    if market_data and not market_data[-1].get('complete'):
+    if isinstance(market_data, CandleFrame):
+        vols, complete = market_data.volume, market_data.complete
+        if len(vols) and not complete[-1]:
+            vol_last = float(vols[-1])
+            complete_vols = vols[:-1][complete[:-1]].tolist()
+        else:
+            complete_vols = vols[complete].tolist()
+    elif market_data and not market_data[-1].get('complete'):
         vol_last = float(market_data[-1].get('volume', 0))
         complete_vols = [
             float(c.get('volume', 0))
@@ -84,13 +55,71 @@ def calculate_indicators(
     vol_avg = sum(recent_vols) / len(recent_vols) if recent_vols else 0.0
     # 平均値が得られない場合は 0.5 を用いる
     vol_ratio = (vol_last / vol_avg) if vol_avg else 0.5
-    weight_last = 0.5 + 0.5 * vol_ratio
+    return 0.5 + 0.5 * vol_ratio
 
-    import logging
-    logger = logging.getLogger(__name__)
-    # 最近の終値をデバッグレベルで出力
-    logger.debug(f"Latest close prices: {close_prices[-15:]}")
 
+def _daily_distributions(pair: str, history_days: int):
+    """Return sorted daily BB width / ATR values and the last daily bar time."""
+    try:
+        history = fetch_candles(pair, granularity="D", count=history_days)
+    except Exception:
+        history = []
+    history = [c for c in history if c.get('complete')]
+    if not history:
+        return None, None
+
+    h_close = [float(c['mid']['c']) for c in history]
+    h_high = [float(c['mid']['h']) for c in history]
+    h_low = [float(c['mid']['l']) for c in history]
+
+    hist_bb = calculate_bollinger_bands(h_close)
+    hist_bb_width = hist_bb['upper_band'] - hist_bb['lower_band']
+    hist_atr = calculate_atr(h_high, h_low, h_close)
+    dists = {
+        'bb_width': sorted(pd.Series(hist_bb_width).dropna().tolist()),
+        'atr': sorted(pd.Series(hist_atr).dropna().tolist()),
+    }
+    return dists, history[-1].get('time')
+
+
+def _apply_percentile_stats(indicators: dict, pair: str | None, history_days: int) -> None:
+    """Add ``bb_width_pct`` and ``atr_pct`` based on daily history.
+
+    The sorted daily distributions are cached per pair until the next daily
+    close (see :mod:`backend.indicators.percentile_cache`).
+    """
+    if pair is None:
+        pair = env_loader.get_env("DEFAULT_PAIR")
+    if env_loader.get_env("DAILY_PERCENTILE_CACHE", "true").lower() == "true":
+        dists = daily_percentiles.get(pair, history_days, _daily_distributions)
+    else:
+        dists, _ = _daily_distributions(pair, history_days)
+
+    if dists:
+        current_bb_width = (
+            indicators['bb_upper'].iloc[-1] - indicators['bb_lower'].iloc[-1]
+        )
+        current_atr = indicators['atr'].iloc[-1]
+
+        indicators['bb_width_pct'] = percentile_rank_sorted(dists['bb_width'], current_bb_width)
+        indicators['atr_pct'] = percentile_rank_sorted(dists['atr'], current_atr)
+    else:
+        indicators['bb_width_pct'] = None
+        indicators['atr_pct'] = None
+
+
+def compute_indicator_series(
+    close_prices: list[float],
+    high_prices: list[float],
+    low_prices: list[float],
+    *,
+    n_wave: bool = True,
+) -> dict:
+    """Return the per-bar indicator series used by :func:`calculate_indicators`.
+
+    The backtester calls this once over the full history so the replayed
+    decisions see exactly the live formulas.
+    """
     ema_fast_period = int(env_loader.get_env("EMA_FAST_PERIOD", "9"))
     ema_slow_period = int(env_loader.get_env("EMA_SLOW_PERIOD", "21"))
 
@@ -122,7 +151,7 @@ def calculate_indicators(
         'macd_signal': macd_signal_series,
         'macd_hist': macd_hist_series,
         'atr': calculate_atr(high_prices, low_prices, close_prices),
-        'n_wave_target': calculate_n_wave_target(close_prices),
+        'n_wave_target': calculate_n_wave_target(close_prices) if n_wave else None,
         # Spread Bollinger components so filters can access them directly
         'bb_upper': bb_df['upper_band'],
         'bb_lower': bb_df['lower_band'],
@@ -131,14 +160,57 @@ def calculate_indicators(
         'plus_di': plus_di,
         'minus_di': minus_di,
         'polarity': calculate_polarity(close_prices),
-        'weight_last': weight_last,
     }
+    return indicators
+
+
+def calculate_indicators(
+    market_data,
+    *,
+    pair: str | None = None,
+    history_days: int = 90,
+    allow_incomplete: bool | None = None,
+) -> dict:
+    """Calculate trading indicators and recent-percentile stats."""
+    if allow_incomplete is None:
+        allow_incomplete = env_loader.get_env("USE_INCOMPLETE_BARS", "false").lower() == "true"
+    if isinstance(market_data, CandleFrame):
+        bars = market_data if allow_incomplete else market_data.complete_only()
+        close_prices = bars.c.tolist()
+        high_prices = bars.h.tolist()
+        low_prices = bars.l.tolist()
+    else:
+        close_prices = [
+            float(c['mid']['c'])
+            for c in market_data
+            if allow_incomplete or c.get('complete')
+        ]
+        high_prices = [
+            float(c['mid']['h'])
+            for c in market_data
+            if allow_incomplete or c.get('complete')
+        ]
+        low_prices = [
+            float(c['mid']['l'])
+            for c in market_data
+            if allow_incomplete or c.get('complete')
+        ]
+
+    weight_last = _weight_last(market_data)
+
+    import logging
+    logger = logging.getLogger(__name__)
+    # 最近の終値をデバッグレベルで出力
+    logger.debug(f"Latest close prices: {close_prices[-15:]}")
+
+    indicators = compute_indicator_series(close_prices, high_prices, low_prices)
+    indicators['weight_last'] = weight_last
 
     try:
         score = calculate_adx_bb_score(
-            adx_series,
-            bb_df['upper_band'],
-            bb_df['lower_band'],
+            indicators['adx'],
+            indicators['bb_upper'],
+            indicators['bb_lower'],
         )
     except Exception:
         score = 0.0
@@ -162,41 +234,37 @@ def calculate_indicators(
             indicators[key] = series.ffill().bfill()
 
     # --- Percentile stats from historical daily data --------------------
-    if pair is None:
-        pair = env_loader.get_env("DEFAULT_PAIR")
-    try:
-        history = fetch_candles(pair, granularity="D", count=history_days)
-    except Exception:
-        history = []
-
-    if history:
-        h_close = [float(c['mid']['c']) for c in history if c.get('complete')]
-        h_high = [float(c['mid']['h']) for c in history if c.get('complete')]
-        h_low = [float(c['mid']['l']) for c in history if c.get('complete')]
-
-        hist_bb = calculate_bollinger_bands(h_close)
-        hist_bb_width = (hist_bb['upper_band'] - hist_bb['lower_band']).tolist()
-        hist_atr = calculate_atr(h_high, h_low, h_close).tolist()
-
-        current_bb_width = (
-            indicators['bb_upper'].iloc[-1] - indicators['bb_lower'].iloc[-1]
-        )
-        current_atr = indicators['atr'].iloc[-1]
-
-        indicators['bb_width_pct'] = _percentile_rank(hist_bb_width, current_bb_width)
-        indicators['atr_pct'] = _percentile_rank(hist_atr, current_atr)
-    else:
-        indicators['bb_width_pct'] = None
-        indicators['atr_pct'] = None
+    _apply_percentile_stats(indicators, pair, history_days)
 
     return indicators
 
 
 
 def calculate_indicators_multi(
-    market_data_dict: dict[str, list], *, pair: str | None = None, history_days: int = 90, allow_incomplete: bool | None = None
+    market_data_dict: dict[str, list],
+    *,
+    pair: str | None = None,
+    history_days: int = 90,
+    allow_incomplete: bool | None = None,
+    incremental: bool | None = None,
 ) -> dict[str, dict]:
-    """Calculate indicators for multiple timeframes."""
+    """Calculate indicators for multiple timeframes.
+
+    When ``incremental`` is true (default: ``INCREMENTAL_INDICATORS`` env)
+    the shared :class:`~backend.indicators.incremental.IncrementalIndicatorEngine`
+    is used so that only changed bars are recomputed between calls.
+    """
+    if incremental is None:
+        incremental = env_loader.get_env("INCREMENTAL_INDICATORS", "true").lower() == "true"
+    if incremental:
+        from backend.indicators.incremental import get_engine
+
+        return get_engine().update_multi(
+            pair,
+            market_data_dict,
+            history_days=history_days,
+            allow_incomplete=allow_incomplete,
+        )
     result = {}
     for tf, data in market_data_dict.items():
         result[tf] = calculate_indicators(
@@ -206,5 +274,3 @@ def calculate_indicators_multi(
             allow_incomplete=allow_incomplete,
         )
     return result
-
-
@@ -0,0 +1,508 @@
+"""Stateful incremental indicator engine.
+
+``calculate_indicators`` rebuilds every pandas Series from scratch on each
+call even though, between two loops, usually only the incomplete last bar of
+a timeframe has moved.  :class:`IncrementalIndicatorEngine` keeps the parsed
+OHLC arrays and the indicator state per ``(pair, timeframe)`` and only
+recomputes the bars that changed.  The returned dictionary has the same keys
+and Series layout as :func:`calculate_indicators`.
+
+All indicators are causal, so as long as the first bar of the window is
+unchanged only the tail has to be recomputed.  When the window slides (a new
+bar pushes the oldest one out) the EMA/RSI seeds move as well, so the
+indicator arrays are rebuilt from the already parsed prices to stay identical
+to the pandas implementation.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Mapping, Sequence
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError as e:
+    raise ImportError(
+        "Pandas is required for indicator calculations."
+        " Install it with 'pip install pandas'."
+    ) from e
+
+from backend.market_data.candle_frame import CandleFrame
+from backend.utils import env_loader
+
+logger = logging.getLogger(__name__)
+
+# calculate_di は period を渡さずに呼ばれるため既定値 14 で固定
+DI_PERIOD = 14
+
+
+def _load_config() -> tuple:
+    """Return indicator periods using the same defaults as the pandas path."""
+    try:
+        bb_std = float(os.environ.get("BOLLINGER_STD", 2))
+    except ValueError:
+        bb_std = 2.0
+    return (
+        int(env_loader.get_env("RSI_PERIOD", 14)),
+        int(env_loader.get_env("EMA_FAST_PERIOD", "9")),
+        int(env_loader.get_env("EMA_SLOW_PERIOD", "21")),
+        int(env_loader.get_env("MACD_FAST_PERIOD", 12)),
+        int(env_loader.get_env("MACD_SLOW_PERIOD", 26)),
+        int(env_loader.get_env("MACD_SIGNAL_PERIOD", 9)),
+        int(env_loader.get_env("ATR_PERIOD", 14)),
+        int(env_loader.get_env("ADX_PERIOD", "12")),
+        int(os.environ.get("BOLLINGER_WINDOW", 20)),
+        bb_std,
+        int(env_loader.get_env("POLARITY_PERIOD", "10")),
+    )
+
+
+def _span_alpha(span: int) -> float:
+    """Return the smoothing factor pandas derives from ``span``."""
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+def _ewm_tail(values: np.ndarray, out: np.ndarray, start: int, alpha: float) -> None:
+    """Fill ``out[start:]`` with ``ewm(alpha, adjust=False).mean()`` values."""
+    old_wt = 1.0 - alpha
+    for i in range(start, len(values)):
+        cur = values[i]
+        if i == 0:
+            out[i] = cur
+            continue
+        weighted = out[i - 1]
+        if weighted != weighted:
+            out[i] = cur
+        elif cur != cur:
+            out[i] = weighted
+        else:
+            # pandas と同じ演算順序で計算し結果を一致させる
+            if weighted != cur:
+                weighted = old_wt * weighted + alpha * cur
+                weighted /= old_wt + alpha
+            out[i] = weighted
+
+
+def _rolling_tail(
+    values: np.ndarray,
+    out: np.ndarray,
+    start: int,
+    window: int,
+    min_periods: int,
+    reducer: Callable[..., Any],
+) -> None:
+    """Fill ``out[start:]`` with a rolling reduction over ``values``."""
+    n = len(values)
+    # ウィンドウが埋まる前の部分 (min_periods 未満は NaN)
+    for i in range(start, min(window - 1, n)):
+        if i + 1 < min_periods:
+            out[i] = np.nan
+        else:
+            out[i] = reducer(values[: i + 1], axis=0)
+    full_start = max(start, window - 1)
+    if full_start < n:
+        views = np.lib.stride_tricks.sliding_window_view(
+            values[full_start - window + 1:], window
+        )
+        out[full_start:n] = reducer(views, axis=1)
+
+
+def _std(arr: np.ndarray, axis: int) -> np.ndarray:
+    return np.std(arr, axis=axis, ddof=1)
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, start: int) -> np.ndarray:
+    """Return true range values for ``start:`` (first bar uses high-low)."""
+    hl = high[start:] - low[start:]
+    if start == 0:
+        prev = np.concatenate(([np.nan], close[:-1]))
+    else:
+        prev = close[start - 1:-1]
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(hl, np.fmax(np.abs(high[start:] - prev), np.abs(low[start:] - prev)))
+    return tr
+
+
+class _SeriesState:
+    """Parsed OHLC arrays and raw indicator arrays for one ``(pair, tf)``."""
+
+    __slots__ = ("config", "times", "complete", "cols", "lock")
+
+    def __init__(self) -> None:
+        self.config: tuple | None = None
+        self.times: list = []
+        self.complete: list[bool] = []
+        self.cols: dict[str, np.ndarray] = {}
+        self.lock = threading.Lock()
+
+
+_INPUT_COLS = ("close", "high", "low")
+_DERIVED_COLS = (
+    "tr",
+    "plus_dm",
+    "minus_dm",
+    "sign",
+    "gain",
+    "loss",
+    "ema_fast",
+    "ema_slow",
+    "macd_fast",
+    "macd_slow",
+    "macd",
+    "macd_signal",
+    "avg_gain",
+    "avg_loss",
+    "rsi",
+    "atr",
+    "bb_middle",
+    "bb_std",
+    "adx_atr",
+    "adx_plus",
+    "adx_minus",
+    "dx",
+    "adx",
+    "di_atr",
+    "plus_di",
+    "minus_di",
+    "polarity",
+)
+
+
+class IncrementalIndicatorEngine:
+    """Keep indicator state per ``(pair, timeframe)`` across job loops."""
+
+    def __init__(self) -> None:
+        self._states: dict[tuple[str | None, str], _SeriesState] = {}
+        self._lock = threading.Lock()
+        self.full_recomputes = 0
+        self.incremental_updates = 0
+
+    # ------------------------------------------------------------------
+    # public API
+    # ------------------------------------------------------------------
+    def reset(self, pair: str | None = None, timeframe: str | None = None) -> None:
+        """Drop cached state for ``pair``/``timeframe`` (all when omitted)."""
+        with self._lock:
+            for key in list(self._states):
+                if pair is not None and key[0] != pair:
+                    continue
+                if timeframe is not None and key[1] != timeframe:
+                    continue
+                del self._states[key]
+
+    def update(
+        self,
+        pair: str | None,
+        timeframe: str,
+        market_data: Sequence[Mapping],
+        *,
+        history_days: int = 90,
+        allow_incomplete: bool | None = None,
+    ) -> dict:
+        """Fold ``market_data`` into the cached state and return indicators."""
+        from backend.indicators.calculate_indicators import (
+            _apply_percentile_stats,
+            _weight_last,
+        )
+
+        if allow_incomplete is None:
+            allow_incomplete = env_loader.get_env("USE_INCOMPLETE_BARS", "false").lower() == "true"
+        if pair is None:
+            pair = env_loader.get_env("DEFAULT_PAIR")
+        if isinstance(market_data, CandleFrame):
+            candles = market_data if allow_incomplete else market_data.complete_only()
+        else:
+            candles = [c for c in market_data if allow_incomplete or c.get("complete")]
+
+        state = self._get_state(pair, timeframe)
+        with state.lock:
+            self._fold(state, candles, _load_config())
+            indicators = self._build_output(state, _weight_last(market_data))
+        _apply_percentile_stats(indicators, pair, history_days)
+        return indicators
+
+    def update_multi(
+        self,
+        pair: str | None,
+        market_data_dict: Mapping[str, Sequence[Mapping]],
+        *,
+        history_days: int = 90,
+        allow_incomplete: bool | None = None,
+    ) -> dict[str, dict]:
+        """Update every timeframe in ``market_data_dict``."""
+        return {
+            tf: self.update(
+                pair,
+                tf,
+                data,
+                history_days=history_days,
+                allow_incomplete=allow_incomplete,
+            )
+            for tf, data in market_data_dict.items()
+        }
+
+    # ------------------------------------------------------------------
+    # internals
+    # ------------------------------------------------------------------
+    def _get_state(self, pair: str | None, timeframe: str) -> _SeriesState:
+        key = (pair, timeframe)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = _SeriesState()
+                self._states[key] = state
+            return state
+
+    @staticmethod
+    def _reusable_bars(state: _SeriesState, times: list) -> tuple[int, int]:
+        """Return ``(offset, count)`` of cached bars still valid for ``times``.
+
+        ``offset`` is the index in the cached window matching ``times[0]``;
+        ``count`` is how many leading bars can be reused without reparsing.
+        Only bars that were already complete are reused.
+        """
+        if not state.times or not times:
+            return 0, 0
+        first = times[0]
+        if first is None:
+            return 0, 0
+        try:
+            offset = state.times.index(first)
+        except ValueError:
+            return 0, 0
+        limit = min(len(state.times) - offset, len(times))
+        count = 0
+        while (
+            count < limit
+            and state.complete[offset + count]
+            and times[count] == state.times[offset + count]
+        ):
+            count += 1
+        return offset, count
+
+    def _fold(self, state: _SeriesState, candles: Sequence[Mapping], config: tuple) -> None:
+        if state.config != config:
+            state.config = config
+            state.times = []
+            state.complete = []
+            state.cols = {}
+
+        if isinstance(candles, CandleFrame):
+            times = candles.time.tolist()
+            complete = candles.complete.tolist()
+        else:
+            times = [c.get("time") for c in candles]
+            complete = [bool(c.get("complete")) for c in candles]
+        offset, reuse = self._reusable_bars(state, times)
+        n = len(candles)
+        fresh = candles[reuse:]
+        if isinstance(fresh, CandleFrame):
+            parsed = {"close": fresh.c, "high": fresh.h, "low": fresh.l}
+        else:
+            parsed = {
+                "close": np.fromiter((float(c["mid"]["c"]) for c in fresh), dtype="float64", count=len(fresh)),
+                "high": np.fromiter((float(c["mid"]["h"]) for c in fresh), dtype="float64", count=len(fresh)),
+                "low": np.fromiter((float(c["mid"]["l"]) for c in fresh), dtype="float64", count=len(fresh)),
+            }
+        cols: dict[str, np.ndarray] = {}
+        for name in _INPUT_COLS:
+            old = state.cols.get(name)
+            head = old[offset: offset + reuse] if old is not None else parsed[name][:0]
+            cols[name] = np.concatenate((head, parsed[name]))
+
+        # ウィンドウ先頭が動いた場合は EMA/RSI の初期値も変わるため全再計算
+        start = reuse if offset == 0 else 0
+        for name in _DERIVED_COLS:
+            arr = np.empty(n, dtype="float64")
+            old = state.cols.get(name)
+            if start and old is not None:
+                arr[:start] = old[:start]
+            cols[name] = arr
+        if start:
+            self.incremental_updates += 1
+        else:
+            self.full_recomputes += 1
+
+        state.times = times
+        state.complete = complete
+        state.cols = cols
+        if n:
+            self._compute(cols, config, start)
+
+    @staticmethod
+    def _compute(cols: dict[str, np.ndarray], config: tuple, start: int) -> None:
+        (
+            rsi_period,
+            ema_fast_period,
+            ema_slow_period,
+            macd_fast_period,
+            macd_slow_period,
+            macd_signal_period,
+            atr_period,
+            adx_period,
+            bb_window,
+            _bb_std,
+            polarity_period,
+        ) = config
+        close = cols["close"]
+        high = cols["high"]
+        low = cols["low"]
+        n = len(close)
+
+        # --- 差分系列 ---------------------------------------------------
+        cols["tr"][start:] = _true_range(high, low, close, start)
+        if start == 0:
+            delta = np.concatenate(([np.nan], np.diff(close)))
+            up = np.concatenate(([np.nan], np.diff(high)))
+            down = np.concatenate(([np.nan], -np.diff(low)))
+        else:
+            delta = close[start:] - close[start - 1:-1]
+            up = high[start:] - high[start - 1:-1]
+            down = -(low[start:] - low[start - 1:-1])
+        with np.errstate(invalid="ignore"):
+            cols["plus_dm"][start:] = np.where((up > down) & (up > 0), up, 0.0)
+            cols["minus_dm"][start:] = np.where((down > up) & (down > 0), down, 0.0)
+            cols["sign"][start:] = np.where(delta > 0, 1.0, np.where(delta < 0, -1.0, 0.0))
+            cols["gain"][start:] = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+            cols["loss"][start:] = np.where(np.isnan(delta), np.nan, -np.minimum(delta, 0.0))
+
+        # --- EMA / MACD -------------------------------------------------
+        _ewm_tail(close, cols["ema_fast"], start, _span_alpha(ema_fast_period))
+        _ewm_tail(close, cols["ema_slow"], start, _span_alpha(ema_slow_period))
+        _ewm_tail(close, cols["macd_fast"], start, _span_alpha(macd_fast_period))
+        _ewm_tail(close, cols["macd_slow"], start, _span_alpha(macd_slow_period))
+        cols["macd"][start:] = cols["macd_fast"][start:] - cols["macd_slow"][start:]
+        _ewm_tail(cols["macd"], cols["macd_signal"], start, _span_alpha(macd_signal_period))
+
+        # --- RSI (Wilder smoothing seeded by a simple mean) ---------------
+        avg_gain = cols["avg_gain"]
+        avg_loss = cols["avg_loss"]
+        seed_end = min(rsi_period + 1, n)
+        if start < seed_end:
+            _rolling_tail(cols["gain"][:seed_end], avg_gain, start, rsi_period, rsi_period, np.mean)
+            _rolling_tail(cols["loss"][:seed_end], avg_loss, start, rsi_period, rsi_period, np.mean)
+        gain = cols["gain"]
+        loss = cols["loss"]
+        for i in range(max(start, rsi_period + 1), n):
+            avg_gain[i] = (avg_gain[i - 1] * (rsi_period - 1) + gain[i]) / rsi_period
+            avg_loss[i] = (avg_loss[i - 1] * (rsi_period - 1) + loss[i]) / rsi_period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain[start:] / avg_loss[start:]
+            cols["rsi"][start:] = 100 - (100 / (1 + rs))
+
+        # --- ATR / Bollinger / polarity ---------------------------------
+        _rolling_tail(cols["tr"], cols["atr"], start, atr_period, 1, np.mean)
+        _rolling_tail(close, cols["bb_middle"], start, bb_window, bb_window, np.mean)
+        _rolling_tail(close, cols["bb_std"], start, bb_window, bb_window, _std)
+        _rolling_tail(cols["sign"], cols["polarity"], start, polarity_period, 1, np.sum)
+        cols["polarity"][start:] /= polarity_period
+
+        # --- ADX and DI ---------------------------------------------------
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for prefix, period in (("adx_", adx_period), ("di_", DI_PERIOD)):
+                atr = cols[f"{prefix}atr"]
+                _rolling_tail(cols["tr"], atr, start, period, period, np.mean)
+                plus_out = cols["adx_plus" if prefix == "adx_" else "plus_di"]
+                minus_out = cols["adx_minus" if prefix == "adx_" else "minus_di"]
+                _rolling_tail(cols["plus_dm"], plus_out, start, period, period, np.sum)
+                _rolling_tail(cols["minus_dm"], minus_out, start, period, period, np.sum)
+                plus_out[start:] = 100 * (plus_out[start:] / atr[start:])
+                minus_out[start:] = 100 * (minus_out[start:] / atr[start:])
+            plus_di = cols["adx_plus"][start:]
+            minus_di = cols["adx_minus"][start:]
+            cols["dx"][start:] = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        _rolling_tail(cols["dx"], cols["adx"], start, adx_period, adx_period, np.mean)
+
+    @staticmethod
+    def _build_output(state: _SeriesState, weight_last: float) -> dict:
+        from backend.indicators.adx import calculate_adx_bb_score
+        from backend.indicators.n_wave import calculate_n_wave_target
+        from backend.indicators.pivot import calculate_pivots
+
+        cols = state.cols
+        bb_std = state.config[9]
+        close = cols.get("close", np.empty(0))
+        n = len(close)
+
+        def _series(arr: np.ndarray) -> pd.Series:
+            return pd.Series(arr, dtype="float64")
+
+        if n:
+            bb_upper = cols["bb_middle"] + bb_std * cols["bb_std"]
+            bb_lower = cols["bb_middle"] - bb_std * cols["bb_std"]
+            ema_slope = np.concatenate(([np.nan], np.diff(cols["ema_fast"])))
+            macd_hist = cols["macd"] - cols["macd_signal"]
+        else:
+            bb_upper = bb_lower = ema_slope = macd_hist = np.empty(0)
+
+        indicators: dict[str, Any] = {
+            "rsi": _series(cols.get("rsi", np.empty(0))),
+            "ema_fast": _series(cols.get("ema_fast", np.empty(0))),
+            "ema_slow": _series(cols.get("ema_slow", np.empty(0))),
+            "ema_slope": _series(ema_slope),
+            "macd": _series(cols.get("macd", np.empty(0))),
+            "macd_signal": _series(cols.get("macd_signal", np.empty(0))),
+            "macd_hist": _series(macd_hist),
+            "atr": _series(cols.get("atr", np.empty(0))),
+            # calculate_n_wave_target は直近 20 本しか参照しない
+            "n_wave_target": calculate_n_wave_target(close[-20:].tolist()),
+            "bb_upper": _series(bb_upper),
+            "bb_lower": _series(bb_lower),
+            "bb_middle": _series(cols.get("bb_middle", np.empty(0))),
+            "adx": _series(cols.get("adx", np.empty(0))),
+            "plus_di": _series(cols.get("plus_di", np.empty(0))),
+            "minus_di": _series(cols.get("minus_di", np.empty(0))),
+            "polarity": _series(cols.get("polarity", np.empty(0))),
+            "weight_last": weight_last,
+        }
+
+        # calculate_adx_bb_score は末尾 20 本のみ参照する
+        tail = 20
+        try:
+            score = calculate_adx_bb_score(
+                cols["adx"][-tail:].tolist(),
+                bb_upper[-tail:].tolist(),
+                bb_lower[-tail:].tolist(),
+            )
+        except Exception:
+            score = 0.0
+        indicators["adx_bb_score"] = score
+
+        if n:
+            piv = calculate_pivots(float(cols["high"][-1]), float(cols["low"][-1]), float(close[-1]))
+            indicators.update(
+                {
+                    "pivot": piv["pivot"],
+                    "pivot_r1": piv["r1"],
+                    "pivot_s1": piv["s1"],
+                    "pivot_r2": piv["r2"],
+                    "pivot_s2": piv["s2"],
+                }
+            )
+
+        # 各指標の欠損値を前後の値で補完
+        for key, series in indicators.items():
+            if isinstance(series, pd.Series):
+                indicators[key] = series.ffill().bfill()
+        return indicators
+
+
+_DEFAULT_ENGINE: IncrementalIndicatorEngine | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_engine() -> IncrementalIndicatorEngine:
+    """Return the process-wide engine shared by ``calculate_indicators_multi``."""
+    global _DEFAULT_ENGINE
+    with _DEFAULT_LOCK:
+        if _DEFAULT_ENGINE is None:
+            _DEFAULT_ENGINE = IncrementalIndicatorEngine()
+        return _DEFAULT_ENGINE
+
+
+__all__ = ["IncrementalIndicatorEngine", "get_engine"]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+"""Per-pair cache of daily indicator distributions.
+
+``bb_width_pct`` and ``atr_pct`` rank the current Bollinger width / ATR
+against the last ``history_days`` daily bars.  The daily history only changes
+once per daily close, so the sorted distributions are built once and every
+lookup afterwards is a binary search.
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Sequence
+
+from backend.market_data.candle_cache import parse_candle_time
+from backend.utils import env_loader
+
+# loader(pair, history_days) -> (distributions, last complete daily bar time)
+Loader = Callable[[str, int], "tuple[dict[str, list[float]] | None, str | None]"]
+
+_DAY = timedelta(days=1)
+
+
+def percentile_rank_sorted(values: Sequence[float], value: float) -> float | None:
+    """Return percentile rank (0-100) of ``value`` in pre-sorted ``values``."""
+    if not values:
+        return None
+    return 100.0 * bisect_right(values, value) / len(values)
+
+
+@dataclass
+class _Entry:
+    dists: dict[str, list[float]] | None = None
+    valid_until: datetime | None = None
+    checked_at: float = float("-inf")
+    checked_wall: datetime | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class DailyPercentileCache:
+    """Sorted daily distributions keyed by ``(pair, history_days)``.
+
+    Entries are valid until the next daily bar can have closed (two days
+    after the start of the last complete bar).  When a refresh finds no new
+    bar, e.g. over the weekend, the loader is retried at most every
+    ``retry_sec`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        retry_sec: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ) -> None:
+        self.retry_sec = retry_sec
+        self._clock = clock
+        self._now = now
+        self._entries: dict[tuple[str, int], _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.refreshes = 0
+
+    def get(self, pair: str, history_days: int, loader: Loader) -> dict[str, list[float]] | None:
+        """Return sorted distributions, refreshing via ``loader`` when stale."""
+        key = (pair, history_days)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+        with entry.lock:
+            if self._is_fresh(entry):
+                with self._lock:
+                    self.hits += 1
+                return entry.dists
+            dists, last_time = loader(pair, history_days)
+            with self._lock:
+                self.refreshes += 1
+            start = parse_candle_time(last_time)
+            entry.dists = dists
+            entry.valid_until = start + 2 * _DAY if start else None
+            entry.checked_at = self._clock()
+            entry.checked_wall = self._now()
+            return dists
+
+    def rank(self, pair: str, history_days: int, loader: Loader, name: str, value: float) -> float | None:
+        """Shortcut for ``percentile_rank_sorted`` on a cached distribution."""
+        dists = self.get(pair, history_days, loader)
+        if not dists:
+            return None
+        return percentile_rank_sorted(dists.get(name, []), value)
+
+    def invalidate(self, pair: str | None = None) -> None:
+        """Drop cached distributions for ``pair`` (all pairs if ``None``)."""
+        with self._lock:
+            for key in list(self._entries):
+                if pair is None or key[0] == pair:
+                    del self._entries[key]
+
+    def _is_fresh(self, entry: _Entry) -> bool:
+        if entry.checked_at == float("-inf"):
+            return False
+        if entry.dists and entry.valid_until is not None:
+            if self._now() < entry.valid_until:
+                return True
+            # 期限切れ後に確認済みでなければ即再取得する
+            if entry.checked_wall is None or entry.checked_wall < entry.valid_until:
+                return False
+        return self._clock() - entry.checked_at < self.retry_sec
+
+
+daily_percentiles = DailyPercentileCache(
+    retry_sec=float(env_loader.get_env("DAILY_PERCENTILE_RETRY_SEC", "300"))
+)
+
+__all__ = ["DailyPercentileCache", "daily_percentiles", "percentile_rank_sorted"]
@@ -1,72 +1,232 @@
-"""Rolling indicator utilities using deque for efficiency."""
+"""Rolling indicator utilities with O(1) updates.
+
+Window sums are kept as running totals (and the Bollinger variance as a
+sliding-window Welford accumulator) instead of re-summing the deque on every
+tick.  To stop floating-point drift from add/subtract cycles the totals are
+re-summed from the window once every ``maxlen`` updates, which keeps the
+amortized cost O(1) and the outputs equal to the straightforward
+``sum(window) / len(window)`` formulas within float rounding.
+
+Every class also offers ``update_many`` for bulk replay: it accepts an array
+(or a list of tick dicts) and returns the per-update outputs as a NumPy
+array, leaving the object in the same state as repeated ``update`` calls.
+"""
 
 from __future__ import annotations
 
 from collections import deque
-from typing import Any, Deque, Dict
+from typing import Any, Deque, Dict, Iterable
+
+import numpy as np
+
+
+class _RollingSum:
+    """Fixed-size window of non-negative values with a running total."""
+
+    __slots__ = ("values", "maxlen", "total", "_nonzero", "_left")
+
+    def __init__(self, maxlen: int) -> None:
+        self.values: Deque[float] = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.total = 0.0
+        self._nonzero = 0
+        self._left = maxlen
+
+    def push(self, value: float) -> float:
+        """Append ``value`` and return the window mean."""
+        values = self.values
+        n = len(values)
+        if n == self.maxlen:
+            old = values[0]
+            total = self.total - old + value
+            if old:
+                self._nonzero -= 1
+        else:
+            total = self.total + value
+            n += 1
+        values.append(value)
+        if value:
+            self._nonzero += 1
+        self._left -= 1
+        if not self._nonzero:
+            # 全てゼロの窓は丸め誤差を残さず 0 にする (``if avg`` 判定を変えない)
+            total = 0.0
+        elif not self._left:
+            # 加減算の誤差が積もらないよう定期的に合計し直す
+            total = sum(values)
+            self._left = self.maxlen
+        self.total = total
+        return max(total, 0.0) / n
+
+    def mean(self) -> float:
+        return max(self.total, 0.0) / len(self.values) if self.values else 0.0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class _RollingMoments:
+    """Sliding-window mean / population variance (Welford).
+
+    Values are accumulated relative to ``shift`` (re-centred at every
+    resync) so that the add/remove updates work on small deviations
+    instead of raw price levels.  A window of identical values reports a
+    variance of exactly zero.
+    """
+
+    __slots__ = ("values", "shift", "mean", "m2", "_run", "_ops")
+
+    def __init__(self, maxlen: int) -> None:
+        self.values: Deque[float] = deque(maxlen=maxlen)
+        self.shift: float | None = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._run = 0
+        self._ops = 0
+
+    def append(self, x: float) -> None:
+        values = self.values
+        if self.shift is None:
+            self.shift = x
+        self._run = self._run + 1 if values and values[-1] == x else 1
+        n = len(values)
+        if n == values.maxlen:
+            y = values[0] - self.shift
+            values.append(x)
+            x -= self.shift
+            old_mean = self.mean
+            self.mean = old_mean + (x - y) / n
+            self.m2 += (x - y) * (x - self.mean + y - old_mean)
+        else:
+            values.append(x)
+            x -= self.shift
+            delta = x - self.mean
+            self.mean += delta / (n + 1)
+            self.m2 += delta * (x - self.mean)
+        self._ops += 1
+        if self._run >= len(values):
+            # 横ばいの窓は分散ちょうど 0 とし、それまでの誤差も捨てる
+            self.mean = values[-1] - self.shift
+            self.m2 = 0.0
+        elif self._ops >= values.maxlen:
+            # 直近値を基準に取り直して平均と偏差平方和を計算し直す
+            self.shift = values[-1]
+            n = len(values)
+            self.mean = sum(v - self.shift for v in values) / n
+            self.m2 = sum((v - self.shift - self.mean) ** 2 for v in values)
+            self._ops = 0
+
+    def variance(self) -> float:
+        n = len(self.values)
+        return max(self.m2, 0.0) / n if n else 0.0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _hlc(data: Any) -> tuple[list[float], list[float], list[float]]:
+    """Return ``high``, ``low`` and ``close`` lists from ticks or an ``(n, 3)`` array."""
+    if isinstance(data, np.ndarray):
+        arr = np.asarray(data, dtype=float).reshape(-1, 3)
+        return arr[:, 0].tolist(), arr[:, 1].tolist(), arr[:, 2].tolist()
+    highs: list[float] = []
+    lows: list[float] = []
+    closes: list[float] = []
+    for tick in data:
+        highs.append(float(tick["high"]))
+        lows.append(float(tick["low"]))
+        closes.append(float(tick["close"]))
+    return highs, lows, closes
+
+
+def _column(data: Any, key: str) -> list[float]:
+    """Return a float list from a 1-D array or ``key`` of tick dicts."""
+    if isinstance(data, np.ndarray):
+        return np.asarray(data, dtype=float).reshape(-1).tolist()
+    return [float(t[key] if isinstance(t, dict) else t) for t in data]
+
+
+def _true_range(high: float, low: float, prev_close: float | None) -> float:
+    if prev_close is None:
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
 
 
 class RollingATR:
     """ATR をローリングで計算して EMA 比を返すクラス."""
 
+    __slots__ = ("length", "tr_values", "prev_close", "ema", "alpha")
+
     def __init__(self, length: int = 14) -> None:
         self.length = length
-        self.tr_values: Deque[float] = deque(maxlen=length)
+        self.tr_values = _RollingSum(length)
         self.prev_close: float | None = None
         self.ema: float | None = None
         self.alpha = 2 / (length + 1)
 
-    def update(self, tick: Dict[str, Any]) -> float:
-        """高値・安値・終値を含む tick データで更新する."""
-        high = float(tick["high"])
-        low = float(tick["low"])
-        close = float(tick["close"])
-        if self.prev_close is None:
-            tr = high - low
-        else:
-            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
-        self.tr_values.append(tr)
+    def _update(self, high: float, low: float, close: float) -> float:
+        atr = self.tr_values.push(_true_range(high, low, self.prev_close))
         self.prev_close = close
-        atr = sum(self.tr_values) / len(self.tr_values)
         self.ema = atr if self.ema is None else self.ema + self.alpha * (atr - self.ema)
         if self.ema:
             return atr / self.ema
         return 1.0
 
+    def update(self, tick: Dict[str, Any]) -> float:
+        """高値・安値・終値を含む tick データで更新する."""
+        return self._update(float(tick["high"]), float(tick["low"]), float(tick["close"]))
+
+    def update_many(self, data: Iterable[Dict[str, Any]] | np.ndarray) -> np.ndarray:
+        """tick 列または ``(n, 3)`` の high/low/close 配列でまとめて更新する."""
+        highs, lows, closes = _hlc(data)
+        step = self._update
+        return np.array([step(h, l, c) for h, l, c in zip(highs, lows, closes)], dtype=float)
+
 
 class RollingADX:
     """ADX とその増減を算出するローリングクラス."""
 
+    __slots__ = (
+        "length",
+        "prev_high",
+        "prev_low",
+        "prev_close",
+        "tr_values",
+        "plus_dm",
+        "minus_dm",
+        "adx",
+        "prev_adx",
+        "last_di_plus",
+        "last_di_minus",
+    )
+
     def __init__(self, length: int = 14) -> None:
         self.length = length
         self.prev_high: float | None = None
         self.prev_low: float | None = None
         self.prev_close: float | None = None
-        self.tr_values: Deque[float] = deque(maxlen=length)
-        self.plus_dm: Deque[float] = deque(maxlen=length)
-        self.minus_dm: Deque[float] = deque(maxlen=length)
+        self.tr_values = _RollingSum(length)
+        self.plus_dm = _RollingSum(length)
+        self.minus_dm = _RollingSum(length)
         self.adx: float | None = None
         self.prev_adx: float | None = None
         self.last_di_plus: float | None = None
         self.last_di_minus: float | None = None
 
-    def update(self, tick: Dict[str, Any]) -> tuple[float, float]:
-        high = float(tick["high"])
-        low = float(tick["low"])
-        close = float(tick["close"])
+    def _update(self, high: float, low: float, close: float) -> tuple[float, float]:
         if self.prev_high is None:
             self.prev_high = high
             self.prev_low = low
             self.prev_close = close
             return 0.0, 0.0
-        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        tr = _true_range(high, low, self.prev_close)
         up_move = high - self.prev_high
         down_move = self.prev_low - low
         plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
         minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
-        self.tr_values.append(tr)
-        self.plus_dm.append(plus_dm)
-        self.minus_dm.append(minus_dm)
+        atr = self.tr_values.push(tr)
+        plus_avg = self.plus_dm.push(plus_dm)
+        minus_avg = self.minus_dm.push(minus_dm)
         self.prev_high = high
         self.prev_low = low
         self.prev_close = close
@@ -74,9 +234,8 @@ class RollingADX:
             self.last_di_plus = None
             self.last_di_minus = None
             return 0.0, 0.0
-        atr = sum(self.tr_values) / len(self.tr_values)
-        di_plus = 100 * (sum(self.plus_dm) / len(self.plus_dm)) / atr if atr else 0.0
-        di_minus = 100 * (sum(self.minus_dm) / len(self.minus_dm)) / atr if atr else 0.0
+        di_plus = 100 * plus_avg / atr if atr else 0.0
+        di_minus = 100 * minus_avg / atr if atr else 0.0
         self.last_di_plus = di_plus
         self.last_di_minus = di_minus
         denom = di_plus + di_minus
@@ -89,75 +248,92 @@ class RollingADX:
         self.prev_adx = self.adx
         return self.adx, delta
 
+    def update(self, tick: Dict[str, Any]) -> tuple[float, float]:
+        return self._update(float(tick["high"]), float(tick["low"]), float(tick["close"]))
+
+    def update_many(self, data: Iterable[Dict[str, Any]] | np.ndarray) -> np.ndarray:
+        """まとめて更新し ``(n, 2)`` の (adx, delta) 配列を返す."""
+        highs, lows, closes = _hlc(data)
+        step = self._update
+        out = [step(h, l, c) for h, l, c in zip(highs, lows, closes)]
+        return np.array(out, dtype=float).reshape(-1, 2)
+
     def direction(self) -> str:
-        plus = sum(self.plus_dm) / len(self.plus_dm) if self.plus_dm else 0.0
-        minus = sum(self.minus_dm) / len(self.minus_dm) if self.minus_dm else 0.0
-        return "up" if plus >= minus else "down"
+        return "up" if self.plus_dm.mean() >= self.minus_dm.mean() else "down"
 
 
 class RollingBBWidth:
     """BB 幅の変化率を計算するローリングクラス."""
 
+    __slots__ = ("window", "avg_len", "prices", "widths")
+
     def __init__(self, window: int = 20, avg_len: int = 50) -> None:
         self.window = window
         self.avg_len = avg_len
-        self.prices: Deque[float] = deque(maxlen=window)
-        self.widths: Deque[float] = deque(maxlen=avg_len)
+        self.prices = _RollingMoments(window)
+        self.widths = _RollingSum(avg_len)
 
-    def update(self, tick_or_price: Any) -> float:
-        price = float(tick_or_price["close"] if isinstance(tick_or_price, dict) else tick_or_price)
+    def _update(self, price: float) -> float:
         self.prices.append(price)
         if len(self.prices) < self.window:
             width = 0.0
         else:
-            mean = sum(self.prices) / len(self.prices)
-            var = sum((p - mean) ** 2 for p in self.prices) / len(self.prices)
-            std = var ** 0.5
-            width = 4 * std
-        self.widths.append(width)
-        avg = sum(self.widths) / len(self.widths) if self.widths else 0.0
+            width = 4 * self.prices.variance() ** 0.5
+        avg = self.widths.push(width)
         return width / avg if avg else 0.0
 
+    def update(self, tick_or_price: Any) -> float:
+        price = float(tick_or_price["close"] if isinstance(tick_or_price, dict) else tick_or_price)
+        return self._update(price)
+
+    def update_many(self, data: Iterable[Any] | np.ndarray) -> np.ndarray:
+        """終値配列 (または tick 列) でまとめて更新する."""
+        step = self._update
+        return np.array([step(p) for p in _column(data, "close")], dtype=float)
+
 
 class RollingKeltner:
     """Keltner Channel をローリングで計算するクラス."""
 
+    __slots__ = ("window", "atr_mult", "alpha", "prev_close", "ema", "tr_values")
+
     def __init__(self, window: int = 20, atr_mult: float = 1.5) -> None:
         self.window = window
         self.atr_mult = atr_mult
         self.alpha = 2 / (window + 1)
         self.prev_close: float | None = None
         self.ema: float | None = None
-        self.tr_values: Deque[float] = deque(maxlen=window)
+        self.tr_values = _RollingSum(window)
 
-    def update(self, tick: Dict[str, Any]) -> Dict[str, float]:
-        high = float(tick["high"])
-        low = float(tick["low"])
-        close = float(tick["close"])
+    def _update(self, high: float, low: float, close: float) -> tuple[float, float, float]:
         typical = (high + low + close) / 3
         self.ema = typical if self.ema is None else self.ema + self.alpha * (typical - self.ema)
-        if self.prev_close is None:
-            tr = high - low
-        else:
-            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
-        self.tr_values.append(tr)
+        atr = self.tr_values.push(_true_range(high, low, self.prev_close))
         self.prev_close = close
-        atr = sum(self.tr_values) / len(self.tr_values)
-        upper = self.ema + self.atr_mult * atr
-        lower = self.ema - self.atr_mult * atr
-        return {"middle": self.ema, "upper": upper, "lower": lower}
+        return self.ema, self.ema + self.atr_mult * atr, self.ema - self.atr_mult * atr
+
+    def update(self, tick: Dict[str, Any]) -> Dict[str, float]:
+        middle, upper, lower = self._update(
+            float(tick["high"]), float(tick["low"]), float(tick["close"])
+        )
+        return {"middle": middle, "upper": upper, "lower": lower}
+
+    def update_many(self, data: Iterable[Dict[str, Any]] | np.ndarray) -> np.ndarray:
+        """まとめて更新し ``(n, 3)`` の (middle, upper, lower) 配列を返す."""
+        highs, lows, closes = _hlc(data)
+        step = self._update
+        out = [step(h, l, c) for h, l, c in zip(highs, lows, closes)]
+        return np.array(out, dtype=float).reshape(-1, 3)
 
     def close_outside(self, tick: Dict[str, Any]) -> bool:
         if self.ema is None:
-            bands = {"upper": float("inf"), "lower": float("-inf")}
+            upper, lower = float("inf"), float("-inf")
         else:
-            atr = sum(self.tr_values) / len(self.tr_values) if self.tr_values else 0.0
-            bands = {
-                "upper": self.ema + self.atr_mult * atr,
-                "lower": self.ema - self.atr_mult * atr,
-            }
+            atr = self.tr_values.mean()
+            upper = self.ema + self.atr_mult * atr
+            lower = self.ema - self.atr_mult * atr
         close = float(tick["close"])
-        outside = close > bands["upper"] or close < bands["lower"]
+        outside = close > upper or close < lower
         self.update(tick)
         return outside
 
@@ -165,16 +341,28 @@ class RollingKeltner:
 class RollingVolumeRatio:
     """出来高比率を返す簡易クラス."""
 
+    __slots__ = ("window", "volumes")
+
     def __init__(self, window: int = 20) -> None:
         self.window = window
-        self.volumes: Deque[float] = deque(maxlen=window)
+        self.volumes = _RollingSum(window)
+
+    def _update(self, vol: float) -> float:
+        avg = self.volumes.push(vol)
+        return (vol / avg) if avg else 1.0
 
     def update(self, tick: Dict[str, Any]) -> float:
         """``volume`` 値から現在値/平均値を計算する."""
-        vol = float(tick.get("volume", 0.0))
-        self.volumes.append(vol)
-        avg = sum(self.volumes) / len(self.volumes) if self.volumes else 0.0
-        return (vol / avg) if avg else 1.0
+        return self._update(float(tick.get("volume", 0.0)))
+
+    def update_many(self, data: Iterable[Dict[str, Any]] | np.ndarray) -> np.ndarray:
+        """出来高配列 (または tick 列) でまとめて更新する."""
+        if isinstance(data, np.ndarray):
+            vols = _column(data, "volume")
+        else:
+            vols = [float(t.get("volume", 0.0)) for t in data]
+        step = self._update
+        return np.array([step(v) for v in vols], dtype=float)
 
 
 __all__ = [
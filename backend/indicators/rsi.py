@@ -23,20 +23,18 @@ def calculate_rsi(prices, period: int = None):
     avg_gain = gain.rolling(window=period, min_periods=period).mean().iloc[:period+1]
     avg_loss = loss.rolling(window=period, min_periods=period).mean().iloc[:period+1]
 
-    gain = gain.iloc[period+1:]
-    loss = loss.iloc[period+1:]
-
-    for i in range(len(gain)):
-        avg_gain = pd.concat([avg_gain, pd.Series(
-            (avg_gain.iloc[-1] * (period - 1) + gain.iloc[i]) / period
-        )], ignore_index=True)
-
-        avg_loss = pd.concat([avg_loss, pd.Series(
-            (avg_loss.iloc[-1] * (period - 1) + loss.iloc[i]) / period
-        )], ignore_index=True)
-
-    rs = avg_gain / avg_loss
+    # Wilder 平滑化は逐次計算だが NumPy 配列上で O(n) で行う
+    n = len(prices)
+    ag = np.empty(n, dtype="float64")
+    al = np.empty(n, dtype="float64")
+    ag[: len(avg_gain)] = avg_gain.to_numpy()
+    al[: len(avg_loss)] = avg_loss.to_numpy()
+    g = gain.to_numpy()
+    lo = loss.to_numpy()
+    for i in range(period + 1, n):
+        ag[i] = (ag[i - 1] * (period - 1) + g[i]) / period
+        al[i] = (al[i - 1] * (period - 1) + lo[i]) / period
+
+    rs = ag / al
     rsi = 100 - (100 / (1 + rs))
-
-    rsi.index = prices.index[-len(rsi):]
-    return rsi
+    return pd.Series(rsi, index=prices.index)
@@ -0,0 +1,312 @@
+"""Per-thread SQLite connections and a batching background writer.
+
+:func:`thread_connection` keeps one long-lived connection per thread so the
+logging helpers no longer pay for ``connect`` + PRAGMAs on every call.  The
+returned connection ignores ``close()`` so legacy ``conn.close()`` calls are
+harmless; :func:`discard` invalidates connections to a path (e.g. after the
+DB file is recreated).
+
+:class:`BatchWriter` drains a bounded queue of ``(path, sql, params)`` rows
+on a daemon thread and commits each batch in a single transaction.  It is
+flushed automatically at interpreter exit.
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_PRAGMAS = ("PRAGMA journal_mode=WAL;", "PRAGMA synchronous=NORMAL;")
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connection owned by the pool; ``close()`` is a no-op."""
+
+    def close(self) -> None:  # noqa: D401 - keep sqlite3 signature
+        pass
+
+    def release(self) -> None:
+        """Really close the underlying database handle."""
+        super().close()
+
+
+def connect(path: str | Path, *, factory: type = sqlite3.Connection) -> sqlite3.Connection:
+    """Open ``path`` with the settings used across the project."""
+    conn = sqlite3.connect(
+        path,
+        timeout=30,
+        isolation_level=None,
+        check_same_thread=False,
+        uri=True,
+        factory=factory,
+    )
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_local = threading.local()
+_generations: dict[str, int] = {}
+_gen_lock = threading.Lock()
+
+
+def _generation(key: str) -> int:
+    return _generations.get(key, 0)
+
+
+def discard(path: str | Path) -> None:
+    """Invalidate pooled connections to ``path`` in every thread."""
+    key = str(path)
+    with _gen_lock:
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def thread_connection(
+    path: str | Path, *, init: Callable[[], Any] | None = None
+) -> PooledConnection:
+    """Return this thread's connection to ``path``, opening it if needed.
+
+    Only the most recently used path is kept per thread; switching paths
+    closes the previous connection.  ``init`` runs before opening when the
+    DB file does not exist yet.
+    """
+    key = str(path)
+    cached = getattr(_local, "conn", None)
+    if cached is not None:
+        c_key, c_gen, conn = cached
+        if c_key == key and c_gen == _generation(key):
+            return conn
+        conn.release()
+        _local.conn = None
+    if init is not None and not Path(path).exists():
+        init()
+    conn = connect(path, factory=PooledConnection)
+    _local.conn = (key, _generation(key), conn)
+    return conn
+
+
+def close_thread_connection() -> None:
+    """Close the calling thread's pooled connection."""
+    cached = getattr(_local, "conn", None)
+    if cached is not None:
+        cached[2].release()
+        _local.conn = None
+
+
+class BatchWriter:
+    """Background thread committing queued inserts in batches.
+
+    ``submit`` never blocks: it returns ``False`` when the queue is full so
+    the caller can fall back to a synchronous write instead of dropping the
+    row.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._conns: dict[str, sqlite3.Connection] = {}
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "errors": 0,
+            "rejected": 0,
+            "max_depth": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    def submit(self, path: str | Path, sql: str, params: tuple = ()) -> bool:
+        if self._stop.is_set():
+            return False
+        try:
+            self._queue.put_nowait((str(path), sql, params))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def flush(self, timeout: float | None = 10.0) -> bool:
+        """Block until every row submitted so far is committed."""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Flush pending rows and stop the writer thread."""
+        if self._stop.is_set():
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        for conn in self._conns.values():
+            conn.close()
+        self._conns.clear()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._stats, "depth": self._queue.qsize()}
+
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch: list[tuple[str, str, tuple]] = []
+            waiters: list[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    batch.append(item)
+                if item is None or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if waiters or remaining <= 0:
+                    # flush 要求があれば待たずに書き込む
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    continue
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for ev in waiters:
+                ev.set()
+            if item is None:
+                return
+
+    def _conn(self, path: str) -> sqlite3.Connection:
+        conn = self._conns.get(path)
+        if conn is None:
+            conn = connect(path)
+            self._conns[path] = conn
+        return conn
+
+    def _write(self, batch: list[tuple[str, str, tuple]]) -> None:
+        if not batch:
+            return
+        for path, rows in itertools.groupby(batch, key=lambda r: r[0]):
+            rows = list(rows)
+            try:
+                conn = self._conn(path)
+                conn.execute("BEGIN")
+                for sql, group in itertools.groupby(rows, key=lambda r: r[1]):
+                    conn.executemany(sql, [r[2] for r in group])
+                conn.execute("COMMIT")
+                written, errors = len(rows), 0
+            except sqlite3.Error as exc:
+                logger.warning("batched DB write failed (%s); retrying row by row", exc)
+                written, errors = self._write_rows(path, rows)
+            with self._stats_lock:
+                self._stats["written"] += written
+                self._stats["errors"] += errors
+                self._stats["batches"] += 1
+
+    def _write_rows(self, path: str, rows: list) -> tuple[int, int]:
+        conn = self._conns.pop(path, None)
+        if conn is not None:
+            try:
+                conn.rollback()
+            finally:
+                conn.close()
+        written = errors = 0
+        try:
+            conn = self._conn(path)
+        except sqlite3.Error as exc:
+            logger.warning("DB writer cannot open %s: %s", path, exc)
+            return 0, len(rows)
+        for _path, sql, params in rows:
+            try:
+                conn.execute(sql, params)
+                written += 1
+            except sqlite3.Error as exc:
+                errors += 1
+                logger.warning("DB write dropped: %s", exc)
+        return written, errors
+
+
+_writer: BatchWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(**kwargs) -> BatchWriter:
+    """Return the process-wide writer, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BatchWriter(**kwargs)
+        return _writer
+
+
+def flush(timeout: float | None = 10.0) -> bool:
+    """Flush the background writer if it is running."""
+    writer = _writer
+    return writer.flush(timeout) if writer is not None else True
+
+
+def shutdown(timeout: float | None = 10.0) -> None:
+    """Flush and stop the background writer."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+def writer_stats() -> dict:
+    """Return queue depth and throughput counters of the writer."""
+    writer = _writer
+    if writer is None:
+        return {"depth": 0, "running": False}
+    return {**writer.stats(), "running": True}
+
+
+atexit.register(shutdown)
+
+
+__all__ = [
+    "BatchWriter",
+    "PooledConnection",
+    "close_thread_connection",
+    "connect",
+    "discard",
+    "flush",
+    "get_writer",
+    "shutdown",
+    "thread_connection",
+    "writer_stats",
+]
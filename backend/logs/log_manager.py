@@ -7,6 +7,8 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+from backend.logs import db_pool, migrations
+from backend.logs.perf_stats_logger import span
 from backend.utils import env_loader
 
 _BASE_DIR = Path(__file__).resolve().parents[2]
@@ -24,20 +26,46 @@ def _ensure_db_dir(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 def get_db_connection():
-    """Return SQLite connection, initializing DB if it doesn't exist."""
-    path = get_db_path()
-    if not path.exists():
-        init_db()
-    conn = sqlite3.connect(
-        path,
-        timeout=30,
-        isolation_level=None,
-        check_same_thread=False,
-        uri=True,
-    )
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    return conn
+    """Return this thread's pooled SQLite connection.
+
+    The connection is long-lived and ``close()`` on it is a no-op, so callers
+    may keep using ``with get_db_connection() as conn`` / ``conn.close()``.
+    """
+    return db_pool.thread_connection(get_db_path(), init=init_db)
+
+
+def _async_writes() -> bool:
+    return env_loader.get_env("LOG_DB_ASYNC", "false").lower() == "true"
+
+
+def _write(sql: str, params: tuple) -> None:
+    """Insert a fire-and-forget row, batched in the background when enabled."""
+    with span("db_write"):
+        if _async_writes():
+            path = get_db_path()
+            if not path.exists():
+                init_db()
+            writer = db_pool.get_writer(
+                max_queue=int(env_loader.get_env("LOG_DB_QUEUE_MAX", "10000")),
+                batch_size=int(env_loader.get_env("LOG_DB_BATCH_SIZE", "200")),
+                flush_interval=float(env_loader.get_env("LOG_DB_FLUSH_MS", "50")) / 1000,
+            )
+            if writer.submit(path, sql, params):
+                return
+            # キューが満杯なら同期書き込みにフォールバック
+        # 自動コミット接続なので with による commit は不要。呼び出し元が
+        # トランザクション中ならその一部として書き込まれる
+        get_db_connection().cursor().execute(sql, params)
+
+
+def flush_writes(timeout: float | None = 10.0) -> bool:
+    """Wait until queued log rows are committed."""
+    return db_pool.flush(timeout)
+
+
+def writer_stats() -> dict:
+    """Return queue depth / batch counters of the background writer."""
+    return db_pool.writer_stats()
 
 def init_db():
     path = get_db_path()
@@ -46,6 +74,8 @@ def init_db():
     _ensure_db_dir(path)
     if first_time:
         logger.info("Initializing database at %s", path)
+        # 作り直された DB に古い接続が残らないようにする
+        db_pool.discard(path)
     else:
         logger.debug("Running DB migrations for %s", path)
     with sqlite3.connect(path) as conn:
@@ -256,6 +286,9 @@ def init_db():
             )
         ''')
 
+        # ---- indexes / versioned migrations ----
+        migrations.apply_migrations(conn)
+
 def log_trade(
     instrument,
     entry_time,
@@ -330,11 +363,10 @@ def log_trade(
 
 def add_trade_label(trade_id: int, label: str) -> None:
     """Add descriptive label for a trade."""
-    with get_db_connection() as conn:
-        conn.execute(
-            'INSERT INTO trade_labels (trade_id, label, timestamp) VALUES (?, ?, ?)',
-            (trade_id, label, datetime.now(timezone.utc).isoformat()),
-        )
+    _write(
+        'INSERT INTO trade_labels (trade_id, label, timestamp) VALUES (?, ?, ?)',
+        (trade_id, label, datetime.now(timezone.utc).isoformat()),
+    )
 
 def log_policy_transition(state: str, action: str, reward: float) -> None:
     """Store a (state, action, reward) tuple for offline RL."""
@@ -371,24 +403,20 @@ def log_policy_transition(state: str, action: str, reward: float) -> None:
         logger.warning("log_policy_transition failed: %s", exc)
 
 def log_ai_decision(decision_type, instrument, ai_response):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO ai_decisions (timestamp, decision_type, instrument, ai_response)
-            VALUES (?, ?, ?, ?)
-        ''', (datetime.now(timezone.utc).isoformat(), decision_type, instrument, ai_response))
+    _write('''
+        INSERT INTO ai_decisions (timestamp, decision_type, instrument, ai_response)
+        VALUES (?, ?, ?, ?)
+    ''', (datetime.now(timezone.utc).isoformat(), decision_type, instrument, ai_response))
 
 def log_prompt_response(decision_type: str, instrument: str, prompt: str, response: str) -> None:
     """LLM への問い合わせ内容と返答を記録する"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            '''
-            INSERT INTO prompt_logs (timestamp, decision_type, instrument, prompt, response)
-            VALUES (?, ?, ?, ?, ?)
-        ''',
-            (datetime.now(timezone.utc).isoformat(), decision_type, instrument, prompt, response),
-        )
+    _write(
+        '''
+        INSERT INTO prompt_logs (timestamp, decision_type, instrument, prompt, response)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+        (datetime.now(timezone.utc).isoformat(), decision_type, instrument, prompt, response),
+    )
 
 def log_error(module, error_message, additional_info=None):
     """Record an error event.
@@ -397,29 +425,18 @@ def log_error(module, error_message, additional_info=None):
     HTTP responses. Anything passed in `additional_info` is stored verbatim for
     later inspection.
     """
+    sql = '''
+        INSERT INTO errors (timestamp, module, error_message, additional_info)
+        VALUES (?, ?, ?, ?)
+    '''
+    params = (datetime.now(timezone.utc).isoformat(), module, error_message, additional_info)
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                INSERT INTO errors (timestamp, module, error_message, additional_info)
-                VALUES (?, ?, ?, ?)
-            ''',
-                (datetime.now(timezone.utc).isoformat(), module, error_message, additional_info),
-            )
+        _write(sql, params)
     except sqlite3.OperationalError as exc:
         if "no such table" in str(exc):
             try:
                 init_db()
-                with get_db_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        '''
-                        INSERT INTO errors (timestamp, module, error_message, additional_info)
-                        VALUES (?, ?, ?, ?)
-                    ''',
-                        (datetime.now(timezone.utc).isoformat(), module, error_message, additional_info),
-                    )
+                _write(sql, params)
             except Exception as retry_exc:
                 logger.warning("log_error retry failed: %s", retry_exc)
         else:
@@ -437,19 +454,17 @@ def log_param_change(param_name, old_value, new_value, ai_reason):
         new_value (Any): New value (stored as string).
         ai_reason (str): Reason provided by the AI or subsystem.
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO param_changes (
-                timestamp, param_name, old_value, new_value, reason
-            ) VALUES (?, ?, ?, ?, ?)
-        ''', (
-            datetime.now(timezone.utc).isoformat(),
-            str(param_name),
-            str(old_value),
-            str(new_value),
-            str(ai_reason),
-        ))
+    _write('''
+        INSERT INTO param_changes (
+            timestamp, param_name, old_value, new_value, reason
+        ) VALUES (?, ?, ?, ?, ?)
+    ''', (
+        datetime.now(timezone.utc).isoformat(),
+        str(param_name),
+        str(old_value),
+        str(new_value),
+        str(ai_reason),
+    ))
 
 
 def log_entry_skip(instrument, side, reason, details=None):
@@ -461,22 +476,20 @@ def log_entry_skip(instrument, side, reason, details=None):
         reason,
         details,
     )
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            '''
-            INSERT INTO entry_skips (
-                timestamp, instrument, side, reason, details
-            ) VALUES (?, ?, ?, ?, ?)
-            ''',
-            (
-                datetime.now(timezone.utc).isoformat(),
-                instrument,
-                side,
-                reason,
-                details,
-            ),
-        )
+    _write(
+        '''
+        INSERT INTO entry_skips (
+            timestamp, instrument, side, reason, details
+        ) VALUES (?, ?, ?, ?, ?)
+        ''',
+        (
+            datetime.now(timezone.utc).isoformat(),
+            instrument,
+            side,
+            reason,
+            details,
+        ),
+    )
 
 
 # OANDAトレードの記録
@@ -559,23 +572,24 @@ def log_oanda_trade(
 
 def log_exit_adjust(trade_id: str, action: str, tp: float | None, sl: float | None) -> None:
     """Record an exit adjustment action."""
-    with get_db_connection() as conn:
-        conn.execute(
-            '''
-            INSERT INTO exit_adjust_calls (trade_id, timestamp, action, tp, sl)
-            VALUES (?, ?, ?, ?, ?)
-        ''',
-            (
-                trade_id,
-                datetime.now(timezone.utc).isoformat(),
-                action,
-                tp,
-                sl,
-            ),
-        )
+    _write(
+        '''
+        INSERT INTO exit_adjust_calls (trade_id, timestamp, action, tp, sl)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+        (
+            trade_id,
+            datetime.now(timezone.utc).isoformat(),
+            action,
+            tp,
+            sl,
+        ),
+    )
 
 
 def count_exit_adjust_calls(trade_id: str) -> int:
+    # キュー中の書き込みも数えるため先に吐き出す
+    flush_writes()
     with get_db_connection() as conn:
         cur = conn.cursor()
         cur.execute('SELECT COUNT(*) FROM exit_adjust_calls WHERE trade_id = ?', (trade_id,))
@@ -0,0 +1,123 @@
+"""Versioned schema migrations for ``trades.db``.
+
+Each entry of :data:`MIGRATIONS` is applied at most once; the number of
+applied steps is stored in ``PRAGMA user_version``.  Table creation and
+column back-fills still live in :func:`log_manager.init_db`, which calls
+:func:`apply_migrations` at the end, so new steps only need to assume that
+the tables exist.
+
+Indexes are chosen for the read paths that run against the live DB:
+
+- ``/trades/summary`` / ``/trades/recent`` / ``daily_summary``:
+  ``oanda_trades WHERE account_id = ? AND close_time ...``
+- ``strategy_analyzer`` / ``param_performance``:
+  ``trades WHERE exit_time IS NOT NULL AND entry_time >= ?``
+- ``label_win_rates``: ``trade_labels GROUP BY label JOIN trades``
+- ``filter_statistics``: ``SELECT reason FROM entry_skips``
+- ``count_exit_adjust_calls``: ``exit_adjust_calls WHERE trade_id = ?``
+- retention (:mod:`maintenance.archive_logs`): ``timestamp < ?`` on
+  ``prompt_logs`` / ``ai_decisions``
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from typing import Callable, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+Step = Union[Sequence[str], Callable[[sqlite3.Cursor], None]]
+
+def _add_reconciled_flag(cur: sqlite3.Cursor) -> None:
+    # 決済時に推定損益で記録された行も OANDA の確定損益で上書きできるよう、
+    # exit_time ではなく専用フラグで照合済みかを判定する
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(trades)")}
+    if "pl_reconciled" not in columns:
+        cur.execute("ALTER TABLE trades ADD COLUMN pl_reconciled INTEGER NOT NULL DEFAULT 0")
+    cur.execute("DROP INDEX IF EXISTS idx_trades_unreconciled")
+    cur.execute(
+        "CREATE INDEX idx_trades_unreconciled ON trades(trade_id) WHERE pl_reconciled = 0"
+    )
+
+
+# (説明, SQL 列 または cursor を受け取る関数)
+MIGRATIONS: list[tuple[str, Step]] = [
+    (
+        "reconcile_trades indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_oanda_trades_instrument_open "
+            "ON oanda_trades(instrument, open_time)",
+            "CREATE INDEX IF NOT EXISTS idx_trades_unreconciled "
+            "ON trades(trade_id) WHERE exit_time IS NULL",
+        ],
+    ),
+    (
+        "covering indexes for API and analysis queries",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_oanda_trades_account_close "
+            "ON oanda_trades(account_id, close_time, realized_pl)",
+            "CREATE INDEX IF NOT EXISTS idx_trades_entry_closed "
+            "ON trades(entry_time, exit_time, profit_loss) WHERE exit_time IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_trade_labels_label "
+            "ON trade_labels(label, trade_id)",
+            "CREATE INDEX IF NOT EXISTS idx_entry_skips_reason "
+            "ON entry_skips(reason)",
+            "CREATE INDEX IF NOT EXISTS idx_exit_adjust_calls_trade "
+            "ON exit_adjust_calls(trade_id)",
+            "CREATE INDEX IF NOT EXISTS idx_param_changes_time "
+            "ON param_changes(timestamp, param_name, new_value)",
+        ],
+    ),
+    (
+        "time indexes for log retention",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_ai_decisions_time "
+            "ON ai_decisions(timestamp, decision_type, instrument)",
+            "CREATE INDEX IF NOT EXISTS idx_prompt_logs_time "
+            "ON prompt_logs(timestamp)",
+        ],
+    ),
+    ("realized P/L reconciliation flag", _add_reconciled_flag),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def apply_migrations(
+    conn: sqlite3.Connection, migrations: Sequence[tuple[str, Step]] | None = None
+) -> int:
+    """Apply pending migrations and return the resulting schema version.
+
+    Every step runs in its own transaction together with the
+    ``user_version`` bump, so an interrupted run resumes where it stopped.
+    """
+    steps = MIGRATIONS if migrations is None else migrations
+    version = current_version(conn)
+    for idx in range(version, len(steps)):
+        desc, step = steps[idx]
+        logger.info("Applying DB migration %d: %s", idx + 1, desc)
+        # 既存の暗黙トランザクションを確定してから明示的に開始する
+        if conn.in_transaction:
+            conn.commit()
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            if callable(step):
+                step(cur)
+            else:
+                for sql in step:
+                    cur.execute(sql)
+            # PRAGMA はパラメータを受け付けないため整数をそのまま埋め込む
+            cur.execute(f"PRAGMA user_version = {int(idx + 1)}")
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        version = idx + 1
+    return version
+
+
+__all__ = ["MIGRATIONS", "apply_migrations", "current_version"]
@@ -1,10 +1,38 @@
-"""Simple performance logging utility."""
+"""Low-overhead stage timing for the job loop.
+
+``PerfTimer("job_loop")`` opens a root span and :func:`span` opens nested
+ones, so ``with span("candle_fetch")`` inside the loop is recorded as
+``job_loop.candle_fetch``.  Durations are aggregated in memory and observed
+into the ``stage_latency_seconds`` histogram of
+:mod:`monitoring.prom_exporter`; nothing touches the disk on the hot path.
+Every :meth:`PerfTimer.stop` also publishes the ``perf_seconds`` metric.
+
+The current span lives in a context variable, so work submitted through
+:func:`backend.utils.llm_pool.submit` (which copies the caller's context) is
+recorded under the submitting span, e.g. ``job_loop.llm``.  Plain threads
+start without a parent.
+
+Optional outputs:
+
+* ``PERF_TRACE_SAMPLE`` – fraction of root spans whose full span tree is
+  dumped as one JSON line to ``perf_traces.jsonl``.
+* ``PERF_STATS_LOG`` – also append every :class:`PerfTimer` to
+  ``perf_stats.jsonl`` (the previous behaviour).
+"""
 from __future__ import annotations
 
+import contextvars
+import functools
 import json
+import random
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+from backend.utils import env_loader
 
 try:
     from monitoring.metrics_publisher import publish as publish_metric
@@ -13,14 +41,177 @@ except Exception:  # pragma: no cover - optional during tests
         return None
 
 LOG_PATH = Path(__file__).resolve().parent / "perf_stats.jsonl"
+TRACE_PATH = Path(__file__).resolve().parent / "perf_traces.jsonl"
 
+PERF_STATS_LOG = env_loader.get_env("PERF_STATS_LOG", "false").lower() == "true"
+TRACE_SAMPLE = float(env_loader.get_env("PERF_TRACE_SAMPLE", "0"))
 
-def log_perf(tag: str, start: float, end: float) -> None:
-    """Append timing info as JSON line."""
+_F = TypeVar("_F", bound=Callable)
+
+_lock = threading.Lock()
+
+
+class SpanStats:
+    """Running aggregate of one span path."""
+
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.last = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+_STATS: dict[str, SpanStats] = {}
+_observers: dict[str, object] = {}
+_histogram = None
+
+
+def _observer(path: str):
+    """Return the cached histogram child for ``path`` (or ``None``)."""
+    child = _observers.get(path)
+    if child is None:
+        global _histogram
+        if _histogram is None:
+            try:
+                from monitoring.prom_exporter import stage_latency_seconds
+            except Exception:  # prometheus / fastapi 無しでも集計は続ける
+                stage_latency_seconds = False
+            _histogram = stage_latency_seconds
+        child = _histogram.labels(stage=path) if _histogram else False
+        _observers[path] = child
+    return child
+
+
+def _record(path: str, elapsed: float) -> None:
+    with _lock:
+        stats = _STATS.get(path)
+        if stats is None:
+            stats = _STATS[path] = SpanStats()
+        stats.add(elapsed)
+    child = _observer(path)
+    if child:
+        child.observe(elapsed)
+
+
+class _Frame:
+    __slots__ = ("path", "start", "trace", "parent")
+
+    def __init__(
+        self, path: str, start: float, trace: list | None, parent: "_Frame | None"
+    ) -> None:
+        self.path = path
+        self.start = start
+        self.trace = trace
+        self.parent = parent
+
+
+# 最も内側のスパン。llm_pool のワーカーにはコンテキストごと引き継がれる
+_current: contextvars.ContextVar[_Frame | None] = contextvars.ContextVar(
+    "perf_span", default=None
+)
+
+
+def _push(name: str, *, root: bool = False) -> _Frame:
+    # root は前ループが例外で抜けて閉じられなかったスパンを引きずらない
+    parent = None if root else _current.get()
+    if parent is not None:
+        frame = _Frame(f"{parent.path}.{name}", time.perf_counter(), parent.trace, parent)
+    else:
+        trace = [] if TRACE_SAMPLE > 0 and random.random() < TRACE_SAMPLE else None
+        frame = _Frame(name, time.perf_counter(), trace, None)
+    _current.set(frame)
+    return frame
+
+
+def _pop(frame: _Frame) -> float:
+    end = time.perf_counter()
+    elapsed = end - frame.start
+    # 例外等で子スパンが閉じられていなくても自分の親に戻す
+    _current.set(frame.parent)
+    _record(frame.path, elapsed)
+    if frame.trace is not None:
+        frame.trace.append((frame.path, frame.start, elapsed))
+        if frame.parent is None:
+            _dump_trace(frame)
+    return elapsed
+
+
+def _dump_trace(root: _Frame) -> None:
+    data = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "root": root.path,
+        "spans": [
+            {"path": p, "offset": s - root.start, "elapsed": e}
+            for p, s, e in sorted(root.trace, key=lambda t: t[1])
+        ],
+    }
+    try:
+        with TRACE_PATH.open("a", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.write("\n")
+    except Exception:
+        pass
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as a child of the current span."""
+    frame = _push(name)
+    try:
+        yield
+    finally:
+        _pop(frame)
+
+
+def timed(name: str) -> Callable[[_F], _F]:
+    """Decorator form of :func:`span`."""
+
+    def deco(func: _F) -> _F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return deco
+
+
+def span_stats() -> dict[str, dict]:
+    """Return aggregated timings keyed by span path."""
+    with _lock:
+        return {path: s.as_dict() for path, s in _STATS.items()}
+
+
+def reset_span_stats() -> None:
+    """Clear the in-memory aggregates."""
+    with _lock:
+        _STATS.clear()
+
+
+def _append_log(tag: str, elapsed: float) -> None:
     data = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "tag": tag,
-        "elapsed": end - start,
+        "elapsed": elapsed,
     }
     try:
         with LOG_PATH.open("a", encoding="utf-8") as f:
@@ -28,20 +219,49 @@ def log_perf(tag: str, start: float, end: float) -> None:
             f.write("\n")
     except Exception:
         pass
+
+
+def _publish(tag: str, elapsed: float) -> None:
     try:
-        publish_metric("perf_seconds", data["elapsed"], {"tag": tag})
+        publish_metric("perf_seconds", elapsed, {"tag": tag})
     except Exception:
         pass
 
 
+def log_perf(tag: str, start: float, end: float) -> None:
+    """Append timing info as JSON line."""
+    _append_log(tag, end - start)
+    _publish(tag, end - start)
+
+
 class PerfTimer:
+    """Root span closed explicitly with :meth:`stop`.
+
+    ``stop`` is idempotent so early-return paths may call it freely.
+    """
+
     def __init__(self, tag: str):
         self.tag = tag
-        self.start = time.perf_counter()
+        self._frame = _push(tag, root=True)
+        self.start = self._frame.start
 
     def stop(self) -> None:
-        end = time.perf_counter()
-        log_perf(self.tag, self.start, end)
+        frame, self._frame = self._frame, None
+        if frame is None:
+            return
+        elapsed = _pop(frame)
+        # publish はバッファに積むだけなので毎回送る。ファイル追記だけ任意
+        _publish(self.tag, elapsed)
+        if PERF_STATS_LOG:
+            _append_log(self.tag, elapsed)
 
 
-__all__ = ["PerfTimer", "log_perf"]
+__all__ = [
+    "PerfTimer",
+    "SpanStats",
+    "log_perf",
+    "reset_span_stats",
+    "span",
+    "span_stats",
+    "timed",
+]
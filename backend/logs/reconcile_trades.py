@@ -1,3 +1,18 @@
+"""Fill realized P/L of local trades from the synced OANDA history.
+
+Only trades whose P/L has not been taken from OANDA yet (``pl_reconciled =
+0``) and that are newer than the ``reconcile_watermark`` stored in
+``sync_state`` are examined.  This includes rows the bot already closed
+itself with an estimated ``profit_loss``: their exit time, price and P/L are
+replaced by OANDA's realized values.  OANDA counterparts are resolved with a
+single set-based join backed by the ``(instrument, open_time)`` index
+created in :func:`init_db`.  The cost of a run therefore depends on the
+number of unreconciled trades, not on the size of the history.
+
+The watermark only advances past a trade once it is reconciled or has had no
+OANDA counterpart for ``RECONCILE_STALE_HOURS``.
+"""
+
 import logging
 import sqlite3
 from datetime import datetime, timedelta, timezone
@@ -8,70 +23,141 @@ from backend.utils import env_loader
 logger = logging.getLogger(__name__)
 
 MATCH_SEC = int(env_loader.get_env("OANDA_MATCH_SEC", "60"))
+WATERMARK_KEY = "reconcile_watermark"
+
+# 各ローカルトレードに最も近い OANDA トレードを 1 件だけ選ぶ。
+# 決済済みを優先し、同距離なら trade_id の小さい方を採用する。
+_MATCH_SQL = """
+WITH pending AS (
+    SELECT trade_id, instrument, entry_time,
+           CAST(strftime('%s', entry_time) AS INTEGER) AS entry_ts,
+           strftime('%Y-%m-%dT%H:%M:%S', entry_time, :lo) AS lo,
+           strftime('%Y-%m-%dT%H:%M:%S', entry_time, :hi) AS hi
+    FROM trades
+    WHERE pl_reconciled = 0 AND units != 0 AND trade_id > :watermark
+),
+ranked AS (
+    SELECT p.trade_id AS local_id,
+           o.trade_id AS oanda_id,
+           o.close_time, o.close_price, o.realized_pl,
+           ROW_NUMBER() OVER (
+               PARTITION BY p.trade_id
+               ORDER BY o.close_time IS NULL,
+                        ABS(strftime('%s', o.open_time) - p.entry_ts),
+                        o.trade_id
+           ) AS rn
+    FROM pending p
+    JOIN oanda_trades o
+      ON o.instrument = p.instrument
+     AND o.open_time >= p.lo AND o.open_time < p.hi
+    WHERE ABS(strftime('%s', o.open_time) - p.entry_ts) <= :match_sec
+)
+SELECT p.trade_id, p.entry_time, r.oanda_id, r.close_time, r.close_price, r.realized_pl
+FROM pending p
+LEFT JOIN ranked r ON r.local_id = p.trade_id AND r.rn = 1
+ORDER BY p.trade_id
+"""
 
 
 def _iso_to_dt(ts: str) -> datetime:
     """Convert ISO string to aware UTC datetime."""
     if ts.endswith("Z"):
         ts = ts[:-1]
-    return datetime.fromisoformat(ts)
+    dt = datetime.fromisoformat(ts)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _get_watermark(cur) -> int:
+    cur.execute("SELECT value FROM sync_state WHERE key = ?", (WATERMARK_KEY,))
+    row = cur.fetchone()
+    try:
+        return int(row[0]) if row else 0
+    except (TypeError, ValueError):
+        return 0
 
 
-def reconcile_trades() -> None:
-    """Update local trades with realized P/L from OANDA history."""
+def _set_watermark(cur, value: int) -> None:
+    cur.execute(
+        "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+        (WATERMARK_KEY, str(value)),
+    )
+
+
+def _is_stale(entry_time: str, cutoff: datetime) -> bool:
+    try:
+        return _iso_to_dt(entry_time) < cutoff
+    except (TypeError, ValueError):
+        return True
+
+
+def reconcile_trades(*, now: datetime | None = None) -> int:
+    """Update local trades with realized P/L from OANDA history.
+
+    Returns the number of trades reconciled in this run.
+    """
     init_db()
+    stale_hours = float(env_loader.get_env("RECONCILE_STALE_HOURS", "168"))
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=stale_hours)
     with get_db_connection() as conn:
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
+        # 共有コネクションを汚さないようカーソル単位で Row を使う
+        cur.row_factory = sqlite3.Row
+        cur.execute("BEGIN")
+        watermark = _get_watermark(cur)
+        rows = cur.execute(
+            _MATCH_SQL,
+            {
+                "lo": f"-{MATCH_SEC} seconds",
+                "hi": f"+{MATCH_SEC + 1} seconds",
+                "watermark": watermark,
+                "match_sec": MATCH_SEC,
+            },
+        ).fetchall()
 
-        cur.execute(
-            "SELECT trade_id, instrument, entry_time, units FROM trades"
-        )
-        local_trades = cur.fetchall()
-
-        for lt in local_trades:
-            if lt["units"] == 0:
-                continue
-            entry_time = _iso_to_dt(lt["entry_time"])
-            start = (entry_time - timedelta(seconds=MATCH_SEC)).isoformat()
-            end = (entry_time + timedelta(seconds=MATCH_SEC)).isoformat()
-            cur.execute(
-                """
-                SELECT trade_id, close_time, close_price, realized_pl,
-                       ABS(strftime('%s', open_time) - strftime('%s', ?)) AS diff
-                FROM oanda_trades
-                WHERE instrument = ? AND close_time IS NOT NULL
-                  AND open_time BETWEEN ? AND ?
-                ORDER BY diff ASC
-                LIMIT 1
-                """,
-                (lt["entry_time"], lt["instrument"], start, end),
-            )
-            row = cur.fetchone()
-            if row:
-                cur.execute(
-                    """
-                    UPDATE trades
-                    SET profit_loss = ?, exit_time = ?, exit_price = ?
-                    WHERE trade_id = ?
-                    """,
-                    (
-                        row["realized_pl"],
-                        row["close_time"],
-                        row["close_price"],
-                        lt["trade_id"],
-                    ),
+        updates = []
+        first_pending = None
+        for row in rows:
+            if row["close_time"] is not None:
+                updates.append(
+                    (row["realized_pl"], row["close_time"], row["close_price"], row["trade_id"])
                 )
                 logger.info(
                     "Reconciled trade %s with OANDA trade %s",
-                    lt["trade_id"],
                     row["trade_id"],
+                    row["oanda_id"],
                 )
-            else:
+                continue
+            if row["oanda_id"] is None and _is_stale(row["entry_time"], cutoff):
                 logger.warning(
-                    "No OANDA match found for trade_id %s", lt["trade_id"]
+                    "No OANDA match found for trade_id %s; giving up after %.0fh",
+                    row["trade_id"],
+                    stale_hours,
                 )
+                continue
+            if row["oanda_id"] is None:
+                logger.debug("No OANDA match found yet for trade_id %s", row["trade_id"])
+            if first_pending is None:
+                first_pending = row["trade_id"]
+
+        if updates:
+            cur.executemany(
+                """
+                UPDATE trades
+                SET profit_loss = ?, exit_time = ?, exit_price = ?, pl_reconciled = 1
+                WHERE trade_id = ?
+                """,
+                updates,
+            )
+        if first_pending is not None:
+            new_mark = first_pending - 1
+        elif rows:
+            new_mark = rows[-1]["trade_id"]
+        else:
+            new_mark = watermark
+        if new_mark != watermark:
+            _set_watermark(cur, new_mark)
         conn.commit()
+    return len(updates)
 
 
 if __name__ == "__main__":
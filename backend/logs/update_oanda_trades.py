@@ -1,3 +1,4 @@
+import json
 import logging
 import sqlite3
 import time
@@ -81,9 +82,27 @@ def fetch_transactions(url, params=None):
         raise Exception(f"Failed to fetch transactions: {response.text}")
     return response.json()
 
+LAST_TX_KEY = "last_transaction_id"
+TX_TYPES = (
+    "ORDER_FILL,STOP_LOSS_ORDER,TAKE_PROFIT_ORDER,"
+    "STOP_LOSS_ORDER_REJECT,TAKE_PROFIT_ORDER_REJECT,"
+    "ORDER_CANCEL"
+)
+
+_db_ready = False
+
+
+def _ensure_db() -> None:
+    """Run init_db once per process instead of on every sync."""
+    global _db_ready
+    if not _db_ready:
+        init_db()
+        _db_ready = True
+
+
 # Get the last transaction ID from the database
 def get_last_transaction_id():
-    init_db()
+    _ensure_db()
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute(
@@ -94,14 +113,17 @@ def get_last_transaction_id():
     return row[0] if row else '0'
 
 
-def set_last_transaction_id(transaction_id: str) -> None:
-    init_db()
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _store_last_transaction_id(cursor, transaction_id) -> None:
     cursor.execute(
         "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
-        ("last_transaction_id", str(transaction_id)),
+        (LAST_TX_KEY, str(transaction_id)),
     )
+
+
+def set_last_transaction_id(transaction_id: str) -> None:
+    _ensure_db()
+    conn = get_db_connection()
+    _store_last_transaction_id(conn.cursor(), transaction_id)
     conn.commit()
     conn.close()
 
@@ -120,135 +142,161 @@ def fetch_trade_details(trade_id):
     else:
         return None
 
-import json
+def fetch_account_last_transaction_id() -> int | None:
+    """Return the newest transaction ID of the account (cheap summary call)."""
+    url = f"{OANDA_API_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/summary"
+    data = fetch_transactions(url)
+    value = data.get("lastTransactionID") or data.get("account", {}).get("lastTransactionID")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_transaction_pages(last_id: int, upper_id: int | None, page_size: int):
+    """Yield ``(page_end_id, transactions)`` for ID windows after ``last_id``.
+
+    Each window is fetched with ``/transactions/idrange`` so only one page
+    is held in memory.  When ``upper_id`` is unknown a single page is
+    fetched and its end is the largest ID it contained.
+    """
+    url = f"{OANDA_API_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/transactions/idrange"
+    start = last_id + 1
+    while upper_id is None or start <= upper_id:
+        stop = start + page_size - 1
+        if upper_id is not None:
+            stop = min(stop, upper_id)
+        params = {"from": str(start), "to": str(stop), "type": TX_TYPES}
+        logger.debug("Fetching transactions %s", params)
+        data = fetch_transactions(url, params)
+        transactions = data.get("transactions", [])
+        if upper_id is None:
+            ids = [int(t["id"]) for t in transactions if t.get("id")]
+            yield (max(ids) if ids else last_id), transactions
+            return
+        yield stop, transactions
+        start = stop + 1
+
+
+def _apply_transaction(conn, cursor, transaction) -> int:
+    """Apply one transaction to ``oanda_trades`` and return affected rows."""
+    rowcount = 0
+    tx_type = transaction.get("type", "")
+    reject_reason = transaction.get("rejectReason")
+    if tx_type.endswith("_REJECT"):
+        if reject_reason in IGNORE_REJECT_REASONS:
+            logger.info("%s reason=%s", tx_type, reject_reason)
+        else:
+            logger.warning("\u274c %s reason=%s", tx_type, reject_reason)
+        if tx_type in ("TAKE_PROFIT_ORDER_REJECT", "ORDER_CANCEL"):
+            logger.warning("[DEBUG] %s rejectReason=%s", tx_type, reject_reason)
+    transaction_type = tx_type
+    transaction_id = transaction.get('id')
+    open_time = transaction.get('time', '')
+
+    if transaction_type == 'ORDER_FILL':
+        trade_id = transaction_id
+        instrument = transaction.get('instrument', 'UNKNOWN')
+        units = transaction.get('units', 0)
+        price = float(transaction.get('price', 0.0))
+        realized_pl = float(transaction.get('pl', 0.0))
+
+        logger.debug(
+            "Debug BEFORE INSERT: %s %s %s %s %s %s",
+            trade_id,
+            instrument,
+            units,
+            open_time,
+            price,
+            realized_pl,
+        )
+        execute_with_retry(
+            log_oanda_trade,
+            trade_id,
+            OANDA_ACCOUNT_ID,
+            instrument,
+            open_time,
+            price,
+            units,
+            "OPEN",
+            0.0,
+            realized_pl,
+            conn=conn,
+        )
+        add_trade_label(trade_id, "FILL")
+        rowcount = 1
+
+    elif transaction_type in ('STOP_LOSS_ORDER', 'TAKE_PROFIT_ORDER'):
+        trade_id = transaction.get('tradeID') or transaction.get('tradesClosed', [{}])[0].get('tradeID')
+        price = float(transaction.get('price', 0.0))
+        close_time = transaction.get('time', '')
+        realized_pl = float(transaction.get('tradesClosed', [{}])[0].get('realizedPL', 0.0))
+        price_col, label = (
+            ('tp_price', "TP") if transaction_type == 'TAKE_PROFIT_ORDER' else ('sl_price', "SL")
+        )
+        before = conn.total_changes
+        execute_with_retry(
+            cursor.execute,
+            f"""
+            UPDATE oanda_trades
+            SET close_time = ?, close_price = ?, {price_col} = ?, realized_pl = ?, state = 'CLOSED'
+            WHERE trade_id = ?
+            """,
+            (close_time, price, price, realized_pl, trade_id),
+        )
+        rowcount = conn.total_changes - before
+        add_trade_label(trade_id, label)
+        logger.info("%s updated for trade_id %s, rowcount=%s", transaction_type, trade_id, rowcount)
+
+    logger.info("%s processed for trade_id %s, rowcount=%s", transaction_type, transaction_id, rowcount)
+    return rowcount
 
 
 def update_oanda_trades():
-    init_db()
+    """Sync new OANDA transactions into ``oanda_trades`` page by page.
+
+    Every page is applied in one DB transaction together with the
+    ``last_transaction_id`` update, so an interrupted catch-up resumes at
+    the first unapplied page and never applies a transaction twice.
+    """
+    _ensure_db()
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    last_transaction_id = get_last_transaction_id()
-    logger.info(f"Last transaction ID fetched from DB: {last_transaction_id}")
-
-    base_url = f"{OANDA_API_URL}/v3/accounts/{OANDA_ACCOUNT_ID}/transactions/sinceid"
-    params = {
-        "type": (
-            "ORDER_FILL,STOP_LOSS_ORDER,TAKE_PROFIT_ORDER,"
-            "STOP_LOSS_ORDER_REJECT,TAKE_PROFIT_ORDER_REJECT,"
-            "ORDER_CANCEL"
-        ),
-        "id": str(int(last_transaction_id) + 1),
-    }
-
-    logger.info(f"Making API request to URL: {base_url} with params: {params}")
+    last_transaction_id = int(get_last_transaction_id())
+    logger.info("Last transaction ID fetched from DB: %s", last_transaction_id)
+    page_size = int(env_loader.get_env("OANDA_SYNC_PAGE_SIZE", "1000"))
+    max_pages = int(env_loader.get_env("OANDA_SYNC_MAX_PAGES", "20"))
 
+    updated_count = 0
     try:
-        transactions_data = fetch_transactions(base_url, params)
-        transactions = transactions_data.get('transactions', [])
-        logger.debug("Transactions fetched from API: %s", transactions)
-        logger.debug("Fetched transactions: %s", json.dumps(transactions, indent=2))
-
-        updated_count = 0
-        max_id = int(last_transaction_id)
-        for transaction in transactions:
-            rowcount = 0
-            tx_type = transaction.get("type", "")
-            reject_reason = transaction.get("rejectReason")
-            if tx_type.endswith("_REJECT"):
-                if reject_reason in IGNORE_REJECT_REASONS:
-                    logger.info(f"{tx_type} reason={reject_reason}")
-                else:
-                    logger.warning(f"\u274c {tx_type} reason={reject_reason}")
-                if tx_type in ("TAKE_PROFIT_ORDER_REJECT", "ORDER_CANCEL"):
-                    logger.warning(
-                        f"[DEBUG] {tx_type} rejectReason={reject_reason}"
-                    )
-            transaction_type = tx_type
-            transaction_id = transaction.get('id')
-            if transaction_id and int(transaction_id) > max_id:
-                max_id = int(transaction_id)
-            open_time = transaction.get('time', '')
-
-            if transaction_type == 'ORDER_FILL':
-                trade_id = transaction_id
-                instrument = transaction.get('instrument', 'UNKNOWN')
-                units = transaction.get('units', 0)
-                price = float(transaction.get('price', 0.0))
-                realized_pl = float(transaction.get('pl', 0.0))
-
-                logger.debug(
-                    "Debug BEFORE INSERT: %s %s %s %s %s %s",
-                    trade_id,
-                    instrument,
-                    units,
-                    open_time,
-                    price,
-                    realized_pl,
-                )
-                execute_with_retry(
-                    log_oanda_trade,
-                    trade_id,
-                    OANDA_ACCOUNT_ID,
-                    instrument,
-                    open_time,
-                    price,
-                    units,
-                    "OPEN",
-                    0.0,
-                    realized_pl,
-                    conn=conn,
-                )
-                add_trade_label(trade_id, "FILL")
-                logger.debug("Debug AFTER INSERT rowcount: 1")
-                rowcount = 1
-                updated_count += rowcount
-
-            elif transaction_type in ('STOP_LOSS_ORDER', 'TAKE_PROFIT_ORDER'):
-                trade_id = transaction.get('tradeID') or transaction.get('tradesClosed', [{}])[0].get('tradeID')
-                price = float(transaction.get('price', 0.0))
-                close_time = transaction.get('time', '')
-                realized_pl = float(transaction.get('tradesClosed', [{}])[0].get('realizedPL', 0.0))
-
-                if transaction_type == 'TAKE_PROFIT_ORDER':
-                    before = conn.total_changes
-                    execute_with_retry(
-                        cursor.execute,
-                        """
-                        UPDATE oanda_trades
-                        SET close_time = ?, close_price = ?, tp_price = ?, realized_pl = ?, state = 'CLOSED'
-                        WHERE trade_id = ?
-                        """,
-                        (close_time, price, price, realized_pl, trade_id),
-                    )
-                    rowcount = conn.total_changes - before
-                    add_trade_label(trade_id, "TP")
-
-                elif transaction_type == 'STOP_LOSS_ORDER':
-                    before = conn.total_changes
-                    execute_with_retry(
-                        cursor.execute,
-                        """
-                        UPDATE oanda_trades
-                        SET close_time = ?, close_price = ?, sl_price = ?, realized_pl = ?, state = 'CLOSED'
-                        WHERE trade_id = ?
-                        """,
-                        (close_time, price, price, realized_pl, trade_id),
-                    )
-                    rowcount = conn.total_changes - before
-                    add_trade_label(trade_id, "SL")
-
-                logger.info(f"{transaction_type} updated for trade_id {trade_id}, rowcount={rowcount}")
-
-            logger.info(
-                f"{transaction_type} processed for trade_id {transaction_id}, rowcount={rowcount}"
-            )
-            if transaction_type != 'ORDER_FILL':
-                updated_count += rowcount
-
-        execute_with_retry(conn.commit)
-        set_last_transaction_id(str(max_id))
-        logger.info(f"Successfully updated {updated_count} new trades.")
+        upper_id = fetch_account_last_transaction_id()
+        if upper_id is not None and upper_id <= last_transaction_id:
+            logger.debug("No new transactions after %s", last_transaction_id)
+            return
+        pages = iter_transaction_pages(last_transaction_id, upper_id, page_size)
+        for page_no, (page_end, transactions) in enumerate(pages, start=1):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Fetched transactions: %s", json.dumps(transactions, indent=2))
+            cursor.execute("BEGIN")
+            try:
+                for transaction in transactions:
+                    updated_count += _apply_transaction(conn, cursor, transaction)
+                if page_end > last_transaction_id:
+                    _store_last_transaction_id(cursor, page_end)
+                    last_transaction_id = page_end
+                cursor.execute("COMMIT")
+            except Exception:
+                try:
+                    cursor.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                raise
+            if max_pages and page_no >= max_pages:
+                # 残りは次回の同期で続きから取得する
+                logger.info("Sync paused at transaction %s after %d pages", page_end, page_no)
+                break
+        logger.info("Successfully updated %d new trades.", updated_count)
     except Exception as e:
         logger.error(f"Error updating trades: {e}")
         log_error("update_oanda_trades", str(e))
@@ -9,6 +9,7 @@ import uvicorn
 
 from backend.logs.log_manager import init_db
 from backend.scheduler.job_runner import JobRunner
+from backend.scheduler.multi_runner import parse_pairs
 from backend.utils import env_loader
 
 
@@ -35,9 +36,18 @@ def main() -> None:
             from execution.quick_tp_mode import run_loop
 
             run_loop()
+        elif len(parse_pairs(env_loader.get_env("TRADE_PAIRS"))) > 1:
+            from backend.scheduler.multi_runner import MultiPairScheduler
+
+            MultiPairScheduler(parse_pairs(env_loader.get_env("TRADE_PAIRS"))).run()
         else:
             runner = JobRunner()
-            runner.run()
+            if env_loader.get_env("RUNNER_MODE", "poll").lower() == "stream":
+                from backend.scheduler.tick_runner import StreamTickRunner
+
+                StreamTickRunner(runner).run()
+            else:
+                runner.run()
 
 
 if __name__ == "__main__":
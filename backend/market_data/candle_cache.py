@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+"""Process-wide rolling candle store shared by every candle consumer.
+
+One job loop used to request the same instrument/granularity from OANDA
+several times (multi-timeframe fetch, higher-TF analysis, daily history for
+percentile stats, scalp helpers ...).  :class:`CandleCache` keeps a rolling
+window per ``(instrument, granularity)`` and only asks the API for the bars
+after the last complete one.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from backend.market_data.candle_frame import CandleFrame
+
+logger = logging.getLogger(__name__)
+
+# OANDA の足種ごとの秒数 (月足は可変長のため対象外)
+GRANULARITY_SECONDS = {
+    "S5": 5,
+    "S10": 10,
+    "S15": 15,
+    "S30": 30,
+    "M1": 60,
+    "M2": 120,
+    "M4": 240,
+    "M5": 300,
+    "M10": 600,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H2": 7200,
+    "H3": 10800,
+    "H4": 14400,
+    "H6": 21600,
+    "H8": 28800,
+    "H12": 43200,
+    "D": 86400,
+    "W": 604800,
+}
+
+Fetcher = Callable[[str, str, dict, float], list]
+
+
+def parse_candle_time(value: str | None) -> datetime | None:
+    """Parse an OANDA RFC3339 timestamp (nanosecond precision) to UTC."""
+    if not value:
+        return None
+    try:
+        text = value.rstrip("Z")
+        if "." in text:
+            head, frac = text.split(".", 1)
+            text = f"{head}.{frac[:6]}"
+        dt = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+@dataclass
+class _Entry:
+    candles: list = field(default_factory=list)
+    capacity: int = 0
+    fetched_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    frame: CandleFrame | None = None
+
+    def last_complete(self) -> dict | None:
+        for candle in reversed(self.candles):
+            if candle.get("complete"):
+                return candle
+        return None
+
+
+class CandleCache:
+    """Rolling candle window per ``(instrument, granularity)``.
+
+    ``fetcher(instrument, granularity, params, timeout)`` performs the actual
+    HTTP request and returns the raw ``candles`` list.  Requests within
+    ``ttl`` seconds are served from memory; complete-only requests are served
+    from memory until the next bar can possibly have closed.
+    """
+
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        *,
+        ttl: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ) -> None:
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self._clock = clock
+        self._now = now
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.delta_fetches = 0
+        self.errors = 0
+        self.fetch_count = 0
+        self.fetch_latency_total = 0.0
+        self.fetch_latency_max = 0.0
+        self.fetch_latency_last = 0.0
+
+    # ------------------------------------------------------------------
+    def get(
+        self,
+        instrument: str,
+        granularity: str,
+        count: int,
+        *,
+        timeout: float = 10,
+        complete_only: bool = False,
+    ) -> list:
+        """Return up to ``count`` most recent candles (incomplete bar included)."""
+        entry = self._entry(instrument, granularity)
+        with entry.lock:
+            if entry.candles and count <= entry.capacity and self._is_fresh(
+                entry, granularity, complete_only
+            ):
+                self._count("hits")
+                return entry.candles[-count:]
+
+            if not entry.candles or count > entry.capacity:
+                candles = self._fetch(instrument, granularity, {"count": count}, timeout)
+                self._count("misses")
+                if candles:
+                    entry.candles = list(candles)
+                    entry.capacity = count
+                    entry.fetched_at = self._clock()
+                return list(candles)
+
+            self._refresh(entry, instrument, granularity, timeout)
+            return entry.candles[-count:]
+
+    def get_frame(
+        self,
+        instrument: str,
+        granularity: str,
+        count: int,
+        *,
+        timeout: float = 10,
+        complete_only: bool = False,
+    ) -> CandleFrame:
+        """Like :meth:`get` but return a :class:`CandleFrame` view.
+
+        The frame for the cached window is parsed once per refresh; bars that
+        survived the refresh are copied from the previous frame.
+        """
+        candles = self.get(
+            instrument, granularity, count, timeout=timeout, complete_only=complete_only
+        )
+        entry = self._entry(instrument, granularity)
+        with entry.lock:
+            window = entry.candles
+            if entry.frame is None or entry.frame._rows is not window:
+                if window:
+                    entry.frame = CandleFrame.from_candles(window, previous=entry.frame)
+            frame = entry.frame
+        if frame is not None and candles and len(candles) <= len(frame) and candles[-1] is frame[-1]:
+            return frame[-len(candles):]
+        return CandleFrame.from_candles(candles)
+
+    def invalidate(self, instrument: str | None = None, granularity: str | None = None) -> None:
+        """Drop cached windows matching ``instrument``/``granularity``."""
+        with self._lock:
+            for key in list(self._entries):
+                if instrument is not None and key[0] != instrument:
+                    continue
+                if granularity is not None and key[1] != granularity:
+                    continue
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """Return hit/miss/latency counters."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.delta_fetches
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "delta_fetches": self.delta_fetches,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "fetch_count": self.fetch_count,
+                "fetch_latency_avg": (
+                    self.fetch_latency_total / self.fetch_count if self.fetch_count else 0.0
+                ),
+                "fetch_latency_max": self.fetch_latency_max,
+                "fetch_latency_last": self.fetch_latency_last,
+                "entries": len(self._entries),
+            }
+
+    # ------------------------------------------------------------------
+    def _entry(self, instrument: str, granularity: str) -> _Entry:
+        key = (instrument, granularity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry()
+                self._entries[key] = entry
+            return entry
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _is_fresh(self, entry: _Entry, granularity: str, complete_only: bool) -> bool:
+        if self._clock() - entry.fetched_at < self.ttl:
+            return True
+        if not complete_only:
+            return False
+        # 確定足のみ必要な場合は次の足が確定し得る時刻まで再取得不要
+        seconds = GRANULARITY_SECONDS.get(granularity)
+        last = entry.last_complete()
+        start = parse_candle_time(last.get("time")) if last else None
+        if seconds is None or start is None:
+            return False
+        return self._now() < start + timedelta(seconds=2 * seconds)
+
+    def _refresh(self, entry: _Entry, instrument: str, granularity: str, timeout: float) -> None:
+        """Fetch bars after the last complete one and merge them in place.
+
+        The delta request returns the bars right after the cached ones, so
+        after a gap longer than the window (sleep, network outage) it would
+        only bring stale bars.  The window is then reloaded in full.
+        """
+        last = entry.last_complete()
+        start = parse_candle_time(last.get("time")) if last else None
+        seconds = GRANULARITY_SECONDS.get(granularity)
+        if start is None or (
+            seconds is not None
+            and self._now() - start > timedelta(seconds=seconds * entry.capacity)
+        ):
+            self._reload(entry, instrument, granularity, timeout)
+            return
+
+        limit = min(entry.capacity + 1, 5000)
+        params = {"from": last["time"], "includeFirst": "false", "count": limit}
+        new = self._fetch(instrument, granularity, params, timeout)
+        self._count("delta_fetches")
+        if len(new) >= limit:
+            # 上限まで返った = まだ続きがある。最新の窓を取り直す
+            self._reload(entry, instrument, granularity, timeout)
+            return
+        idx = len(entry.candles)
+        while idx and entry.candles[idx - 1] is not last:
+            idx -= 1
+        merged = entry.candles[:idx] + list(new) if new else entry.candles
+        entry.candles = merged[-entry.capacity:]
+        entry.fetched_at = self._clock()
+
+    def _reload(self, entry: _Entry, instrument: str, granularity: str, timeout: float) -> None:
+        candles = self._fetch(instrument, granularity, {"count": entry.capacity}, timeout)
+        self._count("misses")
+        if candles:
+            entry.candles = list(candles)
+            entry.fetched_at = self._clock()
+
+    def _fetch(self, instrument: str, granularity: str, params: dict, timeout: float) -> list:
+        start = time.perf_counter()
+        try:
+            return self._fetcher(instrument, granularity, params, timeout) or []
+        except Exception:
+            self._count("errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.fetch_count += 1
+                self.fetch_latency_total += elapsed
+                self.fetch_latency_last = elapsed
+                self.fetch_latency_max = max(self.fetch_latency_max, elapsed)
+
+
+__all__ = ["CandleCache", "GRANULARITY_SECONDS", "parse_candle_time"]
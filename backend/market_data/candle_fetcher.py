@@ -1,8 +1,12 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
 
 import requests
 
+from backend.market_data.candle_cache import CandleCache
+from backend.market_data.candle_frame import CandleFrame
 from backend.utils import env_loader
 
 OANDA_API_URL = "https://api-fxtrade.oanda.com/v3/instruments/{instrument}/candles"
@@ -11,6 +15,66 @@ OANDA_ACCOUNT_ID = env_loader.get_env("OANDA_ACCOUNT_ID")
 
 logger = logging.getLogger(__name__)
 
+# 全時間足の同時取得に備えて接続プールを共有する
+CANDLE_FETCH_MAX_WORKERS = int(env_loader.get_env("CANDLE_FETCH_MAX_WORKERS", "8"))
+try:
+    _SESSION = requests.Session()
+    _adapter = requests.adapters.HTTPAdapter(
+        pool_connections=CANDLE_FETCH_MAX_WORKERS,
+        pool_maxsize=CANDLE_FETCH_MAX_WORKERS,
+    )
+    _SESSION.mount("https://", _adapter)
+    _SESSION.mount("http://", _adapter)
+except Exception:
+    # モック環境などで requests.Session が存在しない場合に備える
+    _SESSION = None
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared worker pool for concurrent candle fetches."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=CANDLE_FETCH_MAX_WORKERS,
+                thread_name_prefix="candle-fetch",
+            )
+        return _EXECUTOR
+
+
+def _request_candles(instrument: str, granularity: str, params: dict, timeout) -> list:
+    """Issue one candles request and return the raw ``candles`` list."""
+    headers = {
+        "Authorization": f"Bearer {OANDA_API_KEY}"
+    }
+    query = {
+        "granularity": granularity,
+        "price": "M",  # Midpoint prices
+        **params,
+    }
+    url = OANDA_API_URL.format(instrument=instrument)
+    getter = _SESSION.get if _SESSION is not None else requests.get
+    response = getter(
+        url, headers=headers, params=query, timeout=timeout
+    )
+    response.raise_for_status()
+    data = response.json()
+    if "candles" in data:
+        return data["candles"]
+    logger.warning("No candles found in response for %s", instrument)
+    return []
+
+
+# プロセス全体で共有するローソク足キャッシュ
+candle_cache = CandleCache(
+    lambda *a: _request_candles(*a),
+    ttl=float(env_loader.get_env("CANDLE_CACHE_TTL_SEC", "1.0")),
+)
+
+
 def fetch_candles(
     instrument=None,
     granularity="M1",
@@ -18,6 +82,8 @@ def fetch_candles(
     timeout=10,
     *,
     allow_incomplete: bool = False,
+    use_cache: bool | None = None,
+    as_frame: bool = False,
 ):
     """
     Fetch candlestick data from OANDA API.
@@ -28,47 +94,58 @@ def fetch_candles(
         count (int): Number of candles to fetch (max 5000).
         timeout (int | float): Timeout in seconds for the HTTP request.
         allow_incomplete (bool): If True, include the most recent incomplete candle.
+        use_cache (bool | None): Serve from the shared :data:`candle_cache`.
+            Defaults to the ``CANDLE_CACHE_ENABLED`` environment variable.
+        as_frame (bool): Return a :class:`CandleFrame` parsed once at fetch
+            time instead of a list of dictionaries.
         
     Returns:
-        list: List of candle data dictionaries.
+        list | CandleFrame: Candle data.
     """
     if instrument is None:
         instrument = env_loader.get_env("DEFAULT_PAIR")
         if not instrument:
             raise ValueError("Instrument not specified and DEFAULT_PAIR environment variable is not set.")
-    headers = {
-        "Authorization": f"Bearer {OANDA_API_KEY}"
-    }
-    params = {
-        "granularity": granularity,
-        "count": count,
-        "price": "M"  # Midpoint prices
-    }
-    url = OANDA_API_URL.format(instrument=instrument)
+    if use_cache is None:
+        use_cache = env_loader.get_env("CANDLE_CACHE_ENABLED", "true").lower() == "true"
     try:
-        response = requests.get(
-            url, headers=headers, params=params, timeout=timeout
-        )
-        response.raise_for_status()
-        data = response.json()
-        if "candles" in data:
-            candles = data["candles"]
-            if not allow_incomplete:
-                if candles and not candles[-1].get("complete"):
-                    logger.debug(
-                        "M%s incomplete; using last complete bar T-1", granularity
-                    )
-                candles = [c for c in candles if c.get("complete")]
-            return candles
+        if use_cache and as_frame:
+            candles = candle_cache.get_frame(
+                instrument,
+                granularity,
+                count,
+                timeout=timeout,
+                complete_only=not allow_incomplete,
+            )
+        elif use_cache:
+            candles = candle_cache.get(
+                instrument,
+                granularity,
+                count,
+                timeout=timeout,
+                complete_only=not allow_incomplete,
+            )
         else:
-            logger.warning("No candles found in response for %s", instrument)
-            return []
+            candles = _request_candles(instrument, granularity, {"count": count}, timeout)
+            if as_frame:
+                candles = CandleFrame.from_candles(candles)
     except requests.Timeout:
         logger.warning("Request timed out while fetching candles for %s", instrument)
-        return []
+        return CandleFrame.empty() if as_frame else []
     except requests.RequestException as e:
         logger.error("Error fetching candles for %s: %s", instrument, e)
-        return []
+        return CandleFrame.empty() if as_frame else []
+    if as_frame:
+        if not allow_incomplete:
+            candles = candles.complete_only()
+        return candles
+    if not allow_incomplete:
+        if candles and not candles[-1].get("complete"):
+            logger.debug(
+                "M%s incomplete; using last complete bar T-1", granularity
+            )
+        candles = [c for c in candles if c.get("complete")]
+    return candles
 
 
 # New function to fetch multiple timeframes
@@ -90,8 +167,22 @@ def _parse_env_timeframes() -> dict:
     return result
 
 
-def fetch_multiple_timeframes(instrument=None, timeframes=None):
-    """複数の時間足のローソク足をまとめて取得する。"""
+def fetch_multiple_timeframes(
+    instrument=None,
+    timeframes=None,
+    *,
+    concurrent: bool | None = None,
+    timeout: float | None = None,
+    deadline: float | None = None,
+    as_frame: bool = False,
+):
+    """複数の時間足のローソク足をまとめて取得する。
+
+    ``concurrent`` が真 (デフォルトは ``CANDLE_FETCH_CONCURRENT``) の場合は
+    全時間足を共有スレッドプールで同時に取得する。``timeout`` は各リクエスト、
+    ``deadline`` は全体の待ち時間で、期限内に揃わなかった時間足は空となる。
+    ``as_frame`` が真なら各時間足を :class:`CandleFrame` で返す。
+    """
     if timeframes is None:
         timeframes = _parse_env_timeframes()
     if not timeframes:
@@ -109,21 +200,59 @@ def fetch_multiple_timeframes(instrument=None, timeframes=None):
         default_count = 60
         timeframes[scalp_tf] = default_count
 
-    candles_by_timeframe = {}
-    for granularity, count in timeframes.items():
+    if concurrent is None:
+        concurrent = env_loader.get_env("CANDLE_FETCH_CONCURRENT", "true").lower() == "true"
+    if timeout is None:
+        timeout = float(env_loader.get_env("CANDLE_FETCH_TIMEOUT_SEC", "10"))
+    if deadline is None:
+        deadline = float(env_loader.get_env("CANDLE_FETCH_DEADLINE_SEC", str(timeout)))
+
+    def _empty():
+        return CandleFrame.empty() if as_frame else []
+
+    def _fetch(granularity: str, count: int):
         fetch_gran = "D" if granularity == "D1" else granularity
         candles = fetch_candles(
             instrument,
             fetch_gran,
             count,
+            timeout,
             allow_incomplete=True,
+            as_frame=as_frame,
         )
         incomplete = bool(candles and not candles[-1].get("complete"))
         logger.debug(
             "%s bars fetched: %d (incomplete=%s)", granularity, len(candles), incomplete
         )
-        candles_by_timeframe[granularity] = candles
-    
+        return candles
+
+    candles_by_timeframe = {}
+    if not concurrent or len(timeframes) <= 1:
+        for granularity, count in timeframes.items():
+            candles_by_timeframe[granularity] = _fetch(granularity, count)
+        return candles_by_timeframe
+
+    executor = _get_executor()
+    futures = {
+        granularity: executor.submit(_fetch, granularity, count)
+        for granularity, count in timeframes.items()
+    }
+    wait(futures.values(), timeout=deadline)
+    for granularity, future in futures.items():
+        if not future.done():
+            logger.warning(
+                "%s candles not ready within %.1fs; returning partial result",
+                granularity,
+                deadline,
+            )
+            candles_by_timeframe[granularity] = _empty()
+            continue
+        try:
+            candles_by_timeframe[granularity] = future.result()
+        except Exception as exc:
+            logger.error("Error fetching %s candles: %s", granularity, exc)
+            candles_by_timeframe[granularity] = _empty()
+
     return candles_by_timeframe
 
 
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+"""Columnar candle container backed by NumPy arrays.
+
+OANDA candles arrive as ``{"mid": {"o", "h", "l", "c"}, "volume", "time",
+"complete"}`` dicts with string prices, and every consumer used to re-parse
+them with ``float(c["mid"]["c"])``.  :class:`CandleFrame` parses a candle list
+once into ``time``/``o``/``h``/``l``/``c``/``volume``/``complete`` arrays.
+
+Slicing returns a view (no copy) and the frame still behaves like a sequence
+of legacy dicts: indexing and iteration yield the original OANDA dict when the
+frame was built from one, so code that has not been converted keeps working.
+"""
+
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, Mapping
+
+import numpy as np
+
+_PRICE_KEYS = ("o", "h", "l", "c")
+
+
+class CandleFrame(Sequence):
+    """Immutable column view over a candle series."""
+
+    __slots__ = ("time", "o", "h", "l", "c", "volume", "complete", "_rows")
+
+    def __init__(
+        self,
+        time: np.ndarray,
+        o: np.ndarray,
+        h: np.ndarray,
+        l: np.ndarray,
+        c: np.ndarray,
+        volume: np.ndarray,
+        complete: np.ndarray,
+        rows: list | None = None,
+    ) -> None:
+        self.time = time
+        self.o = o
+        self.h = h
+        self.l = l
+        self.c = c
+        self.volume = volume
+        self.complete = complete
+        self._rows = rows
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_candles(
+        cls,
+        candles: Iterable[Mapping],
+        *,
+        previous: "CandleFrame | None" = None,
+    ) -> "CandleFrame":
+        """Parse OANDA candle dicts (``mid`` or flat ``o/h/l/c``) once.
+
+        When ``previous`` was built from an earlier window of the same series,
+        rows that are the very same dict objects are copied from its arrays
+        instead of being parsed again.  A ``list`` argument is kept (not
+        copied) as the legacy row storage.
+        """
+        if isinstance(candles, CandleFrame):
+            return candles
+        rows = candles if isinstance(candles, list) else list(candles)
+        offset, reuse = _shared_prefix(previous, rows)
+        n = len(rows)
+        prices = np.empty((4, n), dtype="float64")
+        volume = np.empty(n, dtype="float64")
+        complete = np.empty(n, dtype=bool)
+        times = np.empty(n, dtype=object)
+        if reuse:
+            src = slice(offset, offset + reuse)
+            for i, key in enumerate(_PRICE_KEYS):
+                prices[i, :reuse] = getattr(previous, key)[src]
+            volume[:reuse] = previous.volume[src]
+            complete[:reuse] = previous.complete[src]
+            times[:reuse] = previous.time[src]
+        for i in range(reuse, n):
+            row = rows[i]
+            mid = row.get("mid")
+            base = mid if isinstance(mid, Mapping) else row
+            prices[0, i] = float(base.get("o", 0))
+            prices[1, i] = float(base.get("h", 0))
+            prices[2, i] = float(base.get("l", 0))
+            prices[3, i] = float(base.get("c", 0))
+            volume[i] = float(row.get("volume", 0) or 0)
+            complete[i] = bool(row.get("complete"))
+            times[i] = row.get("time")
+        return cls(times, prices[0], prices[1], prices[2], prices[3], volume, complete, rows)
+
+    @classmethod
+    def empty(cls) -> "CandleFrame":
+        f = np.empty(0, dtype="float64")
+        return cls(np.empty(0, dtype=object), f, f, f, f, f, np.empty(0, dtype=bool), [])
+
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.c)
+
+    def __getitem__(self, idx: Any):
+        if isinstance(idx, slice):
+            rows = self._rows[idx] if self._rows is not None else None
+            return CandleFrame(
+                self.time[idx],
+                self.o[idx],
+                self.h[idx],
+                self.l[idx],
+                self.c[idx],
+                self.volume[idx],
+                self.complete[idx],
+                rows,
+            )
+        if self._rows is not None:
+            return self._rows[idx]
+        return self._row(int(idx))
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._rows is not None:
+            return iter(self._rows)
+        return (self._row(i) for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"CandleFrame(len={len(self)})"
+
+    def _row(self, i: int) -> dict:
+        return {
+            "complete": bool(self.complete[i]),
+            "volume": int(self.volume[i]),
+            "time": self.time[i],
+            "mid": {k: str(float(getattr(self, k)[i])) for k in _PRICE_KEYS},
+        }
+
+    # ------------------------------------------------------------------
+    def complete_only(self) -> "CandleFrame":
+        """Return only complete bars (a view when only the tail is incomplete)."""
+        n = len(self)
+        if n == 0 or self.complete.all():
+            return self
+        if self.complete[:-1].all():
+            return self[:-1]
+        mask = self.complete
+        rows = [r for r, ok in zip(self._rows, mask) if ok] if self._rows is not None else None
+        return CandleFrame(
+            self.time[mask],
+            self.o[mask],
+            self.h[mask],
+            self.l[mask],
+            self.c[mask],
+            self.volume[mask],
+            mask[mask],
+            rows,
+        )
+
+    def to_candles(self) -> list[dict]:
+        """Return the legacy list-of-dicts representation."""
+        if self._rows is not None:
+            return list(self._rows)
+        return [self._row(i) for i in range(len(self))]
+
+
+def _shared_prefix(previous: CandleFrame | None, rows: list) -> tuple[int, int]:
+    """Return ``(offset, count)`` of leading ``rows`` already in ``previous``."""
+    if previous is None or previous._rows is None or not rows:
+        return 0, 0
+    old = previous._rows
+    first = rows[0]
+    offset = next((i for i, r in enumerate(old) if r is first), None)
+    if offset is None:
+        return 0, 0
+    limit = min(len(old) - offset, len(rows))
+    count = 0
+    while count < limit and old[offset + count] is rows[count]:
+        count += 1
+    return offset, count
+
+
+def as_candle_frame(candles: Iterable[Mapping] | None) -> CandleFrame:
+    """Return ``candles`` as a :class:`CandleFrame` (parsing only if needed)."""
+    if candles is None:
+        return CandleFrame.empty()
+    return CandleFrame.from_candles(candles)
+
+
+def as_candle_list(candles: Iterable[Mapping] | None) -> list:
+    """Return ``candles`` as a plain list for JSON / prompt consumers."""
+    if candles is None:
+        return []
+    if isinstance(candles, CandleFrame):
+        return candles.to_candles()
+    return list(candles)
+
+
+__all__ = ["CandleFrame", "as_candle_frame", "as_candle_list"]
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+"""Cached market-hours / tradeable status service.
+
+``instrument_is_tradeable`` used to issue a blocking ``/instruments`` request
+at least twice per job loop.  :class:`TradeableStatus` instead combines the
+weekly FX session calendar with the ``tradeable`` flag observed on the pricing
+feed and only re-verifies against the API when one of them changes state or
+the cached answer is older than ``MARKET_STATUS_REFRESH_SEC``.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import requests
+
+from backend.utils import env_loader
+
+logger = logging.getLogger(__name__)
+
+# FX 市場は NY 時間 日曜 17:00 に開き 金曜 17:00 に閉じる
+_NY = ZoneInfo("America/New_York")
+_ROLLOVER_HOUR = 17
+_SUNDAY = 6
+_FRIDAY = 4
+
+Checker = Callable[[str], "bool | None"]
+
+
+def fx_market_open(now: datetime | None = None) -> bool:
+    """Return ``True`` when ``now`` falls inside the weekly FX session."""
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    local = now.astimezone(_NY)
+    wd = local.weekday()
+    if wd == 5:
+        return False
+    if wd == _SUNDAY:
+        return local.hour >= _ROLLOVER_HOUR
+    if wd == _FRIDAY:
+        return local.hour < _ROLLOVER_HOUR
+    return True
+
+
+def request_tradeable(instrument: str) -> bool | None:
+    """Query OANDA ``/instruments`` for the tradeable flag (``None`` on error)."""
+    api_key = env_loader.get_env("OANDA_API_KEY")
+    account_id = env_loader.get_env("OANDA_ACCOUNT_ID")
+    if not api_key or not account_id:
+        return True  # assume open if credentials missing
+
+    base = env_loader.get_env("OANDA_API_URL", "https://api-fxtrade.oanda.com/v3")
+    url = f"{base}/accounts/{account_id}/instruments"
+    headers = {"Authorization": f"Bearer {api_key}"}
+    params = {"instruments": instrument}
+    try:
+        resp = requests.get(url, headers=headers, params=params, timeout=5)
+        resp.raise_for_status()
+        instruments = resp.json().get("instruments", [])
+        if instruments:
+            return str(instruments[0].get("tradeable", "true")).lower() == "true"
+    except requests.RequestException as exc:
+        logger.warning(f"instrument_is_tradeable: {exc}")
+        return None
+    return False
+
+
+@dataclass
+class _State:
+    tradeable: bool
+    calendar_open: bool
+    verified_at: float
+    feed: bool | None = None
+    dirty: bool = False
+
+
+class TradeableStatus:
+    """Per-instrument tradeable flag cached between state changes.
+
+    ``checker(instrument)`` performs the API verification and returns
+    ``True``/``False`` or ``None`` when the request failed.  Outside the weekly
+    session the instrument is reported closed without touching the API unless
+    the pricing feed says otherwise.
+    """
+
+    def __init__(
+        self,
+        checker: Checker = request_tradeable,
+        *,
+        refresh_sec: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ) -> None:
+        self._checker = checker
+        self.refresh_sec = (
+            refresh_sec
+            if refresh_sec is not None
+            else float(env_loader.get_env("MARKET_STATUS_REFRESH_SEC", "300"))
+        )
+        self._clock = clock
+        self._now = now
+        self._states: dict[str, _State] = {}
+        self._lock = threading.Lock()
+        self.api_checks = 0
+        self.cache_hits = 0
+
+    def observe(self, instrument: str, tradeable: bool) -> None:
+        """Record the ``tradeable`` flag seen on the pricing feed."""
+        with self._lock:
+            st = self._states.get(instrument)
+            if st is None:
+                return
+            if st.feed is not None and st.feed != tradeable:
+                st.dirty = True
+            elif st.feed is None and tradeable != st.tradeable:
+                st.dirty = True
+            st.feed = tradeable
+
+    def is_tradeable(self, instrument: str) -> bool:
+        """Return the cached tradeable status, verifying only when stale."""
+        calendar_open = fx_market_open(self._now())
+        with self._lock:
+            st = self._states.get(instrument)
+            if st is not None and not self._needs_check(st, calendar_open):
+                self.cache_hits += 1
+                return st.tradeable
+            feed = st.feed if st is not None else None
+
+        if not calendar_open and not feed:
+            # 週末は API を叩かずにクローズ扱い
+            tradeable = False
+        else:
+            self.api_checks += 1
+            result = self._checker(instrument)
+            if result is None:
+                tradeable = feed if feed is not None else calendar_open
+            else:
+                tradeable = result
+        with self._lock:
+            self._states[instrument] = _State(
+                tradeable=tradeable,
+                calendar_open=calendar_open,
+                verified_at=self._clock(),
+                feed=feed,
+            )
+        return tradeable
+
+    def invalidate(self, instrument: str | None = None) -> None:
+        """Force re-verification on the next lookup."""
+        with self._lock:
+            if instrument is None:
+                self._states.clear()
+            else:
+                self._states.pop(instrument, None)
+
+    def _needs_check(self, st: _State, calendar_open: bool) -> bool:
+        if st.dirty or st.calendar_open != calendar_open:
+            return True
+        return self._clock() - st.verified_at >= self.refresh_sec
+
+
+tradeable_status = TradeableStatus()
+
+__all__ = [
+    "TradeableStatus",
+    "fx_market_open",
+    "request_tradeable",
+    "tradeable_status",
+]
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import Iterable
 
-from backend.utils import env_loader
+from backend.config import runtime_config
 
 
 def calc_of_imbalance(ticks: Iterable[dict]) -> float:
@@ -49,7 +49,7 @@ def calc_vol_burst(ticks: Iterable[dict]) -> float:
 
 def calc_spd_avg(ticks: Iterable[dict]) -> float:
     """Return average spread in pips."""
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     spreads = []
     for t in ticks:
         try:
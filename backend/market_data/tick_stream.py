@@ -14,6 +14,8 @@ from backend.utils import env_loader
 STREAM_URL = env_loader.get_env("OANDA_STREAM_URL", "https://stream-fxtrade.oanda.com/v3")
 ACCOUNT_ID = env_loader.get_env("OANDA_ACCOUNT_ID")
 API_KEY = env_loader.get_env("OANDA_API_KEY")
+# ハートビートは約5秒毎。これ以上無音なら切断とみなして再接続する
+READ_TIMEOUT_SEC = float(env_loader.get_env("STREAM_STALE_SEC", "10")) or None
 
 
 def start_stream_sync(pairs: Iterable[str], callback: Callable[[dict], None]) -> None:
@@ -22,7 +24,9 @@ def start_stream_sync(pairs: Iterable[str], callback: Callable[[dict], None]) ->
     headers = {"Authorization": f"Bearer {API_KEY}"}
     params = {"instruments": ",".join(pairs)}
     with requests.Session() as session:
-        with session.get(url, headers=headers, params=params, stream=True) as r:
+        with session.get(
+            url, headers=headers, params=params, stream=True, timeout=(10, READ_TIMEOUT_SEC)
+        ) as r:
             r.raise_for_status()
             for line in r.iter_lines():
                 if not line:
@@ -42,7 +46,8 @@ async def start_stream(pairs: Iterable[str], callback: Callable[[dict], None]) -
     backoff = 1
     while True:
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
+            timeout = httpx.Timeout(10.0, read=READ_TIMEOUT_SEC)
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 async with client.stream("GET", url, headers=headers, params=params) as r:
                     r.raise_for_status()
                     async for line in r.aiter_lines():
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+"""In-memory mirror of the OANDA account.
+
+The runner used to re-read account state over REST several times per loop
+(open positions, position + open trades, two ``/summary`` calls and the
+pending-order lookup).  :class:`AccountMirror` bootstraps once from
+``GET /accounts/{id}`` and afterwards applies deltas from
+``GET /accounts/{id}/changes?sinceTransactionID=...``:
+
+* ``changes`` – opened / reduced / closed trades, created / filled /
+  cancelled / triggered orders, changed positions and the transactions
+  themselves (``accountBalance`` is taken from them)
+* ``state`` – price-dependent values (unrealized P/L, margin used, NAV)
+
+Readers call :meth:`AccountMirror.refresh` implicitly through the accessors;
+a delta poll is issued at most every ``ACCOUNT_MIRROR_POLL_SEC`` seconds, so
+all callers within one loop share a single request.  The request runs
+outside the lock and only one thread issues it; the lock guards the state
+swap, so readers never queue behind a slow HTTP call.  Our own order
+requests call :func:`mark_dirty` so the next read polls immediately.
+
+When the mirror is disabled or cannot reach the API the accessors return
+``None`` and callers fall back to their direct REST calls.
+
+Environment variables:
+
+* ``ACCOUNT_MIRROR_ENABLED`` – ``false`` to always use direct REST calls
+* ``ACCOUNT_MIRROR_POLL_SEC`` – minimum seconds between delta polls
+* ``ACCOUNT_MIRROR_RESYNC_SEC`` – full re-bootstrap interval (0 = never)
+"""
+
+import copy
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.logs.perf_stats_logger import span
+from backend.utils import env_loader
+from backend.utils.http_client import request_with_retries
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[str, Optional[dict]], dict]
+
+_STATE_KEYS = ("NAV", "unrealizedPL", "marginUsed", "marginAvailable", "positionValue")
+# トレードに紐づく注文タイプ → ``/trades`` で埋め込まれるキー
+_DEPENDENT_ORDERS = {
+    "TAKE_PROFIT": "takeProfitOrder",
+    "STOP_LOSS": "stopLossOrder",
+    "TRAILING_STOP_LOSS": "trailingStopLossOrder",
+}
+
+
+def _rest_fetch(path: str, params: Optional[dict] = None) -> dict:
+    """GET ``/accounts/{id}{path}`` and return the JSON body."""
+    base = env_loader.get_env("OANDA_API_URL", "https://api-fxtrade.oanda.com/v3")
+    account_id = env_loader.get_env("OANDA_ACCOUNT_ID")
+    headers = {
+        "Authorization": f"Bearer {env_loader.get_env('OANDA_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+    url = f"{base}/accounts/{account_id}{path}"
+    resp = request_with_retries("get", url, headers=headers, params=params, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _units(side: Dict[str, Any] | None) -> float:
+    try:
+        return float((side or {}).get("units", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AccountMirror:
+    """Positions, trades, pending orders and summary kept in sync by deltas."""
+
+    def __init__(
+        self,
+        fetch: Fetch | None = None,
+        *,
+        poll_sec: float | None = None,
+        resync_sec: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._fetch = fetch or _rest_fetch
+        self.poll_sec = (
+            float(env_loader.get_env("ACCOUNT_MIRROR_POLL_SEC", "5"))
+            if poll_sec is None
+            else poll_sec
+        )
+        self.resync_sec = (
+            float(env_loader.get_env("ACCOUNT_MIRROR_RESYNC_SEC", "600"))
+            if resync_sec is None
+            else resync_sec
+        )
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        self._trades: Dict[str, Dict[str, Any]] = {}
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._summary: Dict[str, Any] = {}
+        self.last_transaction_id: str | None = None
+        self._ready = False
+        self._dirty = False
+        self._polled_at: float | None = None
+        self._bootstrapped_at: float | None = None
+        self._inflight: threading.Event | None = None
+        self.polls = 0
+        self.bootstraps = 0
+
+    # ------------------------------------------------------------------
+    # Synchronisation
+    # ------------------------------------------------------------------
+    def bootstrap(self) -> None:
+        """Load the full account state (``GET /accounts/{id}``)."""
+        with span("account_bootstrap"):
+            data = self._fetch("", None)
+        account = data.get("account", {})
+        positions = {p["instrument"]: p for p in account.get("positions", [])}
+        trades = {t["id"]: t for t in account.get("trades", [])}
+        orders = {
+            o["id"]: o
+            for o in account.get("orders", [])
+            if o.get("state", "PENDING") == "PENDING"
+        }
+        summary = {
+            k: v for k, v in account.items() if k not in ("positions", "trades", "orders")
+        }
+        with self._lock:
+            self._positions, self._trades, self._orders = positions, trades, orders
+            self._summary = summary
+            self.last_transaction_id = str(
+                data.get("lastTransactionID") or account.get("lastTransactionID")
+            )
+            now = self._clock()
+            self._ready = True
+            self._polled_at = now
+            self._bootstrapped_at = now
+            self.bootstraps += 1
+
+    def poll(self) -> None:
+        """Apply changes since :attr:`last_transaction_id`."""
+        with self._lock:
+            since = self.last_transaction_id
+        with span("account_sync"):
+            data = self._fetch("/changes", {"sinceTransactionID": since})
+        with self._lock:
+            self.apply_changes(data.get("changes", {}), data.get("state", {}))
+            last = data.get("lastTransactionID")
+            if last is not None:
+                self.last_transaction_id = str(last)
+            self._polled_at = self._clock()
+            self.polls += 1
+
+    def refresh(self, *, force: bool = False) -> bool:
+        """Bring the mirror up to date if due; return ``True`` when usable.
+
+        Only one thread talks to the API at a time and it does so without
+        holding the lock.  Concurrent callers get the current snapshot, or
+        wait for the in-flight request while nothing has been loaded yet.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._ready and self.resync_sec > 0 and self._bootstrapped_at is not None:
+                if now - self._bootstrapped_at >= self.resync_sec:
+                    self._ready = False
+            due = (
+                force
+                or self._dirty
+                or self._polled_at is None
+                or now - self._polled_at >= self.poll_sec
+            )
+            if not due:
+                return self._ready
+            inflight = self._inflight
+            if inflight is None:
+                self._inflight = threading.Event()
+                # 取得中に mark_dirty されたら次回もう一度取り直す
+                self._dirty = False
+                full = not self._ready
+            elif self._ready:
+                return True
+        if inflight is not None:
+            inflight.wait()
+            with self._lock:
+                return self._ready
+        try:
+            if full:
+                self.bootstrap()
+            else:
+                self.poll()
+        except Exception as exc:
+            # 次回は全体を取り直す。それまでは呼び出し側が REST にフォールバック
+            logger.warning("account mirror refresh failed: %s", exc)
+            with self._lock:
+                self._ready = False
+                self._polled_at = now
+        finally:
+            with self._lock:
+                done, self._inflight = self._inflight, None
+            done.set()
+        with self._lock:
+            return self._ready
+
+    def mark_dirty(self) -> None:
+        """Force a poll on the next read (after our own order requests)."""
+        with self._lock:
+            self._dirty = True
+
+    def apply_changes(self, changes: Dict[str, Any], state: Dict[str, Any]) -> None:
+        """Apply an ``AccountChanges`` / ``AccountChangesState`` pair."""
+        with self._lock:
+            for key in ("tradesOpened", "tradesReduced"):
+                for trade in changes.get(key, []):
+                    self._trades[trade["id"]] = trade
+            for trade in changes.get("tradesClosed", []):
+                self._trades.pop(trade["id"], None)
+            for order in changes.get("ordersCreated", []):
+                if order.get("state", "PENDING") == "PENDING":
+                    self._orders[order["id"]] = order
+                    # TP/SL の置き換えは新規作成 + 旧注文取消で届く
+                    self._link_order(order)
+            for key in ("ordersCancelled", "ordersFilled", "ordersTriggered"):
+                for order in changes.get(key, []):
+                    old = self._orders.pop(order["id"], None) or order
+                    self._unlink_order(old)
+            for pos in changes.get("positions", []):
+                self._positions[pos["instrument"]] = pos
+            for tx in changes.get("transactions", []):
+                if "accountBalance" in tx:
+                    self._summary["balance"] = tx["accountBalance"]
+
+            for key in _STATE_KEYS:
+                if key in state:
+                    self._summary[key] = state[key]
+            for ps in state.get("positions", []):
+                pos = self._positions.get(ps.get("instrument"))
+                if pos is None:
+                    continue
+                if "netUnrealizedPL" in ps:
+                    pos["unrealizedPL"] = ps["netUnrealizedPL"]
+                if "marginUsed" in ps:
+                    pos["marginUsed"] = ps["marginUsed"]
+                for side in ("long", "short"):
+                    if f"{side}UnrealizedPL" in ps:
+                        pos.setdefault(side, {})["unrealizedPL"] = ps[f"{side}UnrealizedPL"]
+            for ts in state.get("trades", []):
+                trade = self._trades.get(ts.get("id"))
+                if trade is not None:
+                    trade.update({k: v for k, v in ts.items() if k != "id"})
+            for os_ in state.get("orders", []):
+                order = self._orders.get(os_.get("id"))
+                if order is not None:
+                    order.update({k: v for k, v in os_.items() if k != "id"})
+
+    def _dependent(self, order: Dict[str, Any]) -> tuple[Dict[str, Any] | None, str | None]:
+        key = _DEPENDENT_ORDERS.get(order.get("type"))
+        if key is None or order.get("tradeID") is None:
+            return None, None
+        return self._trades.get(str(order["tradeID"])), key
+
+    def _link_order(self, order: Dict[str, Any]) -> None:
+        trade, key = self._dependent(order)
+        if trade is not None:
+            trade[f"{key}ID"] = order["id"]
+            trade.pop(key, None)
+
+    def _unlink_order(self, order: Dict[str, Any]) -> None:
+        trade, key = self._dependent(order)
+        if trade is not None and trade.get(f"{key}ID") == order["id"]:
+            trade.pop(f"{key}ID", None)
+            trade.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Accessors (``None`` = mirror unavailable, fall back to REST)
+    # ------------------------------------------------------------------
+    def open_positions(self) -> Optional[List[Dict[str, Any]]]:
+        """Positions with non-zero long or short units (``/openPositions``)."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            return [
+                copy.deepcopy(p)
+                for p in self._positions.values()
+                if _units(p.get("long")) != 0 or _units(p.get("short")) != 0
+            ]
+
+    def position(self, instrument: str) -> Optional[Dict[str, Any]]:
+        """Position for ``instrument`` (``/positions/{instrument}``)."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            pos = self._positions.get(instrument)
+            return copy.deepcopy(pos) if pos is not None else {"instrument": instrument}
+
+    def _with_orders(self, trade: Dict[str, Any]) -> Dict[str, Any]:
+        # ``/trades`` と同じく TP/SL 注文を埋め込んで返す
+        out = copy.deepcopy(trade)
+        for key in _DEPENDENT_ORDERS.values():
+            order = self._orders.get(trade.get(f"{key}ID"))
+            if order is not None:
+                out[key] = copy.deepcopy(order)
+        return out
+
+    def open_trades(self, instrument: str | None = None) -> Optional[List[Dict[str, Any]]]:
+        """Open trades, optionally for one instrument (``/trades?state=OPEN``)."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            return [
+                self._with_orders(t)
+                for t in self._trades.values()
+                if instrument is None or t.get("instrument") == instrument
+            ]
+
+    def trade(self, trade_id: str) -> Optional[Dict[str, Any]]:
+        """One open trade by id; ``None`` when unknown or unavailable."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            trade = self._trades.get(str(trade_id))
+            return self._with_orders(trade) if trade is not None else None
+
+    def pending_orders(self, instrument: str | None = None) -> Optional[List[Dict[str, Any]]]:
+        """Pending orders, optionally for one instrument."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            return [
+                copy.deepcopy(o)
+                for o in self._orders.values()
+                if instrument is None or o.get("instrument") == instrument
+            ]
+
+    def summary_value(self, key: str) -> Optional[float]:
+        """Numeric summary field such as ``balance`` or ``marginUsed``."""
+        if not self.refresh():
+            return None
+        with self._lock:
+            if key not in self._summary:
+                return None
+            try:
+                return float(self._summary[key])
+            except (TypeError, ValueError):
+                return None
+
+
+_mirror: AccountMirror | None = None
+_mirror_lock = threading.Lock()
+
+
+def get_account_mirror() -> AccountMirror | None:
+    """Return the process-wide mirror, or ``None`` when disabled."""
+    global _mirror
+    if env_loader.get_env("ACCOUNT_MIRROR_ENABLED", "true").lower() != "true":
+        return None
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = AccountMirror()
+    return _mirror
+
+
+def mark_dirty() -> None:
+    """Ask the mirror (if created) to poll on the next read."""
+    if _mirror is not None:
+        _mirror.mark_dirty()
+
+
+def reset_account_mirror() -> None:
+    """Drop the process-wide mirror (tests / credential changes)."""
+    global _mirror
+    with _mirror_lock:
+        _mirror = None
+
+
+__all__ = [
+    "AccountMirror",
+    "get_account_mirror",
+    "mark_dirty",
+    "reset_account_mirror",
+]
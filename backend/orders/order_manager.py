@@ -12,12 +12,14 @@ from backend.logs.info_logger import info
 from backend.logs.log_manager import log_error
 from backend.logs.trade_logger import ExitReason, log_trade
 from backend.logs.update_oanda_trades import fetch_trade_details
+from backend.orders import account_mirror
 from backend.risk_manager import (
     validate_rrr,
     validate_rrr_after_cost,
     validate_sl,
 )
 from backend.utils import env_loader
+from backend.logs.perf_stats_logger import span
 from backend.utils.http_client import request_with_retries
 from backend.utils.price import format_price
 
@@ -124,13 +126,18 @@ class OrderManager:
 
     def _request_with_retries(self, method: str, url: str, **kwargs) -> object:
         """``backend.utils.http_client`` のラッパー"""
-        return request_with_retries(
-            method,
-            url,
-            headers=kwargs.pop("headers", HEADERS),
-            timeout=kwargs.pop("timeout", HTTP_TIMEOUT_SEC),
-            **kwargs,
-        )
+        with span("order_request"):
+            resp = request_with_retries(
+                method,
+                url,
+                headers=kwargs.pop("headers", HEADERS),
+                timeout=kwargs.pop("timeout", HTTP_TIMEOUT_SEC),
+                **kwargs,
+            )
+        if method.lower() != "get":
+            # 自分の発注・変更は次の参照時に口座ミラーへ反映させる
+            account_mirror.mark_dirty()
+        return resp
 
     def fallback_tp_sl(self, atr_pips: float) -> tuple[int, int]:
         """ATR からフォールバック TP/SL を計算する."""
@@ -3,6 +3,7 @@ import time
 
 import requests
 
+from backend.orders.account_mirror import get_account_mirror, mark_dirty
 from backend.utils import env_loader
 from backend.utils.http_client import request_with_retries
 
@@ -27,8 +28,16 @@ HEADERS = {
 }
 
 
+def _mirror_value(key: str) -> Optional[float]:
+    mirror = get_account_mirror()
+    return mirror.summary_value(key) if mirror is not None else None
+
+
 def get_margin_used(retries: int = 2, delay: float = 1.0) -> Optional[float]:
     """Return current marginUsed from account summary."""
+    cached = _mirror_value("marginUsed")
+    if cached is not None:
+        return cached
     url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/summary"
     try:
         resp = request_with_retries("get", url, headers=HEADERS, timeout=10)
@@ -41,6 +50,9 @@ def get_margin_used(retries: int = 2, delay: float = 1.0) -> Optional[float]:
 
 def get_account_balance(retries: int = 2, delay: float = 1.0) -> Optional[float]:
     """Return current account balance."""
+    cached = _mirror_value("balance")
+    if cached is not None:
+        return cached
     url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/summary"
     try:
         resp = request_with_retries("get", url, headers=HEADERS, timeout=10)
@@ -56,6 +68,11 @@ def get_open_positions() -> Optional[List[Dict[str, Any]]]:
     Fetch open positions for the account.
     Returns a list of open positions or None if error.
     """
+    mirror = get_account_mirror()
+    if mirror is not None:
+        positions = mirror.open_positions()
+        if positions is not None:
+            return positions
     url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/openPositions"
     try:
         response = requests.get(url, headers=HEADERS, timeout=10)
@@ -71,6 +88,12 @@ def get_position_details(instrument: str) -> Optional[Dict[str, Any]]:
     指定銘柄のポジション詳細を取得する。エントリ時のコメントから
     tp/sl(pips) も抽出し ``tp_pips`` / ``sl_pips`` として返す。
     """
+    mirror = get_account_mirror()
+    if mirror is not None:
+        position_data = mirror.position(instrument)
+        trades = mirror.open_trades(instrument)
+        if position_data is not None and trades is not None:
+            return _decorate_position(position_data, trades)
     url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/positions/{instrument}"
     try:
         response = requests.get(url, headers=HEADERS, timeout=10)
@@ -82,72 +105,76 @@ def get_position_details(instrument: str) -> Optional[Dict[str, Any]]:
         trades_response = requests.get(trades_url, headers=HEADERS, timeout=10)
         trades_response.raise_for_status()
         trades = trades_response.json().get("trades", [])
-        
-        # Assuming we take the earliest open trade as the entry time
-        if trades:
-            entry_time = min(trade['openTime'] for trade in trades)
-            position_data['entry_time'] = entry_time
-        else:
-            position_data['entry_time'] = None
-
-        # ---- calc total PL from individual trades -----------------------
-        pl_total = 0.0
-        for tr in trades:
-            try:
-                units = float(tr.get("currentUnits", 0))
-                open_price = float(tr.get("price", 0))
-                unreal = float(tr.get("unrealizedPL", 0))
-                realized = float(tr.get("realizedPL", 0))
-                _ = units, open_price  # 明示的な使用で型チェックを回避
-                pl_total += unreal + realized
-            except Exception:
-                pass
-        position_data["pl_corrected"] = pl_total
-
-        # ---- extract entry_regime JSON from clientExtensions.comment ----
-        entry_regime = None
-        tp_comment = None
-        sl_pips = None
-        tp_pips = None
-        for tr in trades:
-            comment = tr.get("clientExtensions", {}).get("comment")
-            if comment:
-                try:
-                    entry_regime = json.loads(comment)
-                    sl_pips = entry_regime.get("sl")
-                    tp_pips = entry_regime.get("tp")
-                except json.JSONDecodeError:
-                    parts = comment.split("_")
-                    if len(parts) >= 3:
-                        entry_regime = {
-                            "regime": parts[0],
-                            "stance": parts[1],
-                            "entry_uuid": parts[2],
-                        }
-                    else:
-                        entry_regime = {"entry_uuid": comment}
-                break
-        for tr in trades:
-            tp_comment = (
-                tr.get("takeProfitOrder", {})
-                .get("clientExtensions", {})
-                .get("comment")
-            )
-            if tp_comment:
-                break
-        position_data["entry_regime"] = json.dumps(entry_regime) if entry_regime else None
-        position_data["tp_comment"] = tp_comment
-        if sl_pips is not None:
-            position_data["sl_pips"] = float(sl_pips)
-        if tp_pips is not None:
-            position_data["tp_pips"] = float(tp_pips)
-
-        return position_data
+        return _decorate_position(position_data, trades)
 
     except Exception as e:
         logger.error(f"Error fetching position details for {instrument}: {e}")
         return None
 
+
+def _decorate_position(position_data: Dict[str, Any], trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add entry time, corrected P/L and entry comment fields from open trades."""
+    # Assuming we take the earliest open trade as the entry time
+    if trades:
+        entry_time = min(trade['openTime'] for trade in trades)
+        position_data['entry_time'] = entry_time
+    else:
+        position_data['entry_time'] = None
+
+    # ---- calc total PL from individual trades -----------------------
+    pl_total = 0.0
+    for tr in trades:
+        try:
+            units = float(tr.get("currentUnits", 0))
+            open_price = float(tr.get("price", 0))
+            unreal = float(tr.get("unrealizedPL", 0))
+            realized = float(tr.get("realizedPL", 0))
+            _ = units, open_price  # 明示的な使用で型チェックを回避
+            pl_total += unreal + realized
+        except Exception:
+            pass
+    position_data["pl_corrected"] = pl_total
+
+    # ---- extract entry_regime JSON from clientExtensions.comment ----
+    entry_regime = None
+    tp_comment = None
+    sl_pips = None
+    tp_pips = None
+    for tr in trades:
+        comment = tr.get("clientExtensions", {}).get("comment")
+        if comment:
+            try:
+                entry_regime = json.loads(comment)
+                sl_pips = entry_regime.get("sl")
+                tp_pips = entry_regime.get("tp")
+            except json.JSONDecodeError:
+                parts = comment.split("_")
+                if len(parts) >= 3:
+                    entry_regime = {
+                        "regime": parts[0],
+                        "stance": parts[1],
+                        "entry_uuid": parts[2],
+                    }
+                else:
+                    entry_regime = {"entry_uuid": comment}
+            break
+    for tr in trades:
+        tp_comment = (
+            tr.get("takeProfitOrder", {})
+            .get("clientExtensions", {})
+            .get("comment")
+        )
+        if tp_comment:
+            break
+    position_data["entry_regime"] = json.dumps(entry_regime) if entry_regime else None
+    position_data["tp_comment"] = tp_comment
+    if sl_pips is not None:
+        position_data["sl_pips"] = float(sl_pips)
+    if tp_pips is not None:
+        position_data["tp_pips"] = float(tp_pips)
+
+    return position_data
+
 def has_open_position(pair: str) -> bool:
     positions = get_open_positions()
     if positions:
@@ -159,6 +186,7 @@ def close_position(pair: str, side: str) -> bool:
     data = {"longUnits": "ALL"} if side == "long" else {"shortUnits": "ALL"}
     try:
         response = requests.put(url, json=data, headers=HEADERS, timeout=10)
+        mark_dirty()
         response.raise_for_status()
         logging.info(f"Successfully closed {side} position for {pair}")
         return True
@@ -230,10 +258,13 @@ def update_stop_loss_if_needed(position: Dict[str, Any], new_sl_price: float) ->
     # For each trade, fetch current SL and adjust if the new price is tighter
     for trade_id in trade_ids:
         try:
-            trade_url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/trades/{trade_id}"
-            trade_resp = requests.get(trade_url, headers=HEADERS, timeout=10)
-            trade_resp.raise_for_status()
-            trade = trade_resp.json().get("trade", {})
+            mirror = get_account_mirror()
+            trade = mirror.trade(trade_id) if mirror is not None else None
+            if trade is None:
+                trade_url = f"{OANDA_API_URL}/accounts/{OANDA_ACCOUNT_ID}/trades/{trade_id}"
+                trade_resp = requests.get(trade_url, headers=HEADERS, timeout=10)
+                trade_resp.raise_for_status()
+                trade = trade_resp.json().get("trade", {})
             current_sl = float(trade.get("stopLossOrder", {}).get("price", "0"))
 
             if current_sl == 0 or comparison(current_sl, new_sl_price):
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 
+from backend.config import runtime_config
 from backend.utils import env_loader
 
 
@@ -29,7 +30,7 @@ class ReentryManager:
         if self.sl_hit_price is None or self.side is None:
             return False
 
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
         threshold = spread + self.trigger_pips_over_break * pip_size
         diff = price - self.sl_hit_price
 
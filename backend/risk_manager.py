@@ -1,6 +1,9 @@
 import logging
+from datetime import datetime
 
+from backend.config import runtime_config
 from backend.utils import env_loader
+from risk.tp_sl_manager import adjust_sl_for_rr
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +38,14 @@ def validate_rrr_after_cost(
         return False
 
 
-def is_high_vol_session() -> bool:
-    """ロンドン・NY序盤などボラティリティが高い時間帯か判定する。"""
+def is_high_vol_session(now=None) -> bool:
+    """ロンドン・NY序盤などボラティリティが高い時間帯か判定する。
+
+    ``now`` (UTC) を渡すとその時刻で判定する (バックテスト用)。
+    """
     from datetime import datetime, timedelta, timezone
 
-    now_jst = datetime.now(timezone.utc) + timedelta(hours=9)
+    now_jst = (now or datetime.now(timezone.utc)) + timedelta(hours=9)
     hour = now_jst.hour + now_jst.minute / 60.0
     return (15 <= hour < 17) or (22 <= hour < 24)
 
@@ -168,3 +174,233 @@ def tp_only_condition(sl_pips: float | None, noise_pips: float | None) -> bool:
         return False
 
 
+def calc_reversion_tp_sl(indicators: dict, pip_size: float) -> tuple[float | None, float | None]:
+    """Return TP/SL using ATR or Bollinger width for scalp reversion."""
+    atr_series = indicators.get("atr")
+    bb_upper = indicators.get("bb_upper")
+    bb_lower = indicators.get("bb_lower")
+    atr_pips = None
+    width_pips = None
+    if atr_series is not None and len(atr_series):
+        try:
+            atr_val = atr_series.iloc[-1] if hasattr(atr_series, "iloc") else atr_series[-1]
+            atr_pips = float(atr_val) / pip_size
+        except Exception:
+            atr_pips = None
+    if bb_upper is not None and bb_lower is not None and len(bb_upper) and len(bb_lower):
+        try:
+            up = bb_upper.iloc[-1] if hasattr(bb_upper, "iloc") else bb_upper[-1]
+            low = bb_lower.iloc[-1] if hasattr(bb_lower, "iloc") else bb_lower[-1]
+            width_pips = (up - low) / pip_size
+        except Exception:
+            width_pips = None
+    noise = 0.0
+    if atr_pips is not None:
+        noise = max(noise, atr_pips)
+    if width_pips is not None:
+        noise = max(noise, width_pips)
+    if noise == 0.0:
+        return None, None
+    tp_mult = float(env_loader.get_env("SCALP_REV_TP_MULT", "0.6"))
+    sl_mult = float(env_loader.get_env("SCALP_REV_SL_MULT", "1.0"))
+    return noise * tp_mult, noise * sl_mult
+
+
+def resolve_tp_sl(
+    risk_info: dict,
+    indicators: dict,
+    candles,
+    side: str,
+    bid: float | None,
+    ask: float | None,
+    *,
+    higher_tf: dict | None = None,
+    use_fallbacks: bool = True,
+    pip_size: float | None = None,
+    now: datetime | None = None,
+) -> tuple[float, float, float | None]:
+    """Return ``(tp_pips, sl_pips, atr_pips)`` for a non-scalp entry plan.
+
+    Missing plan values are filled from ATR, pivots, the N-wave target,
+    recent wicks, Bollinger width and higher-TF pivots; the SL is then
+    raised to the dynamic floor and ``MIN_SL_PIPS`` and ``ENFORCE_RRR`` is
+    applied.  ``process_entry`` and the backtest engine both use this.
+    """
+    cfg = runtime_config.current()
+    if pip_size is None:
+        pip_size = cfg.pip_size
+    tp_pips = risk_info.get("tp_pips")
+    sl_pips = risk_info.get("sl_pips")
+    fallback_tp = None
+
+    min_sl = float(env_loader.get_env("MIN_SL_PIPS", "0"))
+    fallback_sl = None
+    atr_pips = None
+    dynamic_min_sl = 0.0
+    try:
+        atr_series = indicators.get("atr")
+        if atr_series is not None and len(atr_series):
+            if hasattr(atr_series, "iloc"):
+                atr_val = float(atr_series.iloc[-1])
+            else:
+                atr_val = float(atr_series[-1])
+            atr_pips = atr_val / pip_size
+            mult_sl = float(
+                env_loader.get_env(
+                    "ATR_MULT_SL", env_loader.get_env("ATR_SL_MULTIPLIER", "2.0")
+                )
+            )
+            fallback_sl = atr_pips * mult_sl
+            mult_tp = float(
+                env_loader.get_env(
+                    "ATR_MULT_TP", env_loader.get_env("SHORT_TP_ATR_RATIO", "0.6")
+                )
+            )
+            fallback_tp = atr_pips * mult_tp
+        price_ref = bid if side == "long" else ask
+        # SL用ピボットレベル
+        pivot_sl_key = "pivot_s1" if side == "long" else "pivot_r1"
+        pivot_sl_val = indicators.get(pivot_sl_key)
+        if pivot_sl_val is not None and price_ref is not None:
+            dist_sl = abs(price_ref - pivot_sl_val) / pip_size
+            if fallback_sl is None or dist_sl > fallback_sl:
+                fallback_sl = dist_sl
+        pivot_key = "pivot_r1" if side == "long" else "pivot_s1"
+        pivot_val = indicators.get(pivot_key)
+        if pivot_val is not None and price_ref is not None:
+            dist = abs(pivot_val - price_ref) / pip_size
+            if fallback_tp is None or dist < fallback_tp:
+                fallback_tp = dist
+        n_target = indicators.get("n_wave_target")
+        if n_target is not None and price_ref is not None:
+            dist = abs(n_target - price_ref) / pip_size
+            if fallback_tp is None or dist < fallback_tp:
+                fallback_tp = dist
+            # N波ターゲットをSL候補として利用
+            if fallback_sl is None or dist > fallback_sl:
+                fallback_sl = dist
+
+        # ヒゲ幅平均×2をSL候補に追加
+        try:
+            wicks = []
+            for c in candles[-3:]:
+                base = c.get("mid", c)
+                high = float(base.get("h"))
+                low = float(base.get("l"))
+                opn = float(base.get("o", 0))
+                cls = float(base.get("c", 0))
+                upper = high - max(opn, cls)
+                lower = min(opn, cls) - low
+                wicks.append((upper + lower) / pip_size)
+            if wicks:
+                wick_sl = sum(wicks) / len(wicks) * 2
+                if fallback_sl is None or wick_sl > fallback_sl:
+                    fallback_sl = wick_sl
+        except Exception:
+            pass
+        bb_upper = indicators.get("bb_upper")
+        bb_lower = indicators.get("bb_lower")
+        if bb_upper is not None and bb_lower is not None and price_ref is not None:
+            if hasattr(bb_upper, "iloc"):
+                width = float(bb_upper.iloc[-1]) - float(bb_lower.iloc[-1])
+            else:
+                width = float(bb_upper[-1]) - float(bb_lower[-1])
+            width_pips = width / pip_size
+            bb_ratio = float(env_loader.get_env("TP_BB_RATIO", "0.6"))
+            bb_tp = width_pips * bb_ratio
+            if fallback_tp is None or bb_tp < fallback_tp:
+                fallback_tp = bb_tp
+
+        # 上位足ピボットとの距離を TP 候補として追加
+        if cfg.higher_tf_enabled and higher_tf and price_ref is not None:
+            for key in ("pivot_h1", "pivot_h4", "pivot_d"):
+                pivot_val = higher_tf.get(key)
+                if pivot_val is None:
+                    continue
+                dist = abs(pivot_val - price_ref) / pip_size
+                if fallback_tp is None or dist < fallback_tp:
+                    fallback_tp = dist
+
+        # 動的SL下限計算
+        entry_price = bid if side == "long" else ask
+        swing_diff = None
+        if entry_price is not None:
+            swing_diff = get_recent_swing_diff(candles, side, entry_price, pip_size)
+        session_factor = 1.3 if is_high_vol_session(now) else 1.0
+        dynamic_min_sl = calc_min_sl(
+            atr_pips,
+            swing_diff,
+            atr_mult=float(env_loader.get_env("MIN_ATR_MULT", "1.2")),
+            swing_buffer_pips=5.0,
+            session_factor=session_factor,
+        )
+    except Exception as exc:
+        logger.debug(f"[resolve_tp_sl] ATR-based SL calc failed: {exc}")
+
+    if not use_fallbacks:
+        fallback_tp = None
+        fallback_sl = None
+        dynamic_min_sl = 0.0
+
+    if tp_pips is None:
+        tp_pips = (
+            fallback_tp
+            if fallback_tp is not None
+            else cfg.init_tp_pips
+        )
+    else:
+        try:
+            tp_pips = float(tp_pips)
+        except Exception:
+            tp_pips = cfg.init_tp_pips
+
+    if sl_pips is None:
+        sl_pips = (
+            fallback_sl
+            if fallback_sl is not None
+            else cfg.init_sl_pips
+        )
+    else:
+        try:
+            sl_pips = float(sl_pips)
+        except Exception:
+            sl_pips = cfg.init_sl_pips
+
+    if fallback_sl is not None:
+        sl_pips = max(sl_pips, fallback_sl)
+    try:
+        sl_pips = max(sl_pips, dynamic_min_sl)
+    except Exception:
+        pass
+    if sl_pips < min_sl:
+        sl_pips = min_sl
+    try:
+        if env_loader.get_env("ENFORCE_RRR", "false").lower() == "true":
+            min_rrr = float(env_loader.get_env("MIN_RRR", "0.8"))
+            tp_pips, sl_pips = adjust_sl_for_rr(tp_pips, sl_pips, min_rrr)
+    except Exception:
+        pass
+    return tp_pips, sl_pips, atr_pips
+
+
+def resolve_scalp_tp_sl(
+    risk_info: dict, indicators: dict, trade_mode: str, *, pip_size: float | None = None
+) -> tuple[float, float]:
+    """Return ``(tp_pips, sl_pips)`` for a scalp plan.
+
+    Plan values default to ``SCALP_TP_PIPS``/``SCALP_SL_PIPS``;
+    ``scalp_reversion`` uses the ATR/BB based distances when available.
+    """
+    if pip_size is None:
+        pip_size = runtime_config.current().pip_size
+    tp_pips = risk_info.get("tp_pips")
+    sl_pips = risk_info.get("sl_pips")
+    tp_pips = float(tp_pips if tp_pips is not None else env_loader.get_env("SCALP_TP_PIPS", "2"))
+    sl_pips = float(sl_pips if sl_pips is not None else env_loader.get_env("SCALP_SL_PIPS", "1"))
+    if trade_mode == "scalp_reversion":
+        rev_tp, rev_sl = calc_reversion_tp_sl(indicators, pip_size)
+        if rev_tp is not None:
+            tp_pips = rev_tp
+        if rev_sl is not None:
+            sl_pips = rev_sl
+    return tp_pips, sl_pips
@@ -21,8 +21,19 @@ except Exception:  # pragma: no cover - optional dependency or test stub
         return None
 
 
+def _expose_stage_metrics() -> None:
+    """Serve prom_exporter's stage histograms from the runner's metrics port."""
+    try:
+        from monitoring.prom_exporter import register_with_default
+
+        register_with_default()
+    except Exception:  # pragma: no cover - fastapi 等が無い環境
+        pass
+
+
+from backend.config import runtime_config
 from backend.core.ai_throttle import get_cooldown
-from backend.utils import env_loader, trade_age_seconds
+from backend.utils import env_loader, llm_pool, trade_age_seconds
 from backend.utils.openai_client import reset_call_counter, set_call_limit
 from backend.utils.restart_guard import can_restart
 from maintenance.disk_guard import maybe_cleanup
@@ -45,6 +56,8 @@ except Exception:
 
 from backend.indicators.calculate_indicators import calculate_indicators_multi
 from backend.market_data.candle_fetcher import fetch_multiple_timeframes
+from backend.market_data.candle_frame import as_candle_list
+from backend.market_data.market_hours import tradeable_status
 from backend.market_data.tick_fetcher import fetch_tick_data
 
 try:
@@ -88,6 +101,14 @@ except ImportError:  # tests may stub position_manager without helpers
         return None
 
 
+try:
+    from backend.orders.order_manager import get_pip_size
+except Exception:  # pragma: no cover - test stubs may remove module
+
+    def get_pip_size(instrument: str) -> float:
+        return 0.01 if instrument.endswith("_JPY") else 0.0001
+
+
 try:
     from backend.orders.order_manager import OrderManager
 except Exception:  # pragma: no cover - test stubs may remove module
@@ -100,7 +121,7 @@ except Exception:  # pragma: no cover - test stubs may remove module
             return _noop
 
 
-from backend.logs.perf_stats_logger import PerfTimer
+from backend.logs.perf_stats_logger import PerfTimer, span
 
 try:
     from ai.scalp_trend_classifier import MarketRegimeClassifier
@@ -295,12 +316,11 @@ from backend.logs.update_oanda_trades import fetch_trade_details, update_oanda_t
 
 def build_exit_context(position, tick_data, indicators, indicators_m1=None) -> dict:
     """Compose a minimal context dict for AI exit evaluation."""
+    cfg = runtime_config.current()
     bid = float(tick_data["prices"][0]["bids"][0]["price"])
     ask = float(tick_data["prices"][0]["asks"][0]["price"])
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-    unrealized_pl_pips = float(position["unrealizedPL"]) / float(
-        env_loader.get_env("PIP_VALUE_JPY", "100")
-    )
+    pip_size = cfg.pip_size
+    unrealized_pl_pips = float(position["unrealizedPL"]) / cfg.pip_value_jpy
     side = "long" if int(position.get("long", {}).get("units", 0)) != 0 else "short"
     context = {
         "side": side,
@@ -350,6 +370,8 @@ RUNNER_INSTANCE = None
 
 
 DEFAULT_PAIR = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+# 複数の JobRunner を同一プロセスで動かしてもメトリクスサーバーは 1 つだけ起動する
+_METRICS_STARTED = False
 ENTRY_USE_AI = env_loader.get_env("ENTRY_USE_AI", "true").lower() == "true"
 USE_LLM_REGIME = env_loader.get_env("USE_LLM_REGIME", "true").lower() == "true"
 USE_LLM_MARKET_COND = (
@@ -405,35 +427,36 @@ MM_DRAW_MAX_ATR_RATIO = float(env_loader.get_env("MM_DRAW_MAX_ATR_RATIO", "2.0")
 #  Check if the instrument is currently tradeable via OANDA
 # ───────────────────────────────────────────────────────────
 def instrument_is_tradeable(instrument: str) -> bool:
-    if not OANDA_API_KEY or not OANDA_ACCOUNT_ID:
-        return True  # assume open if credentials missing
-
-    url = f"https://api-fxtrade.oanda.com/v3/accounts/{OANDA_ACCOUNT_ID}/instruments"
-    headers = {"Authorization": f"Bearer {OANDA_API_KEY}"}
-    params = {"instruments": instrument}
-    try:
-        resp = requests.get(url, headers=headers, params=params, timeout=5)
-        resp.raise_for_status()
-        instruments = resp.json().get("instruments", [])
-        if instruments:
-            return str(instruments[0].get("tradeable", "true")).lower() == "true"
-    except requests.RequestException as exc:
-        log.warning(f"instrument_is_tradeable: {exc}")
-    return False
+    """Return cached tradeable status (API verified only on state change)."""
+    return tradeable_status.is_tradeable(instrument)
 
 
 class JobRunner:
-    def __init__(self, interval_seconds=1):
+    # 価格ストリーム駆動時は StreamTickRunner が設定される
+    tick_source = None
+
+    def __init__(self, interval_seconds=1, *, instrument: str | None = None):
         self.interval_seconds = interval_seconds
         self.last_run = None
         self._stop = False
+        # 評価対象の通貨ペア (MultiPairScheduler からはペアごとに渡される)
+        self.instrument = instrument or DEFAULT_PAIR
+        # pips 換算はペアごとの値を使う (ループ中の cfg.pip_size に反映する)
+        self.pip_size = get_pip_size(self.instrument)
+        # MultiPairScheduler 管理下では待機をスケジューラーに任せる
+        self.scheduled = False
+        self.next_run_delay = 0.0
         # Start Prometheus metrics server
+        global _METRICS_STARTED
         metrics_port = int(env_loader.get_env("METRICS_PORT", "8001"))
-        try:
-            start_http_server(metrics_port)
-            log.info("Prometheus metrics server running on port %s", metrics_port)
-        except Exception as exc:  # pragma: no cover - metrics optional
-            log.warning(f"Metrics server start failed: {exc}")
+        if not _METRICS_STARTED:
+            try:
+                start_http_server(metrics_port)
+                _METRICS_STARTED = True
+                _expose_stage_metrics()
+                log.info("Prometheus metrics server running on port %s", metrics_port)
+            except Exception as exc:  # pragma: no cover - metrics optional
+                log.warning(f"Metrics server start failed: {exc}")
         loss_lim = float(env_loader.get_env("LOSS_LIMIT", "0"))
         err_lim = int(env_loader.get_env("ERROR_LIMIT", "0"))
         self.safety = SafetyTrigger(loss_limit=loss_lim, error_limit=err_lim)
@@ -529,9 +552,10 @@ class JobRunner:
         self.mode_reason = ""
         # set initial AI call limit based on mode
         default_limit = int(env_loader.get_env("MAX_AI_CALLS_PER_LOOP", "1"))
-        set_call_limit(
+        self.ai_call_limit = (
             4 if self.trade_mode in ("scalp_momentum", "micro_scalp") else default_limit
         )
+        set_call_limit(self.ai_call_limit)
 
         # Majority-vote pipeline selection
         default_vote = "false" if self.trade_mode == "scalp" else "true"
@@ -542,6 +566,8 @@ class JobRunner:
         self.plan_buffer = (
             PlanBuffer() if self.use_vote_arch and self.use_vote_pipeline else None
         )
+        # tech_arch は DEFAULT_PAIR 固定なので複数ペア同時運用では使えない
+        self.uses_tech_pipeline = not (self.use_vote_pipeline and ENTRY_USE_AI)
         log.info(
             "USE_VOTE_PIPELINE=%s → %s pipeline active",
             self.use_vote_pipeline,
@@ -550,7 +576,7 @@ class JobRunner:
 
         # Restore TP adjustment flags based on existing TP order comment
         try:
-            pos = get_position_details(DEFAULT_PAIR)
+            pos = get_position_details(self.instrument)
             if pos:
                 er_raw = pos.get("entry_regime")
                 tp_comment = pos.get("tp_comment")
@@ -621,6 +647,7 @@ class JobRunner:
             return []
 
     def _update_portfolio_risk(self) -> None:
+        cfg = runtime_config.current()
         if not self.risk_mgr:
             return
         trade_pl = self._get_recent_trade_pl()
@@ -637,7 +664,7 @@ class JobRunner:
         self.risk_mgr.update_risk_metrics(trade_pl, open_pl)
         if self.risk_mgr.check_stop_conditions():
             log.warning("Portfolio CVaR limit exceeded")
-            if env_loader.get_env("FORCE_CLOSE_ON_RISK", "false").lower() == "true":
+            if cfg.force_close_on_risk:
                 try:
                     order_mgr.close_all_positions()
                 except Exception as exc:  # pragma: no cover
@@ -645,9 +672,10 @@ class JobRunner:
 
     def _get_cond_indicators(self) -> dict:
         """Return indicators for market condition check."""
-        tf = env_loader.get_env("TREND_COND_TF", "M5").upper()
+        cfg = runtime_config.current()
+        tf = cfg.trend_cond_tf.upper()
         if self.trade_mode in ("scalp", "scalp_momentum", "micro_scalp"):
-            tf = env_loader.get_env("SCALP_COND_TF", self.scalp_cond_tf).upper()
+            tf = (cfg.scalp_cond_tf or self.scalp_cond_tf).upper()
         return getattr(self, f"indicators_{tf}", {}) or {}
 
     def _evaluate_market_condition(
@@ -693,7 +721,7 @@ class JobRunner:
             "candles_d1": candles_d1,
         }
         try:
-            return get_market_condition(ctx, higher_tf)
+            return get_market_condition(ctx, higher_tf, instrument=self.instrument)
         except Exception as exc:  # pragma: no cover - optional dependency
             log.warning(f"get_market_condition failed: {exc}")
             return {}
@@ -716,16 +744,20 @@ class JobRunner:
         try:
             log.info("Reloading params from %s", path)
             params_loader.load_params(path=path)
+            cfg = runtime_config.refresh()
             # update AI cooldown values after reload
             self.refresh_ai_cooldowns()
-            default_limit = int(env_loader.get_env("MAX_AI_CALLS_PER_LOOP", "1"))
-            set_call_limit(4 if mode in ("scalp_momentum", "micro_scalp") else default_limit)
+            default_limit = cfg.max_ai_calls_per_loop
+            self.ai_call_limit = (
+                4 if mode in ("scalp_momentum", "micro_scalp") else default_limit
+            )
+            set_call_limit(self.ai_call_limit)
             self.current_params_file = path
         except Exception as exc:
             log.error("Param reload failed: %s", exc)
             return
-        if env_loader.get_env("AUTO_RESTART", "false").lower() == "true":
-            interval = float(env_loader.get_env("RESTART_MIN_INTERVAL", "60"))
+        if cfg.auto_restart:
+            interval = cfg.restart_min_interval
             if can_restart(interval):
                 log.info("AUTO_RESTART enabled – restarting process")
                 python = sys.executable
@@ -760,7 +792,8 @@ class JobRunner:
         self, instrument: str, indicators: dict, candles: list, tick_data: dict
     ):
         """Cancel stale LIMIT orders and optionally renew them."""
-        MAX_LIMIT_RETRY = int(env_loader.get_env("MAX_LIMIT_RETRY", "3"))
+        cfg = runtime_config.current()
+        MAX_LIMIT_RETRY = cfg.max_limit_retry
         pend = get_pending_entry_order(instrument)
         if not pend:
             # purge any local record if OANDA reports none
@@ -776,7 +809,7 @@ class JobRunner:
                 break
 
         if local_info:
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = cfg.pip_size
             price = (
                 float(tick_data["prices"][0]["bids"][0]["price"])
                 if local_info.get("side") == "long"
@@ -796,9 +829,7 @@ class JobRunner:
             else:
                 atr_pips = 0.0
 
-            threshold_ratio = float(
-                env_loader.get_env("LIMIT_THRESHOLD_ATR_RATIO", "0.3")
-            )
+            threshold_ratio = cfg.limit_threshold_atr_ratio
             adx_series = indicators.get("adx")
             adx_val = (
                 adx_series.iloc[-1]
@@ -841,6 +872,7 @@ class JobRunner:
                     "ema_slope": ema_slope_val,
                     "bb_width_pips": bb_width_pips,
                     "side": local_info.get("side"),
+                    "instrument": instrument,
                 }
                 try:
                     allow = should_convert_limit_to_market(ctx)
@@ -865,6 +897,7 @@ class JobRunner:
                                 detected_patterns=self.patterns_by_tf,
                                 trade_mode=self.trade_mode,
                                 mode_reason=self.mode_reason,
+                                instrument=instrument,
                             )
                             plan = parse_trade_plan(plan)
                             risk = plan.get("risk", {})
@@ -903,7 +936,7 @@ class JobRunner:
                                     for k, v in (self.indicators_H4 or {}).items()
                                 },
                             }
-                            market_cond = get_market_condition(ctx, {})
+                            market_cond = get_market_condition(ctx, {}, instrument=instrument)
                         except Exception as exc:
                             log.warning(f"get_market_condition failed: {exc}")
                             market_cond = None
@@ -918,11 +951,9 @@ class JobRunner:
                             "market_cond": market_cond,
                             "ai_response": ai_raw,
                         }
-                        sl_val = params.get("sl_pips") or float(
-                            env_loader.get_env("INIT_SL_PIPS", "20")
-                        )
-                        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-                        pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+                        sl_val = params.get("sl_pips") or cfg.init_sl_pips
+                        risk_pct = cfg.entry_risk_pct
+                        pip_val = cfg.pip_value_jpy
                         lot = calc_lot_size(
                             self.account_balance,
                             risk_pct,
@@ -976,6 +1007,7 @@ class JobRunner:
                 detected_patterns=self.patterns_by_tf,
                 trade_mode=self.trade_mode,
                 mode_reason=self.mode_reason,
+                instrument=instrument,
             )
             plan = parse_trade_plan(plan)
         except Exception as exc:
@@ -1006,11 +1038,9 @@ class JobRunner:
             "valid_for_sec": int(entry.get("valid_for_sec", self.max_limit_age_sec)),
             "risk": risk,
         }
-        sl_val = params.get("sl_pips") or float(
-            env_loader.get_env("INIT_SL_PIPS", "20")
-        )
-        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-        pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+        sl_val = params.get("sl_pips") or cfg.init_sl_pips
+        risk_pct = cfg.entry_risk_pct
+        pip_val = cfg.pip_value_jpy
         lot = calc_lot_size(
             self.account_balance,
             risk_pct,
@@ -1073,7 +1103,7 @@ class JobRunner:
             return
         try:
             res = order_mgr.adjust_tp_sl(
-                DEFAULT_PAIR,
+                self.instrument,
                 trade_id,
                 new_tp=new_tp,
                 entry_uuid=entry_uuid,
@@ -1133,7 +1163,7 @@ class JobRunner:
             return
         try:
             res = order_mgr.adjust_tp_sl(
-                DEFAULT_PAIR,
+                self.instrument,
                 trade_id,
                 new_tp=new_tp,
                 entry_uuid=entry_uuid,
@@ -1172,37 +1202,36 @@ class JobRunner:
             except Exception:
                 entry_uuid = None
         if result.get("action") == "MOVE_BE":
-            order_mgr.update_trade_sl(trade_id, DEFAULT_PAIR, entry_price)
+            order_mgr.update_trade_sl(trade_id, self.instrument, entry_price)
             self.breakeven_reached = True
         if result.get("action") == "REDUCE_TP" and result.get("tp") is not None:
             order_mgr.adjust_tp_sl(
-                DEFAULT_PAIR,
+                self.instrument,
                 trade_id,
                 new_tp=float(result["tp"]),
                 entry_uuid=entry_uuid,
             )
         if result.get("action") == "SHRINK_SL" and result.get("sl") is not None:
-            order_mgr.update_trade_sl(trade_id, DEFAULT_PAIR, float(result["sl"]))
+            order_mgr.update_trade_sl(trade_id, self.instrument, float(result["sl"]))
 
     # ────────────────────────────────────────────────────────────
     #  Trailing-stop settings update based on calendar/quiet hours
     # ────────────────────────────────────────────────────────────
     def get_calendar_volatility_level(self) -> int:
-        try:
-            return int(env_loader.get_env("CALENDAR_VOLATILITY_LEVEL", "0"))
-        except (TypeError, ValueError):
-            return 0
+        cfg = runtime_config.current()
+        return cfg.calendar_volatility_level
 
     def _refresh_trailing_status(self) -> None:
         """Update trailing-stop enable flag based on time or event level."""
         from backend.strategy import exit_logic
 
-        quiet_start = float(env_loader.get_env("QUIET_START_HOUR_JST", "3"))
-        quiet_end = float(env_loader.get_env("QUIET_END_HOUR_JST", "7"))
-        quiet2_enabled = env_loader.get_env("QUIET2_ENABLED", "false").lower() == "true"
+        cfg = runtime_config.current()
+        quiet_start = cfg.quiet_start_hour_jst
+        quiet_end = cfg.quiet_end_hour_jst
+        quiet2_enabled = cfg.quiet2_enabled
         if quiet2_enabled:
-            quiet2_start = float(env_loader.get_env("QUIET2_START_HOUR_JST", "23"))
-            quiet2_end = float(env_loader.get_env("QUIET2_END_HOUR_JST", "1"))
+            quiet2_start = cfg.quiet2_start_hour_jst
+            quiet2_end = cfg.quiet2_end_hour_jst
         else:
             quiet2_start = quiet2_end = None
 
@@ -1225,18 +1254,15 @@ class JobRunner:
         if in_quiet_hours or self.get_calendar_volatility_level() >= 3:
             exit_logic.TRAIL_ENABLED = False
         else:
-            exit_logic.TRAIL_ENABLED = (
-                env_loader.get_env("TRAIL_ENABLED", "true").lower() == "true"
-            )
+            exit_logic.TRAIL_ENABLED = cfg.trail_enabled
 
     def refresh_ai_cooldowns(self) -> None:
         """Reload AI cooldown values from environment variables."""
-        self.ai_cooldown_open = int(
-            env_loader.get_env("AI_COOLDOWN_SEC_OPEN", str(self.ai_cooldown_open))
-        )
-        self.ai_cooldown_flat = int(
-            env_loader.get_env("AI_COOLDOWN_SEC_FLAT", str(self.ai_cooldown_flat))
-        )
+        cfg = runtime_config.current()
+        if cfg.ai_cooldown_sec_open is not None:
+            self.ai_cooldown_open = cfg.ai_cooldown_sec_open
+        if cfg.ai_cooldown_sec_flat is not None:
+            self.ai_cooldown_flat = cfg.ai_cooldown_sec_flat
 
     def _should_peak_exit(
         self, side: str, indicators: dict, current_profit: float
@@ -1248,7 +1274,7 @@ class JobRunner:
             atr_val = float(atr_val.iloc[-1])
         if atr_val is None:
             return False
-        pip_size = 0.01 if DEFAULT_PAIR.endswith("_JPY") else 0.0001
+        pip_size = self.pip_size
         allowed_draw = (atr_val / pip_size) * MM_DRAW_MAX_ATR_RATIO
         if (self.max_profit_pips - current_profit) < allowed_draw:
             return False
@@ -1280,822 +1306,688 @@ class JobRunner:
         cross_up = prev_fast <= prev_slow and latest_fast > latest_slow
         return (side == "long" and cross_down) or (side == "short" and cross_up)
 
+    def _fetch_tick_data(self) -> dict | None:
+        """Return the latest pricing data from the stream or the REST API."""
+        with span("tick_fetch"):
+            if self.tick_source is not None:
+                data = self.tick_source.snapshot()
+                if data is not None:
+                    return data
+            return fetch_tick_data(self.instrument, include_liquidity=True)
+
+    def _wait_next_cycle(self) -> None:
+        """Sleep until the next evaluation (timer or stream trigger)."""
+        if self.scheduled:
+            self.next_run_delay = max(self.next_run_delay, self.interval_seconds)
+        elif self.tick_source is not None:
+            self.tick_source.wait()
+        else:
+            time.sleep(self.interval_seconds)
+
+    def _sleep(self, seconds: float) -> None:
+        """Back off for ``seconds`` without blocking a shared worker."""
+        if self.scheduled:
+            self.next_run_delay = max(self.next_run_delay, seconds)
+        else:
+            time.sleep(seconds)
+
+    def _sync_trades(self) -> None:
+        """Sync OANDA history; the scheduler does this once per round instead."""
+        if not self.scheduled:
+            with span("trade_sync"):
+                update_oanda_trades()
+
     def run(self, *, max_loops: int | None = None) -> None:
         """Run the job loop until ``stop`` is called or ``max_loops`` reached."""
         log.info("Job Runner started.")
         loops = 0
         while not self._stop:
             try:
-                reset_call_counter()
-                maybe_cleanup()
-                timer = PerfTimer("job_loop")
-                now = datetime.now(timezone.utc)
-                # ---- Market‑hours guard ---------------------------------
-                if not instrument_is_tradeable(DEFAULT_PAIR):
-                    log.info(f"{DEFAULT_PAIR} market closed – sleeping 60 s")
-                    time.sleep(60)
-                    self.last_run = datetime.now(timezone.utc)
-                    timer.stop()
-                    continue
-                self._update_portfolio_risk()
-                # Refresh POSITION_REVIEW_SEC dynamically each loop
-                self.review_sec = int(
-                    env_loader.get_env("POSITION_REVIEW_SEC", str(self.review_sec))
+                if self.run_cycle():
+                    loops += 1
+                    if max_loops is not None and loops >= max_loops:
+                        self._stop = True
+            except Exception as e:
+                log.error(f"Error occurred during job execution: {e}", exc_info=True)
+                self.safety.record_error()
+                metrics_publisher.publish("job_error", 1)
+                self._wait_next_cycle()
+
+    def run_cycle(self) -> bool:
+        """Evaluate one cycle for ``self.instrument``.
+
+        Returns ``True`` when the cycle ran to the end and ``False`` when it
+        was cut short (market closed, filter skip, pending order …).  All
+        settings read during the cycle come from one
+        :mod:`~backend.config.runtime_config` snapshot, with ``pip_size``
+        pinned to the instrument's pip.
+        """
+        with runtime_config.pinned(pip_size=self.pip_size):
+            return self._run_cycle()
+
+    def _run_cycle(self) -> bool:
+        cfg = runtime_config.current()
+        # AI 呼び出し回数はランナー (ペア) ごとに数える
+        reset_call_counter(getattr(self, "ai_call_limit", None))
+        maybe_cleanup()
+        timer = PerfTimer("job_loop")
+        now = datetime.now(timezone.utc)
+        # ---- Market‑hours guard ---------------------------------
+        if not instrument_is_tradeable(self.instrument):
+            log.info(f"{self.instrument} market closed – sleeping 60 s")
+            self._sleep(60)
+            self.last_run = datetime.now(timezone.utc)
+            timer.stop()
+            return False
+        self._update_portfolio_risk()
+        # Refresh POSITION_REVIEW_SEC dynamically each loop
+        if cfg.position_review_sec is not None:
+            self.review_sec = cfg.position_review_sec
+        log.debug(f"review_sec={self.review_sec}")
+        # Refresh HIGHER_TF_ENABLED dynamically
+        self.higher_tf_enabled = cfg.higher_tf_enabled
+        # Refresh AI cooldown values
+        self.refresh_ai_cooldowns()
+        # Update trailing-stop enable flag each loop
+        self._refresh_trailing_status()
+        if (
+            self.tick_source is not None
+            or self.last_run is None
+            or (now - self.last_run) >= timedelta(
+                seconds=self.interval_seconds
+            )
+        ):
+            log.info(f"Running job at {now.isoformat()}")
+
+            # ティックデータ取得（発注用）
+            tick_data = self._fetch_tick_data()
+            # ティックデータ詳細はDEBUGレベルで出力
+            log.debug(f"Tick data fetched: {tick_data}")
+            try:
+                price = float(tick_data["prices"][0]["bids"][0]["price"])
+                bid_liq = float(
+                    tick_data["prices"][0]["bids"][0].get("liquidity", 0)
                 )
-                log.debug(f"review_sec={self.review_sec}")
-                # Refresh HIGHER_TF_ENABLED dynamically
-                self.higher_tf_enabled = (
-                    env_loader.get_env("HIGHER_TF_ENABLED", "true").lower() == "true"
+                ask_liq = float(
+                    tick_data["prices"][0]["asks"][0].get("liquidity", 0)
                 )
-                # Refresh AI cooldown values
-                self.refresh_ai_cooldowns()
-                # Update trailing-stop enable flag each loop
-                self._refresh_trailing_status()
-                if self.last_run is None or (now - self.last_run) >= timedelta(
-                    seconds=self.interval_seconds
-                ):
-                    log.info(f"Running job at {now.isoformat()}")
+                tick = {
+                    "high": price,
+                    "low": price,
+                    "close": price,
+                    "volume": bid_liq + ask_liq,
+                }
+                if self.cluster_regime:
+                    cr_res = self.cluster_regime.update(tick)
+                    if cr_res.get("transition"):
+                        self.last_ai_call = datetime.min
+            except Exception as exc:
+                log.debug(f"RegimeDetector update failed: {exc}")
 
-                    # ティックデータ取得（発注用）
-                    tick_data = fetch_tick_data(DEFAULT_PAIR, include_liquidity=True)
-                    # ティックデータ詳細はDEBUGレベルで出力
-                    log.debug(f"Tick data fetched: {tick_data}")
-                    try:
-                        price = float(tick_data["prices"][0]["bids"][0]["price"])
-                        bid_liq = float(
-                            tick_data["prices"][0]["bids"][0].get("liquidity", 0)
-                        )
-                        ask_liq = float(
-                            tick_data["prices"][0]["asks"][0].get("liquidity", 0)
-                        )
-                        tick = {
-                            "high": price,
-                            "low": price,
-                            "close": price,
-                            "volume": bid_liq + ask_liq,
-                        }
-                        if self.cluster_regime:
-                            cr_res = self.cluster_regime.update(tick)
-                            if cr_res.get("transition"):
-                                self.last_ai_call = datetime.min
-                    except Exception as exc:
-                        log.debug(f"RegimeDetector update failed: {exc}")
+            # ---- Market closed guard (price feed says non‑tradeable) ----
+            try:
+                tradeable_status.observe(
+                    self.instrument,
+                    bool(tick_data["prices"][0].get("tradeable", True)),
+                )
+                if (
+                    not tick_data["prices"][0].get("tradeable", True)
+                ) or tick_data["prices"][0].get("status") == "non-tradeable":
+                    log.info(
+                        f"{self.instrument} price feed marked non‑tradeable – sleeping 120 s"
+                    )
+                    self._sleep(120)
+                    self.last_run = datetime.now(timezone.utc)
+                    timer.stop()
+                    return False
+            except (IndexError, KeyError, TypeError):
+                # if structure unexpected, fall back to old check
+                pass
 
-                    # ---- Market closed guard (price feed says non‑tradeable) ----
-                    try:
-                        if (
-                            not tick_data["prices"][0].get("tradeable", True)
-                        ) or tick_data["prices"][0].get("status") == "non-tradeable":
-                            log.info(
-                                f"{DEFAULT_PAIR} price feed marked non‑tradeable – sleeping 120 s"
-                            )
-                            time.sleep(120)
-                            self.last_run = datetime.now(timezone.utc)
-                            timer.stop()
-                            continue
-                    except (IndexError, KeyError, TypeError):
-                        # if structure unexpected, fall back to old check
-                        pass
+            # ローソク足データ取得は一度だけ行い、後続処理で再利用する
+            # 指標計算・パターン検出は列指向の CandleFrame をそのまま使い、
+            # その他の処理には従来の dict リストを渡す
+            with span("candle_fetch"):
+                candle_frames = fetch_multiple_timeframes(self.instrument, as_frame=True)
+            candles_dict = {
+                tf: as_candle_list(frame) for tf, frame in candle_frames.items()
+            }
 
-                    # ローソク足データ取得は一度だけ行い、後続処理で再利用する
-                    candles_dict = fetch_multiple_timeframes(DEFAULT_PAIR)
+            # ---- Chart pattern detection per timeframe ----
+            with span("pattern_scan"):
+                self.patterns_by_tf = pattern_scanner.scan(
+                    candle_frames, PATTERN_NAMES, key=self.instrument
+                )
 
-                    # ---- Chart pattern detection per timeframe ----
-                    self.patterns_by_tf = pattern_scanner.scan(
-                        candles_dict, PATTERN_NAMES
-                    )
+            candles_s10 = candles_dict.get("S10", [])
+            candles_m1 = candles_dict.get("M1", [])
+            candles_m5 = candles_dict.get("M5", [])
+            candles_h1 = candles_dict.get("H1", [])
+            candles_h4 = candles_dict.get("H4", [])
+            candles_d1 = candles_dict.get("D", [])
+            self.last_candles_m5 = candles_m5
+            candles = candles_m5  # backward compatibility
+            log.info(
+                f"Candle M5 last: {candles_m5[-1] if candles_m5 else 'No candles'}"
+            )
 
-                    candles_s10 = candles_dict.get("S10", [])
-                    candles_m1 = candles_dict.get("M1", [])
-                    candles_m5 = candles_dict.get("M5", [])
-                    candles_h1 = candles_dict.get("H1", [])
-                    candles_h4 = candles_dict.get("H4", [])
-                    candles_d1 = candles_dict.get("D", [])
-                    self.last_candles_m5 = candles_m5
-                    candles = candles_m5  # backward compatibility
-                    log.info(
-                        f"Candle M5 last: {candles_m5[-1] if candles_m5 else 'No candles'}"
-                    )
+            # -------- Higher‑timeframe reference levels --------
+            higher_tf = {}
+            if self.higher_tf_enabled:
+                with span("higher_tf"):
+                    higher_tf = analyze_higher_tf(self.instrument)
+                log.debug(f"Higher‑TF levels: {higher_tf}")
+
+            # 指標計算
+            with span("indicators"):
+                indicators_multi = calculate_indicators_multi(
+                    candle_frames,
+                    pair=self.instrument,
+                    allow_incomplete=True,
+                )
+            self.indicators_S10 = indicators_multi.get("S10")
+            self.indicators_M1 = indicators_multi.get("M1")
+            self.indicators_M5 = indicators_multi.get("M5")
+            self.indicators_M15 = indicators_multi.get("M15")
+            self.indicators_H1 = indicators_multi.get("H1")
+            self.indicators_H4 = indicators_multi.get("H4")
+            self.indicators_D = indicators_multi.get("D")
+            indicators = dict(self.indicators_M5 or {})
+            if self.indicators_H1:
+                indicators["ema_slope_h1"] = self.indicators_H1.get("ema_slope")
+                indicators["adx_h1"] = self.indicators_H1.get("adx")
+            if self.indicators_H4:
+                indicators["ema_slope_h4"] = self.indicators_H4.get("ema_slope")
+                indicators["adx_h4"] = self.indicators_H4.get("adx")
+
+            if self.indicators_M1:
+                indicators["M1"] = self.indicators_M1
+            if self.indicators_S10:
+                indicators["S10"] = self.indicators_S10
+
+            pip_size = cfg.pip_size
+            ask = float(tick_data["prices"][0]["asks"][0]["price"])
+            bid = float(tick_data["prices"][0]["bids"][0]["price"])
+            spread_pips = (ask - bid) / pip_size
+            tf = (cfg.scalp_cond_tf or self.scalp_cond_tf).upper()
+            src = getattr(self, f"indicators_{tf}", None) or self.indicators_M1
+            try:
+                atr_val = (
+                    src.get("atr").iloc[-1]
+                    if hasattr(src.get("atr"), "iloc")
+                    else src.get("atr", [0])[-1]
+                )
+                atr_pips = float(atr_val) / pip_size
+            except Exception:
+                atr_pips = 0.0
+            try:
+                bw = (
+                    self.indicators_M1["bb_upper"].iloc[-1]
+                    - self.indicators_M1["bb_lower"].iloc[-1]
+                )
+                price = float(tick_data["prices"][0]["bids"][0]["price"])
+                bb_pct = float(bw) / price * 100
+            except Exception:
+                bb_pct = 0.0
+
+            tradeable = instrument_is_tradeable(self.instrument)
+            allow_trade, filter_ctx, reason = apply_filters(
+                atr_pips,
+                bb_pct,
+                spread_pips,
+                tradeable=tradeable,
+            )
+            if not allow_trade:
+                log.info(f"Entry blocked by session filter ({reason})")
+                log_entry_skip(self.instrument, None, reason)
+                self.last_ai_call = datetime.min
+                self.last_run = now
+                self._sync_trades()
+                self._wait_next_cycle()
+                timer.stop()
+                return False
 
-                    # -------- Higher‑timeframe reference levels --------
-                    higher_tf = {}
-                    if self.higher_tf_enabled:
-                        higher_tf = analyze_higher_tf(DEFAULT_PAIR)
-                        log.debug(f"Higher‑TF levels: {higher_tf}")
+            current_price = bid
 
-                    # 指標計算
-                    indicators_multi = calculate_indicators_multi(
-                        candles_dict,
-                        allow_incomplete=True,
-                    )
-                    self.indicators_S10 = indicators_multi.get("S10")
-                    self.indicators_M1 = indicators_multi.get("M1")
-                    self.indicators_M5 = indicators_multi.get("M5")
-                    self.indicators_M15 = indicators_multi.get("M15")
-                    self.indicators_H1 = indicators_multi.get("H1")
-                    self.indicators_H4 = indicators_multi.get("H4")
-                    self.indicators_D = indicators_multi.get("D")
-                    indicators = dict(self.indicators_M5 or {})
-                    if self.indicators_H1:
-                        indicators["ema_slope_h1"] = self.indicators_H1.get("ema_slope")
-                        indicators["adx_h1"] = self.indicators_H1.get("adx")
-                    if self.indicators_H4:
-                        indicators["ema_slope_h4"] = self.indicators_H4.get("ema_slope")
-                        indicators["adx_h4"] = self.indicators_H4.get("adx")
-
-                    if self.indicators_M1:
-                        indicators["M1"] = self.indicators_M1
-                    if self.indicators_S10:
-                        indicators["S10"] = self.indicators_S10
-
-                    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                    ask = float(tick_data["prices"][0]["asks"][0]["price"])
-                    bid = float(tick_data["prices"][0]["bids"][0]["price"])
-                    spread_pips = (ask - bid) / pip_size
-                    tf = env_loader.get_env("SCALP_COND_TF", self.scalp_cond_tf).upper()
-                    src = getattr(self, f"indicators_{tf}", None) or self.indicators_M1
-                    try:
-                        atr_val = (
-                            src.get("atr").iloc[-1]
-                            if hasattr(src.get("atr"), "iloc")
-                            else src.get("atr", [0])[-1]
-                        )
-                        atr_pips = float(atr_val) / pip_size
-                    except Exception:
-                        atr_pips = 0.0
-                    try:
-                        bw = (
-                            self.indicators_M1["bb_upper"].iloc[-1]
-                            - self.indicators_M1["bb_lower"].iloc[-1]
-                        )
-                        price = float(tick_data["prices"][0]["bids"][0]["price"])
-                        bb_pct = float(bw) / price * 100
-                    except Exception:
-                        bb_pct = 0.0
-
-                    tradeable = instrument_is_tradeable(DEFAULT_PAIR)
-                    allow_trade, filter_ctx, reason = apply_filters(
-                        atr_pips,
-                        bb_pct,
-                        spread_pips,
-                        tradeable=tradeable,
+            entry_ctx: dict[str, str] = {}
+            if cfg.always_entry:
+                filter_pass = True
+            else:
+                with span("filters"):
+                    filter_pass = pass_entry_filter(
+                        indicators,
+                        current_price,
+                        self.indicators_M1,
+                        self.indicators_M15,
+                        self.indicators_H1,
+                        mode=self.trade_mode,
+                        context=entry_ctx,
                     )
-                    if not allow_trade:
-                        log.info(f"Entry blocked by session filter ({reason})")
-                        log_entry_skip(DEFAULT_PAIR, None, reason)
-                        self.last_ai_call = datetime.min
-                        self.last_run = now
-                        update_oanda_trades()
-                        time.sleep(self.interval_seconds)
-                        timer.stop()
-                        continue
 
-                    current_price = bid
+            if not filter_pass:
+                reason = entry_ctx.get("reason", "unknown")
+                log.info(
+                    f"Entry blocked by filter ({reason}) → skip any AI calls."
+                )
+                self.last_ai_call = datetime.min
+                self.last_position_review_ts = None
+                self.last_run = now
+                self._sync_trades()
+                self._wait_next_cycle()
+                timer.stop()
+                return False
 
-                    entry_ctx: dict[str, str] = {}
-                    if env_loader.get_env("ALWAYS_ENTRY", "false").lower() == "true":
-                        filter_pass = True
-                    else:
-                        filter_pass = pass_entry_filter(
-                            indicators,
-                            current_price,
-                            self.indicators_M1,
-                            self.indicators_M15,
-                            self.indicators_H1,
-                            mode=self.trade_mode,
-                            context=entry_ctx,
-                        )
+            skip_align = self.trade_mode in (
+                "scalp",
+                "scalp_momentum",
+                "micro_scalp",
+                "scalp_range",
+            )
+            if skip_align:
+                align = None
+                log.debug("Multi‑TF alignment skipped in scalp mode")
+            else:
+                align = is_multi_tf_aligned(
+                    {
+                        "M1": self.indicators_M1 or {},
+                        "M5": self.indicators_M5 or {},
+                        "H1": self.indicators_H1 or {},
+                    }
+                )
+                if align is None and cfg.strict_tf_align:
+                    log.info("Multi‑TF alignment missing → skip entry")
+                    log_entry_skip(self.instrument, None, "tf_align")
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
+                log.info(f"Multi‑TF alignment: {align}")
 
-                    if not filter_pass:
-                        reason = entry_ctx.get("reason", "unknown")
-                        log.info(
-                            f"Entry blocked by filter ({reason}) → skip any AI calls."
-                        )
-                        self.last_ai_call = datetime.min
-                        self.last_position_review_ts = None
-                        self.last_run = now
-                        update_oanda_trades()
-                        time.sleep(self.interval_seconds)
-                        timer.stop()
-                        continue
+            log.info("Indicators calculation successful.")
 
-                    skip_align = self.trade_mode in (
-                        "scalp",
-                        "scalp_momentum",
-                        "micro_scalp",
-                        "scalp_range",
+            # 指標からトレードモードを判定
+            new_mode, _score, reasons = decide_trade_mode_detail(
+                indicators, candles_m5
+            )
+            log.debug(
+                "Trade mode reasons:\n%s",
+                "\n".join(reasons),
+            )
+            perf = recent_strategy_performance()
+            self.current_context = build_context(
+                indicators, perf
+            )
+            selected = self.strategy_selector.select(self.current_context)
+            self.current_strategy_name = selected.name
+            selected_mode = (
+                "trend_follow" if selected.name == "trend" else selected.name
+            )
+            if selected_mode != self.trade_mode:
+                self.reload_params_for_mode(selected_mode)
+                self.trade_mode = selected_mode
+            if new_mode != self.trade_mode:
+                info(
+                    "regime_change",
+                    new=new_mode,
+                    old=self.trade_mode,
+                    score=_score,
+                )
+                self.reload_params_for_mode(new_mode)
+                self.trade_mode = new_mode
+            self.mode_reason = "\n".join(f"- {r}" for r in reasons)
+            log.info("Current trade mode: %s", self.trade_mode)
+
+            pend_info = get_pending_entry_order(self.instrument)
+            if pend_info:
+                age = time.time() - pend_info.get("ts", 0)
+                if age < self.pending_grace_sec:
+                    log.info(
+                        f"Pending LIMIT active ({age:.0f}s) – skip entry check"
                     )
-                    if skip_align:
-                        align = None
-                        log.debug("Multi‑TF alignment skipped in scalp mode")
-                    else:
-                        align = is_multi_tf_aligned(
-                            {
-                                "M1": self.indicators_M1 or {},
-                                "M5": self.indicators_M5 or {},
-                                "H1": self.indicators_H1 or {},
-                            }
-                        )
-                        if (
-                            align is None
-                            and env_loader.get_env(
-                                "ALIGN_STRICT",
-                                env_loader.get_env("STRICT_TF_ALIGN", "false"),
-                            ).lower()
-                            == "true"
-                        ):
-                            log.info("Multi‑TF alignment missing → skip entry")
-                            log_entry_skip(DEFAULT_PAIR, None, "tf_align")
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
-                        log.info(f"Multi‑TF alignment: {align}")
+                    log_entry_skip(
+                        self.instrument,
+                        None,
+                        "pending_limit",
+                        f"{age:.0f}s < {self.pending_grace_sec}s",
+                    )
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
 
-                    log.info("Indicators calculation successful.")
 
-                    # 指標からトレードモードを判定
-                    new_mode, _score, reasons = decide_trade_mode_detail(
-                        indicators, candles_m5
-                    )
-                    log.debug(
-                        "Trade mode reasons:\n%s",
-                        "\n".join(reasons),
-                    )
-                    perf = recent_strategy_performance()
-                    self.current_context = build_context(
-                        indicators, perf
-                    )
-                    selected = self.strategy_selector.select(self.current_context)
-                    self.current_strategy_name = selected.name
-                    selected_mode = (
-                        "trend_follow" if selected.name == "trend" else selected.name
-                    )
-                    if selected_mode != self.trade_mode:
-                        self.reload_params_for_mode(selected_mode)
-                        self.trade_mode = selected_mode
-                    if new_mode != self.trade_mode:
-                        info(
-                            "regime_change",
-                            new=new_mode,
-                            old=self.trade_mode,
-                            score=_score,
-                        )
-                        self.reload_params_for_mode(new_mode)
-                        self.trade_mode = new_mode
-                    self.mode_reason = "\n".join(f"- {r}" for r in reasons)
-                    log.info("Current trade mode: %s", self.trade_mode)
-
-                    pend_info = get_pending_entry_order(DEFAULT_PAIR)
-                    if pend_info:
-                        age = time.time() - pend_info.get("ts", 0)
-                        if age < self.pending_grace_sec:
-                            log.info(
-                                f"Pending LIMIT active ({age:.0f}s) – skip entry check"
-                            )
-                            log_entry_skip(
-                                DEFAULT_PAIR,
-                                None,
-                                "pending_limit",
-                                f"{age:.0f}s < {self.pending_grace_sec}s",
-                            )
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
+            has_position = check_current_position(self.instrument)
 
+            due_for_review = False
+            elapsed_review = None
+            if has_position and self.review_enabled:
+                if self.last_position_review_ts is None:
+                    due_for_review = True
+                else:
+                    elapsed_review = (
+                        now - self.last_position_review_ts
+                    ).total_seconds()
+                    due_for_review = elapsed_review >= self.review_sec
+                log.debug(
+                    "review check: ts=%s elapsed=%s review_sec=%s due=%s",
+                    self.last_position_review_ts,
+                    (
+                        f"{elapsed_review:.1f}"
+                        if elapsed_review is not None
+                        else "N/A"
+                    ),
+                    self.review_sec,
+                    due_for_review,
+                )
 
-                    has_position = check_current_position(DEFAULT_PAIR)
+            if has_position:
+                self.ai_cooldown = self.ai_cooldown_flat
+            else:
+                self.ai_cooldown = self.ai_cooldown_open
+
+            elapsed_seconds = (
+                datetime.now() - self.last_ai_call
+            ).total_seconds()
+            mode_cd = get_cooldown(self.trade_mode or "")
+            cooldown = min(self.ai_cooldown, mode_cd)
+            if (not due_for_review) and elapsed_seconds < cooldown:
+                log.info(
+                    f"AI cooldown active ({elapsed_seconds:.1f}s < {cooldown}s). Skipping AI call."
+                )
+                self.last_run = now
+                self._sync_trades()
+                self._wait_next_cycle()
+                timer.stop()
+                return False
+                
+            # 市場判定 (LLM) は LIMIT 見直し・ポジション管理と並行して実行する
+            market_task = llm_pool.submit(
+                self._evaluate_market_condition,
+                candles_m1,
+                candles_m5,
+                candles_d1,
+                higher_tf,
+            )
 
-                    due_for_review = False
-                    elapsed_review = None
-                    if has_position and self.review_enabled:
-                        if self.last_position_review_ts is None:
-                            due_for_review = True
-                        else:
-                            elapsed_review = (
-                                now - self.last_position_review_ts
-                            ).total_seconds()
-                            due_for_review = elapsed_review >= self.review_sec
-                        log.debug(
-                            "review check: ts=%s elapsed=%s review_sec=%s due=%s",
-                            self.last_position_review_ts,
-                            (
-                                f"{elapsed_review:.1f}"
-                                if elapsed_review is not None
-                                else "N/A"
-                            ),
-                            self.review_sec,
-                            due_for_review,
-                        )
+            # --- manage pending LIMIT orders *after* all entry filters pass
+            self._manage_pending_limits(
+                self.instrument, indicators, candles_m5, tick_data
+            )
 
-                    if has_position:
-                        self.ai_cooldown = self.ai_cooldown_flat
-                    else:
-                        self.ai_cooldown = self.ai_cooldown_open
+            regime_hint = (filter_ctx or {}).get("regime_hint")
+            MIN_HOLD_SECONDS = cfg.min_hold_seconds
 
-                    elapsed_seconds = (
-                        datetime.now() - self.last_ai_call
-                    ).total_seconds()
-                    mode_cd = get_cooldown(self.trade_mode or "")
-                    cooldown = min(self.ai_cooldown, mode_cd)
-                    if (not due_for_review) and elapsed_seconds < cooldown:
-                        log.info(
-                            f"AI cooldown active ({elapsed_seconds:.1f}s < {cooldown}s). Skipping AI call."
-                        )
-                        self.last_run = now
-                        update_oanda_trades()
-                        time.sleep(self.interval_seconds)
-                        timer.stop()
-                        continue
-                        
-                    # --- manage pending LIMIT orders *after* all entry filters pass
-                    self._manage_pending_limits(
-                        DEFAULT_PAIR, indicators, candles_m5, tick_data
-                    )
+            secs_since_entry = (
+                trade_age_seconds(has_position) if has_position else None
+            )
 
-                    market_cond = self._evaluate_market_condition(
-                        candles_m1,
-                        candles_m5,
-                        candles_d1,
-                        higher_tf,
-                    )
-                    log.debug(f"Market condition: {market_cond}")
-                    regime_hint = (filter_ctx or {}).get("regime_hint")
-                    MIN_HOLD_SECONDS = int(env_loader.get_env("MIN_HOLD_SECONDS", "0"))
+            if not has_position:
+                self.breakeven_reached = False
+                self.sl_reset_done = False
+                self.tp_extended = False
+                self.tp_reduced = False
+                self.max_profit_pips = 0.0
+                self.scale_count = 0
 
-                    secs_since_entry = (
-                        trade_age_seconds(has_position) if has_position else None
-                    )
 
-                    if not has_position:
-                        self.breakeven_reached = False
-                        self.sl_reset_done = False
-                        self.tp_extended = False
-                        self.tp_reduced = False
-                        self.max_profit_pips = 0.0
-                        self.scale_count = 0
+            # Determine position_side for further logic
+            if (
+                has_position
+                and int(has_position.get("long", {}).get("units", 0)) != 0
+            ):
+                position_side = "long"
+            elif (
+                has_position
+                and int(has_position.get("short", {}).get("units", 0)) != 0
+            ):
+                position_side = "short"
+            else:
+                position_side = None
+
+            # Inserted logic for dynamic SL management and AI profit-taking consultation
+            if has_position and position_side:
+                current_price = (
+                    float(tick_data["prices"][0]["bids"][0]["price"])
+                    if position_side == "long"
+                    else float(tick_data["prices"][0]["asks"][0]["price"])
+                )
+                entry_price = float(
+                    has_position[position_side].get("averagePrice", 0.0)
+                )
 
+                pip_size = cfg.pip_size
+                current_profit_pips = (
+                    (current_price - entry_price) / pip_size
+                    if position_side == "long"
+                    else (entry_price - current_price) / pip_size
+                )
+                self.max_profit_pips = max(
+                    self.max_profit_pips, current_profit_pips
+                )
 
-                    # Determine position_side for further logic
-                    if (
-                        has_position
-                        and int(has_position.get("long", {}).get("units", 0)) != 0
-                    ):
-                        position_side = "long"
-                    elif (
-                        has_position
-                        and int(has_position.get("short", {}).get("units", 0)) != 0
-                    ):
-                        position_side = "short"
-                    else:
-                        position_side = None
+                BE_TRIGGER_PIPS = cfg.be_trigger_pips
+                BE_ATR_TRIGGER_MULT = cfg.be_atr_trigger_mult
+                BE_TRIGGER_R = cfg.be_trigger_r
+                atr_val = (
+                    indicators["atr"].iloc[-1]
+                    if hasattr(indicators["atr"], "iloc")
+                    else indicators["atr"][-1]
+                )
+                atr_pips = atr_val / pip_size
+                if BE_ATR_TRIGGER_MULT > 0:
+                    be_trigger = max(
+                        BE_TRIGGER_PIPS, atr_pips * BE_ATR_TRIGGER_MULT
+                    )
+                else:
+                    be_trigger = BE_TRIGGER_PIPS
+                if BE_TRIGGER_R > 0:
+                    sl_pips_val = has_position.get("sl_pips")
+                    if sl_pips_val is not None:
+                        try:
+                            sl_pips_val = float(sl_pips_val)
+                            be_trigger = max(
+                                be_trigger, sl_pips_val * BE_TRIGGER_R
+                            )
+                        except Exception:
+                            pass
+                TP_PIPS = cfg.init_tp_pips
+                AI_PROFIT_TRIGGER_RATIO = cfg.ai_profit_trigger_ratio
 
-                    # Inserted logic for dynamic SL management and AI profit-taking consultation
-                    if has_position and position_side:
-                        current_price = (
-                            float(tick_data["prices"][0]["bids"][0]["price"])
-                            if position_side == "long"
-                            else float(tick_data["prices"][0]["asks"][0]["price"])
-                        )
-                        entry_price = float(
-                            has_position[position_side].get("averagePrice", 0.0)
-                        )
+                log.info(
+                    f"profit_pips={current_profit_pips:.1f}, "
+                    f"BE_trigger={be_trigger}, "
+                    f"AI_trigger={TP_PIPS * AI_PROFIT_TRIGGER_RATIO}"
+                )
 
-                        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                        current_profit_pips = (
-                            (current_price - entry_price) / pip_size
-                            if position_side == "long"
-                            else (entry_price - current_price) / pip_size
-                        )
-                        self.max_profit_pips = max(
-                            self.max_profit_pips, current_profit_pips
+                if (
+                    current_profit_pips >= be_trigger
+                    and not self.breakeven_reached
+                ):
+                    adx_series = indicators.get("adx")
+                    adx_val = (
+                        adx_series.iloc[-1]
+                        if adx_series is not None
+                        and hasattr(adx_series, "iloc")
+                        else adx_series[-1] if adx_series else 0.0
+                    )
+                    vol_adx_min = cfg.be_vol_adx_min
+                    vol_sl_mult = cfg.be_vol_sl_mult
+                    if adx_val >= vol_adx_min:
+                        if position_side == "long":
+                            new_sl_price = entry_price - atr_val * vol_sl_mult
+                        else:
+                            new_sl_price = entry_price + atr_val * vol_sl_mult
+                    else:
+                        new_sl_price = entry_price
+                    trade_id = has_position[position_side]["tradeIDs"][0]
+                    result = order_mgr.update_trade_sl(
+                        trade_id, self.instrument, new_sl_price
+                    )
+                    if result is not None:
+                        log.info(
+                            f"SL updated to entry price to secure minimum profit: {new_sl_price}"
                         )
+                        self.breakeven_reached = True
+                        self.sl_reset_done = False
+                        # SLが実行された向きと時間を記録
+                        self.last_sl_side = position_side
+                        self.last_sl_time = datetime.now(timezone.utc)
 
-                        BE_TRIGGER_PIPS = float(
-                            env_loader.get_env("BE_TRIGGER_PIPS", "10")
-                        )
-                        BE_ATR_TRIGGER_MULT = float(
-                            env_loader.get_env("BE_ATR_TRIGGER_MULT", "0")
+                if self.breakeven_reached and not self.sl_reset_done:
+                    trade_id = has_position[position_side]["tradeIDs"][0]
+                    sl_missing = True
+                    try:
+                        trade_info = fetch_trade_details(trade_id) or {}
+                        trade = trade_info.get("trade", {})
+                        sl_price = float(
+                            trade.get("stopLossOrder", {}).get("price", 0)
                         )
-                        BE_TRIGGER_R = float(env_loader.get_env("BE_TRIGGER_R", "0"))
+                        sl_missing = sl_price == 0
+                    except Exception as exc:
+                        log.warning(f"Failed to fetch trade details: {exc}")
+                    if sl_missing:
                         atr_val = (
                             indicators["atr"].iloc[-1]
                             if hasattr(indicators["atr"], "iloc")
                             else indicators["atr"][-1]
                         )
-                        atr_pips = atr_val / pip_size
-                        if BE_ATR_TRIGGER_MULT > 0:
-                            be_trigger = max(
-                                BE_TRIGGER_PIPS, atr_pips * BE_ATR_TRIGGER_MULT
-                            )
+                        if position_side == "long":
+                            new_sl_price = entry_price - atr_val * 2
                         else:
-                            be_trigger = BE_TRIGGER_PIPS
-                        if BE_TRIGGER_R > 0:
-                            sl_pips_val = has_position.get("sl_pips")
-                            if sl_pips_val is not None:
-                                try:
-                                    sl_pips_val = float(sl_pips_val)
-                                    be_trigger = max(
-                                        be_trigger, sl_pips_val * BE_TRIGGER_R
-                                    )
-                                except Exception:
-                                    pass
-                        TP_PIPS = float(env_loader.get_env("INIT_TP_PIPS", "30"))
-                        AI_PROFIT_TRIGGER_RATIO = float(
-                            env_loader.get_env("AI_PROFIT_TRIGGER_RATIO", "0.3")
+                            new_sl_price = entry_price + atr_val * 2
+                        result = order_mgr.update_trade_sl(
+                            trade_id, self.instrument, new_sl_price
                         )
+                        if result is not None:
+                            log.info(f"SL reapplied at {new_sl_price}")
+                            self.sl_reset_done = True
+                            # SLが実行された向きと時間を記録
+                            self.last_sl_side = position_side
+                            self.last_sl_time = datetime.now(timezone.utc)
+
+                self._maybe_extend_tp(
+                    has_position, indicators, position_side, pip_size
+                )
+                self._maybe_reduce_tp(
+                    has_position, indicators, position_side, pip_size
+                )
 
-                        log.info(
-                            f"profit_pips={current_profit_pips:.1f}, "
-                            f"BE_trigger={be_trigger}, "
-                            f"AI_trigger={TP_PIPS * AI_PROFIT_TRIGGER_RATIO}"
+                if self._should_peak_exit(
+                    position_side, indicators, current_profit_pips
+                ):
+                    log.info("Peak exit triggered → closing position.")
+                    try:
+                        order_mgr.close_position(
+                            self.instrument, side=position_side
                         )
-
-                        if (
-                            current_profit_pips >= be_trigger
-                            and not self.breakeven_reached
-                        ):
-                            adx_series = indicators.get("adx")
-                            adx_val = (
-                                adx_series.iloc[-1]
-                                if adx_series is not None
-                                and hasattr(adx_series, "iloc")
-                                else adx_series[-1] if adx_series else 0.0
-                            )
-                            vol_adx_min = float(
-                                env_loader.get_env("BE_VOL_ADX_MIN", "30")
+                        exit_time = datetime.now(timezone.utc).isoformat()
+                        log_trade(
+                            instrument=self.instrument,
+                            entry_time=has_position.get(
+                                "entry_time",
+                                has_position.get("openTime", exit_time),
+                            ),
+                            entry_price=entry_price,
+                            units=(
+                                int(has_position[position_side]["units"])
+                                if position_side == "long"
+                                else -int(has_position[position_side]["units"])
+                            ),
+                            exit_time=exit_time,
+                            exit_price=current_price,
+                            profit_loss=float(
+                                has_position.get(
+                                    "pl_corrected", has_position.get("pl", 0)
+                                )
+                            ),
+                            ai_reason="peak exit",
+                            exit_reason=ExitReason.RISK,
+                            is_manual=False,
+                        )
+                        pl = float(
+                            has_position.get(
+                                "pl_corrected", has_position.get("pl", 0)
                             )
-                            vol_sl_mult = float(
-                                env_loader.get_env("BE_VOL_SL_MULT", "2.0")
+                        )
+                        self.safety.record_loss(pl)
+                        metrics_publisher.publish(
+                            "trade_pl",
+                            pl,
+                            {"reason": "peak"},
+                        )
+                        self.last_close_ts = datetime.now(timezone.utc)
+                        send_line_message(
+                            f"【PEAK EXIT】{self.instrument} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
+                        )
+                        self._record_strategy_result(current_profit_pips)
+                    except Exception as exc:
+                        log.warning(f"Peak exit failed: {exc}")
+                    self.max_profit_pips = 0.0
+                    self.breakeven_reached = False
+                    self.sl_reset_done = False
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
+
+                if current_profit_pips >= TP_PIPS * AI_PROFIT_TRIGGER_RATIO:
+                    if (
+                        secs_since_entry is not None
+                        and secs_since_entry < MIN_HOLD_SECONDS
+                    ):
+                        log.info(
+                            f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
+                        )
+                    else:
+                        # EXITフィルターを評価し、フィルターNGの場合はAIの決済判断をスキップ
+                        self._maybe_exit_adjustment(
+                            has_position,
+                            indicators,
+                            position_side,
+                            pip_size,
+                            tick_data,
+                            current_profit_pips,
+                            entry_price,
+                        )
+                        if pass_exit_filter(indicators, position_side):
+                            log.info(
+                                "Filter OK → Processing exit decision with AI."
                             )
-                            if adx_val >= vol_adx_min:
-                                if position_side == "long":
-                                    new_sl_price = entry_price - atr_val * vol_sl_mult
-                                else:
-                                    new_sl_price = entry_price + atr_val * vol_sl_mult
-                            else:
-                                new_sl_price = entry_price
-                            trade_id = has_position[position_side]["tradeIDs"][0]
-                            result = order_mgr.update_trade_sl(
-                                trade_id, DEFAULT_PAIR, new_sl_price
+                            self.last_ai_call = datetime.now()
+                            exit_ctx = build_exit_context(
+                                has_position,
+                                tick_data,
+                                indicators,
+                                indicators_m1=self.indicators_M1,
                             )
-                            if result is not None:
-                                log.info(
-                                    f"SL updated to entry price to secure minimum profit: {new_sl_price}"
-                                )
-                                self.breakeven_reached = True
-                                self.sl_reset_done = False
-                                # SLが実行された向きと時間を記録
-                                self.last_sl_side = position_side
-                                self.last_sl_time = datetime.now(timezone.utc)
-
-                        if self.breakeven_reached and not self.sl_reset_done:
-                            trade_id = has_position[position_side]["tradeIDs"][0]
-                            sl_missing = True
+                            exit_task = llm_pool.submit(evaluate_exit_ai, exit_ctx)
+                            market_cond = market_task.result()
+                            log.debug(f"Market condition (exit): {market_cond}")
                             try:
-                                trade_info = fetch_trade_details(trade_id) or {}
-                                trade = trade_info.get("trade", {})
-                                sl_price = float(
-                                    trade.get("stopLossOrder", {}).get("price", 0)
-                                )
-                                sl_missing = sl_price == 0
+                                ai_dec = exit_task.result()
                             except Exception as exc:
-                                log.warning(f"Failed to fetch trade details: {exc}")
-                            if sl_missing:
-                                atr_val = (
-                                    indicators["atr"].iloc[-1]
-                                    if hasattr(indicators["atr"], "iloc")
-                                    else indicators["atr"][-1]
-                                )
-                                if position_side == "long":
-                                    new_sl_price = entry_price - atr_val * 2
-                                else:
-                                    new_sl_price = entry_price + atr_val * 2
-                                result = order_mgr.update_trade_sl(
-                                    trade_id, DEFAULT_PAIR, new_sl_price
-                                )
-                                if result is not None:
-                                    log.info(f"SL reapplied at {new_sl_price}")
-                                    self.sl_reset_done = True
-                                    # SLが実行された向きと時間を記録
-                                    self.last_sl_side = position_side
-                                    self.last_sl_time = datetime.now(timezone.utc)
-
-                        self._maybe_extend_tp(
-                            has_position, indicators, position_side, pip_size
-                        )
-                        self._maybe_reduce_tp(
-                            has_position, indicators, position_side, pip_size
-                        )
-
-                        if self._should_peak_exit(
-                            position_side, indicators, current_profit_pips
-                        ):
-                            log.info("Peak exit triggered → closing position.")
-                            try:
-                                order_mgr.close_position(
-                                    DEFAULT_PAIR, side=position_side
-                                )
-                                exit_time = datetime.now(timezone.utc).isoformat()
-                                log_trade(
-                                    instrument=DEFAULT_PAIR,
-                                    entry_time=has_position.get(
-                                        "entry_time",
-                                        has_position.get("openTime", exit_time),
-                                    ),
-                                    entry_price=entry_price,
-                                    units=(
-                                        int(has_position[position_side]["units"])
-                                        if position_side == "long"
-                                        else -int(has_position[position_side]["units"])
-                                    ),
-                                    exit_time=exit_time,
-                                    exit_price=current_price,
-                                    profit_loss=float(
-                                        has_position.get(
-                                            "pl_corrected", has_position.get("pl", 0)
-                                        )
-                                    ),
-                                    ai_reason="peak exit",
-                                    exit_reason=ExitReason.RISK,
-                                    is_manual=False,
-                                )
-                                pl = float(
-                                    has_position.get(
-                                        "pl_corrected", has_position.get("pl", 0)
-                                    )
-                                )
-                                self.safety.record_loss(pl)
-                                metrics_publisher.publish(
-                                    "trade_pl",
-                                    pl,
-                                    {"reason": "peak"},
-                                )
-                                self.last_close_ts = datetime.now(timezone.utc)
-                                send_line_message(
-                                    f"【PEAK EXIT】{DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
-                                )
-                                self._record_strategy_result(current_profit_pips)
-                            except Exception as exc:
-                                log.warning(f"Peak exit failed: {exc}")
-                            self.max_profit_pips = 0.0
-                            self.breakeven_reached = False
-                            self.sl_reset_done = False
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
-
-                        if current_profit_pips >= TP_PIPS * AI_PROFIT_TRIGGER_RATIO:
-                            if (
-                                secs_since_entry is not None
-                                and secs_since_entry < MIN_HOLD_SECONDS
-                            ):
-                                log.info(
-                                    f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
-                                )
-                            else:
-                                # EXITフィルターを評価し、フィルターNGの場合はAIの決済判断をスキップ
-                                self._maybe_exit_adjustment(
-                                    has_position,
-                                    indicators,
-                                    position_side,
-                                    pip_size,
-                                    tick_data,
-                                    current_profit_pips,
-                                    entry_price,
-                                )
-                                if pass_exit_filter(indicators, position_side):
-                                    log.info(
-                                        "Filter OK → Processing exit decision with AI."
-                                    )
-                                    self.last_ai_call = datetime.now()
-                                    log.debug(f"Market condition (exit): {market_cond}")
-                                    exit_ctx = build_exit_context(
-                                        has_position,
-                                        tick_data,
-                                        indicators,
-                                        indicators_m1=self.indicators_M1,
-                                    )
-                                    try:
-                                        ai_dec = evaluate_exit_ai(exit_ctx)
-                                    except Exception as exc:
-                                        log.warning(f"exit AI evaluation failed: {exc}")
-                                        ai_dec = None
-                                    if ai_dec and ai_dec.action == "SCALE":
-                                        pip_size = float(
-                                            env_loader.get_env("PIP_SIZE", "0.01")
-                                        )
-                                        entry_price = float(
-                                            has_position[position_side].get(
-                                                "averagePrice", 0.0
-                                            )
-                                        )
-                                        cur_price = (
-                                            float(
-                                                tick_data["prices"][0]["bids"][0][
-                                                    "price"
-                                                ]
-                                            )
-                                            if position_side == "long"
-                                            else float(
-                                                tick_data["prices"][0]["asks"][0][
-                                                    "price"
-                                                ]
-                                            )
-                                        )
-                                        diff_pips = (
-                                            (cur_price - entry_price) / pip_size
-                                            if position_side == "long"
-                                            else (entry_price - cur_price) / pip_size
-                                        )
-                                        atr_val = (
-                                            indicators["atr"].iloc[-1]
-                                            if hasattr(indicators.get("atr"), "iloc")
-                                            else indicators.get("atr", [0])[-1]
-                                        )
-                                        allow_scale = True
-                                        if (
-                                            SCALE_MAX_POS > 0
-                                            and self.scale_count >= SCALE_MAX_POS
-                                        ):
-                                            log.info(
-                                                "Scale limit reached → ignoring SCALE signal"
-                                            )
-                                            allow_scale = False
-                                        if (
-                                            allow_scale
-                                            and SCALE_TRIGGER_ATR > 0
-                                            and diff_pips
-                                            < (atr_val / pip_size) * SCALE_TRIGGER_ATR
-                                        ):
-                                            log.info(
-                                                f"Scale trigger {diff_pips:.1f} < {(atr_val / pip_size) * SCALE_TRIGGER_ATR:.1f} pips"
-                                            )
-                                            allow_scale = False
-                                        if allow_scale:
-                                            try:
-                                                risk_pct = float(
-                                                    env_loader.get_env(
-                                                        "ENTRY_RISK_PCT", "0.01"
-                                                    )
-                                                )
-                                                pip_val = float(
-                                                    env_loader.get_env(
-                                                        "PIP_VALUE_JPY", "100"
-                                                    )
-                                                )
-                                                base_lot = calc_lot_size(
-                                                    self.account_balance,
-                                                    risk_pct,
-                                                    float(
-                                                        env_loader.get_env(
-                                                            "INIT_SL_PIPS", "20"
-                                                        )
-                                                    ),
-                                                    pip_val,
-                                                    risk_engine=self.risk_mgr,
-                                                )
-                                                lot_sz = min(SCALE_LOT_SIZE, base_lot)
-                                                order_mgr.enter_trade(
-                                                    side=position_side,
-                                                    lot_size=lot_sz,
-                                                    market_data=tick_data,
-                                                    strategy_params={
-                                                        "instrument": DEFAULT_PAIR,
-                                                        "mode": "market",
-                                                    },
-                                                )
-                                                log.info(
-                                                    f"Scaled into position ({position_side}) by {SCALE_LOT_SIZE} lots"
-                                                )
-                                                self.scale_count += 1
-                                                has_position = check_current_position(
-                                                    DEFAULT_PAIR
-                                                )
-                                            except Exception as exc:
-                                                log.warning(
-                                                    f"Failed to scale position: {exc}"
-                                                )
-                                            exit_executed = False
-                                        else:
-                                            exit_executed = process_exit(
-                                                indicators,
-                                                tick_data,
-                                                market_cond,
-                                                higher_tf,
-                                                indicators_m1=self.indicators_M1,
-                                                patterns=PATTERN_NAMES,
-                                                pattern_names=self.patterns_by_tf,
-                                            )
-                                    else:
-                                        exit_executed = process_exit(
-                                            indicators,
-                                            tick_data,
-                                            market_cond,
-                                            higher_tf,
-                                            indicators_m1=self.indicators_M1,
-                                            patterns=PATTERN_NAMES,
-                                            pattern_names=self.patterns_by_tf,
-                                        )
-                                    if exit_executed:
-                                        self.last_close_ts = datetime.now(timezone.utc)
-                                        log.info(
-                                            "Position closed based on AI recommendation."
-                                        )
-                                        send_line_message(
-                                            f"【EXIT】{DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
-                                        )
-                                        self._record_strategy_result(
-                                            current_profit_pips
-                                        )
-                                        self.scale_count = 0
-                                        info(
-                                            "exit",
-                                            pair=DEFAULT_PAIR,
-                                            reason="AI",
-                                            price=current_price,
-                                            pnl=current_profit_pips,
-                                        )
-                                    else:
-                                        log.info(
-                                            "AI decision was HOLD → No exit executed."
-                                        )
-                                else:
-                                    log.info("Filter blocked → AI exit decision skipped.")
-
-                    # ---- Position‑review timing -----------------------------
-
-                    # Periodic exit review
-                    if has_position and due_for_review:
-                        self.last_position_review_ts = now
-                        log.debug(
-                            "last_position_review_ts updated to %s",
-                            self.last_position_review_ts,
-                        )
-                        if position_side:
-                            cur_price = (
-                                float(tick_data["prices"][0]["bids"][0]["price"])
-                                if position_side == "long"
-                                else float(tick_data["prices"][0]["asks"][0]["price"])
-                            )
-                            entry_price = float(
-                                has_position[position_side].get("averagePrice", 0.0)
-                            )
-                            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                            profit_pips = (
-                                (cur_price - entry_price) / pip_size
-                                if position_side == "long"
-                                else (entry_price - cur_price) / pip_size
-                            )
-                        else:
-                            cur_price = float(
-                                tick_data["prices"][0]["bids"][0]["price"]
-                            )
-                            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                            profit_pips = 0.0
-
-                        if (
-                            secs_since_entry is not None
-                            and secs_since_entry < MIN_HOLD_SECONDS
-                        ):
-                            log.info(
-                                f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
-                            )
-                            pass_exit = False
-                        else:
-                            pass_exit = pass_exit_filter(indicators, position_side)
-
-                        if pass_exit:
-                            log.info(
-                                "Filter OK → Processing periodic exit decision with AI."
-                            )
-                            self.last_ai_call = datetime.now()
-                            log.debug(f"Market condition (review): {market_cond}")
-                            exit_ctx = build_exit_context(
-                                has_position,
-                                tick_data,
-                                indicators,
-                                indicators_m1=self.indicators_M1,
-                            )
-                            try:
-                                ai_dec = evaluate_exit_ai(exit_ctx)
-                            except Exception as exc:
-                                log.warning(f"exit AI evaluation failed: {exc}")
-                                ai_dec = None
-                            if ai_dec and ai_dec.action == "SCALE":
-                                pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                                entry_price = float(
-                                    has_position[position_side].get("averagePrice", 0.0)
+                                log.warning(f"exit AI evaluation failed: {exc}")
+                                ai_dec = None
+                            if ai_dec and ai_dec.action == "SCALE":
+                                pip_size = cfg.pip_size
+                                entry_price = float(
+                                    has_position[position_side].get(
+                                        "averagePrice", 0.0
+                                    )
                                 )
                                 cur_price = (
-                                    float(tick_data["prices"][0]["bids"][0]["price"])
+                                    float(
+                                        tick_data["prices"][0]["bids"][0][
+                                            "price"
+                                        ]
+                                    )
                                     if position_side == "long"
                                     else float(
-                                        tick_data["prices"][0]["asks"][0]["price"]
+                                        tick_data["prices"][0]["asks"][0][
+                                            "price"
+                                        ]
                                     )
                                 )
                                 diff_pips = (
@@ -2129,18 +2021,12 @@ class JobRunner:
                                     allow_scale = False
                                 if allow_scale:
                                     try:
-                                        risk_pct = float(
-                                            env_loader.get_env("ENTRY_RISK_PCT", "0.01")
-                                        )
-                                        pip_val = float(
-                                            env_loader.get_env("PIP_VALUE_JPY", "100")
-                                        )
+                                        risk_pct = cfg.entry_risk_pct
+                                        pip_val = cfg.pip_value_jpy
                                         base_lot = calc_lot_size(
                                             self.account_balance,
                                             risk_pct,
-                                            float(
-                                                env_loader.get_env("INIT_SL_PIPS", "20")
-                                            ),
+                                            cfg.init_sl_pips,
                                             pip_val,
                                             risk_engine=self.risk_mgr,
                                         )
@@ -2150,7 +2036,7 @@ class JobRunner:
                                             lot_size=lot_sz,
                                             market_data=tick_data,
                                             strategy_params={
-                                                "instrument": DEFAULT_PAIR,
+                                                "instrument": self.instrument,
                                                 "mode": "market",
                                             },
                                         )
@@ -2159,10 +2045,12 @@ class JobRunner:
                                         )
                                         self.scale_count += 1
                                         has_position = check_current_position(
-                                            DEFAULT_PAIR
+                                            self.instrument
                                         )
                                     except Exception as exc:
-                                        log.warning(f"Failed to scale position: {exc}")
+                                        log.warning(
+                                            f"Failed to scale position: {exc}"
+                                        )
                                     exit_executed = False
                                 else:
                                     exit_executed = process_exit(
@@ -2173,6 +2061,7 @@ class JobRunner:
                                         indicators_m1=self.indicators_M1,
                                         patterns=PATTERN_NAMES,
                                         pattern_names=self.patterns_by_tf,
+                                        instrument=self.instrument,
                                     )
                             else:
                                 exit_executed = process_exit(
@@ -2183,437 +2072,605 @@ class JobRunner:
                                     indicators_m1=self.indicators_M1,
                                     patterns=PATTERN_NAMES,
                                     pattern_names=self.patterns_by_tf,
+                                    instrument=self.instrument,
                                 )
                             if exit_executed:
                                 self.last_close_ts = datetime.now(timezone.utc)
-                                log.info("Position closed based on AI recommendation.")
+                                log.info(
+                                    "Position closed based on AI recommendation."
+                                )
                                 send_line_message(
-                                    f"【EXIT】{DEFAULT_PAIR} {cur_price} で決済しました。PL={profit_pips * pip_size:.2f}"
+                                    f"【EXIT】{self.instrument} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
+                                )
+                                self._record_strategy_result(
+                                    current_profit_pips
                                 )
-                                self._record_strategy_result(profit_pips)
                                 self.scale_count = 0
                                 info(
                                     "exit",
-                                    pair=DEFAULT_PAIR,
+                                    pair=self.instrument,
                                     reason="AI",
-                                    price=cur_price,
-                                    pnl=profit_pips * pip_size,
+                                    price=current_price,
+                                    pnl=current_profit_pips,
                                 )
                             else:
-                                log.info("AI decision was HOLD → No exit executed.")
+                                log.info(
+                                    "AI decision was HOLD → No exit executed."
+                                )
                         else:
                             log.info("Filter blocked → AI exit decision skipped.")
 
-                    # AIによるエントリー/エグジット判断
-                    if not has_position:
-                        self.tp_extended = False
-                        self.tp_reduced = False
-                        self.max_profit_pips = 0.0
-                        entry_params: dict[str, Any] = {}
-                        # 1) Entry cooldown check
+            market_cond = market_task.result()
+            log.debug(f"Market condition: {market_cond}")
+
+            # ---- Position‑review timing -----------------------------
+
+            # Periodic exit review
+            if has_position and due_for_review:
+                self.last_position_review_ts = now
+                log.debug(
+                    "last_position_review_ts updated to %s",
+                    self.last_position_review_ts,
+                )
+                if position_side:
+                    cur_price = (
+                        float(tick_data["prices"][0]["bids"][0]["price"])
+                        if position_side == "long"
+                        else float(tick_data["prices"][0]["asks"][0]["price"])
+                    )
+                    entry_price = float(
+                        has_position[position_side].get("averagePrice", 0.0)
+                    )
+                    pip_size = cfg.pip_size
+                    profit_pips = (
+                        (cur_price - entry_price) / pip_size
+                        if position_side == "long"
+                        else (entry_price - cur_price) / pip_size
+                    )
+                else:
+                    cur_price = float(
+                        tick_data["prices"][0]["bids"][0]["price"]
+                    )
+                    pip_size = cfg.pip_size
+                    profit_pips = 0.0
+
+                if (
+                    secs_since_entry is not None
+                    and secs_since_entry < MIN_HOLD_SECONDS
+                ):
+                    log.info(
+                        f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
+                    )
+                    pass_exit = False
+                else:
+                    pass_exit = pass_exit_filter(indicators, position_side)
+
+                if pass_exit:
+                    log.info(
+                        "Filter OK → Processing periodic exit decision with AI."
+                    )
+                    self.last_ai_call = datetime.now()
+                    log.debug(f"Market condition (review): {market_cond}")
+                    exit_ctx = build_exit_context(
+                        has_position,
+                        tick_data,
+                        indicators,
+                        indicators_m1=self.indicators_M1,
+                    )
+                    try:
+                        ai_dec = evaluate_exit_ai(exit_ctx)
+                    except Exception as exc:
+                        log.warning(f"exit AI evaluation failed: {exc}")
+                        ai_dec = None
+                    if ai_dec and ai_dec.action == "SCALE":
+                        pip_size = cfg.pip_size
+                        entry_price = float(
+                            has_position[position_side].get("averagePrice", 0.0)
+                        )
+                        cur_price = (
+                            float(tick_data["prices"][0]["bids"][0]["price"])
+                            if position_side == "long"
+                            else float(
+                                tick_data["prices"][0]["asks"][0]["price"]
+                            )
+                        )
+                        diff_pips = (
+                            (cur_price - entry_price) / pip_size
+                            if position_side == "long"
+                            else (entry_price - cur_price) / pip_size
+                        )
+                        atr_val = (
+                            indicators["atr"].iloc[-1]
+                            if hasattr(indicators.get("atr"), "iloc")
+                            else indicators.get("atr", [0])[-1]
+                        )
+                        allow_scale = True
                         if (
-                            self.last_close_ts
-                            and (
-                                datetime.now(timezone.utc) - self.last_close_ts
-                            ).total_seconds()
-                            < self.entry_cooldown_sec
+                            SCALE_MAX_POS > 0
+                            and self.scale_count >= SCALE_MAX_POS
                         ):
                             log.info(
-                                f"Entry cooldown active ({(datetime.now(timezone.utc) - self.last_close_ts).total_seconds():.1f}s < {self.entry_cooldown_sec}s). Skipping entry."
+                                "Scale limit reached → ignoring SCALE signal"
                             )
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
-                        # ── Entry side ───────────────────────────────
-                        current_price = float(
-                            tick_data["prices"][0]["bids"][0]["price"]
-                        )
-                        self.last_ai_call = datetime.now()  # record AI call time *before* the call
-
-                        climax_side = detect_climax_reversal(candles_m5, indicators)
-                        if climax_side and not has_position:
+                            allow_scale = False
+                        if (
+                            allow_scale
+                            and SCALE_TRIGGER_ATR > 0
+                            and diff_pips
+                            < (atr_val / pip_size) * SCALE_TRIGGER_ATR
+                        ):
                             log.info(
-                                f"Climax reversal detected → {climax_side} entry"
-                            )
-                            params = {
-                                "instrument": DEFAULT_PAIR,
-                                "side": climax_side,
-                                "tp_pips": float(
-                                    env_loader.get_env("CLIMAX_TP_PIPS", "7")
-                                ),
-                                "sl_pips": float(
-                                    env_loader.get_env("CLIMAX_SL_PIPS", "10")
-                                ),
-                                "mode": "market",
-                                "market_cond": market_cond,
-                            }
-                            risk_pct = float(
-                                env_loader.get_env("ENTRY_RISK_PCT", "0.01")
-                            )
-                            pip_val = float(
-                                env_loader.get_env("PIP_VALUE_JPY", "100")
+                                f"Scale trigger {diff_pips:.1f} < {(atr_val / pip_size) * SCALE_TRIGGER_ATR:.1f} pips"
                             )
-                            lot = calc_lot_size(
-                                self.account_balance,
-                                risk_pct,
-                                float(params["sl_pips"]),
-                                pip_val,
-                                risk_engine=self.risk_mgr,
-                            )
-                            order_mgr.enter_trade(
-                                side=climax_side,
-                                lot_size=lot if lot > 0 else 0.0,
-                                market_data=tick_data,
-                                strategy_params=params,
-                            )
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
-
-                            # AI を呼び出す前のフィルター処理は廃止
-                            # フィルター通過後は必ず AI 判定を実行する
-
-                            if (
-                                not has_position
-                                and market_cond.get("market_condition") == "break"
-                            ):
-                                try:
-                                    direction = market_cond.get("range_break")
-                                    follow = follow_breakout(
-                                        candles_m5, indicators, direction
-                                    )
-                                    log.info(f"follow_breakout result: {follow}")
-                                except Exception as exc:
-                                    log.warning(f"follow_breakout failed: {exc}")
-
-                            margin_used = get_margin_used()
-                            log.info(f"marginUsed={margin_used}")
-                            if margin_used is None:
-                                log.warning("Failed to obtain marginUsed")
-                            elif (
-                                MARGIN_WARNING_THRESHOLD > 0
-                                and margin_used > MARGIN_WARNING_THRESHOLD
-                            ):
-                                log.warning(
-                                    f"marginUsed {margin_used} exceeds threshold {MARGIN_WARNING_THRESHOLD}"
-                                )
-
-                            # --- SL hit cooldown check ----------------------
-                            # SL 直後のクールダウンによるスキップは行わない
-
+                            allow_scale = False
+                        if allow_scale:
                             try:
-                                plan_check = get_trade_plan(
-                                    tick_data,
-                                    {"M5": indicators},
-                                    {"M1": candles_m1, "M5": candles_m5},
-                                    patterns=PATTERN_NAMES,
-                                    detected_patterns=self.patterns_by_tf,
-                                    trade_mode=self.trade_mode,
-                                    mode_reason=self.mode_reason,
-                                )
-                                side = (
-                                    plan_check.get("entry", {})
-                                    .get("side", "no")
-                                    .lower()
-                                )
-                            except Exception as exc:
-                                log.warning(f"get_trade_plan failed for check: {exc}")
-                                side = "no"
-
-                            # 直前の SL 側と同方向でもエントリーを継続
-
-                            # 連続高値安値によるエントリーブロックを廃止
-
-                            tp_ratio = None
-                            is_counter = counter_trend_block(
-                                side,
-                                indicators,
-                                self.indicators_M15,
-                                self.indicators_H1,
-                            )
-                            if is_counter:
-                                log.info("Counter-trend detected → TP reduced")
-                                tp_ratio = float(
-                                    env_loader.get_env("COUNTER_TREND_TP_RATIO", "0.5")
-                                )
-
-                            entry_params = {"tp_ratio": tp_ratio} if tp_ratio else None
-
-                            metrics = {}
-                            metrics["atr"] = atr_pips
-                            try:
-                                metrics["adx"] = float(
-                                    self.indicators_M5.get("adx").iloc[-1]
-                                    if hasattr(self.indicators_M5.get("adx"), "iloc")
-                                    else self.indicators_M5.get("adx", [0])[-1]
-                                )
-                            except Exception:
-                                metrics["adx"] = 0.0
-                            try:
-                                metrics["ma_angle_m1"] = float(
-                                    self.indicators_M1.get("ema_slope").iloc[-1]
-                                    if hasattr(self.indicators_M1.get("ema_slope"), "iloc")
-                                    else self.indicators_M1.get("ema_slope", [0])[-1]
-                                )
-                            except Exception:
-                                metrics["ma_angle_m1"] = 0.0
-                            try:
-                                metrics["ma_angle_m5"] = float(
-                                    self.indicators_M5.get("ema_slope").iloc[-1]
-                                    if hasattr(self.indicators_M5.get("ema_slope"), "iloc")
-                                    else self.indicators_M5.get("ema_slope", [0])[-1]
-                                )
-                            except Exception:
-                                metrics["ma_angle_m5"] = 0.0
-                            try:
-                                width = (
-                                    self.indicators_M5["bb_upper"].iloc[-1]
-                                    - self.indicators_M5["bb_lower"].iloc[-1]
-                                )
-                                metrics["bb_atr_ratio"] = (
-                                    float(width) / pip_size / atr_pips if atr_pips else 0.0
-                                )
-                            except Exception:
-                                metrics["bb_atr_ratio"] = 0.0
-
-                            regime = regime_hint or self.classifier.classify(metrics)
-                            tp_pips, sl_pips = calc_tp_sl(regime, atr_pips)
-                            if entry_params is None:
-                                entry_params = {}
-                            entry_params.update(
-                                {"tp_pips": tp_pips, "sl_pips": sl_pips, "regime": regime}
-                            )
-
-                            if not ENTRY_USE_AI:
-                                res = tech_run_cycle()
-                                if res:
-                                    price = float(tick_data["prices"][0]["bids"][0]["price"])
-                                    send_line_message(
-                                        f"【ENTRY】{DEFAULT_PAIR} {price} でエントリーしました。"
-                                    )
-                                    info(
-                                        "entry",
-                                        pair=DEFAULT_PAIR,
-                                        side=res.get("side"),
-                                        price=price,
-                                        lot=1.0,
-                                        regime=res.get("mode"),
-                                    )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            if self.use_vote_arch:
-                                pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                                bb_width = None
-                                try:
-                                    bb_width = (
-                                        (self.indicators_M5["bb_upper"].iloc[-1] - self.indicators_M5["bb_lower"].iloc[-1])
-                                        / pip_size
-                                    )
-                                except Exception:
-                                    bb_width = 0.0
-                                metrics = MarketMetrics(
-                                    adx_m5=float(
-                                        self.indicators_M5.get("adx").iloc[-1]
-                                        if hasattr(self.indicators_M5.get("adx"), "iloc")
-                                        else self.indicators_M5.get("adx", [0])[-1]
-                                    ),
-                                    ema_fast=float(
-                                        self.indicators_M5.get("ema_fast").iloc[-1]
-                                        if hasattr(self.indicators_M5.get("ema_fast"), "iloc")
-                                        else self.indicators_M5.get("ema_fast", [0])[-1]
-                                    ),
-                                    ema_slow=float(
-                                        self.indicators_M5.get("ema_slow").iloc[-1]
-                                        if hasattr(self.indicators_M5.get("ema_slow"), "iloc")
-                                        else self.indicators_M5.get("ema_slow", [0])[-1]
-                                    ),
-                                    bb_width_m5=float(bb_width),
-                                )
-                                atr_val = float(
-                                    self.indicators_M5.get("atr").iloc[-1]
-                                    if hasattr(self.indicators_M5.get("atr"), "iloc")
-                                    else self.indicators_M5.get("atr", [0])[-1]
-                                )
-                                snapshot = MarketSnapshot(
-                                    atr=atr_val,
-                                    news_score=float(market_cond.get("news_score", 0.0)),
-                                    oi_bias=float(market_cond.get("oi_bias", 0.0)),
-                                )
-                                spread = float(tick_data["prices"][0]["asks"][0]["price"]) - float(
-                                    tick_data["prices"][0]["bids"][0]["price"]
+                                risk_pct = cfg.entry_risk_pct
+                                pip_val = cfg.pip_value_jpy
+                                base_lot = calc_lot_size(
+                                    self.account_balance,
+                                    risk_pct,
+                                    cfg.init_sl_pips,
+                                    pip_val,
+                                    risk_engine=self.risk_mgr,
                                 )
-                                if self.use_vote_pipeline:
-                                    log.info("Using vote pipeline for entry")
-                                    res = vote_run_cycle(
-                                        indicators,
-                                        metrics,
-                                        snapshot,
-                                        self.plan_buffer,
-                                        pair=DEFAULT_PAIR,
-                                        timeframe="M5",
-                                        spread=spread,
-                                        atr=atr_val,
-                                    )
-                                    if not res or not res.plan:
-                                        log.info("Pipeline declined entry → skipping")
-                                        self.last_run = now
-                                        update_oanda_trades()
-                                        time.sleep(self.interval_seconds)
-                                        timer.stop()
-                                        continue
-                                    plan = res.plan
-                                    side = plan.side
-                                    lot = plan.lot
-                                else:
-                                    log.info("Using technical pipeline for entry")
-                                    tech_run_cycle()
-                                    self.last_run = now
-                                    update_oanda_trades()
-                                    time.sleep(self.interval_seconds)
-                                    timer.stop()
-                                    continue
-                                params = {
-                                    "instrument": DEFAULT_PAIR,
-                                    "side": side,
-                                    "tp_pips": plan.tp,
-                                    "sl_pips": plan.sl,
-                                    "mode": "market",
-                                    "market_cond": market_cond,
-                                }
+                                lot_sz = min(SCALE_LOT_SIZE, base_lot)
                                 order_mgr.enter_trade(
-                                    side=side,
-                                    lot_size=lot if lot > 0 else 0.0,
+                                    side=position_side,
+                                    lot_size=lot_sz,
                                     market_data=tick_data,
-                                    strategy_params=params,
-                                )
-                                price = float(tick_data["prices"][0]["bids"][0]["price"])
-                                send_line_message(
-                                    f"【ENTRY】{DEFAULT_PAIR} {price} でエントリーしました。"
+                                    strategy_params={
+                                        "instrument": self.instrument,
+                                        "mode": "market",
+                                    },
                                 )
-                                info(
-                                    "entry",
-                                    pair=DEFAULT_PAIR,
-                                    side=side,
-                                    price=price,
-                                    lot=lot,
-                                    regime=res.mode,
+                                log.info(
+                                    f"Scaled into position ({position_side}) by {SCALE_LOT_SIZE} lots"
                                 )
-                                self.scale_count = 0
-                                self.last_entry_context = self.current_context
-                                self.last_entry_strategy = self.current_strategy_name
-                                set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-                            else:
-                                side = None
-                                result = process_entry(
-                                    indicators,
-                                    candles_m5,
-                                    tick_data,
-                                    market_cond,
-                                    entry_params,
-                                    higher_tf=higher_tf,
-                                    patterns=PATTERN_NAMES,
-                                    candles_dict={"M1": candles_m1, "M5": candles_m5},
-                                    pattern_names=self.patterns_by_tf,
-                                    tf_align=align,
-                                    indicators_multi={
-                                        "M1": self.indicators_M1 or {},
-                                        "M5": self.indicators_M5 or {},
-                                        "H1": self.indicators_H1 or {},
-                                    },
-                                    risk_engine=self.risk_mgr,
+                                self.scale_count += 1
+                                has_position = check_current_position(
+                                    self.instrument
                                 )
-                            # process_entry 結果に関わらず必ず進める
-                            # Send LINE notification on entry
-                            price = float(tick_data["prices"][0]["bids"][0]["price"])
-                            send_line_message(
-                                f"【ENTRY】{DEFAULT_PAIR} {price} でエントリーしました。"
-                            )
-                            info(
-                                "entry",
-                                pair=DEFAULT_PAIR,
-                                side=side,
-                                price=price,
-                                lot=float(env_loader.get_env("TRADE_LOT_SIZE", "1.0")),
-                                regime=self.trade_mode,
-                            )
-                            self.scale_count = 0
-                            self.last_entry_context = self.current_context
-                            self.last_entry_strategy = self.current_strategy_name
-                            set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                            except Exception as exc:
+                                log.warning(f"Failed to scale position: {exc}")
+                            exit_executed = False
                         else:
-
-                            log.info("Filter blocked → AI entry decision skipped.")
-                            log.info("Filter NG → forcing entry after AI.")
-                            side = None
-                            result = process_entry(
+                            exit_executed = process_exit(
                                 indicators,
-                                candles_m5,
                                 tick_data,
                                 market_cond,
-                                entry_params,
-                                higher_tf=higher_tf,
+                                higher_tf,
+                                indicators_m1=self.indicators_M1,
                                 patterns=PATTERN_NAMES,
-                                candles_dict={"M1": candles_m1, "M5": candles_m5},
                                 pattern_names=self.patterns_by_tf,
-                                tf_align=align,
-                                indicators_multi={
-                                    "M1": self.indicators_M1 or {},
-                                    "M5": self.indicators_M5 or {},
-                                    "H1": self.indicators_H1 or {},
-                                },
-                                risk_engine=self.risk_mgr,
+                                instrument=self.instrument,
                             )
+                    else:
+                        exit_executed = process_exit(
+                            indicators,
+                            tick_data,
+                            market_cond,
+                            higher_tf,
+                            indicators_m1=self.indicators_M1,
+                            patterns=PATTERN_NAMES,
+                            pattern_names=self.patterns_by_tf,
+                            instrument=self.instrument,
+                        )
+                    if exit_executed:
+                        self.last_close_ts = datetime.now(timezone.utc)
+                        log.info("Position closed based on AI recommendation.")
+                        send_line_message(
+                            f"【EXIT】{self.instrument} {cur_price} で決済しました。PL={profit_pips * pip_size:.2f}"
+                        )
+                        self._record_strategy_result(profit_pips)
+                        self.scale_count = 0
+                        info(
+                            "exit",
+                            pair=self.instrument,
+                            reason="AI",
+                            price=cur_price,
+                            pnl=profit_pips * pip_size,
+                        )
+                    else:
+                        log.info("AI decision was HOLD → No exit executed.")
+                else:
+                    log.info("Filter blocked → AI exit decision skipped.")
+
+            # AIによるエントリー/エグジット判断
+            if not has_position:
+                self.tp_extended = False
+                self.tp_reduced = False
+                self.max_profit_pips = 0.0
+                entry_params: dict[str, Any] = {}
+                # 1) Entry cooldown check
+                if (
+                    self.last_close_ts
+                    and (
+                        datetime.now(timezone.utc) - self.last_close_ts
+                    ).total_seconds()
+                    < self.entry_cooldown_sec
+                ):
+                    log.info(
+                        f"Entry cooldown active ({(datetime.now(timezone.utc) - self.last_close_ts).total_seconds():.1f}s < {self.entry_cooldown_sec}s). Skipping entry."
+                    )
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
+                # ── Entry side ───────────────────────────────
+                current_price = float(
+                    tick_data["prices"][0]["bids"][0]["price"]
+                )
+                self.last_ai_call = datetime.now()  # record AI call time *before* the call
+
+                climax_side = detect_climax_reversal(candles_m5, indicators)
+                if climax_side and not has_position:
+                    log.info(
+                        f"Climax reversal detected → {climax_side} entry"
+                    )
+                    params = {
+                        "instrument": self.instrument,
+                        "side": climax_side,
+                        "tp_pips": cfg.climax_tp_pips,
+                        "sl_pips": cfg.climax_sl_pips,
+                        "mode": "market",
+                        "market_cond": market_cond,
+                    }
+                    risk_pct = cfg.entry_risk_pct
+                    pip_val = cfg.pip_value_jpy
+                    lot = calc_lot_size(
+                        self.account_balance,
+                        risk_pct,
+                        float(params["sl_pips"]),
+                        pip_val,
+                        risk_engine=self.risk_mgr,
+                    )
+                    order_mgr.enter_trade(
+                        side=climax_side,
+                        lot_size=lot if lot > 0 else 0.0,
+                        market_data=tick_data,
+                        strategy_params=params,
+                    )
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
+
+                    # AI を呼び出す前のフィルター処理は廃止
+                    # フィルター通過後は必ず AI 判定を実行する
+
+                    if (
+                        not has_position
+                        and market_cond.get("market_condition") == "break"
+                    ):
+                        try:
+                            direction = market_cond.get("range_break")
+                            follow = follow_breakout(
+                                candles_m5, indicators, direction
+                            )
+                            log.info(f"follow_breakout result: {follow}")
+                        except Exception as exc:
+                            log.warning(f"follow_breakout failed: {exc}")
+
+                    margin_used = get_margin_used()
+                    log.info(f"marginUsed={margin_used}")
+                    if margin_used is None:
+                        log.warning("Failed to obtain marginUsed")
+                    elif (
+                        MARGIN_WARNING_THRESHOLD > 0
+                        and margin_used > MARGIN_WARNING_THRESHOLD
+                    ):
+                        log.warning(
+                            f"marginUsed {margin_used} exceeds threshold {MARGIN_WARNING_THRESHOLD}"
+                        )
+
+                    # --- SL hit cooldown check ----------------------
+                    # SL 直後のクールダウンによるスキップは行わない
+
+                    try:
+                        plan_check = get_trade_plan(
+                            tick_data,
+                            {"M5": indicators},
+                            {"M1": candles_m1, "M5": candles_m5},
+                            patterns=PATTERN_NAMES,
+                            detected_patterns=self.patterns_by_tf,
+                            trade_mode=self.trade_mode,
+                            mode_reason=self.mode_reason,
+                            instrument=self.instrument,
+                        )
+                        side = (
+                            plan_check.get("entry", {})
+                            .get("side", "no")
+                            .lower()
+                        )
+                    except Exception as exc:
+                        log.warning(f"get_trade_plan failed for check: {exc}")
+                        side = "no"
+
+                    # 直前の SL 側と同方向でもエントリーを継続
+
+                    # 連続高値安値によるエントリーブロックを廃止
+
+                    tp_ratio = None
+                    is_counter = counter_trend_block(
+                        side,
+                        indicators,
+                        self.indicators_M15,
+                        self.indicators_H1,
+                    )
+                    if is_counter:
+                        log.info("Counter-trend detected → TP reduced")
+                        tp_ratio = cfg.counter_trend_tp_ratio
+
+                    entry_params = {"tp_ratio": tp_ratio} if tp_ratio else None
+
+                    metrics = {}
+                    metrics["atr"] = atr_pips
+                    try:
+                        metrics["adx"] = float(
+                            self.indicators_M5.get("adx").iloc[-1]
+                            if hasattr(self.indicators_M5.get("adx"), "iloc")
+                            else self.indicators_M5.get("adx", [0])[-1]
+                        )
+                    except Exception:
+                        metrics["adx"] = 0.0
+                    try:
+                        metrics["ma_angle_m1"] = float(
+                            self.indicators_M1.get("ema_slope").iloc[-1]
+                            if hasattr(self.indicators_M1.get("ema_slope"), "iloc")
+                            else self.indicators_M1.get("ema_slope", [0])[-1]
+                        )
+                    except Exception:
+                        metrics["ma_angle_m1"] = 0.0
+                    try:
+                        metrics["ma_angle_m5"] = float(
+                            self.indicators_M5.get("ema_slope").iloc[-1]
+                            if hasattr(self.indicators_M5.get("ema_slope"), "iloc")
+                            else self.indicators_M5.get("ema_slope", [0])[-1]
+                        )
+                    except Exception:
+                        metrics["ma_angle_m5"] = 0.0
+                    try:
+                        width = (
+                            self.indicators_M5["bb_upper"].iloc[-1]
+                            - self.indicators_M5["bb_lower"].iloc[-1]
+                        )
+                        metrics["bb_atr_ratio"] = (
+                            float(width) / pip_size / atr_pips if atr_pips else 0.0
+                        )
+                    except Exception:
+                        metrics["bb_atr_ratio"] = 0.0
+
+                    regime = regime_hint or self.classifier.classify(metrics)
+                    tp_pips, sl_pips = calc_tp_sl(regime, atr_pips)
+                    if entry_params is None:
+                        entry_params = {}
+                    entry_params.update(
+                        {"tp_pips": tp_pips, "sl_pips": sl_pips, "regime": regime}
+                    )
+
+                    if not ENTRY_USE_AI:
+                        res = tech_run_cycle()
+                        if res:
                             price = float(tick_data["prices"][0]["bids"][0]["price"])
                             send_line_message(
-                                f"【ENTRY】{DEFAULT_PAIR} {price} でエントリーしました。"
+                                f"【ENTRY】{self.instrument} {price} でエントリーしました。"
                             )
                             info(
                                 "entry",
-                                pair=DEFAULT_PAIR,
-                                side=side,
+                                pair=self.instrument,
+                                side=res.get("side"),
                                 price=price,
-                                lot=float(env_loader.get_env("TRADE_LOT_SIZE", "1.0")),
-                                regime=self.trade_mode,
+                                lot=1.0,
+                                regime=res.get("mode"),
                             )
-                            self.scale_count = 0
-                            self.last_entry_context = self.current_context
-                            self.last_entry_strategy = self.current_strategy_name
-                            set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
-                            self.last_position_review_ts = None
-                    # (removed: periodic exit check block)
-                # Update OANDA trade history every second
-                self.last_run = now
-
-                update_oanda_trades()
-                metrics_publisher.publish(
-                    "job_loop_success",
-                    1,
-                    {"mode": self.trade_mode or "unknown"},
-                )
-                time.sleep(self.interval_seconds)
-                timer.stop()
-                loops += 1
-                if max_loops is not None and loops >= max_loops:
-                    self._stop = True
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
 
-            except Exception as e:
-                log.error(f"Error occurred during job execution: {e}", exc_info=True)
-                self.safety.record_error()
-                metrics_publisher.publish("job_error", 1)
-                time.sleep(self.interval_seconds)
+                    if self.use_vote_arch:
+                        pip_size = cfg.pip_size
+                        bb_width = None
+                        try:
+                            bb_width = (
+                                (self.indicators_M5["bb_upper"].iloc[-1] - self.indicators_M5["bb_lower"].iloc[-1])
+                                / pip_size
+                            )
+                        except Exception:
+                            bb_width = 0.0
+                        metrics = MarketMetrics(
+                            adx_m5=float(
+                                self.indicators_M5.get("adx").iloc[-1]
+                                if hasattr(self.indicators_M5.get("adx"), "iloc")
+                                else self.indicators_M5.get("adx", [0])[-1]
+                            ),
+                            ema_fast=float(
+                                self.indicators_M5.get("ema_fast").iloc[-1]
+                                if hasattr(self.indicators_M5.get("ema_fast"), "iloc")
+                                else self.indicators_M5.get("ema_fast", [0])[-1]
+                            ),
+                            ema_slow=float(
+                                self.indicators_M5.get("ema_slow").iloc[-1]
+                                if hasattr(self.indicators_M5.get("ema_slow"), "iloc")
+                                else self.indicators_M5.get("ema_slow", [0])[-1]
+                            ),
+                            bb_width_m5=float(bb_width),
+                        )
+                        atr_val = float(
+                            self.indicators_M5.get("atr").iloc[-1]
+                            if hasattr(self.indicators_M5.get("atr"), "iloc")
+                            else self.indicators_M5.get("atr", [0])[-1]
+                        )
+                        snapshot = MarketSnapshot(
+                            atr=atr_val,
+                            news_score=float(market_cond.get("news_score", 0.0)),
+                            oi_bias=float(market_cond.get("oi_bias", 0.0)),
+                        )
+                        spread = float(tick_data["prices"][0]["asks"][0]["price"]) - float(
+                            tick_data["prices"][0]["bids"][0]["price"]
+                        )
+                        if self.use_vote_pipeline:
+                            log.info("Using vote pipeline for entry")
+                            res = vote_run_cycle(
+                                indicators,
+                                metrics,
+                                snapshot,
+                                self.plan_buffer,
+                                pair=self.instrument,
+                                timeframe="M5",
+                                spread=spread,
+                                atr=atr_val,
+                            )
+                            if not res or not res.plan:
+                                log.info("Pipeline declined entry → skipping")
+                                self.last_run = now
+                                self._sync_trades()
+                                self._wait_next_cycle()
+                                timer.stop()
+                                return False
+                            plan = res.plan
+                            side = plan.side
+                            lot = plan.lot
+                        else:
+                            log.info("Using technical pipeline for entry")
+                            tech_run_cycle()
+                            self.last_run = now
+                            self._sync_trades()
+                            self._wait_next_cycle()
+                            timer.stop()
+                            return False
+                        params = {
+                            "instrument": self.instrument,
+                            "side": side,
+                            "tp_pips": plan.tp,
+                            "sl_pips": plan.sl,
+                            "mode": "market",
+                            "market_cond": market_cond,
+                        }
+                        order_mgr.enter_trade(
+                            side=side,
+                            lot_size=lot if lot > 0 else 0.0,
+                            market_data=tick_data,
+                            strategy_params=params,
+                        )
+                        price = float(tick_data["prices"][0]["bids"][0]["price"])
+                        send_line_message(
+                            f"【ENTRY】{self.instrument} {price} でエントリーしました。"
+                        )
+                        info(
+                            "entry",
+                            pair=self.instrument,
+                            side=side,
+                            price=price,
+                            lot=lot,
+                            regime=res.mode,
+                        )
+                        self.scale_count = 0
+                        self.last_entry_context = self.current_context
+                        self.last_entry_strategy = self.current_strategy_name
+                        set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+                    else:
+                        side = None
+                        result = process_entry(
+                            indicators,
+                            candles_m5,
+                            tick_data,
+                            market_cond,
+                            entry_params,
+                            higher_tf=higher_tf,
+                            patterns=PATTERN_NAMES,
+                            candles_dict={"M1": candles_m1, "M5": candles_m5},
+                            pattern_names=self.patterns_by_tf,
+                            tf_align=align,
+                            indicators_multi={
+                                "M1": self.indicators_M1 or {},
+                                "M5": self.indicators_M5 or {},
+                                "H1": self.indicators_H1 or {},
+                            },
+                            risk_engine=self.risk_mgr,
+                            instrument=self.instrument,
+                        )
+                    # process_entry 結果に関わらず必ず進める
+                    # Send LINE notification on entry
+                    price = float(tick_data["prices"][0]["bids"][0]["price"])
+                    send_line_message(
+                        f"【ENTRY】{self.instrument} {price} でエントリーしました。"
+                    )
+                    info(
+                        "entry",
+                        pair=self.instrument,
+                        side=side,
+                        price=price,
+                        lot=cfg.trade_lot_size,
+                        regime=self.trade_mode,
+                    )
+                    self.scale_count = 0
+                    self.last_entry_context = self.current_context
+                    self.last_entry_strategy = self.current_strategy_name
+                    set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                else:
+
+                    log.info("Filter blocked → AI entry decision skipped.")
+                    log.info("Filter NG → forcing entry after AI.")
+                    side = None
+                    result = process_entry(
+                        indicators,
+                        candles_m5,
+                        tick_data,
+                        market_cond,
+                        entry_params,
+                        higher_tf=higher_tf,
+                        patterns=PATTERN_NAMES,
+                        candles_dict={"M1": candles_m1, "M5": candles_m5},
+                        pattern_names=self.patterns_by_tf,
+                        tf_align=align,
+                        indicators_multi={
+                            "M1": self.indicators_M1 or {},
+                            "M5": self.indicators_M5 or {},
+                            "H1": self.indicators_H1 or {},
+                        },
+                        risk_engine=self.risk_mgr,
+                        instrument=self.instrument,
+                    )
+                    price = float(tick_data["prices"][0]["bids"][0]["price"])
+                    send_line_message(
+                        f"【ENTRY】{self.instrument} {price} でエントリーしました。"
+                    )
+                    info(
+                        "entry",
+                        pair=self.instrument,
+                        side=side,
+                        price=price,
+                        lot=cfg.trade_lot_size,
+                        regime=self.trade_mode,
+                    )
+                    self.scale_count = 0
+                    self.last_entry_context = self.current_context
+                    self.last_entry_strategy = self.current_strategy_name
+                    set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                    self.last_position_review_ts = None
+            # (removed: periodic exit check block)
+        # Update OANDA trade history every second
+        self.last_run = now
+
+        self._sync_trades()
+        metrics_publisher.publish(
+            "job_loop_success",
+            1,
+            {"mode": self.trade_mode or "unknown"},
+        )
+        self._wait_next_cycle()
+        timer.stop()
+        return True
 
     def stop(self) -> None:
         """Signal the runner loop to exit."""
@@ -0,0 +1,236 @@
+"""Evaluate several instruments in one process.
+
+:class:`MultiPairScheduler` owns one :class:`JobRunner` per instrument and
+drives them with :meth:`JobRunner.run_cycle` on a bounded thread pool.  The
+runners are put in ``scheduled`` mode, so instead of sleeping they report
+how long to back off via ``next_run_delay`` and the scheduler keeps the
+worker free for other pairs.
+
+Everything that is process-wide is shared automatically: the candle cache
+and HTTP session of :mod:`backend.market_data.candle_fetcher`, the OpenAI
+client, the DB connection pool / background writer and the metrics server.
+OANDA trade history is synced once per round rather than once per pair.
+
+Fairness: due pairs are dispatched oldest-deadline first and a pair is never
+queued twice, so a slow instrument cannot starve the others and at most
+``max_workers`` cycles run at the same time.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable
+
+from backend.logs.perf_stats_logger import span
+from backend.utils import env_loader
+
+log = logging.getLogger(__name__)
+
+
+def parse_pairs(value: str | None) -> list[str]:
+    """Return the de-duplicated instruments of a comma-separated list."""
+    pairs: list[str] = []
+    for item in (value or "").split(","):
+        item = item.strip().upper()
+        if item and item not in pairs:
+            pairs.append(item)
+    return pairs
+
+
+class PairSlot:
+    """Scheduling state of one instrument."""
+
+    __slots__ = (
+        "instrument",
+        "runner",
+        "next_due",
+        "busy",
+        "cycles",
+        "skipped",
+        "errors",
+        "last_latency",
+    )
+
+    def __init__(self, instrument: str, runner) -> None:
+        self.instrument = instrument
+        self.runner = runner
+        self.next_due = 0.0
+        self.busy = False
+        self.cycles = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_latency = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "cycles": self.cycles,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "busy": self.busy,
+        }
+
+
+def _default_factory(instrument: str, interval: float):
+    from backend.scheduler.job_runner import JobRunner
+
+    return JobRunner(interval_seconds=interval, instrument=instrument)
+
+
+class MultiPairScheduler:
+    """Run ``JobRunner.run_cycle`` for many instruments on a worker pool."""
+
+    def __init__(
+        self,
+        instruments: Iterable[str],
+        *,
+        interval_seconds: float = 1.0,
+        max_workers: int | None = None,
+        runner_factory: Callable[[str, float], object] | None = None,
+        sync_trades: Callable[[], None] | None = None,
+    ) -> None:
+        pairs = list(dict.fromkeys(instruments))
+        if not pairs:
+            raise ValueError("at least one instrument is required")
+        self.interval_seconds = interval_seconds
+        factory = runner_factory or _default_factory
+        self.slots: list[PairSlot] = []
+        for pair in pairs:
+            runner = factory(pair, interval_seconds)
+            runner.scheduled = True
+            self.slots.append(PairSlot(pair, runner))
+        if len(self.slots) > 1 and any(
+            getattr(slot.runner, "uses_tech_pipeline", False) for slot in self.slots
+        ):
+            raise ValueError(
+                "tech_arch pipeline trades DEFAULT_PAIR only; "
+                "enable USE_VOTE_PIPELINE and ENTRY_USE_AI for multiple instruments"
+            )
+        if max_workers is None:
+            max_workers = int(env_loader.get_env("MULTI_PAIR_WORKERS", "4"))
+        self.max_workers = max(1, min(max_workers, len(self.slots)))
+        if sync_trades is None:
+            from backend.logs.update_oanda_trades import update_oanda_trades
+
+            sync_trades = update_oanda_trades
+        self._sync_trades = sync_trades
+        self._stop = threading.Event()
+        self._executor: ThreadPoolExecutor | None = None
+
+    # ------------------------------------------------------------------
+    def _run_slot(self, slot: PairSlot) -> None:
+        runner = slot.runner
+        runner.next_run_delay = 0.0
+        start = time.monotonic()
+        try:
+            completed = runner.run_cycle()
+            if completed:
+                slot.cycles += 1
+            else:
+                slot.skipped += 1
+        except Exception as exc:
+            slot.errors += 1
+            log.error("[%s] cycle failed: %s", slot.instrument, exc, exc_info=True)
+            try:
+                runner.safety.record_error()
+            except Exception:  # pragma: no cover - safety is optional in tests
+                pass
+        finally:
+            end = time.monotonic()
+            slot.last_latency = end - start
+            delay = max(runner.next_run_delay, self.interval_seconds)
+            slot.next_due = end + delay
+
+    def _sync(self) -> None:
+        try:
+            # ペアのループ外で動くので stage="trade_sync" として記録される
+            with span("trade_sync"):
+                self._sync_trades()
+        except Exception as exc:
+            log.warning("update_oanda_trades failed: %s", exc)
+
+    def run(self, *, max_rounds: int | None = None) -> None:
+        """Schedule cycles until :meth:`stop` or ``max_rounds`` full rounds.
+
+        A round ends once every pair that is not backing off has finished
+        one more cycle; trade history is synced at the end of every round.
+        """
+        log.info(
+            "MultiPairScheduler started: %s (%d workers)",
+            ",".join(s.instrument for s in self.slots),
+            self.max_workers,
+        )
+        rounds = 0
+        done_in_round: set[str] = set()
+        running: dict[Future, PairSlot] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="pair"
+        )
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                free = self.max_workers - len(running)
+                if free > 0:
+                    due = sorted(
+                        (s for s in self.slots if not s.busy and s.next_due <= now),
+                        key=lambda s: s.next_due,
+                    )
+                    for slot in due[:free]:
+                        slot.busy = True
+                        running[self._executor.submit(self._run_slot, slot)] = slot
+
+                if running:
+                    idle = [s.next_due for s in self.slots if not s.busy]
+                    timeout = max(0.0, min(idle) - now) if idle and free > 0 else None
+                    finished, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        slot = running.pop(fut)
+                        slot.busy = False
+                        done_in_round.add(slot.instrument)
+                        if getattr(slot.runner, "_stop", False):
+                            # SafetyTrigger などで停止したら全ペアを止める
+                            log.warning("[%s] runner stopped – stopping scheduler", slot.instrument)
+                            self._stop.set()
+                else:
+                    nxt = min(s.next_due for s in self.slots)
+                    self._stop.wait(max(0.0, nxt - time.monotonic()))
+
+                # バックオフ中 (市場クローズ等) のペアは待たずにラウンドを締める
+                horizon = time.monotonic() + self.interval_seconds
+                waiting = [
+                    s
+                    for s in self.slots
+                    if s.instrument not in done_in_round and (s.busy or s.next_due <= horizon)
+                ]
+                if done_in_round and not waiting:
+                    done_in_round.clear()
+                    self._sync()
+                    rounds += 1
+                    if max_rounds is not None and rounds >= max_rounds:
+                        self._stop.set()
+            if running:
+                wait(list(running))
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            for slot in self.slots:
+                slot.busy = False
+
+    def stop(self) -> None:
+        """Signal the scheduler and every runner to exit."""
+        self._stop.set()
+        for slot in self.slots:
+            try:
+                slot.runner.stop()
+            except Exception:  # pragma: no cover - defensive
+                pass
+
+    def stats(self) -> dict[str, dict]:
+        """Return per-instrument cycle counters and last cycle latency."""
+        return {slot.instrument: slot.stats() for slot in self.slots}
+
+
+__all__ = ["MultiPairScheduler", "PairSlot", "parse_pairs"]
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+"""Event-driven runner fed by the OANDA pricing stream.
+
+The polling :class:`~backend.scheduler.job_runner.JobRunner` wakes up every
+``interval_seconds`` and issues a REST pricing request.  In stream mode the
+prices pushed by :func:`backend.market_data.tick_stream.start_stream` are kept
+in a :class:`~core.ring_buffer.RingBuffer`, aggregated into bars and fed to
+the rolling ATR/ADX/regime updaters.  One job iteration is triggered on bar
+close or on a configurable tick trigger (tick count / price move) instead of
+on a timer.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from analysis.regime_detector import RegimeDetector
+from backend.indicators.rolling import RollingADX, RollingATR
+from backend.market_data.candle_cache import GRANULARITY_SECONDS, parse_candle_time
+from backend.market_data.market_hours import tradeable_status
+from backend.utils import env_loader
+from core.ring_buffer import RingBuffer
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Bar:
+    """OHLC bar built from streamed mid prices."""
+
+    start: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int = 1
+
+    def as_tick(self) -> dict:
+        return {
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        }
+
+
+class BarAggregator:
+    """Aggregate ticks into fixed-length bars aligned to the epoch."""
+
+    def __init__(self, seconds: int) -> None:
+        self.seconds = seconds
+        self.current: Bar | None = None
+
+    def add(self, ts: float, price: float) -> Bar | None:
+        """Add a tick and return the bar it closed, if any."""
+        start = ts - ts % self.seconds
+        bar = self.current
+        if bar is None or start > bar.start:
+            self.current = Bar(start, price, price, price, price)
+            return bar
+        if start < bar.start:
+            # 再接続直後などの古いティックは無視する
+            return None
+        bar.high = max(bar.high, price)
+        bar.low = min(bar.low, price)
+        bar.close = price
+        bar.volume += 1
+        return None
+
+
+class StreamTickRunner:
+    """Drive a job runner from streamed prices.
+
+    ``runner`` must provide ``run()``, ``stop()`` and honour the
+    ``tick_source`` attribute (see :meth:`JobRunner._fetch_tick_data`).
+    Triggers are configured through ``STREAM_TRIGGER_TF`` (bar close),
+    ``STREAM_TRIGGER_TICKS`` (every N ticks, ``0`` disables) and
+    ``STREAM_TRIGGER_PIPS`` (move since the last evaluation, ``0`` disables).
+    ``STREAM_MIN_INTERVAL_SEC`` throttles tick triggers and
+    ``STREAM_MAX_IDLE_SEC`` forces an evaluation when the market is quiet so
+    open positions are still reviewed.  :meth:`snapshot` returns ``None`` once
+    no price or heartbeat has arrived for ``STREAM_STALE_SEC`` seconds, so the
+    runner falls back to a REST quote while the stream is down.
+    """
+
+    def __init__(
+        self,
+        runner: Any,
+        pair: str | None = None,
+        *,
+        granularity: str | None = None,
+        tick_trigger: int | None = None,
+        move_pips: float | None = None,
+        min_interval: float | None = None,
+        max_idle: float | None = None,
+        buffer_size: int | None = None,
+        stale_after: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.runner = runner
+        self.pair = pair or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+        tf = (granularity or env_loader.get_env("STREAM_TRIGGER_TF", "M1")).upper()
+        self.granularity = tf
+        self.bars = BarAggregator(GRANULARITY_SECONDS.get(tf, 60))
+        self.tick_trigger = (
+            tick_trigger
+            if tick_trigger is not None
+            else int(env_loader.get_env("STREAM_TRIGGER_TICKS", "0"))
+        )
+        pips = (
+            move_pips
+            if move_pips is not None
+            else float(env_loader.get_env("STREAM_TRIGGER_PIPS", "0"))
+        )
+        self.move_threshold = pips * float(env_loader.get_env("PIP_SIZE", "0.01"))
+        self.min_interval = (
+            min_interval
+            if min_interval is not None
+            else float(env_loader.get_env("STREAM_MIN_INTERVAL_SEC", "1"))
+        )
+        self.max_idle = (
+            max_idle
+            if max_idle is not None
+            else float(env_loader.get_env("STREAM_MAX_IDLE_SEC", "60"))
+        )
+        self.stale_after = (
+            stale_after
+            if stale_after is not None
+            else float(env_loader.get_env("STREAM_STALE_SEC", "10"))
+        )
+        size = buffer_size or int(env_loader.get_env("STREAM_BUFFER_SIZE", "1000"))
+        self.ticks = RingBuffer(size)
+        self.atr = RollingATR()
+        self.adx = RollingADX()
+        self.regime = RegimeDetector()
+        self.last_price: dict | None = None
+        self.last_regime: dict | None = None
+        self.tradeable = True
+        self.trigger_reason: str | None = None
+        self.trigger_count = 0
+        self._clock = clock
+        self._last_message: float | None = None
+        self._ticks_since = 0
+        self._eval_price: float | None = None
+        self._last_trigger = float("-inf")
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------
+    def on_message(self, msg: dict) -> None:
+        """Stream callback handling ``PRICE`` and ``HEARTBEAT`` messages."""
+        if msg.get("type") in ("PRICE", "HEARTBEAT"):
+            # ハートビートも接続が生きている証拠として記録する
+            self._last_message = self._clock()
+        if msg.get("type") != "PRICE" or msg.get("instrument", self.pair) != self.pair:
+            return
+        try:
+            bid = float(msg["bids"][0]["price"])
+            ask = float(msg["asks"][0]["price"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return
+        mid = (bid + ask) / 2
+        dt = parse_candle_time(msg.get("time"))
+        ts = dt.timestamp() if dt else time.time()
+        self.ticks.append({"time": ts, "bid": bid, "ask": ask, "mid": mid})
+
+        with self._lock:
+            self.last_price = msg
+            reason = None
+            closed = self.bars.add(ts, mid)
+            if closed is not None:
+                self._on_bar_close(closed)
+                reason = "bar_close"
+            tradeable = msg.get("tradeable", True) is not False
+            if tradeable != self.tradeable:
+                # 取引可否の変化は即座に反映させる
+                self.tradeable = tradeable
+                tradeable_status.observe(self.pair, tradeable)
+                reason = reason or "tradeable"
+            self._ticks_since += 1
+            if self._eval_price is None:
+                self._eval_price = mid
+            if reason is None and self._clock() - self._last_trigger >= self.min_interval:
+                if self.tick_trigger and self._ticks_since >= self.tick_trigger:
+                    reason = "ticks"
+                elif self.move_threshold and abs(mid - self._eval_price) >= self.move_threshold:
+                    reason = "move"
+            if reason is not None:
+                self._fire(reason, mid)
+
+    def _on_bar_close(self, bar: Bar) -> None:
+        tick = bar.as_tick()
+        self.atr.update(tick)
+        self.adx.update(tick)
+        res = self.regime.update(tick)
+        self.last_regime = res
+        if res.get("transition"):
+            # レジーム遷移時は AI クールダウンを解除する
+            try:
+                self.runner.last_ai_call = datetime.min
+            except AttributeError:
+                pass
+
+    def _fire(self, reason: str, price: float) -> None:
+        self.trigger_reason = reason
+        self.trigger_count += 1
+        self._ticks_since = 0
+        self._eval_price = price
+        self._last_trigger = self._clock()
+        self._event.set()
+
+    # ------------------------------------------------------------------
+    def snapshot(self) -> dict | None:
+        """Return the latest price in the REST ``pricing`` response shape.
+
+        ``None`` when nothing was received yet or the stream went silent for
+        longer than :attr:`stale_after` seconds (``0`` disables the check).
+        """
+        with self._lock:
+            if self.last_price is None:
+                return None
+            if (
+                self.stale_after > 0
+                and self._clock() - (self._last_message or 0.0) > self.stale_after
+            ):
+                return None
+            return {"prices": [self.last_price]}
+
+    def wait(self, timeout: float | None = None) -> str | None:
+        """Block until the next trigger and return its reason (``None`` on idle)."""
+        fired = self._event.wait(self.max_idle if timeout is None else timeout)
+        with self._lock:
+            self._event.clear()
+            reason = self.trigger_reason if fired else None
+            self.trigger_reason = None
+        return reason
+
+    # ------------------------------------------------------------------
+    def start_stream(self) -> threading.Thread:
+        """Consume the pricing stream in a daemon thread."""
+        from backend.market_data.tick_stream import start_stream
+
+        def _target() -> None:
+            asyncio.run(start_stream([self.pair], self.on_message))
+
+        self._thread = threading.Thread(target=_target, name="tick-stream", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def run(self, *, max_loops: int | None = None) -> None:
+        """Start streaming and run ``runner`` with this object as tick source."""
+        if self._thread is None:
+            self.start_stream()
+        self.runner.tick_source = self
+        log.info(
+            "Stream runner started: pair=%s tf=%s ticks=%s move=%s",
+            self.pair,
+            self.granularity,
+            self.tick_trigger,
+            self.move_threshold,
+        )
+        if max_loops is None:
+            self.runner.run()
+        else:
+            self.runner.run(max_loops=max_loops)
+
+
+__all__ = ["Bar", "BarAggregator", "StreamTickRunner"]
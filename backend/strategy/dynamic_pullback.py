@@ -1,11 +1,12 @@
 """Dynamic pullback threshold calculation."""
 
+from backend.config import runtime_config
 from backend.utils import env_loader
 
 
 def calculate_dynamic_pullback(indicators: dict, recent_high: float, recent_low: float) -> float:
     """Return dynamic pullback threshold in pips."""
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     atr = indicators.get("atr")
     adx = indicators.get("adx")
     noise = indicators.get("noise")
@@ -35,7 +36,7 @@ def pullback_completed(
 ) -> bool:
     """Return ``True`` when price has met the dynamic pullback depth."""
 
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     if direction == "long" and recent_high:
         return (recent_high - price) / pip_size >= pullback_needed
     if direction == "short" and recent_low:
@@ -1,12 +1,13 @@
 import importlib
 
+from backend.config import runtime_config
 from backend.filters.false_break_filter import should_skip as false_break_skip
+from backend.logs.perf_stats_logger import timed
 from backend.logs.trade_logger import log_trade
 from backend.orders.order_manager import OrderManager
 from backend.risk_manager import tp_only_condition
 from backend.strategy.dynamic_pullback import calculate_dynamic_pullback
 from backend.strategy.risk_manager import calc_lot_size
-from risk.tp_sl_manager import adjust_sl_for_rr
 
 # trend_pullback filter removed – AI handles pullback assessment
 
@@ -63,9 +64,8 @@ from datetime import datetime, timezone
 
 from backend.risk_manager import (
     calc_fallback_tp_sl,
-    calc_min_sl,
-    get_recent_swing_diff,
-    is_high_vol_session,
+    resolve_scalp_tp_sl,
+    resolve_tp_sl,
     validate_rrr,
     validate_rrr_after_cost,
     validate_sl,
@@ -105,7 +105,7 @@ PEAK_ENTRY_ENABLED = env_loader.get_env("PEAK_ENTRY_ENABLED", "false").lower() =
 
 def pullback_limit(side: str, price: float, offset_pips: float) -> float:
     """Return limit price offset by given pips in the direction of a pullback."""
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     return (
         price - offset_pips * pip_size
         if side == "long"
@@ -121,7 +121,7 @@ def calculate_pullback_offset(indicators: dict, market_cond: dict | None) -> flo
     """
     offset = float(env_loader.get_env("PULLBACK_LIMIT_OFFSET_PIPS", "2"))
     try:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
 
         atr_series = indicators.get("atr")
         if atr_series is not None and len(atr_series):
@@ -187,38 +187,7 @@ def _calc_scalp_tp_sl(
     return max(tp, 0.0), max(sl, 0.0)
 
 
-def _calc_reversion_tp_sl(indicators: dict, pip_size: float) -> tuple[float | None, float | None]:
-    """Return TP/SL using ATR or Bollinger width for scalp reversion."""
-    atr_series = indicators.get("atr")
-    bb_upper = indicators.get("bb_upper")
-    bb_lower = indicators.get("bb_lower")
-    atr_pips = None
-    width_pips = None
-    if atr_series is not None and len(atr_series):
-        try:
-            atr_val = atr_series.iloc[-1] if hasattr(atr_series, "iloc") else atr_series[-1]
-            atr_pips = float(atr_val) / pip_size
-        except Exception:
-            atr_pips = None
-    if bb_upper is not None and bb_lower is not None and len(bb_upper) and len(bb_lower):
-        try:
-            up = bb_upper.iloc[-1] if hasattr(bb_upper, "iloc") else bb_upper[-1]
-            low = bb_lower.iloc[-1] if hasattr(bb_lower, "iloc") else bb_lower[-1]
-            width_pips = (up - low) / pip_size
-        except Exception:
-            width_pips = None
-    noise = 0.0
-    if atr_pips is not None:
-        noise = max(noise, atr_pips)
-    if width_pips is not None:
-        noise = max(noise, width_pips)
-    if noise == 0.0:
-        return None, None
-    tp_mult = float(env_loader.get_env("SCALP_REV_TP_MULT", "0.6"))
-    sl_mult = float(env_loader.get_env("SCALP_REV_SL_MULT", "1.0"))
-    return noise * tp_mult, noise * sl_mult
-
-
+@timed("process_entry")
 def process_entry(
     indicators,
     candles,
@@ -235,6 +204,7 @@ def process_entry(
     allow_delayed_entry: bool | None = None,
     risk_engine=None,
     return_side: bool | None = False,
+    instrument: str | None = None,
 ):
     """
     Ask OpenAI whether to enter a trade.
@@ -248,12 +218,15 @@ def process_entry(
         indicators_multi: multi-timeframe indicators for alignment adjustment
         return_side   : if True, return only the AI-determined side without
                         placing any order
+        instrument    : pair traded by the caller (defaults to the tick's
+                        instrument, then ``DEFAULT_PAIR``)
 
     Returns:
         True if an entry was placed, False otherwise. When ``return_side`` is
         True, return the side string ("long"/"short") determined by the AI
         without executing an order.
     """
+    cfg = runtime_config.current()
     # If the caller did not pass a dict (JobRunner passes candles), fall back to an empty dict
     if not isinstance(strategy_params, dict):
         strategy_params = {}
@@ -264,14 +237,12 @@ def process_entry(
         )
 
     forced_entry = False
-    force_entry_after_ai = (
-        env_loader.get_env("FORCE_ENTRY_AFTER_AI", "false").lower() == "true"
-    )
+    force_entry_after_ai = cfg.force_entry_after_ai
     use_dynamic_risk = (
         env_loader.get_env("FALLBACK_DYNAMIC_RISK", "false").lower() == "true"
     )
 
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = cfg.pip_size
     spread_pips = None
     try:
         if isinstance(market_data, dict):
@@ -382,11 +353,8 @@ def process_entry(
                             return False
 
             if ai_side in ("long", "short"):
-                tp_pips = float(
-                    plan.get("tp_pips", env_loader.get_env("SCALP_TP_PIPS", "2"))
-                )
-                sl_pips = float(
-                    plan.get("sl_pips", env_loader.get_env("SCALP_SL_PIPS", "1"))
+                tp_pips, sl_pips = resolve_scalp_tp_sl(
+                    plan, indicators, trade_mode, pip_size=pip_size
                 )
                 wait_pips = float(plan.get("wait_pips", 0))
                 side = ai_side
@@ -401,7 +369,7 @@ def process_entry(
                 if not force_entry_after_ai:
                     return False
             price = bid if side == "long" else ask
-            tf = env_loader.get_env("SCALP_COND_TF", "M1").upper()
+            tf = (cfg.scalp_cond_tf or "M1").upper()
             extra_tp, extra_sl = _calc_scalp_tp_sl(
                 indicators,
                 indicators_multi,
@@ -419,13 +387,6 @@ def process_entry(
             if sl_pips is None:
                 sl_pips = float(env_loader.get_env("SCALP_SL_PIPS", "1"))
 
-            if trade_mode == "scalp_reversion":
-                rev_tp, rev_sl = _calc_reversion_tp_sl(indicators, pip_size)
-                if rev_tp is not None:
-                    tp_pips = rev_tp
-                if rev_sl is not None:
-                    sl_pips = rev_sl
-
             # --- Volatility / spread filters for scalping ------------------
             try:
                 cool_bw = float(env_loader.get_env("COOL_BBWIDTH_PCT", "0"))
@@ -474,7 +435,8 @@ def process_entry(
             # スプレッドに基づくエントリーブロックは行わない
 
             params = {
-                "instrument": (
+                "instrument": instrument
+                or (
                     market_data["prices"][0]["instrument"]
                     if isinstance(market_data, dict)
                     else env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
@@ -496,8 +458,8 @@ def process_entry(
                 params["time_limit_sec"] = float(
                     env_loader.get_env("SCALP_REV_TIME_LIMIT_SEC", "120")
                 )
-            risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-            pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+            risk_pct = cfg.entry_risk_pct
+            pip_val = cfg.pip_value_jpy
             lot = calc_lot_size(
                 float(env_loader.get_env("ACCOUNT_BALANCE", "10000")),
                 risk_pct,
@@ -564,6 +526,7 @@ def process_entry(
         detected_patterns=detected,
         allow_delayed_entry=allow_delayed_entry,
         filter_ctx=strategy_params.get("filter_ctx") if isinstance(strategy_params, dict) else None,
+        instrument=instrument,
     )
 
     # AI_RETRY_ON_NO 機能は廃止されたため、ここでの再試行は行わない
@@ -709,24 +672,13 @@ def process_entry(
             if align and side != align:
                 logging.info(f"AI side {side} realigned to {align} by multi‑TF check")
                 side = align
-            elif (
-                align is None
-                and env_loader.get_env(
-                    "ALIGN_STRICT", env_loader.get_env("STRICT_TF_ALIGN", "false")
-                ).lower()
-                == "true"
-            ):
+            elif align is None and cfg.strict_tf_align:
                 logging.info("Multi‑TF alignment missing → skip entry")
                 if not force_entry_after_ai:
                     return False
         except Exception as exc:
             logging.debug(f"alignment adjust failed: {exc}")
-            if (
-                env_loader.get_env(
-                    "ALIGN_STRICT", env_loader.get_env("STRICT_TF_ALIGN", "false")
-                ).lower()
-                == "true"
-            ):
+            if cfg.strict_tf_align:
                 logging.info("Alignment adjustment failed and strict mode → skip entry")
                 if not force_entry_after_ai:
                     return False
@@ -766,7 +718,7 @@ def process_entry(
     pullback_needed = None
     if not is_break:
         try:
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = cfg.pip_size
             atr_series = indicators.get("atr")
             bb_upper = indicators.get("bb_upper")
             bb_lower = indicators.get("bb_lower")
@@ -826,11 +778,11 @@ def process_entry(
             pass
 
     if isinstance(market_data, dict):
-        instrument = market_data["prices"][0]["instrument"]
+        instrument = instrument or market_data["prices"][0]["instrument"]
         bid = float(market_data["prices"][0]["bids"][0]["price"])
         ask = float(market_data["prices"][0]["asks"][0]["price"])
     else:
-        instrument = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+        instrument = instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
         bid = ask = None
 
     # H1 レベルチェック無効化 (AI 指示を優先)
@@ -857,7 +809,7 @@ def process_entry(
                 and len(bb_upper)
                 and len(bb_lower)
             ):
-                pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+                pip_size = cfg.pip_size
                 bw_pips = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / pip_size
                 bw_thresh = float(env_loader.get_env("BAND_WIDTH_THRESH_PIPS", "4"))
                 narrow_range = bw_pips < bw_thresh
@@ -871,162 +823,17 @@ def process_entry(
     if mode == "wait":
         logging.info("AI suggests WAIT – proceeding with entry.")
 
-    tp_pips = risk_info.get("tp_pips")
-    sl_pips = risk_info.get("sl_pips")
-    fallback_tp = None
-
-    min_sl = float(env_loader.get_env("MIN_SL_PIPS", "0"))
-    fallback_sl = None
-    atr_pips = None
-    dynamic_min_sl = 0.0
-    try:
-        atr_series = indicators.get("atr")
-        if atr_series is not None and len(atr_series):
-            if hasattr(atr_series, "iloc"):
-                atr_val = float(atr_series.iloc[-1])
-            else:
-                atr_val = float(atr_series[-1])
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-            atr_pips = atr_val / pip_size
-            mult_sl = float(
-                env_loader.get_env(
-                    "ATR_MULT_SL", env_loader.get_env("ATR_SL_MULTIPLIER", "2.0")
-                )
-            )
-            fallback_sl = atr_pips * mult_sl
-            mult_tp = float(
-                env_loader.get_env(
-                    "ATR_MULT_TP", env_loader.get_env("SHORT_TP_ATR_RATIO", "0.6")
-                )
-            )
-            fallback_tp = atr_pips * mult_tp
-        price_ref = bid if side == "long" else ask
-        # SL用ピボットレベル
-        pivot_sl_key = "pivot_s1" if side == "long" else "pivot_r1"
-        pivot_sl_val = indicators.get(pivot_sl_key)
-        if pivot_sl_val is not None and price_ref is not None:
-            dist_sl = abs(price_ref - pivot_sl_val) / pip_size
-            if fallback_sl is None or dist_sl > fallback_sl:
-                fallback_sl = dist_sl
-        pivot_key = "pivot_r1" if side == "long" else "pivot_s1"
-        pivot_val = indicators.get(pivot_key)
-        if pivot_val is not None and price_ref is not None:
-            dist = abs(pivot_val - price_ref) / pip_size
-            if fallback_tp is None or dist < fallback_tp:
-                fallback_tp = dist
-        n_target = indicators.get("n_wave_target")
-        if n_target is not None and price_ref is not None:
-            dist = abs(n_target - price_ref) / pip_size
-            if fallback_tp is None or dist < fallback_tp:
-                fallback_tp = dist
-            # N波ターゲットをSL候補として利用
-            if fallback_sl is None or dist > fallback_sl:
-                fallback_sl = dist
-
-        # ヒゲ幅平均×2をSL候補に追加
-        try:
-            wicks = []
-            for c in candles[-3:]:
-                base = c.get("mid", c)
-                high = float(base.get("h"))
-                low = float(base.get("l"))
-                opn = float(base.get("o", 0))
-                cls = float(base.get("c", 0))
-                upper = high - max(opn, cls)
-                lower = min(opn, cls) - low
-                wicks.append((upper + lower) / pip_size)
-            if wicks:
-                wick_sl = sum(wicks) / len(wicks) * 2
-                if fallback_sl is None or wick_sl > fallback_sl:
-                    fallback_sl = wick_sl
-        except Exception:
-            pass
-        bb_upper = indicators.get("bb_upper")
-        bb_lower = indicators.get("bb_lower")
-        if bb_upper is not None and bb_lower is not None and price_ref is not None:
-            if hasattr(bb_upper, "iloc"):
-                width = float(bb_upper.iloc[-1]) - float(bb_lower.iloc[-1])
-            else:
-                width = float(bb_upper[-1]) - float(bb_lower[-1])
-            width_pips = width / pip_size
-            bb_ratio = float(env_loader.get_env("TP_BB_RATIO", "0.6"))
-            bb_tp = width_pips * bb_ratio
-            if fallback_tp is None or bb_tp < fallback_tp:
-                fallback_tp = bb_tp
-
-        # 上位足ピボットとの距離を TP 候補として追加
-        if (
-            env_loader.get_env("HIGHER_TF_ENABLED", "true").lower() == "true"
-            and higher_tf
-            and price_ref is not None
-        ):
-            for key in ("pivot_h1", "pivot_h4", "pivot_d"):
-                pivot_val = higher_tf.get(key)
-                if pivot_val is None:
-                    continue
-                dist = abs(pivot_val - price_ref) / pip_size
-                if fallback_tp is None or dist < fallback_tp:
-                    fallback_tp = dist
-
-        # 動的SL下限計算
-        entry_price = bid if side == "long" else ask
-        swing_diff = None
-        if entry_price is not None:
-            swing_diff = get_recent_swing_diff(candles, side, entry_price, pip_size)
-        session_factor = 1.3 if is_high_vol_session() else 1.0
-        dynamic_min_sl = calc_min_sl(
-            atr_pips,
-            swing_diff,
-            atr_mult=float(env_loader.get_env("MIN_ATR_MULT", "1.2")),
-            swing_buffer_pips=5.0,
-            session_factor=session_factor,
-        )
-    except Exception as exc:
-        logging.debug(f"[process_entry] ATR-based SL calc failed: {exc}")
-
-    if not use_dynamic_risk and forced_entry:
-        fallback_tp = None
-        fallback_sl = None
-        dynamic_min_sl = 0.0
-
-    if tp_pips is None:
-        tp_pips = (
-            fallback_tp
-            if fallback_tp is not None
-            else float(env_loader.get_env("INIT_TP_PIPS", "30"))
-        )
-    else:
-        try:
-            tp_pips = float(tp_pips)
-        except Exception:
-            tp_pips = float(env_loader.get_env("INIT_TP_PIPS", "30"))
-
-    if sl_pips is None:
-        sl_pips = (
-            fallback_sl
-            if fallback_sl is not None
-            else float(env_loader.get_env("INIT_SL_PIPS", "20"))
-        )
-    else:
-        try:
-            sl_pips = float(sl_pips)
-        except Exception:
-            sl_pips = float(env_loader.get_env("INIT_SL_PIPS", "20"))
-
-    if fallback_sl is not None:
-        sl_pips = max(sl_pips, fallback_sl)
-    try:
-        sl_pips = max(sl_pips, dynamic_min_sl)
-    except Exception:
-        pass
-    if sl_pips < min_sl:
-        sl_pips = min_sl
-    try:
-        if env_loader.get_env("ENFORCE_RRR", "false").lower() == "true":
-            min_rrr = float(env_loader.get_env("MIN_RRR", "0.8"))
-            tp_pips, sl_pips = adjust_sl_for_rr(tp_pips, sl_pips, min_rrr)
-    except Exception:
-        pass
+    tp_pips, sl_pips, atr_pips = resolve_tp_sl(
+        risk_info,
+        indicators,
+        candles,
+        side,
+        bid,
+        ask,
+        higher_tf=higher_tf,
+        use_fallbacks=use_dynamic_risk or not forced_entry,
+        pip_size=pip_size,
+    )
 
     # マルチTFが逆方向の場合のTP短縮
     try:
@@ -1044,7 +851,7 @@ def process_entry(
         pass
 
     try:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = cfg.pip_size
         spread = (ask - bid) / pip_size if bid is not None and ask is not None else 0.0
         slip = float(env_loader.get_env("ENTRY_SLIPPAGE_PIPS", "0"))
         min_rrr_cost = float(env_loader.get_env("MIN_RRR_AFTER_COST", "0"))
@@ -1098,7 +905,7 @@ def process_entry(
             "entry_vol_pips": noise_pips,
             "entry_stance": trade_mode,
         }
-        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
+        risk_pct = cfg.entry_risk_pct
         if entry_type == "breakout":
             risk_pct *= 1.05
         elif entry_type == "reversal":
@@ -1109,7 +916,7 @@ def process_entry(
                 float(env_loader.get_env("ACCOUNT_BALANCE", "10000")),
                 risk_pct,
                 sl_pips,
-                float(env_loader.get_env("PIP_VALUE_JPY", "100")),
+                cfg.pip_value_jpy,
                 risk_engine=risk_engine,
             ),
             market_data=market_data,
@@ -1149,7 +956,7 @@ def process_entry(
             "entry_stance": trade_mode,
         }
 
-    risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
+    risk_pct = cfg.entry_risk_pct
     if entry_type == "breakout":
         risk_pct *= 1.05
     elif entry_type == "reversal":
@@ -1160,7 +967,7 @@ def process_entry(
             float(env_loader.get_env("ACCOUNT_BALANCE", "10000")),
             risk_pct,
             sl_pips,
-            float(env_loader.get_env("PIP_VALUE_JPY", "100")),
+            cfg.pip_value_jpy,
             risk_engine=risk_engine,
         ),
         market_data=market_data,
@@ -1171,7 +978,7 @@ def process_entry(
 
     if trade_result and mode == "market":
         instrument = params["instrument"]
-        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
+        risk_pct = cfg.entry_risk_pct
         if entry_type == "breakout":
             risk_pct *= 1.05
         elif entry_type == "reversal":
@@ -1180,7 +987,7 @@ def process_entry(
             float(env_loader.get_env("ACCOUNT_BALANCE", "10000")),
             risk_pct,
             sl_pips,
-            float(env_loader.get_env("PIP_VALUE_JPY", "100")),
+            cfg.pip_value_jpy,
             risk_engine=risk_engine,
         )
         units = int(lot_size * 1000) if side == "long" else -int(lot_size * 1000)
@@ -185,9 +185,8 @@ def evaluate(context: Dict[str, Any], bias_factor: float = 1.0) -> AIDecision:
         Parsed decision from the language model.
     """
 
-    user_json = json.dumps(
-        to_serializable(context), separators=(",", ":"), ensure_ascii=False
-    )
+    payload = to_serializable(context)
+    user_json = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
     score, bias = atmos_eval(context)
     if bias > 0.2:
         bias_label = "Up"
@@ -221,6 +220,13 @@ def evaluate(context: Dict[str, Any], bias_factor: float = 1.0) -> AIDecision:
         temperature=temperature,
         max_tokens=max_tokens,
         messages=messages,
+        template_id="exit_decision",
+        cache_context={
+            "context": payload,
+            "score": score,
+            "bias": bias_label,
+            "bias_factor": bias_factor,
+        },
     )
 
     decision = _parse_answer(raw)
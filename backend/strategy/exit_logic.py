@@ -7,6 +7,7 @@ import logging
 from datetime import datetime, timezone
 
 from backend.logs.exit_logger import append_exit_log
+from backend.logs.perf_stats_logger import timed
 from backend.logs.trade_logger import ExitReason, log_trade
 from backend.orders.order_manager import OrderManager
 from backend.utils import env_loader, trade_age_seconds
@@ -154,6 +155,7 @@ def decide_exit(
 
 
 
+@timed("process_exit")
 def process_exit(
     indicators,
     market_data,
@@ -162,11 +164,13 @@ def process_exit(
     indicators_m1=None,
     patterns=None,
     pattern_names=None,
+    *,
+    instrument: str | None = None,
 ):
-    default_pair = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
-    position = get_position_details(default_pair)
+    pair = instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+    position = get_position_details(pair)
     if position is None:
-        logging.info(f"No open position for {default_pair}; skip exit logic.")
+        logging.info(f"No open position for {pair}; skip exit logic.")
         return False
 
     if position.get("long") and int(position["long"]["units"]) > 0:
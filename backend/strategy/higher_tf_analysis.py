@@ -23,6 +23,7 @@ from typing import Dict, List, Tuple, Union
 import pandas as pd
 
 from backend.market_data.candle_fetcher import fetch_candles
+from backend.market_data.candle_frame import as_candle_frame
 
 logger = logging.getLogger(__name__)
 
@@ -59,54 +60,44 @@ def analyze_higher_tf(
     """
     try:
         # --- Daily (D) ----------------------------------------------------
-        daily_candles = fetch_candles(pair, granularity="D", count=day_lookback)
-        if not daily_candles:
+        daily = as_candle_frame(
+            fetch_candles(pair, granularity="D", count=day_lookback, as_frame=True)
+        )
+        if not len(daily):
             logger.warning("No daily candles fetched for %s", pair)
             return {}
 
         # last completed D candle
-        last_d = daily_candles[-1] if daily_candles[-1]["complete"] else daily_candles[-2]
-        day_high = float(last_d["mid"]["h"])
-        day_low = float(last_d["mid"]["l"])
-        day_close = float(last_d["mid"]["c"])
+        i = -1 if daily.complete[-1] else -2
+        day_high = float(daily.h[i])
+        day_low = float(daily.l[i])
+        day_close = float(daily.c[i])
         pivot_d = _pivot(day_high, day_low, day_close)
 
-        close_d = [float(c["mid"]["c"]) for c in daily_candles if c["complete"]]
+        close_d = daily.c[daily.complete].tolist()
         sma50_d = _sma(close_d, 50)
         sma200_d = _sma(close_d, 200)
 
         # --- H4 -----------------------------------------------------------
-        h4_candles = fetch_candles(pair, granularity="H4", count=h4_lookback)
-        recent_high = (
-            max(float(c["mid"]["h"]) for c in h4_candles if c["complete"])
-            if h4_candles
-            else None
-        )
-        recent_low = (
-            min(float(c["mid"]["l"]) for c in h4_candles if c["complete"])
-            if h4_candles
-            else None
+        h4 = as_candle_frame(
+            fetch_candles(pair, granularity="H4", count=h4_lookback, as_frame=True)
         )
+        recent_high = float(h4.h[h4.complete].max()) if len(h4) else None
+        recent_low = float(h4.l[h4.complete].min()) if len(h4) else None
 
         pivot_h4 = None
-        if h4_candles:
-            last_h4 = h4_candles[-1] if h4_candles[-1]["complete"] else h4_candles[-2]
-            pivot_h4 = _pivot(
-                float(last_h4["mid"]["h"]),
-                float(last_h4["mid"]["l"]),
-                float(last_h4["mid"]["c"]),
-            )
+        if len(h4):
+            i = -1 if h4.complete[-1] else -2
+            pivot_h4 = _pivot(float(h4.h[i]), float(h4.l[i]), float(h4.c[i]))
 
         # --- H1 -----------------------------------------------------------
-        h1_candles = fetch_candles(pair, granularity="H1", count=h1_lookback)
+        h1 = as_candle_frame(
+            fetch_candles(pair, granularity="H1", count=h1_lookback, as_frame=True)
+        )
         pivot_h1 = None
-        if h1_candles:
-            last_h1 = h1_candles[-1] if h1_candles[-1]["complete"] else h1_candles[-2]
-            pivot_h1 = _pivot(
-                float(last_h1["mid"]["h"]),
-                float(last_h1["mid"]["l"]),
-                float(last_h1["mid"]["c"]),
-            )
+        if len(h1):
+            i = -1 if h1.complete[-1] else -2
+            pivot_h1 = _pivot(float(h1.h[i]), float(h1.l[i]), float(h1.c[i]))
 
         return {
             "day_high": day_high,
@@ -2,6 +2,7 @@
 
 from typing import Dict, List, Optional
 
+from backend.config import runtime_config
 from backend.utils import env_loader
 
 
@@ -34,7 +35,7 @@ def follow_breakout(candles: List[dict], indicators: Dict[str, list], direction:
     if not len(adx_series) or not len(atr_series):
         return False
 
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     adx_min = float(env_loader.get_env("FOLLOW_ADX_MIN", "25"))
     pull_ratio = float(env_loader.get_env("FOLLOW_PULLBACK_ATR_RATIO", "0.5"))
 
@@ -17,6 +17,7 @@ except Exception:  # テストでスタブが残っている場合のフォー
 
     def log_prompt_response(*_a, **_k) -> None:
         pass
+from backend.config import runtime_config
 from backend.strategy.pattern_ai_detection import detect_chart_pattern
 from backend.strategy.pattern_scanner import PATTERN_DIRECTION
 from backend.utils import env_loader, parse_json_answer
@@ -298,7 +299,9 @@ from backend.strategy.range_break import (
 )
 
 
-def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
+def get_market_condition(
+    context: dict, higher_tf: dict | None = None, *, instrument: str | None = None
+) -> dict:
     """
     Determine whether the market is in a 'trend' or 'range' state.
         The function combines a heuristic, indicator‑based assessment
@@ -315,7 +318,8 @@ def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
             "break_class": "trend" | "range" | None,
         }
     ``context`` may include ``indicators_h1`` and ``indicators_h4`` to
-    improve the local regime decision.
+    improve the local regime decision.  ``instrument`` is the pair used in
+    the prompt log (default ``DEFAULT_PAIR``).
     """
     import json
     import logging
@@ -355,7 +359,7 @@ def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
     bw_pips = None
     try:
         if bb_upper is not None and bb_lower is not None:
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = runtime_config.current().pip_size
             bb_u = float(bb_upper.iloc[-1]) if hasattr(bb_upper, "iloc") else float(bb_upper[-1])
             bb_l = float(bb_lower.iloc[-1]) if hasattr(bb_lower, "iloc") else float(bb_lower[-1])
             bw_pips = (bb_u - bb_l) / pip_size
@@ -539,7 +543,7 @@ def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
         bb_upper = indicators.get("bb_upper")
         bb_lower = indicators.get("bb_lower")
         if bb_upper is not None and bb_lower is not None and len(bb_upper) and len(bb_lower):
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = runtime_config.current().pip_size
             bw_pips = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / pip_size
             bw_thresh = float(env_loader.get_env("BAND_WIDTH_THRESH_PIPS", "4"))
             narrow_bw = bw_pips <= bw_thresh
@@ -651,6 +655,12 @@ def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
         llm_raw = ask_openai(
             prompt,
             response_format={"type": "json_object"},
+            template_id="market_condition",
+            cache_context={
+                "instrument": instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY"),
+                "context": context,
+                "bw_pips": bw_pips if narrow_bw else None,
+            },
         )
         if isinstance(llm_raw, dict):  # already parsed
             llm_regime = llm_raw.get("market_condition", "range")
@@ -660,7 +670,7 @@ def get_market_condition(context: dict, higher_tf: dict | None = None) -> dict:
             raw_text = str(llm_raw)
         log_prompt_response(
             "REGIME",
-            env_loader.get_env("DEFAULT_PAIR", "USD_JPY"),
+            instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY"),
             prompt,
             raw_text,
         )
@@ -851,7 +861,7 @@ def get_exit_decision(
 
     BE_ATR_TRIGGER_MULT = float(env_loader.get_env("BE_ATR_TRIGGER_MULT", "0"))
     if BE_ATR_TRIGGER_MULT > 0:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
         atr_val = indicators.get("atr")
         if hasattr(atr_val, "iloc"):
             atr_val = atr_val.iloc[-1]
@@ -1160,7 +1170,7 @@ def get_trade_plan(
     # --- calculate noise and pullback state ------------------------------
     noise_pips = None
     try:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
         atr_series = ind_m5.get("atr")
         bb_upper = ind_m5.get("bb_upper")
         bb_lower = ind_m5.get("bb_lower")
@@ -1430,7 +1440,7 @@ def get_trade_plan(
 
             # --- 動的SL下限を計算して適用 -------------------------
             try:
-                pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+                pip_size = runtime_config.current().pip_size
                 atr_series = ind_m5.get("atr")
                 atr_val = None
                 if atr_series is not None:
@@ -1543,7 +1553,7 @@ def get_trade_plan(
         bb_upper = ind_m5.get("bb_upper")
         bb_lower = ind_m5.get("bb_lower")
         if bb_upper is not None and bb_lower is not None and len(bb_upper) and len(bb_lower):
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = runtime_config.current().pip_size
             bw_pips = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / pip_size
             bw_thresh = float(env_loader.get_env("BAND_WIDTH_THRESH_PIPS", "4"))
             if bw_pips <= bw_thresh:
@@ -1656,7 +1666,7 @@ def should_convert_limit_to_market(context: dict) -> bool:
         result = ask_openai(prompt, model=AI_LIMIT_CONVERT_MODEL)
         log_prompt_response(
             "LIMIT_CONVERT",
-            env_loader.get_env("DEFAULT_PAIR", "USD_JPY"),
+            context.get("instrument") or env_loader.get_env("DEFAULT_PAIR", "USD_JPY"),
             prompt,
             json.dumps(result, ensure_ascii=False) if isinstance(result, dict) else str(result),
         )
@@ -4,6 +4,7 @@ from __future__ import annotations
 import json
 from typing import Tuple
 
+from backend.config import runtime_config
 from backend.strategy.dynamic_pullback import calculate_dynamic_pullback
 from backend.utils import env_loader
 from backend.utils.prompt_loader import load_template
@@ -146,7 +147,7 @@ def build_trade_plan_prompt(
     # --------------------------------------------------------------
     noise_pips = None
     try:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
         atr_series = ind_m5.get("atr")
         bb_upper = ind_m5.get("bb_upper")
         bb_lower = ind_m5.get("bb_lower")
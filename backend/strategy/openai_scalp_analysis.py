@@ -1,5 +1,6 @@
 import logging
 
+from backend.market_data.candle_frame import as_candle_list
 from backend.utils import env_loader, parse_json_answer
 from backend.utils.openai_client import ask_openai
 from backend.utils.prompt_loader import load_template
@@ -41,7 +42,7 @@ def get_scalp_plan(indicators: dict, candles: list, *, higher_tf_direction: str
         rsi_vals=rsi_vals,
         bb_upper=bb_upper,
         bb_lower=bb_lower,
-        candles=candles[-20:],
+        candles=as_candle_list(candles[-20:]),
         higher_tf_direction=higher_tf_direction,
         bias_note=bias_note,
     )
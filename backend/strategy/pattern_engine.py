@@ -0,0 +1,324 @@
+"""Vectorized chart-pattern evaluation over NumPy OHLC arrays.
+
+The detectors in :mod:`backend.strategy.pattern_scanner` work on lists of
+dicts and re-run ``min``/``max``/``index``/slicing for every pattern (and in
+a Python loop for ``double_top``).  Here a timeframe is parsed once into a
+:class:`PatternSeries` whose extrema (first arg-max of highs, first arg-min
+of lows, suffix minima of lows) are computed lazily and shared between the
+detectors, and every detector is a handful of NumPy reductions.
+
+The detectors reproduce the list-based ones exactly; those remain in
+``pattern_scanner`` as the regression oracle (``scan_all_reference``).
+
+:class:`PatternScanner` adds incremental evaluation across loops.
+:class:`CandleFrame` is immutable and the candle cache hands out views of the
+same arrays until a refresh appends or updates a bar, so the result of each
+``(key, timeframe)`` is reused while its frame still points at the same
+memory; only timeframes whose bars changed are evaluated again.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, Mapping
+
+import numpy as np
+
+from backend.market_data.candle_frame import CandleFrame
+
+_KEYS = ("o", "h", "l", "c")
+
+
+class PatternSeries:
+    """OHLC arrays of one timeframe with lazily shared extrema."""
+
+    __slots__ = ("o", "h", "l", "c", "n", "_hi_idx", "_lo_idx", "_lo_suffix")
+
+    def __init__(self, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> None:
+        self.o = o
+        self.h = h
+        self.l = l
+        self.c = c
+        self.n = len(c)
+        self._hi_idx: int | None = None
+        self._lo_idx: int | None = None
+        self._lo_suffix: np.ndarray | None = None
+
+    @classmethod
+    def from_candles(cls, data: Iterable[Mapping]) -> "PatternSeries":
+        """Build from a :class:`CandleFrame` (no copy) or candle dicts.
+
+        Dict rows follow ``pattern_scanner._as_list``: ``mid`` prices when
+        present, falling back to flat ``o/h/l/c`` keys.
+        """
+        if isinstance(data, CandleFrame):
+            return cls(data.o, data.h, data.l, data.c)
+        rows = data if isinstance(data, list) else list(data)
+        prices = np.empty((4, len(rows)), dtype="float64")
+        for i, row in enumerate(rows):
+            mid = row.get("mid")
+            base = mid if isinstance(mid, Mapping) else row
+            for k, key in enumerate(_KEYS):
+                prices[k, i] = float(base.get(key, row.get(key, 0)))
+        return cls(prices[0], prices[1], prices[2], prices[3])
+
+    # ------------------------------------------------------------------
+    @property
+    def hi_idx(self) -> int:
+        """First index of the highest high."""
+        if self._hi_idx is None:
+            self._hi_idx = int(np.argmax(self.h))
+        return self._hi_idx
+
+    @property
+    def lo_idx(self) -> int:
+        """First index of the lowest low."""
+        if self._lo_idx is None:
+            self._lo_idx = int(np.argmin(self.l))
+        return self._lo_idx
+
+    @property
+    def lo_suffix(self) -> np.ndarray:
+        """``lo_suffix[k] == min(l[k:])``."""
+        if self._lo_suffix is None:
+            self._lo_suffix = np.minimum.accumulate(self.l[::-1])[::-1]
+        return self._lo_suffix
+
+    def last(self, back: int = 1) -> tuple[float, float, float, float]:
+        """Return ``(o, h, l, c)`` of the ``back``-th bar from the end."""
+        i = self.n - back
+        return float(self.o[i]), float(self.h[i]), float(self.l[i]), float(self.c[i])
+
+
+# ----------------------------------------------------------------------
+# Chart patterns (whole window)
+# ----------------------------------------------------------------------
+
+
+def double_bottom(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < min_bars:
+        return False
+    i1 = s.lo_idx
+    if i1 + 1 >= s.n:
+        return False
+    i2 = i1 + 1 + int(np.argmin(s.l[i1 + 1:]))
+    if i2 - i1 < 2:
+        return False
+    if not abs(float(s.l[i1]) - float(s.l[i2])) <= tol:
+        return False
+    hi_between = float(s.h[i1 + 1:i2].max())
+    hi_after = float(s.h[i2 + 1:].max()) if i2 + 1 < s.n else float(s.l[i2])
+    return hi_after > hi_between
+
+
+def double_top(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < min_bars:
+        return False
+    i1 = s.hi_idx
+    start = i1 + 2
+    if start >= s.n:
+        return False
+    # 天井と同水準の高値 j について「間の安値」と「j 以降の安値」を一括比較
+    js = start + np.flatnonzero(np.abs(s.h[start:] - s.h[i1]) <= tol)
+    if not len(js):
+        return False
+    lo_between = np.minimum.accumulate(s.l[i1 + 1:])[js - i1 - 2]
+    after_idx = np.minimum(js + 1, s.n - 1)
+    lo_after = np.where(js + 1 < s.n, s.lo_suffix[after_idx], lo_between - 0.01)
+    return bool(np.any(lo_after < lo_between))
+
+
+def head_and_shoulders(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < max(min_bars, 5):
+        return False
+    head_idx = s.hi_idx
+    if head_idx in (0, s.n - 1):
+        return False
+    head = float(s.h[head_idx])
+    left = float(s.h[:head_idx].max())
+    right = float(s.h[head_idx + 1:].max())
+    if head <= left or head <= right:
+        return False
+    return abs(left - right) <= head * 0.05
+
+
+def inverse_head_and_shoulders(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < max(min_bars, 5):
+        return False
+    head_idx = s.lo_idx
+    if head_idx in (0, s.n - 1):
+        return False
+    head = float(s.l[head_idx])
+    left = float(s.l[:head_idx].min())
+    right = float(s.l[head_idx + 1:].min())
+    if head >= left or head >= right:
+        return False
+    return abs(left - right) <= abs(head) * 0.05
+
+
+# ----------------------------------------------------------------------
+# Candlestick patterns (last bars only)
+# ----------------------------------------------------------------------
+
+
+def doji(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 1:
+        return False
+    o, h, l, c = s.last()
+    rng = h - l
+    if rng == 0:
+        return False
+    return abs(c - o) <= rng * 0.1
+
+
+def hammer(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 1:
+        return False
+    o, h, l, c = s.last()
+    body = abs(c - o)
+    upper = h - max(o, c)
+    lower = min(o, c) - l
+    if body == 0:
+        body = (h - l) * 0.001
+    return lower >= body * 2 and upper <= body
+
+
+def bullish_engulfing(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 2:
+        return False
+    po, _, _, pc = s.last(2)
+    o, _, _, c = s.last()
+    return pc < po and c > o and o <= pc and c >= po
+
+
+def bearish_engulfing(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 2:
+        return False
+    po, _, _, pc = s.last(2)
+    o, _, _, c = s.last()
+    return pc > po and c < o and o >= pc and c <= po
+
+
+def morning_star(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 3:
+        return False
+    ao, _, _, ac = s.last(3)
+    bo, _, _, bc = s.last(2)
+    co, _, _, cc = s.last()
+    body_a = abs(ac - ao)
+    body_b = abs(bc - bo)
+    return ac < ao and body_b <= body_a * 0.5 and cc > co and cc > ao - body_a * 0.5
+
+
+def evening_star(s: PatternSeries, min_bars: int, tol: float) -> bool:
+    if s.n < 3:
+        return False
+    ao, _, _, ac = s.last(3)
+    bo, _, _, bc = s.last(2)
+    co, _, _, cc = s.last()
+    body_a = abs(ac - ao)
+    body_b = abs(bc - bo)
+    return ac > ao and body_b <= body_a * 0.5 and cc < co and cc < ao + body_a * 0.5
+
+
+Detector = Callable[[PatternSeries, int, float], bool]
+
+DETECTORS: dict[str, Detector] = {
+    "doji": doji,
+    "hammer": hammer,
+    "bullish_engulfing": bullish_engulfing,
+    "bearish_engulfing": bearish_engulfing,
+    "morning_star": morning_star,
+    "evening_star": evening_star,
+    "double_bottom": double_bottom,
+    "double_top": double_top,
+    "head_and_shoulders": head_and_shoulders,
+    "inverse_head_and_shoulders": inverse_head_and_shoulders,
+}
+
+
+def evaluate(
+    series: PatternSeries,
+    names: Iterable[str],
+    *,
+    min_bars: int,
+    tol: float,
+) -> str | None:
+    """Return the first of ``names`` detected in ``series``."""
+    for name in names:
+        func = DETECTORS.get(name)
+        if func and func(series, min_bars, tol):
+            return name
+    return None
+
+
+def _address(a: np.ndarray) -> tuple[int, int, int]:
+    return a.__array_interface__["data"][0], a.shape[0], a.strides[0]
+
+
+class _Entry:
+    __slots__ = ("arrays", "key", "names", "result")
+
+    def __init__(self, s: PatternSeries, names: tuple, result: str | None) -> None:
+        # 配列への参照を保持するのでアドレスが別の足データに再利用されることはない
+        self.arrays = (s.o, s.h, s.l, s.c)
+        self.key = tuple(_address(a) for a in self.arrays)
+        self.names = names
+        self.result = result
+
+    def matches(self, s: PatternSeries, names: tuple) -> bool:
+        return names == self.names and self.key == tuple(
+            _address(a) for a in (s.o, s.h, s.l, s.c)
+        )
+
+
+class PatternScanner:
+    """Evaluate timeframes, skipping those whose bars did not change.
+
+    Only :class:`CandleFrame` inputs are cached; candle lists are parsed
+    into fresh arrays and therefore always evaluated.
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[tuple, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(
+        self,
+        key: tuple,
+        data: Iterable[Mapping],
+        names: Iterable[str],
+        *,
+        min_bars: int,
+        tol: float,
+    ) -> str | None:
+        series = PatternSeries.from_candles(data)
+        names = tuple(names)
+        if not isinstance(data, CandleFrame):
+            return evaluate(series, names, min_bars=min_bars, tol=tol)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry.matches(series, names):
+            self.hits += 1
+            return entry.result
+        self.misses += 1
+        result = evaluate(series, names, min_bars=min_bars, tol=tol)
+        with self._lock:
+            self._cache[key] = _Entry(series, names, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+__all__ = [
+    "DETECTORS",
+    "PatternScanner",
+    "PatternSeries",
+    "evaluate",
+]
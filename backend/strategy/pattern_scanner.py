@@ -1,6 +1,15 @@
-import math
+"""Chart / candlestick pattern detection.
+
+``scan`` and ``scan_all`` run the vectorized detectors of
+:mod:`backend.strategy.pattern_engine`.  The list-based ``detect_*`` / ``is_*``
+functions below are kept as the reference implementation
+(``scan_all_reference``) that the engine is regression-tested against.
+"""
+
 from typing import Iterable, Mapping
 
+from backend.market_data.candle_frame import CandleFrame
+from backend.strategy.pattern_engine import PatternScanner, PatternSeries, evaluate
 from backend.utils import env_loader
 
 CANDLE_KEYS = ('o', 'h', 'l', 'c')
@@ -22,6 +31,11 @@ def _as_list(data: Iterable[Mapping]) -> list[dict]:
     既存形式の ``{"o": ..., "h": ..., "l": ..., "c": ...}`` のどちらにも対応する。
     """
 
+    if isinstance(data, CandleFrame):
+        return [
+            {'o': o, 'h': h, 'l': l, 'c': c}
+            for o, h, l, c in zip(data.o.tolist(), data.h.tolist(), data.l.tolist(), data.c.tolist())
+        ]
     rows: list[dict] = []
     for row in data:
         base = row.get("mid") if isinstance(row.get("mid"), Mapping) else row
@@ -223,7 +237,10 @@ PATTERN_DIRECTION: dict[str, str] = {
 }
 
 
-def scan_all(data: Iterable[Mapping], pattern_names: list[str] | None = None) -> str | None:
+def scan_all_reference(
+    data: Iterable[Mapping], pattern_names: list[str] | None = None
+) -> str | None:
+    """List-based reference implementation of :func:`scan_all`."""
     rows = _as_list(data)
     names = pattern_names or list(PATTERN_FUNCS.keys())
     for name in names:
@@ -233,15 +250,37 @@ def scan_all(data: Iterable[Mapping], pattern_names: list[str] | None = None) ->
     return None
 
 
-def scan(candles_dict: dict[str, list], pattern_names: list[str]) -> dict[str, str | None]:
+def scan_all(data: Iterable[Mapping], pattern_names: list[str] | None = None) -> str | None:
+    names = pattern_names or list(PATTERN_FUNCS.keys())
+    return evaluate(
+        PatternSeries.from_candles(data),
+        names,
+        min_bars=PATTERN_MIN_BARS,
+        tol=PATTERN_TOLERANCE,
+    )
+
+
+# ループ間で変化しなかった時間足は再評価しない
+_SCANNER = PatternScanner()
+
+
+def scan(
+    candles_dict: dict[str, list],
+    pattern_names: list[str],
+    *,
+    key: str | None = None,
+) -> dict[str, str | None]:
     """Scan candle data for chart patterns per timeframe.
 
     Parameters
     ----------
     candles_dict : dict[str, list]
-        Mapping of timeframe labels to candle lists.
+        Mapping of timeframe labels to candle lists or ``CandleFrame``.
     pattern_names : list[str]
         Names of patterns to check. If empty, all available patterns are tested.
+    key : str | None
+        Series identity (e.g. the instrument) used to reuse the previous
+        result of a timeframe whose bars did not change.
 
     Returns
     -------
@@ -249,13 +288,20 @@ def scan(candles_dict: dict[str, list], pattern_names: list[str]) -> dict[str, s
         Detected pattern name for each timeframe, or ``None`` if no match.
     """
 
+    names = pattern_names or list(PATTERN_FUNCS.keys())
     results: dict[str, str | None] = {}
     for tf, candles in candles_dict.items():
         if tf.upper() in PATTERN_EXCLUDE_TFS:
             results[tf] = None
             continue
         try:
-            results[tf] = scan_all(candles, pattern_names)
+            results[tf] = _SCANNER.evaluate(
+                (key, tf),
+                candles,
+                names,
+                min_bars=PATTERN_MIN_BARS,
+                tol=PATTERN_TOLERANCE,
+            )
         except Exception:
             results[tf] = None
     return results
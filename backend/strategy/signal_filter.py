@@ -16,6 +16,7 @@ from datetime import timezone
 
 import pandas as pd
 
+from backend.config import runtime_config
 from backend.indicators.adx import calculate_adx_slope
 from backend.market_data.tick_fetcher import fetch_tick_data
 from backend.strategy.higher_tf_analysis import analyze_higher_tf
@@ -50,6 +51,14 @@ def update_overshoot_window(high: float, low: float) -> None:
         pass
 
 
+def reset_filter_state() -> None:
+    """Clear the overshoot window and timestamp kept between calls."""
+    global _last_overshoot_ts
+    _recent_highs.clear()
+    _recent_lows.clear()
+    _last_overshoot_ts = None
+
+
 def _ema_direction(fast, slow) -> str | None:
     """Return EMA-based direction."""
     try:
@@ -373,12 +382,13 @@ def pass_entry_filter(
     *,
     mode: str | None = None,
     context: dict | None = None,
+    now: datetime.datetime | None = None,
 ) -> bool:
     """Simplified entry filter.
 
     Filters only when the market is closed or during the configured quiet hours.
     The overshoot check is preserved to update ``context`` but never blocks the
-    entry.
+    entry.  ``now`` overrides the wall clock (used by the backtester).
     """
 
     global _last_overshoot_ts
@@ -401,7 +411,8 @@ def pass_entry_filter(
     else:
         quiet2_start = quiet2_end = None
 
-    now_jst = datetime.datetime.now(timezone.utc) + datetime.timedelta(hours=9)
+    now_utc = now or datetime.datetime.now(timezone.utc)
+    now_jst = now_utc + datetime.timedelta(hours=9)
     current_time = now_jst.hour + now_jst.minute / 60.0
 
     def _in_range(start: float | None, end: float | None) -> bool:
@@ -422,7 +433,7 @@ def pass_entry_filter(
         context["reason"] = "session"
         return False
 
-    if not _in_trade_hours():
+    if not _in_trade_hours(now_utc):
         logger.info("Filter blocked: market_closed")
         context["reason"] = "market_closed"
         return False
@@ -439,7 +450,7 @@ def pass_entry_filter(
         and atr_series is not None
         and len(atr_series)
     ):
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = runtime_config.current().pip_size
         bw_thresh = float(env_loader.get_env("BAND_WIDTH_THRESH_PIPS", "4"))
         bw_pips = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / pip_size
         width_ratio = (bw_pips - bw_thresh) / bw_thresh if bw_thresh != 0 else 0.0
@@ -450,14 +461,12 @@ def pass_entry_filter(
         recover_rate = float(env_loader.get_env("OVERSHOOT_RECOVERY_RATE", "0.05"))
         elapsed_min = 0.0
         if _last_overshoot_ts is not None:
-            elapsed_min = (
-                datetime.datetime.now(timezone.utc) - _last_overshoot_ts
-            ).total_seconds() / 60.0
+            elapsed_min = (now_utc - _last_overshoot_ts).total_seconds() / 60.0
         dynamic_base = min(max_mult, base_mult + recover_rate * elapsed_min)
         dynamic_mult = dynamic_base * (1 + dyn_coeff * width_ratio)
         threshold = bb_lower.iloc[-1] - atr_series.iloc[-1] * dynamic_mult
         if price is not None and price <= threshold:
-            _last_overshoot_ts = datetime.datetime.now(timezone.utc)
+            _last_overshoot_ts = now_utc
             context["overshoot_flag"] = True
             logger.info("Overshoot detected: flagging rebound opportunity")
         else:
@@ -495,7 +504,7 @@ def pass_entry_filter(
                 limit_pips = min(max(atr_pips * factor, floor), ceil)
             atr_limit_pips = atr_series.iloc[-1] * dynamic_mult / pip_size
             if (limit_pips and range_pips > limit_pips) or range_pips > atr_limit_pips:
-                _last_overshoot_ts = datetime.datetime.now(timezone.utc)
+                _last_overshoot_ts = now_utc
                 context["overshoot_flag"] = True
                 logger.info("Overshoot range detected: flag set")
 
@@ -566,7 +575,7 @@ def pass_exit_filter(indicators: dict, position_side: str) -> bool:
         cross_signal = False
 
     # fast / slow EMA がほぼ重なった、または 2 本連続で逆方向なら勢い喪失と判断
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     flat_or_cross = _ema_flat_or_cross(ema_fast, ema_slow, position_side, pip_size)
 
     return (in_neutral_band and atr_is_calm) or cross_signal or flat_or_cross
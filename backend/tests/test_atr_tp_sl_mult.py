@@ -74,7 +74,7 @@ class TestAtrTpSlMult(unittest.TestCase):
         import backend.risk_manager as rm
         self._risk_manager = rm
         self._orig_is_high_vol = rm.is_high_vol_session
-        rm.is_high_vol_session = lambda: False
+        rm.is_high_vol_session = lambda now=None: False
 
         import backend.strategy.entry_logic as el
         importlib.reload(el)
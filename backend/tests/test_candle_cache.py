@@ -0,0 +1,139 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from backend.market_data.candle_cache import CandleCache, parse_candle_time
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _ts(i: int, step: int = 60) -> str:
+    return (BASE + timedelta(seconds=step * i)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+
+
+def _candle(i: int, complete: bool = True, close: float = 1.0) -> dict:
+    c = str(close + i * 0.01)
+    return {"time": _ts(i), "mid": {"o": c, "h": c, "l": c, "c": c}, "volume": 1, "complete": complete}
+
+
+class FakeFeed:
+    """Serve a growing candle series like the OANDA candles endpoint."""
+
+    def __init__(self, n: int):
+        self.bars = [_candle(i) for i in range(n - 1)] + [_candle(n - 1, complete=False)]
+        self.calls: list[dict] = []
+
+    def advance(self):
+        n = len(self.bars)
+        self.bars[-1] = _candle(n - 1)
+        self.bars.append(_candle(n, complete=False))
+
+    def __call__(self, instrument, granularity, params, timeout):
+        self.calls.append(dict(params))
+        if "from" in params:
+            start = parse_candle_time(params["from"])
+            bars = [b for b in self.bars if parse_candle_time(b["time"]) > start]
+            return bars[: params["count"]]
+        return list(self.bars[-params["count"]:])
+
+
+class TestCandleCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = [0.0]
+        self.now = [BASE + timedelta(minutes=29, seconds=30)]
+        self.feed = FakeFeed(30)
+        self.cache = CandleCache(
+            self.feed,
+            ttl=1.0,
+            clock=lambda: self.clock[0],
+            now=lambda: self.now[0],
+        )
+
+    def test_repeated_calls_within_ttl_are_hits(self):
+        first = self.cache.get("USD_JPY", "M1", 20)
+        second = self.cache.get("USD_JPY", "M1", 10)
+        self.assertEqual(len(first), 20)
+        self.assertEqual(second, first[-10:])
+        self.assertEqual(len(self.feed.calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_expired_entry_fetches_only_delta(self):
+        self.cache.get("USD_JPY", "M1", 20)
+        self.feed.advance()
+        self.clock[0] = 5.0
+        candles = self.cache.get("USD_JPY", "M1", 20)
+        self.assertEqual(candles, self.feed.bars[-20:])
+        self.assertIn("from", self.feed.calls[-1])
+        self.assertEqual(self.feed.calls[-1]["from"], _ts(28))
+        self.assertEqual(self.cache.stats()["delta_fetches"], 1)
+
+    def test_gap_longer_than_window_reloads(self):
+        feed = FakeFeed(10)
+        now = [BASE + timedelta(minutes=9, seconds=30)]
+        cache = CandleCache(feed, clock=lambda: self.clock[0], now=lambda: now[0])
+        cache.get("USD_JPY", "M1", 5)
+        for _ in range(91):
+            feed.advance()
+        now[0] = BASE + timedelta(minutes=100, seconds=30)
+        self.clock[0] = 5.0
+        candles = cache.get("USD_JPY", "M1", 5)
+        self.assertEqual([c["time"] for c in candles], [_ts(i) for i in range(96, 101)])
+        self.assertEqual(feed.calls[-1], {"count": 5})
+
+    def test_full_delta_page_reloads(self):
+        feed = FakeFeed(10)
+        cache = CandleCache(feed, clock=lambda: self.clock[0], now=lambda: BASE)
+        cache.get("USD_JPY", "M1", 5)
+        for _ in range(20):
+            feed.advance()
+        self.clock[0] = 5.0
+        candles = cache.get("USD_JPY", "M1", 5)
+        self.assertEqual(candles, feed.bars[-5:])
+        self.assertEqual(feed.calls[-1], {"count": 5})
+
+    def test_larger_count_triggers_full_fetch(self):
+        self.cache.get("USD_JPY", "M1", 10)
+        candles = self.cache.get("USD_JPY", "M1", 25)
+        self.assertEqual(len(candles), 25)
+        self.assertEqual(self.feed.calls[-1], {"count": 25})
+        self.assertEqual(self.cache.get("USD_JPY", "M1", 10), candles[-10:])
+
+    def test_complete_only_served_until_next_bar_can_close(self):
+        self.cache.get("USD_JPY", "M1", 20, complete_only=True)
+        self.clock[0] = 10.0
+        self.cache.get("USD_JPY", "M1", 20, complete_only=True)
+        self.assertEqual(len(self.feed.calls), 1)
+        self.now[0] = BASE + timedelta(minutes=31)
+        self.cache.get("USD_JPY", "M1", 20, complete_only=True)
+        self.assertEqual(len(self.feed.calls), 2)
+
+    def test_frame_is_parsed_once_per_refresh(self):
+        frame = self.cache.get_frame("USD_JPY", "M1", 20)
+        again = self.cache.get_frame("USD_JPY", "M1", 10)
+        self.assertEqual(len(frame), 20)
+        self.assertIs(again[-1], frame[-1])
+        self.assertEqual(again.c.tolist(), frame.c[-10:].tolist())
+        self.feed.advance()
+        self.clock[0] = 5.0
+        fresh = self.cache.get_frame("USD_JPY", "M1", 20)
+        self.assertEqual(fresh.to_candles(), self.feed.bars[-20:])
+        self.assertAlmostEqual(fresh.c[-1], float(self.feed.bars[-1]["mid"]["c"]))
+
+    def test_errors_are_counted_and_raised(self):
+        def boom(*_a):
+            raise RuntimeError("down")
+
+        cache = CandleCache(boom, clock=lambda: 0.0)
+        with self.assertRaises(RuntimeError):
+            cache.get("USD_JPY", "M5", 10)
+        self.assertEqual(cache.stats()["errors"], 1)
+
+    def test_parse_candle_time_handles_nanoseconds(self):
+        dt = parse_candle_time("2024-01-01T00:01:00.123456789Z")
+        self.assertEqual(dt, BASE + timedelta(minutes=1, microseconds=123456))
+        self.assertIsNone(parse_candle_time("bad"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import importlib
+import os
+import sys
+import time
+import unittest
+
+from diagnostics.candle_fetch_benchmark import TIMEFRAMES, StubCandleServer
+
+
+class TestConcurrentMultiTimeframeFetch(unittest.TestCase):
+    def setUp(self):
+        self._env = os.environ.get("CANDLE_CACHE_ENABLED")
+        os.environ["CANDLE_CACHE_ENABLED"] = "false"
+        # 他テストのスタブが残っている場合は実モジュールを読み直す
+        if getattr(sys.modules.get("requests"), "__version__", None) is None:
+            sys.modules.pop("requests", None)
+        sys.modules.pop("backend.market_data.candle_fetcher", None)
+        self.cf = importlib.import_module("backend.market_data.candle_fetcher")
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("CANDLE_CACHE_ENABLED", None)
+        else:
+            os.environ["CANDLE_CACHE_ENABLED"] = self._env
+
+    def _fetch(self, server, **kwargs):
+        self.cf.OANDA_API_URL = server.url
+        start = time.perf_counter()
+        res = self.cf.fetch_multiple_timeframes("USD_JPY", dict(TIMEFRAMES), **kwargs)
+        return res, time.perf_counter() - start
+
+    def test_concurrent_matches_sequential_and_is_faster(self):
+        with StubCandleServer(latency=0.1) as server:
+            seq, seq_time = self._fetch(server, concurrent=False)
+            par, par_time = self._fetch(server, concurrent=True)
+        self.assertEqual(list(par), list(TIMEFRAMES))
+        self.assertEqual(par, seq)
+        self.assertEqual(len(par["H1"]), 120)
+        self.assertLess(par_time, seq_time / 2)
+
+    def test_slow_timeframe_returns_partial_result(self):
+        with StubCandleServer(latency=0.01, slow={"D": 1.0}) as server:
+            res, elapsed = self._fetch(server, concurrent=True, deadline=0.3)
+        self.assertEqual(list(res), list(TIMEFRAMES))
+        self.assertEqual(res["D"], [])
+        self.assertEqual(len(res["M5"]), 50)
+        self.assertLess(elapsed, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from backend.market_data.candle_frame import CandleFrame, as_candle_frame, as_candle_list
+
+
+def _candle(i: int, complete: bool = True) -> dict:
+    px = f"{150 + i * 0.01:.3f}"
+    return {
+        "complete": complete,
+        "volume": 10 + i,
+        "time": f"2024-01-01T00:{i:02d}:00.000000000Z",
+        "mid": {"o": px, "h": px, "l": px, "c": px},
+    }
+
+
+class TestCandleFrame(unittest.TestCase):
+    def setUp(self):
+        self.rows = [_candle(i) for i in range(9)] + [_candle(9, complete=False)]
+        self.frame = CandleFrame.from_candles(self.rows)
+
+    def test_columns_are_parsed_once(self):
+        self.assertEqual(len(self.frame), 10)
+        self.assertEqual(self.frame.c.dtype, np.float64)
+        self.assertAlmostEqual(self.frame.c[3], 150.03)
+        self.assertEqual(self.frame.volume[-1], 19)
+        self.assertFalse(self.frame.complete[-1])
+        self.assertEqual(self.frame.time[0], self.rows[0]["time"])
+
+    def test_slicing_is_zero_copy(self):
+        tail = self.frame[-5:]
+        self.assertIsInstance(tail, CandleFrame)
+        self.assertTrue(np.shares_memory(tail.c, self.frame.c))
+        self.assertIs(tail[0], self.rows[5])
+
+    def test_legacy_dict_access(self):
+        self.assertIs(self.frame[-1], self.rows[-1])
+        self.assertEqual(list(self.frame), self.rows)
+        self.assertEqual(as_candle_list(self.frame), self.rows)
+        self.assertEqual(float(self.frame[2]["mid"]["c"]), 150.02)
+
+    def test_complete_only(self):
+        done = self.frame.complete_only()
+        self.assertEqual(len(done), 9)
+        self.assertTrue(np.shares_memory(done.c, self.frame.c))
+        gap = CandleFrame.from_candles([_candle(0), _candle(1, False), _candle(2)])
+        self.assertEqual(gap.complete_only().to_candles(), [_candle(0), _candle(2)])
+
+    def test_previous_frame_rows_are_reused(self):
+        window = self.rows[2:] + [_candle(10, complete=False)]
+        frame = CandleFrame.from_candles(window, previous=self.frame)
+        expected = CandleFrame.from_candles([dict(r) for r in window])
+        for col in ("o", "h", "l", "c", "volume", "complete"):
+            np.testing.assert_array_equal(getattr(frame, col), getattr(expected, col))
+
+    def test_synthesized_rows_without_source(self):
+        f = self.frame
+        bare = CandleFrame(f.time, f.o, f.h, f.l, f.c, f.volume, f.complete)
+        row = bare[4]
+        self.assertEqual(float(row["mid"]["h"]), 150.04)
+        self.assertTrue(row["complete"])
+        self.assertEqual(len(as_candle_frame(None)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "trades.db"
+        os.environ["TRADES_DB_PATH"] = str(self.path)
+        for name in ("backend.logs.migrations", "backend.logs.log_manager"):
+            sys.modules.pop(name, None)
+        self.lm = importlib.import_module("backend.logs.log_manager")
+        self.mig = importlib.import_module("backend.logs.migrations")
+
+    def tearDown(self):
+        os.environ.pop("TRADES_DB_PATH", None)
+        self.tmp.cleanup()
+
+    def test_init_db_applies_all_steps_once(self):
+        self.lm.init_db()
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(self.mig.current_version(conn), len(self.mig.MIGRATIONS))
+            names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        self.assertIn("idx_oanda_trades_account_close", names)
+        self.assertIn("idx_prompt_logs_time", names)
+        # 2 回目は何もしない
+        self.lm.init_db()
+
+    def test_summary_query_uses_index(self):
+        self.lm.init_db()
+        with sqlite3.connect(self.path) as conn:
+            plan = " ".join(
+                str(r[-1])
+                for r in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT COUNT(*), SUM(realized_pl) FROM oanda_trades "
+                    "WHERE account_id = ? AND close_time BETWEEN ? AND ?",
+                    ("a", "2024", "2025"),
+                )
+            )
+        self.assertIn("COVERING INDEX idx_oanda_trades_account_close", plan)
+
+    def test_failed_step_is_rolled_back(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        steps = [
+            ("ok", ["CREATE TABLE a (x)"]),
+            ("bad", ["CREATE TABLE b (x)", "CREATE TABLE a (x)"]),
+        ]
+        with self.assertRaises(sqlite3.OperationalError):
+            self.mig.apply_migrations(conn, steps)
+        self.assertEqual(self.mig.current_version(conn), 1)
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+        self.assertNotIn("b", tables)
+        conn.close()
+
+
+class TestArchiveLogs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "trades.db"
+        os.environ["TRADES_DB_PATH"] = str(self.path)
+        sys.modules.pop("backend.logs.log_manager", None)
+        importlib.import_module("backend.logs.log_manager").init_db()
+        self.now = datetime(2024, 6, 15, tzinfo=timezone.utc)
+        with sqlite3.connect(self.path) as conn:
+            for days in (200, 100, 40, 1):
+                ts = (self.now - timedelta(days=days)).isoformat()
+                conn.execute(
+                    "INSERT INTO prompt_logs (timestamp, decision_type, instrument, prompt, response)"
+                    " VALUES (?,?,?,?,?)",
+                    (ts, "ENTRY", "USD_JPY", "p", "r"),
+                )
+                conn.execute(
+                    "INSERT INTO ai_decisions (timestamp, decision_type, instrument, ai_response)"
+                    " VALUES (?,?,?,?)",
+                    (ts, "ENTRY", "USD_JPY", "{}"),
+                )
+
+    def tearDown(self):
+        os.environ.pop("TRADES_DB_PATH", None)
+        self.tmp.cleanup()
+
+    def test_rows_moved_to_monthly_archives(self):
+        from maintenance.archive_logs import archive_old_logs
+
+        out = Path(self.tmp.name) / "archive"
+        moved = archive_old_logs(db_path=self.path, archive_dir=out, now=self.now, chunk_size=1)
+        self.assertEqual(moved, {"prompt_logs": 3, "ai_decisions": 2})
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM prompt_logs").fetchone()[0], 1)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM ai_decisions").fetchone()[0], 2)
+        files = sorted(p.name for p in out.iterdir())
+        self.assertEqual(files, ["logs_2023-11.db", "logs_2024-03.db", "logs_2024-05.db"])
+        with sqlite3.connect(out / "logs_2024-03.db") as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM ai_decisions").fetchone()[0], 1)
+        # 再実行しても重複しない
+        again = archive_old_logs(db_path=self.path, archive_dir=out, now=self.now)
+        self.assertEqual(again, {"prompt_logs": 0, "ai_decisions": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from backend.logs import db_pool
+
+
+class TestThreadConnection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "t.db"
+        sqlite3.connect(self.path).close()
+
+    def tearDown(self):
+        db_pool.close_thread_connection()
+        self.tmp.cleanup()
+
+    def test_reused_within_thread(self):
+        a = db_pool.thread_connection(self.path)
+        a.close()
+        b = db_pool.thread_connection(self.path)
+        self.assertIs(a, b)
+        b.execute("SELECT 1")
+
+    def test_separate_per_thread(self):
+        main = db_pool.thread_connection(self.path)
+        other = []
+
+        def worker():
+            other.append(db_pool.thread_connection(self.path))
+            db_pool.close_thread_connection()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertIsNot(main, other[0])
+
+    def test_discard_reconnects(self):
+        a = db_pool.thread_connection(self.path)
+        db_pool.discard(self.path)
+        b = db_pool.thread_connection(self.path)
+        self.assertIsNot(a, b)
+
+
+class TestBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "w.db"
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE t (v INTEGER)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _count(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+    def test_rows_batched(self):
+        writer = db_pool.BatchWriter(batch_size=50, flush_interval=0.5)
+        for i in range(120):
+            self.assertTrue(writer.submit(self.path, "INSERT INTO t VALUES (?)", (i,)))
+        self.assertTrue(writer.flush(5))
+        stats = writer.stats()
+        writer.stop()
+        self.assertEqual(self._count(), 120)
+        self.assertEqual(stats["written"], 120)
+        self.assertLess(stats["batches"], 120)
+        self.assertEqual(stats["depth"], 0)
+
+    def test_stop_flushes_pending(self):
+        writer = db_pool.BatchWriter(batch_size=1000, flush_interval=5.0)
+        for i in range(10):
+            writer.submit(self.path, "INSERT INTO t VALUES (?)", (i,))
+        writer.stop()
+        self.assertEqual(self._count(), 10)
+        self.assertFalse(writer.submit(self.path, "INSERT INTO t VALUES (?)", (0,)))
+
+    def test_bad_row_does_not_drop_batch(self):
+        writer = db_pool.BatchWriter(batch_size=10, flush_interval=0.5)
+        writer.submit(self.path, "INSERT INTO t VALUES (?)", (1,))
+        writer.submit(self.path, "INSERT INTO missing VALUES (?)", (2,))
+        writer.submit(self.path, "INSERT INTO t VALUES (?)", (3,))
+        writer.stop()
+        self.assertEqual(self._count(), 2)
+        self.assertEqual(writer.stats()["errors"], 1)
+
+    def test_full_queue_rejects(self):
+        writer = db_pool.BatchWriter(max_queue=1, batch_size=1, flush_interval=0.01)
+        block = threading.Event()
+        writer._write = lambda batch: block.wait(5)
+        writer.submit(self.path, "INSERT INTO t VALUES (?)", (0,))
+        accepted = [
+            writer.submit(self.path, "INSERT INTO t VALUES (?)", (i,)) for i in range(5)
+        ]
+        block.set()
+        writer.stop()
+        self.assertIn(False, accepted)
+        self.assertGreater(writer.stats()["rejected"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,7 +13,7 @@ class TestHigherTFPivot(unittest.TestCase):
                 self._added.append(name)
         fetcher = types.ModuleType("backend.market_data.candle_fetcher")
         self.day_count = None
-        def fake_fetch_candles(pair, granularity="M1", count=0):
+        def fake_fetch_candles(pair, granularity="M1", count=0, **_kwargs):
             if granularity == "D":
                 self.day_count = count
                 return [{"complete": True, "mid": {"h": "2", "l": "1", "c": "1.5"}}]
@@ -0,0 +1,185 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+from backend.utils import llm_cache
+
+
+class TestSemanticKey(unittest.TestCase):
+    def test_small_float_changes_share_key(self):
+        a = {"indicators": {"rsi": 55.312, "adx": 24.01}, "time": "2024-01-01T00:00:00Z"}
+        b = {"time": "2024-01-01T00:05:00Z", "indicators": {"adx": 24.04, "rsi": 55.349}}
+        self.assertEqual(
+            llm_cache.semantic_key("m", "t", a, digits=3),
+            llm_cache.semantic_key("m", "t", b, digits=3),
+        )
+        c = {"indicators": {"rsi": 61.0, "adx": 24.01}}
+        self.assertNotEqual(
+            llm_cache.semantic_key("m", "t", a, digits=3),
+            llm_cache.semantic_key("m", "t", c, digits=3),
+        )
+        self.assertNotEqual(
+            llm_cache.semantic_key("m", "t", a, digits=3),
+            llm_cache.semantic_key("m", "other", a, digits=3),
+        )
+
+    def _market_ctx(self, close: str, rsi: float, instrument: str = "USD_JPY") -> dict:
+        # get_market_condition に渡る形 (OANDA の mid は文字列)
+        candle = {
+            "time": "2024-01-01T00:05:00.000000000Z",
+            "volume": 42,
+            "complete": True,
+            "mid": {"o": close, "h": close, "l": close, "c": close},
+        }
+        return {
+            "instrument": instrument,
+            "context": {
+                "indicators": {"rsi": rsi, "atr": 0.0812, "ema_fast": float(close)},
+                "candles_m5": [candle],
+            },
+            "bw_pips": None,
+        }
+
+    def test_prices_are_quantized_in_pips(self):
+        key = lambda ctx: llm_cache.semantic_key("m", "t", ctx, digits=3)
+        base = key(self._market_ctx("150.121", 55.31))
+        # 1 pip 未満の揺れは同じキー
+        self.assertEqual(base, key(self._market_ctx("150.124", 55.34)))
+        # 3 桁丸めだと 150 に潰れていた値動き
+        self.assertNotEqual(base, key(self._market_ctx("150.49", 55.31)))
+        self.assertNotEqual(base, key(self._market_ctx("150.141", 55.31)))
+        eur = lambda c: key(self._market_ctx(c, 55.31, "EUR_USD"))
+        self.assertEqual(eur("1.08512"), eur("1.08514"))
+        self.assertNotEqual(eur("1.08512"), eur("1.08534"))
+
+    def test_numeric_strings_match_floats(self):
+        as_str = llm_cache.canonicalize({"mid": {"c": "150.123"}, "units": "1000"})
+        as_float = llm_cache.canonicalize({"mid": {"c": 150.1234}, "units": "1000"})
+        self.assertEqual(as_str, as_float)
+        self.assertEqual(as_str["mid"]["c"], 150.12)
+        self.assertEqual(as_str["units"], "1000")
+
+    def test_prompt_text_numbers_quantized(self):
+        self.assertEqual(
+            llm_cache.quantize_text("rsi=55.312 price 150.1234", 4),
+            "rsi=55.31 price 150.1",
+        )
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        self.now = [1000.0]
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _backends(self):
+        clock = lambda: self.now[0]
+        yield llm_cache.MemoryLLMCache(ttl_sec=60, max_entries=2, clock=clock)
+        yield llm_cache.SQLiteLLMCache(
+            os.path.join(self.tmp.name, "c.db"), ttl_sec=60, max_entries=2, clock=clock
+        )
+
+    def test_ttl_lru_and_stats(self):
+        for cache in self._backends():
+            with self.subTest(cache=type(cache).__name__):
+                cache.clear()
+                self.now[0] = 1000.0
+                cache.set("a", {"v": 1})
+                self.now[0] += 1
+                cache.set("b", {"v": 2})
+                self.now[0] += 1
+                self.assertEqual(cache.get("a"), {"v": 1})
+                self.now[0] += 1
+                cache.set("c", {"v": 3})
+                # b は最も長く参照されていないので追い出される
+                self.assertIsNone(cache.get("b"))
+                self.assertEqual(cache.get("c"), {"v": 3})
+                self.now[0] += 120
+                self.assertIsNone(cache.get("a"))
+                st = cache.stats()
+                self.assertEqual(st["hits"], 2)
+                self.assertEqual(st["misses"], 2)
+                self.assertEqual(st["evictions"], 1)
+                self.assertAlmostEqual(st["hit_rate"], 0.5)
+
+    def test_sqlite_survives_reopen(self):
+        path = os.path.join(self.tmp.name, "p.db")
+        first = llm_cache.SQLiteLLMCache(path, ttl_sec=60)
+        first.set("k", {"market_condition": "trend"})
+        first.close()
+        second = llm_cache.SQLiteLLMCache(path, ttl_sec=60)
+        self.assertEqual(second.get("k"), {"market_condition": "trend"})
+        self.assertEqual(len(second), 1)
+
+
+class TestAskOpenAISemanticCache(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("OPENAI_API_KEY", "dummy")
+        os.environ["MAX_AI_CALLS_PER_LOOP"] = "100"
+        self.calls = []
+        calls = self.calls
+
+        class DummyClient:
+            def __init__(self, *a, **k):
+                self.chat = types.SimpleNamespace(
+                    completions=types.SimpleNamespace(create=self._create)
+                )
+
+            @staticmethod
+            def _create(**kwargs):
+                calls.append(kwargs["messages"][1]["content"])
+                return types.SimpleNamespace(
+                    choices=[
+                        types.SimpleNamespace(
+                            message=types.SimpleNamespace(content=json.dumps({"n": len(calls)}))
+                        )
+                    ]
+                )
+
+        stub = types.ModuleType("openai")
+        stub.OpenAI = DummyClient
+        stub.APIError = Exception
+        self._saved = sys.modules.get("openai")
+        sys.modules["openai"] = stub
+        sys.modules.pop("backend.utils.openai_client", None)
+        self.oc = importlib.import_module("backend.utils.openai_client")
+        self.tmp = tempfile.TemporaryDirectory()
+        llm_cache.set_cache(
+            llm_cache.SQLiteLLMCache(os.path.join(self.tmp.name, "llm.db"), ttl_sec=600)
+        )
+
+    def tearDown(self):
+        llm_cache.set_cache(None)
+        self.tmp.cleanup()
+        if self._saved is None:
+            sys.modules.pop("openai", None)
+        else:
+            sys.modules["openai"] = self._saved
+        os.environ.pop("MAX_AI_CALLS_PER_LOOP", None)
+
+    def test_near_identical_context_hits_cache(self):
+        ctx1 = {"rsi": 55.312, "adx": 24.01}
+        ctx2 = {"rsi": 55.349, "adx": 24.04}
+        r1 = self.oc.ask_openai(json.dumps(ctx1), template_id="regime", cache_context=ctx1)
+        r2 = self.oc.ask_openai(json.dumps(ctx2), template_id="regime", cache_context=ctx2)
+        self.assertEqual(r1, r2)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(llm_cache.stats()["hits"], 1)
+
+    def test_cache_survives_process_restart(self):
+        self.oc.ask_openai("rsi 55.312")
+        # プロセス再起動相当: メモリキャッシュを捨てて再読み込み
+        sys.modules.pop("backend.utils.openai_client", None)
+        oc = importlib.import_module("backend.utils.openai_client")
+        self.assertEqual(oc.ask_openai("rsi 55.349"), {"n": 1})
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
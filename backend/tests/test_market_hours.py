@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime, timezone
+
+from backend.market_data.market_hours import TradeableStatus, fx_market_open
+
+# 2024-01-03 は水曜日, 2024-01-06 は土曜日
+WEDNESDAY = datetime(2024, 1, 3, 12, tzinfo=timezone.utc)
+SATURDAY = datetime(2024, 1, 6, 12, tzinfo=timezone.utc)
+
+
+class TestFxCalendar(unittest.TestCase):
+    def test_weekly_session(self):
+        self.assertTrue(fx_market_open(WEDNESDAY))
+        self.assertFalse(fx_market_open(SATURDAY))
+        # 金曜 17:00 NY (冬時間 22:00 UTC) でクローズ
+        self.assertTrue(fx_market_open(datetime(2024, 1, 5, 21, 59, tzinfo=timezone.utc)))
+        self.assertFalse(fx_market_open(datetime(2024, 1, 5, 22, 0, tzinfo=timezone.utc)))
+        # 夏時間は 21:00 UTC にオープン
+        self.assertFalse(fx_market_open(datetime(2024, 7, 7, 20, 59, tzinfo=timezone.utc)))
+        self.assertTrue(fx_market_open(datetime(2024, 7, 7, 21, 0, tzinfo=timezone.utc)))
+
+
+class TestTradeableStatus(unittest.TestCase):
+    def setUp(self):
+        self.clock = [0.0]
+        self.now = [WEDNESDAY]
+        self.calls = []
+        self.answer = True
+        self.status = TradeableStatus(
+            self._check,
+            refresh_sec=300,
+            clock=lambda: self.clock[0],
+            now=lambda: self.now[0],
+        )
+
+    def _check(self, instrument):
+        self.calls.append(instrument)
+        return self.answer
+
+    def test_cached_until_refresh_interval(self):
+        for _ in range(5):
+            self.assertTrue(self.status.is_tradeable("USD_JPY"))
+        self.assertEqual(len(self.calls), 1)
+        self.clock[0] = 301
+        self.status.is_tradeable("USD_JPY")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_feed_change_triggers_verification(self):
+        self.status.is_tradeable("USD_JPY")
+        self.status.observe("USD_JPY", True)
+        self.status.is_tradeable("USD_JPY")
+        self.assertEqual(len(self.calls), 1)
+        self.answer = False
+        self.status.observe("USD_JPY", False)
+        self.assertFalse(self.status.is_tradeable("USD_JPY"))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_weekend_skips_api(self):
+        self.now[0] = SATURDAY
+        self.assertFalse(self.status.is_tradeable("USD_JPY"))
+        self.assertEqual(self.calls, [])
+        self.now[0] = WEDNESDAY
+        self.assertTrue(self.status.is_tradeable("USD_JPY"))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_api_error_falls_back_to_feed(self):
+        self.status.is_tradeable("USD_JPY")
+        self.answer = None
+        self.status.observe("USD_JPY", False)
+        self.assertFalse(self.status.is_tradeable("USD_JPY"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import types
+import unittest
+
+
+def _response(content: str):
+    return types.SimpleNamespace(
+        choices=[
+            types.SimpleNamespace(
+                message=types.SimpleNamespace(content=json.dumps({"echo": content}))
+            )
+        ]
+    )
+
+
+class TestOpenAIConcurrency(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("OPENAI_API_KEY", "dummy")
+        os.environ["MAX_AI_CALLS_PER_LOOP"] = "100"
+        self.calls = []
+        self.release = threading.Event()
+        calls = self.calls
+        release = self.release
+
+        class DummyClient:
+            def __init__(self, *a, **k):
+                self.chat = types.SimpleNamespace(
+                    completions=types.SimpleNamespace(create=self._create)
+                )
+
+            @staticmethod
+            def _create(**kwargs):
+                calls.append(("sync", kwargs["messages"][1]["content"]))
+                release.wait(2)
+                return _response(kwargs["messages"][1]["content"])
+
+        class DummyAsyncClient:
+            def __init__(self, *a, **k):
+                self.chat = types.SimpleNamespace(
+                    completions=types.SimpleNamespace(create=self._create)
+                )
+
+            @staticmethod
+            async def _create(**kwargs):
+                calls.append(("async", kwargs["messages"][1]["content"]))
+                await asyncio.sleep(0.05)
+                return _response(kwargs["messages"][1]["content"])
+
+        openai_stub = types.ModuleType("openai")
+        openai_stub.OpenAI = DummyClient
+        openai_stub.AsyncOpenAI = DummyAsyncClient
+        openai_stub.APIError = Exception
+        self._saved = sys.modules.get("openai")
+        sys.modules["openai"] = openai_stub
+
+        sys.modules.pop("backend.utils.openai_client", None)
+        self.oc = importlib.import_module("backend.utils.openai_client")
+        self.oc.llm_cache.set_cache(None)
+
+    def tearDown(self):
+        self.release.set()
+        if self._saved is None:
+            sys.modules.pop("openai", None)
+        else:
+            sys.modules["openai"] = self._saved
+        os.environ.pop("MAX_AI_CALLS_PER_LOOP", None)
+
+    def test_identical_sync_requests_are_coalesced(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.oc.ask_openai("same")))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        self.release.set()
+        for t in threads:
+            t.join(2)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [{"echo": "same"}] * 4)
+        self.assertEqual(self.oc.stats["coalesced"], 3)
+
+    def test_async_requests_share_one_call(self):
+        async def run():
+            return await asyncio.gather(
+                self.oc.ask_openai_async("a"),
+                self.oc.ask_openai_async("a"),
+                self.oc.ask_openai_async("b"),
+            )
+
+        res = asyncio.run(run())
+        self.assertEqual(res, [{"echo": "a"}, {"echo": "a"}, {"echo": "b"}])
+        self.assertEqual(sorted(self.calls), [("async", "a"), ("async", "b")])
+        # 完了後はキャッシュから返る
+        self.assertEqual(self.oc.ask_openai("a"), {"echo": "a"})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failure_propagates_to_followers(self):
+        def boom(**_kwargs):
+            self.release.wait(2)
+            raise ValueError("down")
+
+        self.oc._get_client().chat.completions.create = boom
+        errors = []
+
+        def call():
+            try:
+                self.oc.ask_openai("x")
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        self.release.set()
+        for t in threads:
+            t.join(2)
+        self.assertEqual(len(errors), 2)
+        self.assertFalse(self.oc._inflight)
+        self.assertNotIn(("gpt-4.1-nano", "You are a helpful assistant.", "x", 1), self.oc._cache)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waiting_caller_does_not_hold_lock(self):
+        from backend.utils.rate_limiter import TokenBucket
+
+        bucket = TokenBucket(rate=60, capacity=1)
+        bucket.acquire()
+        t = threading.Thread(target=bucket.acquire)
+        t.start()
+        time.sleep(0.05)
+        # 待機中のスレッドがいてもロックは即座に取得できる
+        self.assertTrue(bucket.lock.acquire(timeout=0.1))
+        bucket.lock.release()
+        self.assertGreater(bucket.reserve(), 1.0)
+        t.join(3)
+
+    def test_async_acquire(self):
+        from backend.utils.rate_limiter import TokenBucket
+
+        bucket = TokenBucket(rate=6000, capacity=1)
+
+        async def run():
+            await bucket.acquire_async()
+            start = time.monotonic()
+            await bucket.acquire_async()
+            return time.monotonic() - start
+
+        self.assertGreater(asyncio.run(run()), 0.005)
+
+
+class TestLLMPool(unittest.TestCase):
+    def test_inline_when_single_worker(self):
+        from backend.utils import llm_pool
+
+        os.environ["LLM_CONCURRENCY"] = "1"
+        try:
+            fut = llm_pool.submit(lambda x: x * 2, 3)
+            self.assertTrue(fut.done())
+            self.assertEqual(fut.result(), 6)
+            err = llm_pool.submit(lambda: 1 / 0)
+            with self.assertRaises(ZeroDivisionError):
+                err.result()
+        finally:
+            os.environ.pop("LLM_CONCURRENCY", None)
+
+    def test_calls_overlap(self):
+        from backend.utils import llm_pool
+
+        os.environ["LLM_CONCURRENCY"] = "3"
+        try:
+            start = time.monotonic()
+            futs = [llm_pool.submit(time.sleep, 0.2) for _ in range(3)]
+            for f in futs:
+                f.result()
+            self.assertLess(time.monotonic() - start, 0.5)
+        finally:
+            llm_pool.shutdown()
+            os.environ.pop("LLM_CONCURRENCY", None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import contextvars
+import importlib
+import os
+import unittest
+
+
+class TestOpenAICallBudget(unittest.TestCase):
+    def setUp(self):
+        os.environ["LLM_CONCURRENCY"] = "2"
+        import backend.utils.llm_pool as pool
+        import backend.utils.openai_client as oc
+
+        self.oc = importlib.reload(oc)
+        self.pool = pool
+
+    def tearDown(self):
+        self.pool.shutdown()
+        os.environ.pop("LLM_CONCURRENCY", None)
+
+    def _cycle(self, limit):
+        # ランナー 1 ループ分: 自分の予算を張ってプール経由で呼ぶ
+        self.oc.reset_call_counter(limit)
+        results = []
+        for _ in range(limit + 1):
+            try:
+                self.pool.submit(self.oc._count_call).result()
+                results.append(True)
+            except RuntimeError:
+                results.append(False)
+        return results
+
+    def test_runners_have_separate_budgets(self):
+        self.oc.set_call_limit(1)
+        usd = contextvars.copy_context().run(self._cycle, 2)
+        eur = contextvars.copy_context().run(self._cycle, 2)
+        self.assertEqual(usd, [True, True, False])
+        self.assertEqual(eur, [True, True, False])
+        # 予算を張っていない呼び出しは従来どおりプロセス全体のカウンタ
+        self.oc._count_call()
+        with self.assertRaises(RuntimeError):
+            self.oc._count_call()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import random
+import unittest
+
+from backend.market_data.candle_frame import CandleFrame
+from backend.strategy import pattern_engine as pe
+from backend.strategy import pattern_scanner as ps
+
+
+def _candles(rng, n, step):
+    """Random walk on a coarse grid so ties / tolerance hits are common."""
+    rows = []
+    price = 1.0
+    for _ in range(n):
+        o = price
+        c = round(o + rng.choice((-2, -1, 0, 1, 2)) * step, 4)
+        h = round(max(o, c) + rng.choice((0, 1, 2)) * step, 4)
+        l = round(min(o, c) - rng.choice((0, 1, 2)) * step, 4)
+        rows.append({"mid": {"o": str(o), "h": str(h), "l": str(l), "c": str(c)}})
+        price = c
+    return rows
+
+
+class TestPatternEngineOracle(unittest.TestCase):
+    def test_matches_reference_for_every_pattern(self):
+        rng = random.Random(7)
+        names = list(ps.PATTERN_FUNCS)
+        for i in range(3000):
+            rows = _candles(rng, rng.randint(0, 40), rng.choice((0.001, 0.005, 0.01)))
+            series = pe.PatternSeries.from_candles(CandleFrame.from_candles(rows))
+            ref_rows = ps._as_list(rows)
+            for name in names:
+                expected = ps.PATTERN_FUNCS[name](ref_rows)
+                got = pe.DETECTORS[name](series, ps.PATTERN_MIN_BARS, ps.PATTERN_TOLERANCE)
+                self.assertEqual(got, expected, f"{name} case {i}: {ref_rows}")
+            rng.shuffle(names)
+            self.assertEqual(ps.scan_all(rows, names), ps.scan_all_reference(rows, names))
+
+    def test_flat_dicts_and_frames_agree(self):
+        rows = _candles(random.Random(1), 30, 0.01)
+        flat = ps._as_list(rows)
+        self.assertEqual(ps.scan_all(flat), ps.scan_all_reference(flat))
+        self.assertEqual(ps.scan_all(CandleFrame.from_candles(rows)), ps.scan_all_reference(rows))
+
+
+class TestPatternScannerCache(unittest.TestCase):
+    def test_unchanged_timeframes_are_not_reevaluated(self):
+        scanner = pe.PatternScanner()
+        rows = _candles(random.Random(3), 50, 0.01)
+        frame = CandleFrame.from_candles(rows)
+        kw = {"min_bars": 5, "tol": 0.005}
+        first = scanner.evaluate(("USD_JPY", "H1"), frame, ["double_top"], **kw)
+        # キャッシュから返されるのと同じビュー
+        again = scanner.evaluate(("USD_JPY", "H1"), frame[-50:], ["double_top"], **kw)
+        self.assertEqual(first, again)
+        self.assertEqual((scanner.hits, scanner.misses), (1, 1))
+
+        # 新しい足が追加されたら再評価する
+        rows2 = rows[1:] + _candles(random.Random(4), 1, 0.01)
+        frame2 = CandleFrame.from_candles(rows2, previous=frame)
+        self.assertEqual(
+            scanner.evaluate(("USD_JPY", "H1"), frame2, ["double_top"], **kw),
+            ps.scan_all_reference(rows2, ["double_top"]),
+        )
+        # 別の通貨ペアは別キャッシュ、リストは常に評価
+        scanner.evaluate(("EUR_USD", "H1"), frame, ["double_top"], **kw)
+        scanner.evaluate(("EUR_USD", "M1"), rows, ["double_top"], **kw)
+        self.assertEqual((scanner.hits, scanner.misses), (1, 3))
+
+    def test_scan_uses_key(self):
+        rows = _candles(random.Random(5), 40, 0.01)
+        frames = {"M5": CandleFrame.from_candles(rows), "H1": []}
+        out = ps.scan(frames, [], key="USD_JPY")
+        self.assertEqual(out["M5"], ps.scan_all_reference(rows))
+        self.assertIsNone(out["H1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
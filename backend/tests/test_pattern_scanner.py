@@ -82,7 +82,6 @@ class TestPatternScanner(unittest.TestCase):
                 sys.modules[name] = mod
                 self._added.append(name)
         add("requests", types.ModuleType("requests"))
-        add("numpy", types.ModuleType("numpy"))
         dotenv_stub = types.ModuleType("dotenv")
         dotenv_stub.load_dotenv = lambda *a, **k: None
         add("dotenv", dotenv_stub)
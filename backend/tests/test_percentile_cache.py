@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from backend.indicators.percentile_cache import DailyPercentileCache, percentile_rank_sorted
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _ts(day: int) -> str:
+    return (BASE + timedelta(days=day)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+
+
+class TestDailyPercentileCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = [0.0]
+        self.now = [BASE + timedelta(days=10, hours=3)]
+        self.last_day = 9
+        self.calls = 0
+        self.cache = DailyPercentileCache(
+            retry_sec=300,
+            clock=lambda: self.clock[0],
+            now=lambda: self.now[0],
+        )
+
+    def _loader(self, pair, days):
+        self.calls += 1
+        return {"atr": [1.0, 2.0, 3.0, 4.0]}, _ts(self.last_day)
+
+    def test_rank_matches_searchsorted_semantics(self):
+        values = [1.0, 2.0, 2.0, 3.0]
+        self.assertEqual(percentile_rank_sorted(values, 2.0), 75.0)
+        self.assertEqual(percentile_rank_sorted(values, 0.5), 0.0)
+        self.assertEqual(percentile_rank_sorted(values, 9.0), 100.0)
+        self.assertIsNone(percentile_rank_sorted([], 1.0))
+
+    def test_loaded_once_per_daily_close(self):
+        for _ in range(5):
+            self.assertEqual(self.cache.rank("USD_JPY", 90, self._loader, "atr", 2.5), 50.0)
+        self.assertEqual(self.calls, 1)
+        # 次の日足が確定し得る時刻を過ぎたら再取得
+        self.now[0] = BASE + timedelta(days=11, minutes=1)
+        self.last_day = 10
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.assertEqual(self.calls, 2)
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.assertEqual(self.calls, 2)
+
+    def test_no_new_bar_retries_after_interval(self):
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.now[0] = BASE + timedelta(days=13)
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.assertEqual(self.calls, 2)
+        self.clock[0] = 301
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.assertEqual(self.calls, 3)
+
+    def test_keys_are_per_pair(self):
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.cache.get("EUR_USD", 90, self._loader)
+        self.assertEqual(self.calls, 2)
+        self.cache.invalidate("USD_JPY")
+        self.cache.get("USD_JPY", 90, self._loader)
+        self.assertEqual(self.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -66,5 +66,97 @@ class TestReconcileTrades(unittest.TestCase):
         self.assertEqual(row[1], "2024-01-01T01:00:00Z")
         self.assertAlmostEqual(row[2], 1.1)
 
+    def _add_trade(self, entry_time, instrument="EUR_USD"):
+        conn = self.lm.get_db_connection()
+        cur = conn.execute(
+            "INSERT INTO trades (instrument, entry_time, entry_price, units) VALUES (?,?,?,?)",
+            (instrument, entry_time, 1.0, 1000),
+        )
+        conn.commit()
+        conn.close()
+        return cur.lastrowid
+
+    def _watermark(self):
+        conn = self.lm.get_db_connection()
+        row = conn.execute(
+            "SELECT value FROM sync_state WHERE key = 'reconcile_watermark'"
+        ).fetchone()
+        conn.close()
+        return int(row[0]) if row else None
+
+    def test_watermark_skips_reconciled_and_stale_trades(self):
+        from datetime import datetime, timezone
+
+        now = datetime(2024, 1, 20, tzinfo=timezone.utc)
+        # 1: 照合済みになる, 2: 古く OANDA に対応なし, 3: 直近でまだ対応なし
+        self._add_trade("2024-01-02T00:00:00Z")
+        pending = self._add_trade("2024-01-19T12:00:00+00:00")
+        self.assertEqual(self.rt.reconcile_trades(now=now), 1)
+        self.assertEqual(self._watermark(), pending - 1)
+
+        conn = self.lm.get_db_connection()
+        conn.execute(
+            """
+            INSERT INTO oanda_trades (trade_id, instrument, open_time, close_time, open_price, close_price, units, realized_pl, state)
+            VALUES (11, 'EUR_USD', '2024-01-19T12:00:30.123456789Z', '2024-01-19T13:00:00Z', 1.0, 0.9, 1000, -2.0, 'CLOSED')
+            """
+        )
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.rt.reconcile_trades(now=now), 1)
+        self.assertEqual(self._watermark(), pending)
+        self.assertEqual(self.rt.reconcile_trades(now=now), 0)
+
+        conn = self.lm.get_db_connection()
+        pl = conn.execute(
+            "SELECT profit_loss FROM trades WHERE trade_id = ?", (pending,)
+        ).fetchone()[0]
+        conn.close()
+        self.assertAlmostEqual(pl, -2.0)
+
+    def test_trade_closed_locally_gets_realized_pl(self):
+        # 決済時に推定損益で記録済みの行も OANDA の確定値で上書きする
+        conn = self.lm.get_db_connection()
+        conn.execute(
+            "UPDATE trades SET exit_time = ?, exit_price = ?, profit_loss = ? WHERE trade_id = 1",
+            ("2024-01-01T00:59:58Z", 1.09, 1.4),
+        )
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.rt.reconcile_trades(), 1)
+        self.assertEqual(self.rt.reconcile_trades(), 0)
+
+        conn = self.lm.get_db_connection()
+        row = conn.execute(
+            "SELECT profit_loss, exit_time, exit_price, pl_reconciled FROM trades WHERE trade_id = 1"
+        ).fetchone()
+        conn.close()
+        self.assertAlmostEqual(row[0], 1.5)
+        self.assertEqual(row[1], "2024-01-01T01:00:00Z")
+        self.assertAlmostEqual(row[2], 1.1)
+        self.assertEqual(row[3], 1)
+
+    def test_open_oanda_trade_keeps_trade_pending(self):
+        conn = self.lm.get_db_connection()
+        conn.execute("UPDATE oanda_trades SET close_time = NULL, state = 'OPEN'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.rt.reconcile_trades(), 0)
+        self.assertEqual(self._watermark(), None)
+
+    def test_lookup_uses_indexes(self):
+        conn = self.lm.get_db_connection()
+        plan = " ".join(
+            r[3]
+            for r in conn.execute(
+                "EXPLAIN QUERY PLAN " + self.rt._MATCH_SQL,
+                {"lo": "-60 seconds", "hi": "+61 seconds", "watermark": 0, "match_sec": 60},
+            )
+        )
+        conn.close()
+        self.assertIn("idx_trades_unreconciled", plan)
+        self.assertIn("idx_oanda_trades_instrument_open", plan)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,188 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+from backend.indicators import rolling
+
+
+def _ticks(rng, n):
+    rows = []
+    price = 150.0
+    for i in range(n):
+        close = round(price + rng.gauss(0, 0.05), 3)
+        high = max(price, close) + abs(rng.gauss(0, 0.02))
+        low = min(price, close) - abs(rng.gauss(0, 0.02))
+        # 出来高ゼロ区間や横ばい区間も混ぜる
+        vol = 0.0 if (i // 30) % 4 == 3 else float(rng.randint(1, 500))
+        if (i // 50) % 5 == 4:
+            high = low = close = price
+        rows.append({"high": high, "low": low, "close": close, "volume": vol})
+        price = close
+    return rows
+
+
+def _tr(t, prev_close):
+    if prev_close is None:
+        return t["high"] - t["low"]
+    return max(t["high"] - t["low"], abs(t["high"] - prev_close), abs(t["low"] - prev_close))
+
+
+def _ref_atr(ticks, n):
+    out, prev, ema, alpha = [], None, None, 2 / (n + 1)
+    trs = []
+    for t in ticks:
+        trs.append(_tr(t, prev))
+        prev = t["close"]
+        win = trs[-n:]
+        atr = sum(win) / len(win)
+        ema = atr if ema is None else ema + alpha * (atr - ema)
+        out.append(atr / ema if ema else 1.0)
+    return out
+
+
+def _ref_adx(ticks, n):
+    out, prev, adx, prev_adx = [], None, None, None
+    trs, pdm, mdm = [], [], []
+    for t in ticks:
+        if prev is None:
+            prev = t
+            out.append((0.0, 0.0))
+            continue
+        up = t["high"] - prev["high"]
+        down = prev["low"] - t["low"]
+        trs.append(_tr(t, prev["close"]))
+        pdm.append(up if up > down and up > 0 else 0.0)
+        mdm.append(down if down > up and down > 0 else 0.0)
+        prev = t
+        if len(trs) < n:
+            out.append((0.0, 0.0))
+            continue
+        atr = sum(trs[-n:]) / n
+        dip = 100 * (sum(pdm[-n:]) / n) / atr if atr else 0.0
+        dim = 100 * (sum(mdm[-n:]) / n) / atr if atr else 0.0
+        denom = dip + dim
+        dx = 100 * abs(dip - dim) / denom if denom else 0.0
+        adx = dx if adx is None else (adx * (n - 1) + dx) / n
+        delta = adx - prev_adx if prev_adx is not None else 0.0
+        prev_adx = adx
+        out.append((adx, delta))
+    return out
+
+
+def _ref_bbwidth(ticks, window, avg_len):
+    out, prices, widths = [], [], []
+    for t in ticks:
+        prices.append(t["close"])
+        win = prices[-window:]
+        if len(win) < window:
+            width = 0.0
+        else:
+            mean = sum(win) / len(win)
+            width = 4 * (sum((p - mean) ** 2 for p in win) / len(win)) ** 0.5
+        widths.append(width)
+        w = widths[-avg_len:]
+        avg = sum(w) / len(w)
+        out.append(width / avg if avg else 0.0)
+    return out
+
+
+def _ref_volume(ticks, n):
+    out, vols = [], []
+    for t in ticks:
+        vols.append(t["volume"])
+        avg = sum(vols[-n:]) / len(vols[-n:])
+        out.append(t["volume"] / avg if avg else 1.0)
+    return out
+
+
+def _close(a, b):
+    # 累積和は合計し直しとの差が丸め誤差の範囲で一致すればよい
+    return math.isclose(a, b, rel_tol=1e-7, abs_tol=1e-9)
+
+
+class TestRollingMatchesReference(unittest.TestCase):
+    def setUp(self):
+        self.ticks = _ticks(random.Random(11), 2000)
+
+    def test_atr(self):
+        ind = rolling.RollingATR(14)
+        for t, exp in zip(self.ticks, _ref_atr(self.ticks, 14)):
+            self.assertTrue(_close(ind.update(t), exp))
+
+    def test_adx(self):
+        ind = rolling.RollingADX(14)
+        for t, exp in zip(self.ticks, _ref_adx(self.ticks, 14)):
+            got = ind.update(t)
+            self.assertTrue(_close(got[0], exp[0]) and _close(got[1], exp[1]), (got, exp))
+        self.assertIn(ind.direction(), ("up", "down"))
+
+    def test_bbwidth(self):
+        ind = rolling.RollingBBWidth(20, 50)
+        for t, exp in zip(self.ticks, _ref_bbwidth(self.ticks, 20, 50)):
+            got = ind.update(t)
+            if exp < 1e-9:
+                # 横ばい窓: 参照実装は丸め誤差だけが残る
+                self.assertLess(got, 1e-9)
+            else:
+                self.assertTrue(math.isclose(got, exp, rel_tol=1e-6), (got, exp))
+
+    def test_volume_ratio_zero_windows(self):
+        ind = rolling.RollingVolumeRatio(20)
+        for t, exp in zip(self.ticks, _ref_volume(self.ticks, 20)):
+            got = ind.update(t)
+            # 出来高ゼロの窓は誤差なしで既定値 1.0 を返す
+            self.assertTrue(got == exp if exp == 1.0 else _close(got, exp), (got, exp))
+
+    def test_slots(self):
+        for cls in (
+            rolling.RollingATR,
+            rolling.RollingADX,
+            rolling.RollingBBWidth,
+            rolling.RollingKeltner,
+            rolling.RollingVolumeRatio,
+        ):
+            self.assertFalse(hasattr(cls(), "__dict__"), cls.__name__)
+
+
+class TestUpdateMany(unittest.TestCase):
+    def setUp(self):
+        self.ticks = _ticks(random.Random(3), 300)
+        self.hlc = np.array([[t["high"], t["low"], t["close"]] for t in self.ticks])
+
+    def test_batch_equals_incremental(self):
+        cases = [
+            (rolling.RollingATR, self.hlc),
+            (rolling.RollingADX, self.hlc),
+            (rolling.RollingKeltner, self.hlc),
+            (rolling.RollingBBWidth, self.hlc[:, 2]),
+            (rolling.RollingVolumeRatio, np.array([t["volume"] for t in self.ticks])),
+        ]
+        for cls, arr in cases:
+            step, bulk, ticks = cls(), cls(), cls()
+            expected = []
+            for t in self.ticks:
+                res = step.update(t)
+                if isinstance(res, dict):
+                    res = (res["middle"], res["upper"], res["lower"])
+                expected.append(res)
+            expected = np.array(expected, dtype=float)
+            self.assertTrue(np.array_equal(bulk.update_many(arr), expected), cls.__name__)
+            self.assertTrue(np.array_equal(ticks.update_many(self.ticks), expected), cls.__name__)
+            # 一括更新後の状態から逐次更新を続けられる
+            extra = {"high": 151.0, "low": 149.0, "close": 150.5, "volume": 10.0}
+            self.assertEqual(step.update(extra), bulk.update(extra), cls.__name__)
+
+    def test_process_all_uses_batch(self):
+        from regime.features import RegimeFeatureExtractor
+
+        batch = RegimeFeatureExtractor().process_all(self.ticks)
+        inc = RegimeFeatureExtractor()
+        expected = np.vstack([inc.update(t) for t in self.ticks])
+        self.assertTrue(np.array_equal(batch, expected))
+        self.assertEqual(RegimeFeatureExtractor().process_all([]).shape, (0, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
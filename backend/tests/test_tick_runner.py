@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from backend.scheduler.tick_runner import BarAggregator, StreamTickRunner
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _price(sec: float, bid: float, tradeable: bool = True) -> dict:
+    ts = (BASE + timedelta(seconds=sec)).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+    return {
+        "type": "PRICE",
+        "instrument": "USD_JPY",
+        "time": ts,
+        "bids": [{"price": f"{bid:.3f}", "liquidity": 1000000}],
+        "asks": [{"price": f"{bid + 0.002:.3f}", "liquidity": 1000000}],
+        "tradeable": tradeable,
+    }
+
+
+class DummyRunner:
+    def __init__(self):
+        self.last_ai_call = None
+
+
+class TestBarAggregator(unittest.TestCase):
+    def test_bar_closes_on_next_period(self):
+        agg = BarAggregator(60)
+        self.assertIsNone(agg.add(0, 1.0))
+        self.assertIsNone(agg.add(10, 1.5))
+        self.assertIsNone(agg.add(20, 0.5))
+        bar = agg.add(61, 2.0)
+        self.assertEqual((bar.open, bar.high, bar.low, bar.close), (1.0, 1.5, 0.5, 0.5))
+        self.assertEqual(bar.volume, 3)
+        self.assertIsNone(agg.add(30, 9.0))
+
+
+class TestStreamTickRunner(unittest.TestCase):
+    def setUp(self):
+        self.clock = [0.0]
+
+    def _runner(self, **kwargs):
+        opts = dict(
+            granularity="M1",
+            tick_trigger=0,
+            move_pips=0,
+            min_interval=0,
+            max_idle=0.01,
+            clock=lambda: self.clock[0],
+        )
+        opts.update(kwargs)
+        return StreamTickRunner(DummyRunner(), "USD_JPY", **opts)
+
+    def test_bar_close_triggers_evaluation(self):
+        st = self._runner()
+        for sec in range(0, 60, 5):
+            st.on_message(_price(sec, 150.0 + sec * 0.001))
+        self.assertIsNone(st.wait(0))
+        st.on_message(_price(61, 150.1))
+        self.assertEqual(st.wait(0), "bar_close")
+        self.assertEqual(len(st.ticks), 13)
+        self.assertIsNotNone(st.atr.prev_close)
+
+    def test_tick_count_trigger_respects_min_interval(self):
+        st = self._runner(tick_trigger=3, min_interval=5)
+        for i in range(3):
+            st.on_message(_price(i, 150.0))
+        self.assertEqual(st.wait(0), "ticks")
+        for i in range(3, 6):
+            st.on_message(_price(i, 150.0))
+        self.assertIsNone(st.wait(0))
+        self.clock[0] = 10
+        st.on_message(_price(7, 150.0))
+        self.assertEqual(st.wait(0), "ticks")
+
+    def test_price_move_trigger(self):
+        st = self._runner(move_pips=2)
+        st.on_message(_price(0, 150.000))
+        st.on_message(_price(1, 150.010))
+        self.assertIsNone(st.wait(0))
+        st.on_message(_price(2, 150.025))
+        self.assertEqual(st.wait(0), "move")
+
+    def test_tradeable_change_and_snapshot(self):
+        st = self._runner()
+        self.assertIsNone(st.snapshot())
+        st.on_message({"type": "HEARTBEAT", "time": "2024-01-01T00:00:00Z"})
+        st.on_message(_price(0, 150.0))
+        st.on_message(_price(1, 150.0, tradeable=False))
+        self.assertEqual(st.wait(0), "tradeable")
+        snap = st.snapshot()
+        self.assertFalse(snap["prices"][0]["tradeable"])
+        self.assertEqual(snap["prices"][0]["bids"][0]["price"], "150.000")
+
+    def test_snapshot_goes_stale_without_messages(self):
+        st = self._runner(stale_after=10)
+        st.on_message(_price(0, 150.0))
+        self.clock[0] = 8
+        st.on_message({"type": "HEARTBEAT", "time": "2024-01-01T00:00:08Z"})
+        self.clock[0] = 15
+        # ハートビートが届いていれば価格は古くても有効
+        self.assertIsNotNone(st.snapshot())
+        self.clock[0] = 19
+        self.assertIsNone(st.snapshot())
+        st.on_message(_price(19, 150.1))
+        self.assertEqual(st.snapshot()["prices"][0]["bids"][0]["price"], "150.100")
+
+    def test_wait_times_out_when_idle(self):
+        st = self._runner()
+        self.assertIsNone(st.wait())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,424 @@
+"""Semantic-keyed LLM response cache with pluggable storage.
+
+The exact-prompt cache in :mod:`backend.utils.openai_client` misses whenever
+an embedded indicator moves in the last decimal place.  Here requests are
+keyed on a *canonical* view of the market context instead.  Numbers are
+quantized per field: prices (OHLC, bid/ask, EMA, bands, pivots, ATR …) to
+buckets of ``LLM_CACHE_PRICE_PIPS`` pips, everything else (RSI, ADX, ratios)
+to ``LLM_CACHE_SIG_DIGITS`` significant digits.  Numeric strings such as the
+OANDA ``mid`` values are parsed first.  Volatile keys such as timestamps are
+dropped and dict keys are sorted.  The key also carries the model and a
+prompt template id so different prompts never collide.
+
+The pip size comes from an ``instrument``/``pair`` entry of the context
+(``_JPY`` pairs use 0.01); without one a price of 20 or more is treated as
+a JPY quote.
+
+Two backends implement the same ``get``/``set``/``clear``/``stats`` interface:
+
+``memory``
+    In-process LRU (lost on restart).
+``sqlite``
+    File-backed store at ``LLM_CACHE_PATH`` surviving restarts.
+
+Both honour ``LLM_CACHE_TTL_SEC`` and evict least recently used entries above
+``LLM_CACHE_MAX``.  ``LLM_CACHE_BACKEND=none`` disables the cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from backend.utils import env_loader
+
+_BASE_DIR = Path(__file__).resolve().parents[2]
+_NUMBER_RE = re.compile(r"-?\d+\.\d+(?:[eE][-+]?\d+)?")
+_DEFAULT_IGNORE = ("time", "timestamp", "ts")
+# 価格単位で表される項目 (pips 単位で丸める)
+_PRICE_KEYS = frozenset(
+    {
+        "o", "h", "l", "c",
+        "open", "high", "low", "close",
+        "bid", "ask", "price", "avg_price", "entry_price", "current_price",
+        "closeoutBid", "closeoutAsk",
+        "ema_fast", "ema_slow",
+        "bb_upper", "bb_middle", "bb_lower",
+        "upper_band", "middle_band", "lower_band",
+        "pivot", "pivot_r1", "pivot_r2", "pivot_s1", "pivot_s2",
+        "r1", "r2", "s1", "s2",
+        "n_wave_target", "atr",
+    }
+)
+
+
+def quantize(value: float, digits: int) -> float:
+    """Round ``value`` to ``digits`` significant digits."""
+    if value == 0 or not math.isfinite(value):
+        return value
+    exp = math.floor(math.log10(abs(value)))
+    return round(value, digits - 1 - exp)
+
+
+def pip_size_for(instrument: str) -> float:
+    """Pip size of ``instrument`` (``USD_JPY`` → 0.01, ``EUR_USD`` → 0.0001)."""
+    return 0.01 if instrument.upper().endswith("_JPY") else 0.0001
+
+
+def quantize_price(value: float, step: float) -> float:
+    """Round a price to the nearest multiple of ``step``."""
+    if not math.isfinite(value) or step <= 0:
+        return value
+    return round(round(value / step) * step, 6)
+
+
+def _find_instrument(obj: Any) -> str | None:
+    if isinstance(obj, dict):
+        for key in ("instrument", "pair"):
+            if isinstance(obj.get(key), str):
+                return obj[key]
+        for val in obj.values():
+            if isinstance(val, dict):
+                found = _find_instrument(val)
+                if found:
+                    return found
+    return None
+
+
+def _parse_number(text: str) -> float | None:
+    # OANDA は価格を "150.123" のような文字列で返す
+    if _NUMBER_RE.fullmatch(text.strip()) is None:
+        return None
+    return float(text)
+
+
+def canonicalize(
+    obj: Any,
+    *,
+    digits: int = 3,
+    ignore: Iterable[str] = _DEFAULT_IGNORE,
+    pip_size: float | None = None,
+    price_pips: float = 1.0,
+) -> Any:
+    """Return a JSON-ready copy of ``obj`` with numbers quantized per field.
+
+    Values under a price key are rounded to ``price_pips`` × ``pip_size``;
+    other floats keep ``digits`` significant digits.
+    """
+    skip = frozenset(ignore)
+    if pip_size is None:
+        instrument = _find_instrument(obj)
+        pip_size = pip_size_for(instrument) if instrument else None
+
+    def _price(val: float) -> float:
+        pip = pip_size or (0.01 if abs(val) >= 20 else 0.0001)
+        return quantize_price(val, pip * price_pips)
+
+    def _walk(val: Any, key: str | None) -> Any:
+        if isinstance(val, bool) or val is None:
+            return val
+        if isinstance(val, str):
+            num = _parse_number(val)
+            return val if num is None else _walk(num, key)
+        if isinstance(val, float):
+            return _price(val) if key in _PRICE_KEYS else quantize(val, digits)
+        if isinstance(val, int):
+            return val
+        if isinstance(val, dict):
+            items = sorted(val.items(), key=lambda kv: str(kv[0]))
+            return {str(k): _walk(v, str(k)) for k, v in items if k not in skip}
+        if isinstance(val, (list, tuple)):
+            return [_walk(v, key) for v in val]
+        if hasattr(val, "iloc"):
+            # pandas Series は最新値のみで判定する
+            try:
+                return _walk(float(val.iloc[-1]), key)
+            except Exception:
+                return None
+        try:
+            return _walk(float(val), key)
+        except (TypeError, ValueError):
+            return str(val)
+
+    return _walk(obj, None)
+
+
+def quantize_text(text: str, digits: int = 3) -> str:
+    """Quantize decimal numbers embedded in a prompt string."""
+    return _NUMBER_RE.sub(lambda m: repr(quantize(float(m.group()), digits)), text)
+
+
+def semantic_key(
+    model: str,
+    template_id: str,
+    context: Any,
+    *,
+    digits: int | None = None,
+) -> str:
+    """Return the cache key for ``context`` rendered through ``template_id``.
+
+    ``context`` may be a mapping/sequence (canonicalized) or the raw prompt
+    text, in which case decimal numbers inside the text are quantized to
+    significant digits (field names are unknown there).
+    """
+    if digits is None:
+        digits = int(env_loader.get_env("LLM_CACHE_SIG_DIGITS", "3"))
+    if isinstance(context, str):
+        body = quantize_text(context, digits)
+    else:
+        price_pips = float(env_loader.get_env("LLM_CACHE_PRICE_PIPS", "1.0"))
+        body = json.dumps(
+            canonicalize(context, digits=digits, price_pips=price_pips),
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+    raw = f"{model}\x1f{template_id}\x1f{body}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class MemoryLLMCache:
+    """In-process LRU cache with TTL."""
+
+    def __init__(
+        self,
+        *,
+        ttl_sec: float = 300.0,
+        max_entries: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def get(self, key: str) -> Any | None:
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats.misses += 1
+                return None
+            if now - item[0] >= self.ttl_sec:
+                del self._data[key]
+                self._stats.expired += 1
+                self._stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats.as_dict(), "size": len(self._data)}
+
+
+class SQLiteLLMCache:
+    """SQLite-backed cache persisting responses across restarts.
+
+    ``accessed`` is refreshed on every hit so eviction removes the least
+    recently used rows; expired rows are deleted lazily on lookup and in bulk
+    on each eviction pass.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl_sec: float = 300.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed)"
+        )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def get(self, key: str) -> Any | None:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return None
+            if now - row[1] >= self.ttl_sec:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._size -= 1
+                self._stats.expired += 1
+                self._stats.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._stats.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        now = self._clock()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE llm_cache SET value = ?, created = ?, accessed = ? WHERE key = ?",
+                (payload, now, now, key),
+            )
+            if cur.rowcount == 0:
+                self._conn.execute(
+                    "INSERT INTO llm_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created <= ?", (now - self.ttl_sec,)
+        ).rowcount
+        self._stats.expired += expired
+        self._size -= expired
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self._stats.evictions += excess
+            self._size -= excess
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats.as_dict(), "size": self._size}
+
+
+_cache: MemoryLLMCache | SQLiteLLMCache | None = None
+_configured = False
+_lock = threading.Lock()
+
+
+def get_cache() -> MemoryLLMCache | SQLiteLLMCache | None:
+    """Return the process-wide cache configured by ``LLM_CACHE_*``."""
+    global _cache, _configured
+    with _lock:
+        if _configured:
+            return _cache
+        backend = env_loader.get_env("LLM_CACHE_BACKEND", "memory").lower()
+        ttl = float(env_loader.get_env("LLM_CACHE_TTL_SEC", "120"))
+        max_entries = int(env_loader.get_env("LLM_CACHE_MAX", "10000"))
+        if backend == "sqlite":
+            path = env_loader.get_env("LLM_CACHE_PATH", str(_BASE_DIR / "llm_cache.db"))
+            _cache = SQLiteLLMCache(path, ttl_sec=ttl, max_entries=max_entries)
+        elif backend == "memory":
+            _cache = MemoryLLMCache(ttl_sec=ttl, max_entries=max_entries)
+        else:
+            _cache = None
+        _configured = True
+        return _cache
+
+
+def set_cache(cache: MemoryLLMCache | SQLiteLLMCache | None) -> None:
+    """Replace the process-wide cache (``None`` disables it)."""
+    global _cache, _configured
+    with _lock:
+        _cache = cache
+        _configured = True
+
+
+def stats() -> dict:
+    """Return hit/miss counters of the active cache."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+__all__ = [
+    "MemoryLLMCache",
+    "SQLiteLLMCache",
+    "canonicalize",
+    "get_cache",
+    "pip_size_for",
+    "quantize",
+    "quantize_price",
+    "quantize_text",
+    "semantic_key",
+    "set_cache",
+    "stats",
+]
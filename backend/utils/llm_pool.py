@@ -0,0 +1,63 @@
+"""Shared worker pool for running independent LLM calls concurrently.
+
+``get_market_condition``, ``get_trade_plan`` and the exit evaluation are
+independent blocking OpenAI requests.  Submitting them here lets one job loop
+overlap their latency instead of paying for each in turn.  ``LLM_CONCURRENCY``
+sets the number of workers; ``1`` runs every call inline (the old behaviour).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from backend.utils import env_loader
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor | None:
+    global _executor
+    workers = int(env_loader.get_env("LLM_CONCURRENCY", "3"))
+    if workers <= 1:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+        return _executor
+
+
+def submit(fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+    """Run ``fn`` on the LLM pool and return its future.
+
+    Exceptions raised by ``fn`` surface from ``Future.result()`` so callers
+    keep their existing ``try``/``except`` blocks around the result.  ``fn``
+    runs in a copy of the caller's context (pinned config, AI call budget).
+    """
+    executor = _get_executor()
+    if executor is not None:
+        ctx = contextvars.copy_context()
+        return executor.submit(ctx.run, fn, *args, **kwargs)
+    fut: Future = Future()
+    try:
+        fut.set_result(fn(*args, **kwargs))
+    except Exception as exc:
+        fut.set_exception(exc)
+    return fut
+
+
+def shutdown(wait: bool = True) -> None:
+    """Stop the worker pool (a new one is created on the next ``submit``)."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+__all__ = ["submit", "shutdown"]
@@ -69,10 +69,23 @@ def get_pending_entry_order(instrument: str) -> Optional[dict]:
     """
     Return dict {order_id, ts} for our own pending LIMIT entry order, or None.
 
+    Pending orders come from the account mirror when it is available; the
+    direct GET (with its short cache) is only the fallback.
+
     Detection rule:
       • order.type == "LIMIT"
       • JSON(clientExtensions.comment) has keys {"mode":"limit","entry_uuid":...}
     """
+    try:
+        from backend.orders.account_mirror import get_account_mirror
+
+        mirror = get_account_mirror()
+    except Exception:  # pragma: no cover - stubbed in tests
+        mirror = None
+    orders = mirror.pending_orders(instrument) if mirror is not None else None
+    if orders is not None:
+        return _find_entry_order(orders)
+
     now = time.time()
     cached = _cache.get(instrument)
     if cached and now - cached["fetched_at"] < _CACHE_TTL_SEC:
@@ -85,7 +98,13 @@ def get_pending_entry_order(instrument: str) -> Optional[dict]:
         _cache[instrument] = {"fetched_at": now, "result": None}
         return None
 
-    result: Optional[dict] = None
+    result = _find_entry_order(orders)
+    _cache[instrument] = {"fetched_at": now, "result": result}
+    return result
+
+
+def _find_entry_order(orders: list[dict]) -> Optional[dict]:
+    """Return ``{order_id, ts}`` of the first LIMIT entry order we created."""
     for order in orders:
         if order.get("type") != "LIMIT":
             continue
@@ -109,8 +128,5 @@ def get_pending_entry_order(instrument: str) -> Optional[dict]:
                 ts_val = int(tag_text)
             except ValueError:
                 ts_val = 0
-            result = {"order_id": order["id"], "ts": ts_val}
-            break
-
-    _cache[instrument] = {"fetched_at": now, "result": result}
-    return result
+            return {"order_id": order["id"], "ts": ts_val}
+    return None
@@ -1,4 +1,10 @@
-"""Thin wrapper around the OpenAI client with optional lazy import."""
+"""Thin wrapper around the OpenAI client with optional lazy import.
+
+Both the blocking :func:`ask_openai` and the native :func:`ask_openai_async`
+share the response cache, the per-loop call budget and the rate limiter.
+Identical requests issued while one is already in flight are coalesced: the
+first caller performs the API request and the others wait for its result.
+"""
 
 try:  # Lazy import when available
     from openai import APIError as _APIError
@@ -9,24 +15,59 @@ except Exception:  # pragma: no cover - allow tests without openai
     APIError = Exception
     OpenAI = None
 import asyncio
+import contextvars
 import json
 import logging
+import threading
 import time
+import weakref
 from collections import OrderedDict
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     import tiktoken  # type: ignore
 except Exception:  # pragma: no cover - optional dependency
     tiktoken = None
 
-from backend.utils import env_loader
+from backend.logs.perf_stats_logger import span
+from backend.utils import env_loader, llm_cache
 from backend.utils.rate_limiter import TokenBucket
 
 # env_loader はインポート時に既定の .env を読み込む
 
 # OpenAI クライアントは初回呼び出し時に生成する
 client: Optional[OpenAI] = None
+# AsyncOpenAI の接続プールはイベントループ単位で保持する
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+
+_MAX_CONNECTIONS = int(env_loader.get_env("OPENAI_MAX_CONNECTIONS", "10"))
+
+
+def _http_client(kind: str) -> Any:
+    """Return an httpx client with bounded keep-alive pool, or ``None``."""
+    try:
+        import httpx
+        import openai
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+    factory = getattr(openai, f"Default{kind}HttpxClient", None)
+    if factory is None:
+        return None
+    limits = httpx.Limits(
+        max_connections=_MAX_CONNECTIONS,
+        max_keepalive_connections=_MAX_CONNECTIONS,
+    )
+    return factory(limits=limits)
+
+
+def _api_key() -> str:
+    api_key = env_loader.get_env("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set in environment variables.")
+    return api_key
 
 
 def _get_client() -> OpenAI:
@@ -39,12 +80,37 @@ def _get_client() -> OpenAI:
                 OpenAI = _OpenAI
             except Exception as exc:  # pragma: no cover - optional dependency
                 raise RuntimeError("openai package is required") from exc
-        api_key = env_loader.get_env("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY not set in environment variables.")
-        client = OpenAI(api_key=api_key)
+        api_key = _api_key()
+        http_client = _http_client("")
+        if http_client is None:
+            client = OpenAI(api_key=api_key)
+        else:
+            client = OpenAI(api_key=api_key, http_client=http_client)
     return client
 
+
+def _get_async_client() -> Any:
+    """Return the ``AsyncOpenAI`` client bound to the running loop.
+
+    ``None`` is returned when the installed ``openai`` package has no async
+    client, in which case callers fall back to the blocking client in a
+    worker thread.
+    """
+    try:
+        from openai import AsyncOpenAI
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+    loop = asyncio.get_running_loop()
+    aclient = _async_clients.get(loop)
+    if aclient is None:
+        http_client = _http_client("Async")
+        if http_client is None:
+            aclient = AsyncOpenAI(api_key=_api_key())
+        else:
+            aclient = AsyncOpenAI(api_key=_api_key(), http_client=http_client)
+        _async_clients[loop] = aclient
+    return aclient
+
 logger = logging.getLogger(__name__)
 
 # Default model can be overridden via settings.env → AI_MODEL
@@ -53,9 +119,12 @@ AI_MODEL = env_loader.get_env("AI_MODEL", "gpt-4.1-nano")
 # ──────────────────────────────────
 #   Lightweight in-memory cache
 # ──────────────────────────────────
-_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, dict]]" = OrderedDict()
+_cache: "OrderedDict[Tuple[str, str, str, int], Tuple[float, Any]]" = OrderedDict()
 _CACHE_TTL_SEC = int(env_loader.get_env("OPENAI_CACHE_TTL_SEC", "30"))
 _CACHE_MAX = int(env_loader.get_env("OPENAI_CACHE_MAX", "100"))
+# 実行中リクエスト (キー → 結果を待つ Future)
+_inflight: "dict[Tuple[str, str, str, int], Future]" = {}
+_lock = threading.Lock()
 
 # --- AI 呼び出し制御 ----------------------------
 _CALL_LIMIT_PER_LOOP = int(env_loader.get_env("MAX_AI_CALLS_PER_LOOP", "4"))
@@ -63,17 +132,199 @@ _calls_this_loop = 0
 _bucket = TokenBucket(rate=120)
 
 
+class _CallBudget:
+    """AI calls left in one runner's loop."""
+
+    __slots__ = ("limit", "used")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+
+
+# ランナーごとの予算。未設定ならプロセス全体のカウンタを使う
+_budget: contextvars.ContextVar[_CallBudget | None] = contextvars.ContextVar(
+    "openai_call_budget", default=None
+)
+
+# 統計値 (キャッシュヒット / 合流したリクエスト数)
+stats = {"requests": 0, "cache_hits": 0, "coalesced": 0}
+
+
 def set_call_limit(_limit: int) -> None:
     """Set the maximum number of OpenAI calls allowed per loop."""
     global _CALL_LIMIT_PER_LOOP, _calls_this_loop
-    _CALL_LIMIT_PER_LOOP = _limit
-    _calls_this_loop = 0
+    with _lock:
+        _CALL_LIMIT_PER_LOOP = _limit
+        _calls_this_loop = 0
 
 
-def reset_call_counter() -> None:
-    """Reset the per-loop OpenAI call counter."""
+def reset_call_counter(limit: int | None = None) -> None:
+    """Reset the per-loop OpenAI call counter.
+
+    With ``limit`` a fresh budget is bound to the current context, so
+    runners driven concurrently (one per instrument) each get their own
+    allowance instead of sharing the process-wide counter.  Work handed to
+    :mod:`backend.utils.llm_pool` is charged to the submitting context.
+    """
     global _calls_this_loop
-    _calls_this_loop = 0
+    if limit is not None:
+        _budget.set(_CallBudget(limit))
+        return
+    with _lock:
+        _calls_this_loop = 0
+    budget = _budget.get()
+    if budget is not None:
+        budget.used = 0
+
+
+def _count_call() -> None:
+    global _calls_this_loop
+    budget = _budget.get()
+    with _lock:
+        if budget is not None:
+            if budget.used >= budget.limit:
+                raise RuntimeError("OpenAI call limit exceeded")
+            budget.used += 1
+            return
+        if _calls_this_loop >= _CALL_LIMIT_PER_LOOP:
+            raise RuntimeError("OpenAI call limit exceeded")
+        _calls_this_loop += 1
+
+
+def _prepare(
+    prompt: str | None,
+    system_prompt: str,
+    model: str,
+    messages: List[Dict[str, str]] | None,
+    n: int,
+) -> tuple[Tuple[str, str, str, int], List[Dict[str, str]]]:
+    """Return the cache key and the message list for a request."""
+    if messages is not None:
+        cache_prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        return (model, "messages", cache_prompt, n), messages
+    key = (model, system_prompt, prompt or "", n)
+    return key, [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt or ""},
+    ]
+
+
+def _lookup(key: Tuple[str, str, str, int]) -> tuple[Any, Future | None, bool]:
+    """Return ``(cached, future, leader)`` for ``key``.
+
+    ``cached`` is the cached response (``None`` on miss).  On a miss the
+    caller either becomes the leader that must perform the request and
+    resolve ``future`` via :func:`_finish`, or a follower waiting on it.
+    """
+    now = time.time()
+    with _lock:
+        cached = _cache.get(key)
+        if cached:
+            if now - cached[0] < _CACHE_TTL_SEC:
+                _cache.move_to_end(key)
+                stats["cache_hits"] += 1
+                return cached[1], None, False
+            _cache.pop(key, None)
+        fut = _inflight.get(key)
+        if fut is not None:
+            stats["coalesced"] += 1
+            return None, fut, False
+        fut = Future()
+        _inflight[key] = fut
+        stats["requests"] += 1
+        return None, fut, True
+
+
+def _finish(
+    key: Tuple[str, str, str, int],
+    fut: Future,
+    result: Any = None,
+    exc: BaseException | None = None,
+) -> None:
+    """Publish the leader's result to the cache and to waiting followers."""
+    with _lock:
+        _inflight.pop(key, None)
+        if exc is None:
+            _cache[key] = (time.time(), result)
+            _cache.move_to_end(key)
+            while len(_cache) > _CACHE_MAX:
+                _cache.popitem(last=False)
+    if exc is None:
+        fut.set_result(result)
+    else:
+        fut.set_exception(exc)
+
+
+def _semantic_get(
+    key: Tuple[str, str, str, int],
+    template_id: str | None,
+    cache_context: Any,
+) -> tuple[str | None, Any]:
+    """Return ``(semantic_key, cached)`` from the persistent LLM cache."""
+    store = llm_cache.get_cache()
+    if store is None:
+        return None, None
+    model, system_prompt, cache_prompt, n = key
+    if cache_context is None:
+        context = f"{system_prompt}\n{cache_prompt}"
+    else:
+        context = cache_context
+    skey = llm_cache.semantic_key(model, f"{template_id or 'raw'}:{n}", context)
+    try:
+        return skey, store.get(skey)
+    except Exception as exc:  # pragma: no cover - corrupted cache file etc.
+        logger.warning("LLM cache lookup failed: %s", exc)
+        return skey, None
+
+
+def _semantic_put(skey: str | None, value: Any) -> None:
+    store = llm_cache.get_cache()
+    if skey is not None and store is not None:
+        try:
+            store.set(skey, value)
+        except Exception as exc:  # pragma: no cover - disk full etc.
+            logger.warning("LLM cache store failed: %s", exc)
+
+
+def _parse(response: Any, n: int) -> dict | list[dict]:
+    results = []
+    for choice in response.choices:
+        response_content = choice.message.content.strip()
+        try:
+            results.append(json.loads(response_content))
+        except json.JSONDecodeError as exc:
+            logger.error("Malformed JSON from OpenAI: %s", response_content)
+            raise RuntimeError("Invalid JSON response") from exc
+    return results[0] if n == 1 else results
+
+
+def _failure(exc: BaseException) -> BaseException:
+    """Map client errors to the ``RuntimeError`` raised to callers."""
+    if isinstance(exc, APIError) and not isinstance(exc, RuntimeError):
+        err = RuntimeError(f"OpenAI API request failed: {exc}")
+        err.__cause__ = exc
+        return err
+    return exc
+
+
+def _request_kwargs(
+    model: str,
+    messages: List[Dict[str, str]],
+    max_tokens: int,
+    temperature: float,
+    response_format: dict | None,
+    n: int,
+) -> dict:
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "response_format": response_format or {"type": "json_object"},
+        "n": n,
+    }
+
 
 def ask_openai(
     prompt: str | None = None,
@@ -85,6 +336,8 @@ def ask_openai(
     response_format: dict | None = None,
     n: int = 1,
     messages: List[Dict[str, str]] | None = None,
+    template_id: str | None = None,
+    cache_context: Any = None,
 ) -> dict | list[dict]:
     """
     Send a prompt or prepared message list to OpenAI's API and return the response.
@@ -97,75 +350,55 @@ def ask_openai(
             Defaults to requesting a JSON object when not provided.
         messages (list[dict] | None): Pre-composed message list overriding
             ``prompt`` and ``system_prompt``.
+        template_id (str | None): Prompt template identifier for the
+            persistent semantic cache (see :mod:`backend.utils.llm_cache`).
+        cache_context (Any): Market context the prompt was rendered from.
+            When given, the semantic cache key is built from its quantized
+            form instead of the prompt text.
     Returns:
         dict or list[dict]: Parsed JSON object(s) returned by the assistant.
     Raises:
         Exception: If the API request fails.
     """
 
-    global _calls_this_loop
-
     # Use env‑defined default when caller does not specify
     if model is None:
         model = AI_MODEL
 
-    if _calls_this_loop >= _CALL_LIMIT_PER_LOOP:
-        raise RuntimeError("OpenAI call limit exceeded")
-    _calls_this_loop += 1
-    _bucket.acquire()
-
-    if messages is not None:
-        cache_prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
-        key = (model, "messages", cache_prompt)
-    else:
-        cache_prompt = prompt or ""
-        key = (model, system_prompt, cache_prompt)
-    now = time.time()
-    cached = _cache.get(key)
-    if cached:
-        if now - cached[0] < _CACHE_TTL_SEC:
-            logger.debug("OpenAI cache hit for %s", model)
-            _cache.move_to_end(key)
-            return cached[1]
-        else:
-            _cache.pop(key, None)
+    _count_call()
+    key, messages = _prepare(prompt, system_prompt, model, messages, n)
+    cached, fut, leader = _lookup(key)
+    if fut is None:
+        logger.debug("OpenAI cache hit for %s", model)
+        return cached
+    if not leader:
+        logger.debug("OpenAI request coalesced for %s", model)
+        return fut.result()
+    skey, hit = _semantic_get(key, template_id, cache_context)
+    if hit is not None:
+        logger.debug("LLM semantic cache hit for %s", model)
+        _finish(key, fut, hit)
+        return hit
     try:
-        if response_format is None:
-            response_format = {"type": "json_object"}
-
-        openai_client = _get_client()
-        if messages is None:
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt or ""},
-            ]
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            response_format=response_format,
-            n=n,
-        )
-        results = []
-        for choice in response.choices:
-            response_content = choice.message.content.strip()
-            results.append(json.loads(response_content))
-        parsed = results[0] if n == 1 else results
-        _cache[key] = (now, parsed)
-        _cache.move_to_end(key)
-        while len(_cache) > _CACHE_MAX:
-            _cache.popitem(last=False)
-        return parsed
-    except json.JSONDecodeError as exc:
-        logger.error("Malformed JSON from OpenAI: %s", response_content)
-        raise RuntimeError("Invalid JSON response") from exc
-    except APIError as e:
-        raise RuntimeError(f"OpenAI API request failed: {e}") from e
+        _bucket.acquire()
+        with span("llm"):
+            response = _get_client().chat.completions.create(
+                **_request_kwargs(model, messages, max_tokens, temperature, response_format, n)
+            )
+        parsed = _parse(response, n)
+        _semantic_put(skey, parsed)
+    except BaseException as exc:
+        err = _failure(exc)
+        _finish(key, fut, exc=err)
+        if err is exc:
+            raise
+        raise err from exc
+    _finish(key, fut, parsed)
+    return parsed
 
 
 async def ask_openai_async(
-    prompt: str,
+    prompt: str | None = None,
     system_prompt: str = "You are a helpful assistant.",
     model: str | None = None,
     *,
@@ -173,19 +406,54 @@ async def ask_openai_async(
     temperature: float = 0.7,
     response_format: dict | None = None,
     n: int = 1,
+    messages: List[Dict[str, str]] | None = None,
+    template_id: str | None = None,
+    cache_context: Any = None,
 ) -> dict | list[dict]:
-    """Non-blocking wrapper around ``ask_openai``."""
-
-    return await asyncio.to_thread(
-        ask_openai,
-        prompt,
-        system_prompt=system_prompt,
-        model=model,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        response_format=response_format,
-        n=n,
-    )
+    """Native async counterpart of :func:`ask_openai`.
+
+    Requests go through ``AsyncOpenAI`` with a pooled HTTP client and wait for
+    the rate limiter with ``asyncio.sleep``.  Concurrent identical requests
+    (from coroutines or threads) share a single API call.
+    """
+
+    if model is None:
+        model = AI_MODEL
+
+    _count_call()
+    key, messages = _prepare(prompt, system_prompt, model, messages, n)
+    cached, fut, leader = _lookup(key)
+    if fut is None:
+        logger.debug("OpenAI cache hit for %s", model)
+        return cached
+    if not leader:
+        logger.debug("OpenAI request coalesced for %s", model)
+        return await asyncio.wrap_future(fut)
+    skey, hit = _semantic_get(key, template_id, cache_context)
+    if hit is not None:
+        logger.debug("LLM semantic cache hit for %s", model)
+        _finish(key, fut, hit)
+        return hit
+    kwargs = _request_kwargs(model, messages, max_tokens, temperature, response_format, n)
+    try:
+        await _bucket.acquire_async()
+        aclient = _get_async_client()
+        if aclient is None:
+            response = await asyncio.to_thread(
+                _get_client().chat.completions.create, **kwargs
+            )
+        else:
+            response = await aclient.chat.completions.create(**kwargs)
+        parsed = _parse(response, n)
+        _semantic_put(skey, parsed)
+    except BaseException as exc:
+        err = _failure(exc)
+        _finish(key, fut, exc=err)
+        if err is exc:
+            raise
+        raise err from exc
+    _finish(key, fut, parsed)
+    return parsed
 
 
 def num_tokens(messages: List[Dict[str, str]], model: str | None = None) -> int:
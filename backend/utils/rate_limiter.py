@@ -1,12 +1,18 @@
 """Simple token bucket rate limiter."""
 from __future__ import annotations
 
+import asyncio
 import threading
 import time
 
 
 class TokenBucket:
-    """Token bucket limiter for API calls."""
+    """Token bucket limiter for API calls.
+
+    Callers reserve a token under the lock and sleep *after* releasing it, so
+    a caller waiting for capacity never blocks other threads from reserving
+    (and queueing behind) the next tokens.
+    """
 
     def __init__(self, rate: int, capacity: int | None = None) -> None:
         self.rate = rate
@@ -15,17 +21,27 @@ class TokenBucket:
         self.updated = time.monotonic()
         self.lock = threading.Lock()
 
-    def acquire(self) -> None:
-        """Block until a token is available."""
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
         with self.lock:
             now = time.monotonic()
             elapsed = now - self.updated
             self.tokens = min(self.capacity, self.tokens + elapsed * self.rate / 60)
             self.updated = now
-            if self.tokens < 1:
-                wait = (1 - self.tokens) * 60 / self.rate
-                time.sleep(wait)
-                self.updated = time.monotonic()
-                self.tokens = 0
+            # 不足分はマイナス残高として先着順に予約する
             self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens * 60 / self.rate
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
 
+    async def acquire_async(self) -> None:
+        """Await a token without blocking the event loop."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -108,4 +108,13 @@ def load_params(
 
     for k, v in env_params.items():
         os.environ[k] = str(v)
+
+    # ファイルが更新されたら同じ引数で読み直す
+    from backend.config import runtime_config
+
+    runtime_config.watch(
+        "params",
+        [p for p in (path, strategy_path, settings_path, mode_path, filters_path) if p is not None],
+        lambda _changed: load_params(path, strategy_path, settings_path, mode_path, filters_path),
+    )
     return env_params
@@ -0,0 +1,124 @@
+"""Benchmark sequential vs concurrent ``fetch_multiple_timeframes``.
+
+A local stub HTTP server mimics the OANDA candles endpoint with a fixed
+per-request latency so the effect of fetching all granularities at once can
+be measured without network access::
+
+    python -m diagnostics.candle_fetch_benchmark --latency 0.08 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TIMEFRAMES = {"M1": 20, "M5": 50, "M15": 50, "H1": 120, "H4": 90, "D": 90}
+
+
+def _make_candles(count: int) -> list[dict]:
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    candles = []
+    for i in range(count):
+        px = f"{150 + i * 0.01:.3f}"
+        candles.append(
+            {
+                "time": (base + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"),
+                "mid": {"o": px, "h": px, "l": px, "c": px},
+                "volume": 1,
+                "complete": i < count - 1,
+            }
+        )
+    return candles
+
+
+class StubCandleServer:
+    """Threaded HTTP server answering ``/v3/instruments/<pair>/candles``.
+
+    ``latency`` is applied to every request; ``slow`` maps granularities to
+    an overriding latency to simulate one lagging timeframe.
+    """
+
+    def __init__(self, latency: float = 0.05, slow: dict[str, float] | None = None) -> None:
+        self.latency = latency
+        self.slow = slow or {}
+        self.requests = 0
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 - http.server API
+                query = parse_qs(urlparse(self.path).query)
+                gran = query.get("granularity", ["M1"])[0]
+                count = int(query.get("count", ["500"])[0])
+                outer.requests += 1
+                threading.Event().wait(outer.slow.get(gran, outer.latency))
+                body = json.dumps({"candles": _make_candles(count)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3/instruments/{{instrument}}/candles"
+
+    def __enter__(self) -> "StubCandleServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run(latency: float, rounds: int) -> dict[str, float]:
+    """Return median wall time (seconds) for both fetch modes."""
+    os.environ["CANDLE_CACHE_ENABLED"] = "false"
+    from backend.market_data import candle_fetcher as cf
+
+    results: dict[str, float] = {}
+    with StubCandleServer(latency=latency) as server:
+        orig_url = cf.OANDA_API_URL
+        cf.OANDA_API_URL = server.url
+        try:
+            for mode, concurrent in (("sequential", False), ("concurrent", True)):
+                timings = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    cf.fetch_multiple_timeframes("USD_JPY", dict(TIMEFRAMES), concurrent=concurrent)
+                    timings.append(time.perf_counter() - start)
+                results[mode] = statistics.median(timings)
+        finally:
+            cf.OANDA_API_URL = orig_url
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.08, help="stub latency per request (s)")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    res = run(args.latency, args.rounds)
+    for mode, sec in res.items():
+        print(f"{mode:>10}: {sec * 1000:.1f} ms")
+    if res.get("concurrent"):
+        print(f"   speedup: {res['sequential'] / res['concurrent']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Benchmark the hot ``trades.db`` queries before and after migrations.
+
+A synthetic database is generated with ``init_db``'s schema (prompt text is
+padded to ``--prompt-kb`` so a few hundred thousand rows already reach
+several GB), then each query used by the API / analysis scripts is timed
+with and without the secondary indexes from :mod:`backend.logs.migrations`,
+and finally :func:`maintenance.archive_logs.archive_old_logs` is timed::
+
+    python -m diagnostics.db_query_benchmark --path /tmp/bench.db \
+        --trades 200000 --prompts 600000 --prompt-kb 4
+
+The DB is reused when it already exists, so generating it once and
+re-running the timings is cheap.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ACCOUNT = "bench-account"
+INSTRUMENTS = ["USD_JPY", "EUR_USD", "GBP_JPY", "AUD_USD"]
+LABELS = ["breakout", "pullback", "range", "trend", "reversal"]
+REASONS = ["cooldown", "spread", "rsi", "adx", "session", "ai_no"]
+
+QUERIES = {
+    "trades_summary": (
+        "SELECT COUNT(*), SUM(CASE WHEN realized_pl > 0 THEN 1 ELSE 0 END), "
+        "SUM(realized_pl) FROM oanda_trades "
+        "WHERE account_id = :account AND close_time BETWEEN :hour_ago AND :now"
+    ),
+    "trades_recent": (
+        "SELECT trade_id, instrument, open_time, close_time, realized_pl "
+        "FROM oanda_trades WHERE account_id = :account "
+        "ORDER BY close_time DESC LIMIT 100"
+    ),
+    "daily_summary": (
+        "SELECT instrument, close_price, tp_price, units, close_time FROM oanda_trades "
+        "WHERE account_id = :account AND close_time IS NOT NULL "
+        "AND tp_price IS NOT NULL AND close_time >= :day_ago"
+    ),
+    "param_performance": (
+        "SELECT profit_loss FROM trades "
+        "WHERE exit_time IS NOT NULL AND entry_time >= :week_ago"
+    ),
+    "label_win_rates": (
+        "SELECT l.label, COUNT(*), SUM(CASE WHEN t.profit_loss > 0 THEN 1 ELSE 0 END) "
+        "FROM trade_labels l JOIN trades t ON t.trade_id = l.trade_id GROUP BY l.label"
+    ),
+    "filter_statistics": "SELECT reason FROM entry_skips",
+    "exit_adjust_count": (
+        "SELECT COUNT(*) FROM exit_adjust_calls WHERE trade_id = :trade_id"
+    ),
+    "ai_decisions_recent": (
+        "SELECT timestamp, decision_type, instrument FROM ai_decisions "
+        "WHERE timestamp >= :hour_ago"
+    ),
+}
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def build_db(path: Path, *, trades: int, prompts: int, prompt_kb: int, days: int) -> None:
+    """Fill ``path`` with synthetic rows spread over ``days`` days."""
+    os.environ["TRADES_DB_PATH"] = str(path)
+    from backend.logs import log_manager
+
+    log_manager.init_db()
+    rng = random.Random(0)
+    end = datetime.now(timezone.utc)
+    span = days * 86400
+    pad = "x" * (prompt_kb * 1024)
+
+    def ts(i: int, n: int) -> datetime:
+        return end - timedelta(seconds=span * (1 - i / max(n, 1)))
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    for i in range(trades):
+        t = ts(i, trades)
+        inst = rng.choice(INSTRUMENTS)
+        closed = i < trades - 20
+        pl = rng.gauss(0, 100)
+        cur.execute(
+            "INSERT INTO oanda_trades (trade_id, account_id, instrument, open_time, close_time,"
+            " open_price, close_price, units, realized_pl, state, tp_price)"
+            " VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            (
+                i + 1, ACCOUNT, inst, _iso(t),
+                _iso(t + timedelta(minutes=30)) if closed else None,
+                150.0, 150.1, 1000, pl, "CLOSED" if closed else "OPEN", 150.2,
+            ),
+        )
+        cur.execute(
+            "INSERT INTO trades (instrument, entry_time, entry_price, exit_time, units, profit_loss)"
+            " VALUES (?,?,?,?,?,?)",
+            (inst, _iso(t), 150.0, _iso(t + timedelta(minutes=30)) if closed else None, 1000,
+             pl if closed else None),
+        )
+        cur.execute(
+            "INSERT INTO trade_labels (trade_id, label, timestamp) VALUES (?,?,?)",
+            (i + 1, rng.choice(LABELS), _iso(t)),
+        )
+        for _ in range(3):
+            cur.execute(
+                "INSERT INTO entry_skips (timestamp, instrument, side, reason) VALUES (?,?,?,?)",
+                (_iso(t), inst, "long", rng.choice(REASONS)),
+            )
+        cur.execute(
+            "INSERT INTO exit_adjust_calls (trade_id, timestamp, action) VALUES (?,?,?)",
+            (str(i + 1), _iso(t), "HOLD"),
+        )
+        if i % 50000 == 49999:
+            cur.execute("COMMIT")
+            cur.execute("BEGIN")
+    for i in range(prompts):
+        t = _iso(ts(i, prompts))
+        inst = rng.choice(INSTRUMENTS)
+        cur.execute(
+            "INSERT INTO ai_decisions (timestamp, decision_type, instrument, ai_response)"
+            " VALUES (?,?,?,?)",
+            (t, "ENTRY", inst, '{"entry": {"side": "no"}}'),
+        )
+        cur.execute(
+            "INSERT INTO prompt_logs (timestamp, decision_type, instrument, prompt, response)"
+            " VALUES (?,?,?,?,?)",
+            (t, "ENTRY", inst, pad, "{}"),
+        )
+        if i % 20000 == 19999:
+            cur.execute("COMMIT")
+            cur.execute("BEGIN")
+    cur.execute("COMMIT")
+    conn.close()
+
+
+def _drop_indexes(conn: sqlite3.Connection) -> None:
+    names = [
+        r[0]
+        for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'"
+        )
+    ]
+    for name in names:
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute("PRAGMA user_version = 0")
+
+
+def time_queries(conn: sqlite3.Connection, params: dict, rounds: int) -> dict[str, float]:
+    out = {}
+    for name, sql in QUERIES.items():
+        samples = []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append(time.perf_counter() - t0)
+        out[name] = statistics.median(samples)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--trades", type=int, default=100000)
+    parser.add_argument("--prompts", type=int, default=300000)
+    parser.add_argument("--prompt-kb", type=int, default=4)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--archive", action="store_true", help="also time archive_old_logs")
+    args = parser.parse_args()
+
+    path = args.path or Path(tempfile.mkdtemp()) / "bench.db"
+    if not path.exists():
+        t0 = time.perf_counter()
+        build_db(
+            path, trades=args.trades, prompts=args.prompts,
+            prompt_kb=args.prompt_kb, days=args.days,
+        )
+        print(f"built {path} in {time.perf_counter() - t0:.1f}s")
+    print(f"db size: {path.stat().st_size / 1e9:.2f} GB")
+
+    from backend.logs import migrations
+
+    now = datetime.now(timezone.utc)
+    params = {
+        "account": ACCOUNT,
+        "now": _iso(now),
+        "hour_ago": _iso(now - timedelta(hours=1)),
+        "day_ago": _iso(now - timedelta(days=1)),
+        "week_ago": _iso(now - timedelta(days=7)),
+        "trade_id": str(args.trades // 2),
+    }
+    conn = sqlite3.connect(path, isolation_level=None)
+    _drop_indexes(conn)
+    before = time_queries(conn, params, args.rounds)
+    t0 = time.perf_counter()
+    migrations.apply_migrations(conn)
+    print(f"migrations applied in {time.perf_counter() - t0:.1f}s")
+    after = time_queries(conn, params, args.rounds)
+    conn.close()
+
+    print(f"{'query':<22}{'no index ms':>14}{'indexed ms':>14}{'speedup':>10}")
+    for name in QUERIES:
+        b, a = before[name] * 1000, after[name] * 1000
+        print(f"{name:<22}{b:>14.2f}{a:>14.2f}{b / a if a else float('inf'):>9.1f}x")
+
+    if args.archive:
+        from maintenance.archive_logs import archive_old_logs
+
+        t0 = time.perf_counter()
+        moved = archive_old_logs(db_path=path, archive_dir=path.parent / "archive", now=now)
+        print(f"archive_old_logs moved {moved} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,10 +41,12 @@ def _parse_time(ts: str) -> datetime | None:
         return None
 
 
-def create_split_orders(mode: str, plan: EntryPlan) -> List[Order]:
-    """Place two child orders sharing the same position_id."""
+def create_split_orders(
+    mode: str, plan: EntryPlan, pair: str | None = None
+) -> List[Order]:
+    """Place two child orders sharing the same position_id on ``pair``."""
 
-    pair = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+    pair = pair or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
     ratio = _SPLIT_TABLE.get(mode, (0.7, 0.3))
     pos_id = uuid.uuid4().hex[:8]
     order_mgr = OrderManager()
@@ -16,9 +16,9 @@ from backend.utils import env_loader
 logger = logging.getLogger(__name__)
 
 
-def run_loop() -> None:
-    """Run micro scalp mode that aims for 2 pips repeatedly."""
-    instrument = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+def run_loop(instrument: str | None = None) -> None:
+    """Run micro scalp mode that aims for 2 pips repeatedly on ``instrument``."""
+    instrument = instrument or env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
     interval = int(env_loader.get_env("QUICK_TP_INTERVAL_SEC", "360"))
     units = int(env_loader.get_env("QUICK_TP_UNITS", "1000"))
 
@@ -26,7 +26,11 @@ def run_loop() -> None:
 
     while True:
         try:
-            positions = get_open_positions() or []
+            positions = [
+                p
+                for p in get_open_positions() or []
+                if p.get("instrument", instrument) == instrument
+            ]
             if positions:
                 time.sleep(interval)
                 continue
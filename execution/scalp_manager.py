@@ -10,6 +10,7 @@ from pathlib import Path
 
 import yaml
 
+from backend.market_data.candle_frame import CandleFrame
 from backend.utils import env_loader
 from piphawk_ai.risk.manager import PortfolioRiskManager
 
@@ -60,16 +61,23 @@ def get_dynamic_hold_seconds(
     pip_size = pip_size_fn(instrument)
     try:
         if fetch_candles_func is None:
-            from backend.market_data.candle_fetcher import fetch_candles as fetch_candles_func
+            from functools import partial
+
+            from backend.market_data.candle_fetcher import fetch_candles
+
+            fetch_candles_func = partial(fetch_candles, as_frame=True)
         if calculate_atr_func is None:
             from backend.indicators.atr import calculate_atr as calculate_atr_func
 
         candles = fetch_candles_func(
             instrument, granularity="M1", count=30, allow_incomplete=True
         )
-        highs = [float(c["mid"]["h"]) for c in candles]
-        lows = [float(c["mid"]["l"]) for c in candles]
-        closes = [float(c["mid"]["c"]) for c in candles]
+        if isinstance(candles, CandleFrame):
+            highs, lows, closes = candles.h.tolist(), candles.l.tolist(), candles.c.tolist()
+        else:
+            highs = [float(c["mid"]["h"]) for c in candles]
+            lows = [float(c["mid"]["l"]) for c in candles]
+            closes = [float(c["mid"]["c"]) for c in candles]
         atr_series = calculate_atr_func(highs, lows, closes)
         atr_val = (
             float(atr_series.iloc[-1])
@@ -107,7 +115,7 @@ def enter_scalp_trade(
         from backend.strategy import openai_scalp_analysis as scalp_ai
 
         candles = fetch_candles(
-            instrument, granularity="M5", count=30, allow_incomplete=True
+            instrument, granularity="M5", count=30, allow_incomplete=True, as_frame=True
         )
         indicators = calculate_indicators(candles, pair=instrument)
 
@@ -251,7 +259,11 @@ def monitor_scalp_positions() -> None:
             from backend.market_data.candle_fetcher import fetch_candles
 
             candles = fetch_candles(
-                pos["instrument"], granularity="M5", count=30, allow_incomplete=True
+                pos["instrument"],
+                granularity="M5",
+                count=30,
+                allow_incomplete=True,
+                as_frame=True,
             )
             indicators = calculate_indicators(candles, pair=pos["instrument"])
         except Exception as exc:  # pragma: no cover - network failure
@@ -2,6 +2,30 @@ from __future__ import annotations
 
 from typing import Optional, Sequence
 
+from backend.market_data.candle_frame import CandleFrame
+
+
+def _columns(candles: Sequence[dict]) -> Optional[tuple[list, list, list]]:
+    """Return ``(lows, highs, volumes)`` or ``None`` on malformed rows."""
+    if isinstance(candles, CandleFrame):
+        return candles.l.tolist(), candles.h.tolist(), candles.volume.tolist()
+    lows: list[float] = []
+    highs: list[float] = []
+    volumes: list[float | None] = []
+    for row in candles:
+        mid = row.get("mid", {})
+        try:
+            lows.append(float(mid.get("l", row.get("l"))))
+            highs.append(float(mid.get("h", row.get("h"))))
+        except Exception:
+            return None
+        vol = row.get("volume")
+        try:
+            volumes.append(float(vol) if vol is not None else None)
+        except Exception:
+            volumes.append(None)
+    return lows, highs, volumes
+
 
 class DoubleBottomSignal:
     """Detect double-bottom pattern and compute features."""
@@ -13,24 +37,12 @@ class DoubleBottomSignal:
 
     def evaluate(self, candles: Sequence[dict]) -> Optional[dict]:
         """Return pattern features or ``None`` when not detected."""
-        rows = list(candles)
-        if len(rows) < 3:
+        cols = _columns(candles)
+        if cols is None:
+            return None
+        lows, highs, volumes = cols
+        if len(lows) < 3:
             return None
-        lows: list[float] = []
-        highs: list[float] = []
-        volumes: list[float | None] = []
-        for row in rows:
-            mid = row.get("mid", {})
-            try:
-                lows.append(float(mid.get("l", row.get("l"))))
-                highs.append(float(mid.get("h", row.get("h"))))
-            except Exception:
-                return None
-            vol = row.get("volume")
-            try:
-                volumes.append(float(vol) if vol is not None else None)
-            except Exception:
-                volumes.append(None)
         i1 = lows.index(min(lows))
         second = None
         for j in range(i1 + 2, min(len(lows), i1 + self.max_separation + 1)):
@@ -0,0 +1,170 @@
+"""Move old ``prompt_logs`` / ``ai_decisions`` rows into monthly archive DBs.
+
+Both tables store the full prompt / response text and dominate the size of
+``trades.db``.  Rows older than the retention window are copied into
+``<LOG_ARCHIVE_DIR>/logs_YYYY-MM.db`` (one file per calendar month, same
+table name and primary key) and then deleted from the live DB.  Work is
+done in chunks of ``chunk_size`` rows, each chunk in its own transaction,
+so the bot's writers are never blocked for long.  Copies use
+``INSERT OR IGNORE`` on the original primary key, which makes a re-run
+after an interruption safe.
+
+Set ``LOG_ARCHIVE_ENABLED=false`` to delete expired rows without keeping
+an archive.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from backend.utils import db_helper, env_loader
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(env_loader.get_env("TRADES_DB_PATH", db_helper.DB_PATH))
+
+# テーブル名 -> (主キー列, 保持日数の環境変数, 既定日数)
+RETENTION_TABLES: dict[str, tuple[str, str, str]] = {
+    "prompt_logs": ("id", "PROMPT_LOG_RETENTION_DAYS", "30"),
+    "ai_decisions": ("decision_id", "AI_DECISION_RETENTION_DAYS", "90"),
+}
+
+
+def _archive_dir(db_path: Path) -> Path:
+    configured = env_loader.get_env("LOG_ARCHIVE_DIR")
+    return Path(configured) if configured else db_path.parent / "archive"
+
+
+def _month_bounds(month: str) -> tuple[str, str]:
+    year, mon = (int(x) for x in month.split("-"))
+    nxt = f"{year + 1:04d}-01" if mon == 12 else f"{year:04d}-{mon + 1:02d}"
+    return month, nxt
+
+
+def _ensure_archive_table(cur: sqlite3.Cursor, table: str) -> None:
+    cols = cur.execute(f"PRAGMA main.table_info({table})").fetchall()
+    defs = []
+    pks = []
+    for _cid, name, ctype, _notnull, _default, pk in cols:
+        defs.append(f'"{name}" {ctype}')
+        if pk:
+            pks.append(f'"{name}"')
+    if pks:
+        defs.append(f"PRIMARY KEY ({', '.join(pks)})")
+    cur.execute(f"CREATE TABLE IF NOT EXISTS arch.{table} ({', '.join(defs)})")
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS arch.idx_{table}_time ON {table}(timestamp)"
+    )
+
+
+def _move_range(
+    conn: sqlite3.Connection,
+    table: str,
+    pk: str,
+    lo: str,
+    hi: str,
+    *,
+    archive: bool,
+    chunk_size: int,
+) -> int:
+    moved = 0
+    cur = conn.cursor()
+    while True:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute("DELETE FROM temp._archive_ids")
+            # timestamp インデックスだけで対象 ID を拾う
+            cur.execute(
+                f"INSERT INTO temp._archive_ids SELECT {pk} FROM main.{table} "
+                "WHERE timestamp >= ? AND timestamp < ? LIMIT ?",
+                (lo, hi, chunk_size),
+            )
+            count = cur.rowcount
+            if count <= 0:
+                cur.execute("COMMIT")
+                return moved
+            if archive:
+                cur.execute(
+                    f"INSERT OR IGNORE INTO arch.{table} SELECT * FROM main.{table} "
+                    f"WHERE {pk} IN (SELECT id FROM temp._archive_ids)"
+                )
+            cur.execute(
+                f"DELETE FROM main.{table} WHERE {pk} IN (SELECT id FROM temp._archive_ids)"
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        moved += count
+
+
+def archive_old_logs(
+    *,
+    db_path: str | Path | None = None,
+    archive_dir: str | Path | None = None,
+    now: datetime | None = None,
+    chunk_size: int = 5000,
+) -> dict[str, int]:
+    """Archive expired rows and return the number moved per table."""
+    path = Path(db_path) if db_path is not None else DB_PATH
+    if not path.exists():
+        return {}
+    archive = env_loader.get_env("LOG_ARCHIVE_ENABLED", "true").lower() == "true"
+    out_dir = Path(archive_dir) if archive_dir is not None else _archive_dir(path)
+    now = now or datetime.now(timezone.utc)
+    result: dict[str, int] = {}
+
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        cur = conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS _archive_ids (id INTEGER PRIMARY KEY)")
+        for table, (pk, env_key, default) in RETENTION_TABLES.items():
+            days = float(env_loader.get_env(env_key, default))
+            if days <= 0:
+                continue
+            exists = cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+            ).fetchone()
+            if not exists:
+                continue
+            cutoff = (now - timedelta(days=days)).isoformat()
+            months = [
+                r[0]
+                for r in cur.execute(
+                    f"SELECT DISTINCT substr(timestamp, 1, 7) FROM {table} "
+                    "WHERE timestamp < ? ORDER BY 1",
+                    (cutoff,),
+                ).fetchall()
+            ]
+            moved = 0
+            for month in months:
+                lo, hi = _month_bounds(month)
+                hi = min(hi, cutoff)
+                if archive:
+                    out_dir.mkdir(parents=True, exist_ok=True)
+                    cur.execute(
+                        "ATTACH DATABASE ? AS arch", (str(out_dir / f"logs_{month}.db"),)
+                    )
+                try:
+                    if archive:
+                        _ensure_archive_table(cur, table)
+                    moved += _move_range(
+                        conn, table, pk, lo, hi, archive=archive, chunk_size=chunk_size
+                    )
+                finally:
+                    if archive:
+                        cur.execute("DETACH DATABASE arch")
+            if moved:
+                logger.info("archived %d rows from %s (older than %s)", moved, table, cutoff)
+            result[table] = moved
+    finally:
+        conn.close()
+    return result
+
+
+if __name__ == "__main__":
+    for name, num in archive_old_logs().items():
+        print(f"archived {num} rows from {name}")
@@ -1,9 +1,31 @@
-
 """Kafka と Prometheus へメトリクスを送信するユーティリティ."""
-"""Publish metrics to Kafka and expose Prometheus gauges."""
+"""Publish metrics to Kafka and expose Prometheus gauges.
+
+:func:`publish` never waits on Kafka.  The Prometheus gauge is set in place
+and the sample is appended to an in-process buffer.  A daemon thread drains
+the buffer every ``METRICS_FLUSH_MS`` and hands the whole batch to the Kafka
+producer, which groups the records per request (``linger_ms``).
+
+When Kafka is unreachable the producer is not rebuilt on every publish: a
+failed construction or send opens a circuit breaker and the next attempt is
+made after an exponentially growing delay (capped at
+``METRICS_KAFKA_RETRY_MAX_SEC``).  Samples buffered while the breaker is open
+are dropped; the buffer itself is bounded by ``METRICS_BUFFER_MAX`` and drops
+the oldest samples when full.
+
+Hot paths can pre-register a :class:`MetricHandle` with :func:`metric` so the
+gauge child and labels are resolved once::
+
+    LOOP_OK = metrics_publisher.metric("job_loop_success", {"mode": "scalp"})
+    LOOP_OK.set(1)
+"""
 
+import atexit
 import json
 import logging
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
 try:
@@ -25,51 +47,179 @@ KAFKA_SERVERS = (
     or "localhost:9092"
 )
 METRICS_TOPIC = env_loader.get_env("METRICS_TOPIC", "metrics")
+BUFFER_MAX = int(env_loader.get_env("METRICS_BUFFER_MAX", "10000"))
+FLUSH_INTERVAL_SEC = float(env_loader.get_env("METRICS_FLUSH_MS", "500")) / 1000
+RETRY_MIN_SEC = 1.0
+RETRY_MAX_SEC = float(env_loader.get_env("METRICS_KAFKA_RETRY_MAX_SEC", "300"))
 
 # Kafka producer is initialized lazily so unit tests can run without Kafka.
 _producer = None
+_retry_at = 0.0
+_retry_delay = RETRY_MIN_SEC
 _gauges: dict[str, Gauge] = {}
+_handles: dict[tuple, "MetricHandle"] = {}
+_handles_lock = threading.Lock()
 
+# publish 側は append するだけ。満杯時は古いサンプルから捨てる
+_buffer: deque = deque(maxlen=BUFFER_MAX)
+_send_lock = threading.Lock()
+_flusher: threading.Thread | None = None
+_stats = {"published": 0, "sent": 0, "dropped": 0, "batches": 0, "producer_failures": 0}
 
-def _get_producer() -> KafkaProducer | None:
-    global _producer
-    if _producer is None:
-        try:
-            _producer = KafkaProducer(
-                bootstrap_servers=KAFKA_SERVERS.split(","),
-                value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            )
-        except Exception as exc:  # pragma: no cover - Kafka optional
-            logger.debug(f"Kafka producer init failed: {exc}")
-            _producer = None
+
+def _get_producer() -> "KafkaProducer | None":
+    """Return the producer, or ``None`` while the circuit breaker is open."""
+    global _producer, _retry_at, _retry_delay
+    if _producer is not None or KafkaProducer is None:
+        return _producer
+    now = time.monotonic()
+    if now < _retry_at:
+        return None
+    try:
+        _producer = KafkaProducer(
+            bootstrap_servers=KAFKA_SERVERS.split(","),
+            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+            linger_ms=int(FLUSH_INTERVAL_SEC * 1000),
+        )
+        _retry_delay = RETRY_MIN_SEC
+    except Exception as exc:  # pragma: no cover - Kafka optional
+        _open_breaker(now, f"producer init failed: {exc}")
     return _producer
 
 
-def publish(metric: str, value: float, labels: dict | None = None) -> None:
-    """Send metric to Kafka and update Prometheus gauge."""
-    labels = labels or {}
-    data = {
-        "metric": metric,
-        "value": value,
-        "labels": labels,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
-    producer = _get_producer()
-    if producer:
+def _open_breaker(now: float, reason: str) -> None:
+    global _producer, _retry_at, _retry_delay
+    producer, _producer = _producer, None
+    if producer is not None:
         try:
-            producer.send(METRICS_TOPIC, data)
-        except Exception as exc:  # pragma: no cover
-            logger.debug(f"Kafka publish failed: {exc}")
-    gauge_key = metric + "_" + "_".join(sorted(labels))
-    if gauge_key not in _gauges:
-        _gauges[gauge_key] = Gauge(metric, metric, labelnames=list(labels))
+            producer.close(timeout=0)
+        except Exception:  # pragma: no cover - best effort
+            pass
+    _stats["producer_failures"] += 1
+    _retry_at = now + _retry_delay
+    logger.debug(f"Kafka {reason}; retry in {_retry_delay:.0f}s")
+    _retry_delay = min(_retry_delay * 2, RETRY_MAX_SEC)
+
+
+def _gauge_child(name: str, labels: dict):
+    gauge_key = name + "_" + "_".join(sorted(labels))
     try:
-        _gauges[gauge_key].labels(**labels).set(value)
+        gauge = _gauges.get(gauge_key)
+        if gauge is None:
+            gauge = _gauges[gauge_key] = Gauge(name, name, labelnames=list(labels))
+        return gauge.labels(**labels) if labels else gauge
     except Exception as exc:  # pragma: no cover - avoid crash
-        logger.debug(f"Gauge update failed: {exc}")
+        logger.debug(f"Gauge setup failed: {exc}")
+        return None
+
+
+class MetricHandle:
+    """Pre-resolved gauge child and labels for one metric series."""
+
+    __slots__ = ("name", "labels", "_child")
+
+    def __init__(self, name: str, labels: dict) -> None:
+        self.name = name
+        self.labels = labels
+        self._child = _gauge_child(name, labels)
+
+    def set(self, value: float) -> None:
+        """Update the gauge and queue the sample for Kafka."""
+        if self._child is not None:
+            try:
+                self._child.set(value)
+            except Exception as exc:  # pragma: no cover - avoid crash
+                logger.debug(f"Gauge update failed: {exc}")
+        _buffer.append((self, value, time.time()))
+        if _flusher is None:
+            _start_flusher()
+
+
+def metric(name: str, labels: dict | None = None) -> MetricHandle:
+    """Return the (cached) handle for ``name`` with ``labels``."""
+    key = (name, tuple(sorted(labels.items()))) if labels else (name,)
+    handle = _handles.get(key)
+    if handle is None:
+        with _handles_lock:
+            handle = _handles.get(key)
+            if handle is None:
+                handle = _handles[key] = MetricHandle(name, dict(labels or {}))
+    return handle
+
+
+def publish(metric_name: str, value: float, labels: dict | None = None) -> None:
+    """Send metric to Kafka and update Prometheus gauge."""
+    metric(metric_name, labels).set(value)
 
 
 def record_latency(metric: str, start: float, end: float) -> None:
     """Processing timeをmsで計測して出力する."""
     latency = (end - start) * 1000
     publish(metric, latency)
+
+
+# ----------------------------------------------------------------------
+# Background flusher
+# ----------------------------------------------------------------------
+def flush() -> int:
+    """Send every buffered sample now; return how many were sent."""
+    with _send_lock:
+        batch = []
+        while True:
+            try:
+                batch.append(_buffer.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return 0
+        _stats["published"] += len(batch)
+        producer = _get_producer()
+        if producer is None:
+            _stats["dropped"] += len(batch)
+            return 0
+        sent = 0
+        try:
+            for handle, value, ts in batch:
+                producer.send(
+                    METRICS_TOPIC,
+                    {
+                        "metric": handle.name,
+                        "value": value,
+                        "labels": handle.labels,
+                        "timestamp": datetime.utcfromtimestamp(ts).isoformat(),
+                    },
+                )
+                sent += 1
+        except Exception as exc:  # pragma: no cover
+            _open_breaker(time.monotonic(), f"publish failed: {exc}")
+        _stats["sent"] += sent
+        _stats["dropped"] += len(batch) - sent
+        _stats["batches"] += 1
+        return sent
+
+
+def _run() -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL_SEC)
+        try:
+            flush()
+        except Exception as exc:  # pragma: no cover - keep the thread alive
+            logger.debug(f"metrics flush failed: {exc}")
+
+
+def _start_flusher() -> None:
+    global _flusher
+    with _handles_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="metrics-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def stats() -> dict:
+    """Return buffer depth, send counters and circuit-breaker state."""
+    return {
+        **_stats,
+        "buffered": len(_buffer),
+        "breaker_open": _producer is None and time.monotonic() < _retry_at,
+    }
@@ -7,6 +7,7 @@ from prometheus_client import (
     CONTENT_TYPE_LATEST,
     CollectorRegistry,
     Counter,
+    Gauge,
     Histogram,
     generate_latest,
 )
@@ -54,6 +55,49 @@ ai_pattern_model_missing_total = Counter(
     registry=registry,
 )
 
+log_db_queue_depth = Gauge(
+    "log_db_queue_depth",
+    "Rows waiting in the background log DB writer",
+    registry=registry,
+)
+
+
+def _log_db_queue_depth() -> float:
+    try:
+        from backend.logs.log_manager import writer_stats
+
+        return float(writer_stats().get("depth", 0))
+    except Exception:
+        return 0.0
+
+
+log_db_queue_depth.set_function(_log_db_queue_depth)
+
+stage_latency_seconds = Histogram(
+    "stage_latency_seconds",
+    "Latency of JobRunner loop stages (span path)",
+    ["stage"],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+    registry=registry,
+)
+
+_registered_default = False
+
+
+def register_with_default() -> None:
+    """このレジストリを prometheus_client の既定レジストリにも載せる.
+
+    JobRunner は ``start_http_server`` で既定レジストリを公開するため、
+    ステージ別ヒストグラム等をそちらからも取得できるようにする。
+    """
+    global _registered_default
+    if _registered_default:
+        return
+    from prometheus_client import REGISTRY
+
+    REGISTRY.register(registry)
+    _registered_default = True
+
 app = FastAPI()
 
 
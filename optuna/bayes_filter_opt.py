@@ -1,52 +1,250 @@
 from __future__ import annotations
 
-"""Bayesian optimization for entry filter parameters."""
+"""Bayesian optimization for entry filter parameters.
 
-import json
-import os
-import subprocess
+Trials run in-process.  The dataset is read and the model is unpickled
+once; its positions and confidences are computed up front because they do
+not depend on the filter parameters.  A trial only builds the entry mask::
+
+    volume MA(VOL_MA_PERIOD) >= MIN_VOL_MA and confidence >= CNN_PROB_THRESHOLD
+
+and scores the filtered returns fold by fold.  The Sharpe ratio of the
+folds seen so far is reported after each fold so the pruner can stop weak
+trials early; the final value is the Sharpe over the whole dataset.
+
+Trials share a study in persistent storage (SQLite by default), so a run
+can be resumed and spread over ``--jobs`` threads and ``--workers``
+processes.  Unless ``--study`` is given, the study is named after the data
+file, the model file and the fold count (path, size and mtime), so a run on
+different inputs starts a fresh study instead of resuming a stale one.  Worker processes receive the prepared arrays once through the
+pool initializer.
+
+Usage::
+
+    python optuna/bayes_filter_opt.py --data data/USD_JPY_M5.feather \\
+        --model models/latest/model.pkl --trials 500 --workers 4
+"""
+
+import argparse
+import hashlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable
 
+import joblib
+import numpy as np
+import pandas as pd
 import yaml
 
 import optuna
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from pipelines.walk_forward.utils import calc_sharpe, predict_positions
+
 DATA_PATH = Path("training/examples/sample_rates.csv")
 MODEL_PATH = Path("models/sample_model.pkl")
+STORAGE = "sqlite:///optuna_filters.db"
+STUDY_NAME = "entry_filters"
+VOL_MA_PERIODS = range(3, 11)
 
 
-def objective(trial: optuna.Trial) -> float:
-    """Run backtest CLI with trial parameters and return Sharpe ratio."""
-    params = {
+@dataclass(frozen=True)
+class FilterDataset:
+    """Filter-independent arrays shared read-only by every trial."""
+
+    trade_returns: np.ndarray
+    prob: np.ndarray
+    vol_ma: dict[int, np.ndarray]
+    folds: tuple[slice, ...]
+    key: str = ""
+
+
+def dataset_id(data_path: Path, model_path: Path, n_folds: int) -> str:
+    """Identify a dataset by its input files and fold count (for resuming)."""
+    parts = []
+    for path in (data_path, model_path):
+        st = path.stat()
+        parts.append(f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}")
+    key = "|".join(parts) + f"|{n_folds}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def load_dataset(
+    data_path: Path = DATA_PATH, model_path: Path = MODEL_PATH, n_folds: int = 4
+) -> FilterDataset:
+    """Read the rates and model once and precompute everything trials need."""
+    if data_path.suffix.lower() == ".feather":
+        df = pd.read_feather(data_path)
+    else:
+        df = pd.read_csv(data_path)
+    model = joblib.load(model_path)
+    feats, pos, prob = predict_positions(model, df)
+    trade_returns = pos * (feats["next_close"].to_numpy() - feats["close"].to_numpy())
+    volume = feats["volume"] if "volume" in feats else pd.Series(0.0, index=feats.index)
+    # 出来高平均は探索範囲の期間ぶんだけ先に計算しておく
+    vol_ma = {
+        p: volume.rolling(p, min_periods=1).mean().to_numpy() for p in VOL_MA_PERIODS
+    }
+    edges = np.linspace(0, len(feats), n_folds + 1).astype(int)
+    folds = tuple(slice(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a)
+    key = dataset_id(data_path, model_path, n_folds)
+    return FilterDataset(trade_returns, prob, vol_ma, folds, key)
+
+
+def suggest_params(trial: optuna.Trial) -> dict:
+    return {
         "MIN_VOL_MA": trial.suggest_int("MIN_VOL_MA", 40, 120),
-        "VOL_MA_PERIOD": trial.suggest_int("VOL_MA_PERIOD", 3, 10),
+        "VOL_MA_PERIOD": trial.suggest_int(
+            "VOL_MA_PERIOD", VOL_MA_PERIODS.start, VOL_MA_PERIODS.stop - 1
+        ),
         "CNN_PROB_THRESHOLD": trial.suggest_float("CNN_PROB_THRESHOLD", 0.55, 0.85),
     }
-    env = os.environ.copy()
-    env.update({k: str(v) for k, v in params.items()})
-    subprocess.run(
-        [
-            "python",
-            "offline_training/backtest.py",
-            "--model",
-            str(MODEL_PATH),
-            "--data",
-            str(DATA_PATH),
-            "--out",
-            "metrics.json",
-        ],
-        check=True,
-        env=env,
+
+
+def evaluate(ds: FilterDataset, params: dict, trial: optuna.Trial | None = None) -> float:
+    """Sharpe ratio of the trades the filters let through.
+
+    With ``trial`` the running Sharpe is reported after every fold and
+    :class:`optuna.TrialPruned` is raised when the pruner says so.
+    """
+    mask = (ds.vol_ma[params["VOL_MA_PERIOD"]] >= params["MIN_VOL_MA"]) & (
+        ds.prob >= params["CNN_PROB_THRESHOLD"]
     )
-    with open("metrics.json") as f:
-        metrics = json.load(f)
-    return float(metrics.get("sharpe", 0))
+    taken: list[np.ndarray] = []
+    sharpe = 0.0
+    for step, fold in enumerate(ds.folds):
+        taken.append(ds.trade_returns[fold][mask[fold]])
+        returns = np.concatenate(taken)
+        sharpe = calc_sharpe(returns) if returns.size > 1 else 0.0
+        if trial is not None:
+            trial.report(sharpe, step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+    return sharpe
+
+
+def make_objective(ds: FilterDataset) -> Callable[[optuna.Trial], float]:
+    """Objective bound to a prepared dataset."""
 
+    def _objective(trial: optuna.Trial) -> float:
+        return evaluate(ds, suggest_params(trial), trial)
 
-def main() -> None:
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=24)
-    with open("best_filters.yaml", "w") as f:
+    return _objective
+
+
+_dataset: FilterDataset | None = None
+
+
+def objective(trial: optuna.Trial) -> float:
+    """Evaluate trial parameters on the default dataset and model."""
+    global _dataset
+    if _dataset is None:
+        _dataset = load_dataset()
+    return evaluate(_dataset, suggest_params(trial), trial)
+
+
+def create_study(
+    storage: str | None, study_name: str | None, seed: int | None = None
+) -> optuna.Study:
+    return optuna.create_study(
+        study_name=study_name,
+        storage=storage or None,
+        load_if_exists=True,
+        direction="maximize",
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1),
+    )
+
+
+def _init_worker(ds: FilterDataset) -> None:
+    # データセットはワーカー起動時に一度だけ受け取る
+    global _dataset
+    _dataset = ds
+
+
+def _optimize_worker(
+    storage: str, study_name: str | None, n_trials: int, n_jobs: int, seed: int | None
+) -> None:
+    study = create_study(storage, study_name, seed)
+    study.optimize(make_objective(_dataset), n_trials=n_trials, n_jobs=n_jobs)
+
+
+def optimize(
+    ds: FilterDataset,
+    *,
+    n_trials: int = 24,
+    n_jobs: int = 1,
+    workers: int = 1,
+    storage: str | None = STORAGE,
+    study_name: str | None = None,
+    seed: int | None = None,
+) -> optuna.Study:
+    """Run ``n_trials`` over ``workers`` processes × ``n_jobs`` threads.
+
+    Without ``study_name`` the study is named after the dataset's inputs.
+    """
+    if study_name is None:
+        if not ds.key and storage:
+            raise ValueError("study_name is required for a dataset without a key")
+        # 入力が変わったら別スタディにして古い試行と混ぜない
+        study_name = f"{STUDY_NAME}-{ds.key}" if ds.key else None
+    study = create_study(storage, study_name, seed)
+    if workers <= 1:
+        study.optimize(make_objective(ds), n_trials=n_trials, n_jobs=n_jobs)
+        return study
+    if not storage:
+        raise ValueError("workers > 1 needs a shared storage")
+    shares = [n_trials // workers + (i < n_trials % workers) for i in range(workers)]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(ds,)
+    ) as pool:
+        futures = [
+            # ワーカーごとにシードをずらして同じ候補ばかり試さないようにする
+            pool.submit(
+                _optimize_worker,
+                storage,
+                study_name,
+                n,
+                n_jobs,
+                None if seed is None else seed + i,
+            )
+            for i, n in enumerate(shares)
+            if n > 0
+        ]
+        for fut in futures:
+            fut.result()
+    return study
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Tune entry filter parameters")
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=4, help="pruning steps")
+    parser.add_argument("--trials", type=int, default=24)
+    parser.add_argument("--jobs", type=int, default=1, help="threads per process")
+    parser.add_argument("--workers", type=int, default=1, help="processes")
+    parser.add_argument("--storage", default=STORAGE, help="'' for in-memory")
+    parser.add_argument(
+        "--study", default=None, help="default: derived from --data, --model and --folds"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", type=Path, default=Path("best_filters.yaml"))
+    args = parser.parse_args(argv)
+
+    ds = load_dataset(args.data, args.model, args.folds)
+    study = optimize(
+        ds,
+        n_trials=args.trials,
+        n_jobs=args.jobs,
+        workers=args.workers,
+        storage=args.storage,
+        study_name=args.study,
+        seed=args.seed,
+    )
+    with open(args.out, "w") as f:
         yaml.safe_dump(study.best_params, f, sort_keys=False)
 
 
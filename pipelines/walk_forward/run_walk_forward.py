@@ -1,10 +1,31 @@
-"""Walk-forward optimization main script."""
+"""Walk-forward optimization main script.
+
+Folds are independent, so they are trained and evaluated in parallel
+worker processes.  The feature table is never pickled to the workers: each
+worker opens the file once (memory-mapped for Feather / Arrow IPC and
+Parquet via ``pyarrow``, plain ``read_csv`` for CSV) and slices the rows of
+its fold.  Every fold gets a seed derived from ``--seed`` and the fold
+index, so results do not depend on which worker ran it.
+
+Per-fold metrics are appended to ``fold_metrics.jsonl`` as soon as a fold
+finishes.  Re-running with the same data and window settings skips folds
+already recorded there; ``--fresh`` starts over.
+
+Usage::
+
+    python pipelines/walk_forward/run_walk_forward.py data/USD_JPY_M1.feather \\
+        --train-size 43200 --test-size 10080 --jobs 8 --outdir models/candidate
+"""
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import os
 import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import pandas as pd
@@ -12,10 +33,14 @@ import pandas as pd
 sys.path.append(str(Path(__file__).resolve().parent))
 from utils import calc_sharpe, simulate_trades, train_simple_model
 
+_COLUMNS = ["open", "high", "low", "close"]
+_ARROW_SUFFIXES = (".feather", ".arrow", ".ipc")
+_PARQUET_SUFFIXES = (".parquet", ".pq")
+
 
-def train_model(df: pd.DataFrame):
+def train_model(df: pd.DataFrame, random_state: int | None = None):
     """Fit a simple logistic regression model."""
-    return train_simple_model(df)
+    return train_simple_model(df, random_state=random_state)
 
 
 def run_backtest(model, df: pd.DataFrame):
@@ -37,36 +62,202 @@ def evaluate_metrics(bt_result, fwd_result) -> dict:
     return {"bt_sharpe": bt_sharpe, "fwd_sharpe": fwd_sharpe}
 
 
+def fold_starts(n_rows: int, train_size: int, test_size: int) -> range:
+    """Start row of every fold (same windows as :func:`rolling_train_test`)."""
+    return range(0, n_rows - train_size - test_size, test_size)
+
+
 def rolling_train_test(ohlc: pd.DataFrame, train_size: int, test_size: int):
     """ジェネレータで訓練区間とテスト区間を返す"""
-    for start in range(0, len(ohlc) - train_size - test_size, test_size):
+    for start in fold_starts(len(ohlc), train_size, test_size):
         train = ohlc.iloc[start : start + train_size]
         test = ohlc.iloc[start + train_size : start + train_size + test_size]
         yield train, test
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--outdir", type=Path, default=Path("models/candidate"))
-    args = parser.parse_args()
-    args.outdir.mkdir(parents=True, exist_ok=True)
+def fold_seed(seed: int, fold: int) -> int:
+    """Seed for ``fold``; independent of worker assignment and run order."""
+    digest = hashlib.sha256(f"{seed}:{fold}".encode()).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+# ----------------------------------------------------------------------
+# Data access
+# ----------------------------------------------------------------------
+
+
+def open_table(path: Path):
+    """Open ``path`` for row slicing (``pyarrow.Table`` or ``DataFrame``)."""
+    suffix = path.suffix.lower()
+    if suffix in _ARROW_SUFFIXES:
+        import pyarrow as pa
+
+        # 非圧縮の Arrow IPC ならページキャッシュを共有したままゼロコピーで読める
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        return table.select(_COLUMNS)
+    if suffix in _PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=_COLUMNS, memory_map=True)
+    return pd.read_csv(path, usecols=_COLUMNS)
+
+
+def count_rows(path: Path) -> int:
+    """Number of rows without materialising the table where possible."""
+    if path.suffix.lower() in _PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    table = open_table(path)
+    return table.num_rows if hasattr(table, "num_rows") else len(table)
+
+
+def slice_rows(table, start: int, length: int) -> pd.DataFrame:
+    """Rows ``start:start+length`` as a DataFrame with a fresh index."""
+    if isinstance(table, pd.DataFrame):
+        return table.iloc[start : start + length].reset_index(drop=True)
+    return table.slice(start, length).to_pandas()
 
-    csv_path = Path("tests/data/range_sample.csv")
-    ohlc = pd.read_csv(csv_path)
-    metrics_all = []
-    last_model = None
 
-    for train_df, test_df in rolling_train_test(ohlc, 6, 2):
-        last_model = train_model(train_df)
-        bt_r = run_backtest(last_model, train_df)
-        fwd_r = run_forward(last_model, test_df)
-        metrics_all.append(evaluate_metrics(bt_r, fwd_r))
+_table = None
+
+
+def _init_worker(path: str) -> None:
+    # ワーカーごとにファイルを一度だけ開く
+    global _table
+    _table = open_table(Path(path))
+
+
+def run_fold(fold: int, start: int, train_size: int, test_size: int, seed: int) -> dict:
+    """Train on one window, test on the next one and return its metrics."""
+    rs = fold_seed(seed, fold)
+    train_df = slice_rows(_table, start, train_size)
+    test_df = slice_rows(_table, start + train_size, test_size)
+    model = train_model(train_df, random_state=rs)
+    metrics = evaluate_metrics(run_backtest(model, train_df), run_forward(model, test_df))
+    return {"fold": fold, "start": start, "seed": rs, **metrics}
+
+
+# ----------------------------------------------------------------------
+# Resumable driver
+# ----------------------------------------------------------------------
+
+
+def run_id(path: Path, train_size: int, test_size: int, seed: int) -> str:
+    """Identify a run by its input file and settings (for resuming)."""
+    st = path.stat()
+    key = f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}|{train_size}|{test_size}|{seed}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def load_done(log_path: Path, rid: str) -> dict[int, dict]:
+    """Fold metrics already recorded for run ``rid``; drop a torn last line."""
+    done: dict[int, dict] = {}
+    if not log_path.exists():
+        return done
+    with open(log_path, "rb+") as f:
+        good = 0
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            good += len(line)
+            if rec.get("run") == rid:
+                done[rec["fold"]] = rec
+        # 中断時に書きかけだった行を切り捨ててから追記する
+        f.truncate(good)
+    return done
+
+
+def walk_forward(
+    path: Path,
+    outdir: Path,
+    *,
+    train_size: int,
+    test_size: int,
+    jobs: int = 1,
+    seed: int = 42,
+    fresh: bool = False,
+) -> pd.DataFrame:
+    """Run every fold not yet in ``outdir/fold_metrics.jsonl``; return all folds."""
+    outdir.mkdir(parents=True, exist_ok=True)
+    log_path = outdir / "fold_metrics.jsonl"
+    if fresh and log_path.exists():
+        log_path.unlink()
+    rid = run_id(path, train_size, test_size, seed)
+    done = load_done(log_path, rid)
+    todo = [
+        (fold, start)
+        for fold, start in enumerate(fold_starts(count_rows(path), train_size, test_size))
+        if fold not in done
+    ]
+    if done:
+        print(f"resuming: {len(done)} folds done, {len(todo)} to run")
+
+    with open(log_path, "a") as log:
+
+        def record(rec: dict) -> None:
+            rec["run"] = rid
+            done[rec["fold"]] = rec
+            log.write(json.dumps(rec) + "\n")
+            log.flush()
+
+        if jobs <= 1 or len(todo) <= 1:
+            _init_worker(str(path))
+            for fold, start in todo:
+                record(run_fold(fold, start, train_size, test_size, seed))
+        elif todo:
+            with ProcessPoolExecutor(
+                max_workers=min(jobs, len(todo)),
+                initializer=_init_worker,
+                initargs=(str(path),),
+            ) as pool:
+                futures = [
+                    pool.submit(run_fold, fold, start, train_size, test_size, seed)
+                    for fold, start in todo
+                ]
+                for fut in as_completed(futures):
+                    record(fut.result())
+
+    cols = ["fold", "start", "seed", "bt_sharpe", "fwd_sharpe"]
+    return pd.DataFrame([done[k] for k in sorted(done)], columns=cols)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", type=Path, default=Path("tests/data/range_sample.csv"))
+    parser.add_argument("--outdir", type=Path, default=Path("models/candidate"))
+    parser.add_argument("--train-size", type=int, default=6)
+    parser.add_argument("--test-size", type=int, default=2)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fresh", action="store_true", help="ignore recorded folds")
+    args = parser.parse_args(argv)
 
-    df_metrics = pd.DataFrame(metrics_all)
+    df_metrics = walk_forward(
+        args.path,
+        args.outdir,
+        train_size=args.train_size,
+        test_size=args.test_size,
+        jobs=args.jobs,
+        seed=args.seed,
+        fresh=args.fresh,
+    )
     df_metrics.to_json(args.outdir / "metrics.json", orient="records")
-    if last_model is not None:
-        with open(args.outdir / "model.pkl", "wb") as f:
-            pickle.dump(last_model, f)
+    if df_metrics.empty:
+        return
+    # 最終フォールのモデルだけ親プロセスで学習し直して保存する
+    last = df_metrics.iloc[-1]
+    table = open_table(args.path)
+    last_model = train_model(
+        slice_rows(table, int(last["start"]), args.train_size),
+        random_state=int(last["seed"]),
+    )
+    with open(args.outdir / "model.pkl", "wb") as f:
+        pickle.dump(last_model, f)
 
 
 if __name__ == "__main__":
@@ -20,7 +20,7 @@ def _prepare_features(df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna().reset_index(drop=True)
 
 
-def train_simple_model(df: pd.DataFrame):
+def train_simple_model(df: pd.DataFrame, random_state: int | None = None):
     """Train logistic regression model. Uses a dummy model if data is degenerate."""
     feats = _prepare_features(df)
     X = feats[["feat1", "feat2"]]
@@ -29,7 +29,7 @@ def train_simple_model(df: pd.DataFrame):
         model = DummyClassifier(strategy="most_frequent")
         model.fit(X, y)
     else:
-        model = LogisticRegression()
+        model = LogisticRegression(random_state=random_state)
         model.fit(X, y)
     return model
 
@@ -44,6 +44,18 @@ def simulate_trades(model: LogisticRegression, df: pd.DataFrame) -> np.ndarray:
     return pos * price_diff
 
 
+def predict_positions(model, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Return prepared features, +1/-1 positions and the model's confidence."""
+    feats = _prepare_features(df)
+    X = feats[["feat1", "feat2"]]
+    pos = model.predict(X) * 2 - 1
+    if hasattr(model, "predict_proba"):
+        prob = model.predict_proba(X).max(axis=1)
+    else:
+        prob = np.ones(len(feats))
+    return feats, pos, prob
+
+
 def calc_sharpe(returns: np.ndarray) -> float:
     """Calculate simple Sharpe ratio."""
     if returns.size == 0:
@@ -58,5 +70,6 @@ def calc_sharpe(returns: np.ndarray) -> float:
 __all__ = [
     "train_simple_model",
     "simulate_trades",
+    "predict_positions",
     "calc_sharpe",
 ]
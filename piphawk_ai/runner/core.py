@@ -19,7 +19,18 @@ except Exception:  # pragma: no cover - optional dependency or test stub
         return None
 
 
-from backend.utils import env_loader, trade_age_seconds
+def _expose_stage_metrics() -> None:
+    """Serve prom_exporter's stage histograms from the runner's metrics port."""
+    try:
+        from monitoring.prom_exporter import register_with_default
+
+        register_with_default()
+    except Exception:  # pragma: no cover - fastapi 等が無い環境
+        pass
+
+
+from backend.config import runtime_config
+from backend.utils import env_loader, llm_pool, trade_age_seconds
 from backend.utils.openai_client import reset_call_counter, set_call_limit
 from backend.utils.restart_guard import can_restart
 
@@ -42,6 +53,8 @@ from backend.indicators.calculate_indicators import (
     calculate_indicators_multi,
 )
 from backend.market_data.candle_fetcher import fetch_multiple_timeframes
+from backend.market_data.candle_frame import as_candle_list
+from backend.market_data.market_hours import tradeable_status
 from backend.market_data.tick_fetcher import fetch_tick_data
 
 try:
@@ -94,6 +107,14 @@ except ImportError:  # tests may stub position_manager without helpers
         return None
 
 
+try:
+    from backend.orders.order_manager import get_pip_size
+except Exception:  # pragma: no cover - test stubs may remove module
+
+    def get_pip_size(instrument: str) -> float:
+        return 0.01 if instrument.endswith("_JPY") else 0.0001
+
+
 try:
     from backend.orders.order_manager import OrderManager
 except Exception:  # pragma: no cover - test stubs may remove module
@@ -128,7 +149,7 @@ except Exception:  # pragma: no cover - test stubs may lack filter_pre_ai
         return False
 
 
-from backend.logs.perf_stats_logger import PerfTimer
+from backend.logs.perf_stats_logger import PerfTimer, span
 from backend.strategy.signal_filter import pass_exit_filter
 from backend.utils.ai_parse import parse_trade_plan
 from monitoring import metrics_publisher
@@ -223,12 +244,11 @@ from execution import scalp_manager
 
 def build_exit_context(position, tick_data, indicators, indicators_m1=None) -> dict:
     """Compose a minimal context dict for AI exit evaluation."""
+    cfg = runtime_config.current()
     bid = float(tick_data["prices"][0]["bids"][0]["price"])
     ask = float(tick_data["prices"][0]["asks"][0]["price"])
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-    unrealized_pl_pips = float(position["unrealizedPL"]) / float(
-        env_loader.get_env("PIP_VALUE_JPY", "100")
-    )
+    pip_size = cfg.pip_size
+    unrealized_pl_pips = float(position["unrealizedPL"]) / cfg.pip_value_jpy
     side = "long" if int(position.get("long", {}).get("units", 0)) != 0 else "short"
     context = {
         "side": side,
@@ -275,6 +295,8 @@ order_mgr = OrderManager()
 
 
 DEFAULT_PAIR = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+# 複数の JobRunner を同一プロセスで動かしてもメトリクスサーバーは 1 つだけ起動する
+_METRICS_STARTED = False
 
 # Comma-separated chart pattern names used for AI analysis
 PATTERN_NAMES = [
@@ -322,37 +344,37 @@ MM_DRAW_MAX_ATR_RATIO = float(env_loader.get_env("MM_DRAW_MAX_ATR_RATIO", "2.0")
 #  Check if the instrument is currently tradeable via OANDA
 # ───────────────────────────────────────────────────────────
 def instrument_is_tradeable(instrument: str) -> bool:
-    if not OANDA_API_KEY or not OANDA_ACCOUNT_ID:
-        return True  # assume open if credentials missing
-
-    url = f"https://api-fxtrade.oanda.com/v3/accounts/{OANDA_ACCOUNT_ID}/instruments"
-    headers = {"Authorization": f"Bearer {OANDA_API_KEY}"}
-    params = {"instruments": instrument}
-    try:
-        resp = requests.get(url, headers=headers, params=params, timeout=5)
-        resp.raise_for_status()
-        instruments = resp.json().get("instruments", [])
-        if instruments:
-            return str(instruments[0].get("tradeable", "true")).lower() == "true"
-    except requests.RequestException as exc:
-        logger.warning(f"instrument_is_tradeable: {exc}")
-    return False
+    """Return cached tradeable status (API verified only on state change)."""
+    return tradeable_status.is_tradeable(instrument)
 
 
 class JobRunner:
-    def __init__(self, interval_seconds=1):
+    # 価格ストリーム駆動時は StreamTickRunner が設定される
+    tick_source = None
+
+    def __init__(self, interval_seconds=1, *, instrument: str | None = None):
         self.interval_seconds = interval_seconds
         self.last_run = None
         self._stop = False
         # DEFAULT_PAIR を属性に保持して外部モジュールから参照できるようにする
-        self.DEFAULT_PAIR = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
+        # (MultiPairScheduler からは通貨ペアごとに instrument が渡される)
+        self.DEFAULT_PAIR = instrument or DEFAULT_PAIR
+        # pips 換算はペアごとの値を使う (ループ中の cfg.pip_size に反映する)
+        self.pip_size = get_pip_size(self.DEFAULT_PAIR)
+        # MultiPairScheduler 管理下では待機をスケジューラーに任せる
+        self.scheduled = False
+        self.next_run_delay = 0.0
         # Start Prometheus metrics server
+        global _METRICS_STARTED
         metrics_port = int(env_loader.get_env("METRICS_PORT", "8001"))
-        try:
-            start_http_server(metrics_port)
-            logger.info("Prometheus metrics server running on port %s", metrics_port)
-        except Exception as exc:  # pragma: no cover - metrics optional
-            logger.warning(f"Metrics server start failed: {exc}")
+        if not _METRICS_STARTED:
+            try:
+                start_http_server(metrics_port)
+                _METRICS_STARTED = True
+                _expose_stage_metrics()
+                logger.info("Prometheus metrics server running on port %s", metrics_port)
+            except Exception as exc:  # pragma: no cover - metrics optional
+                logger.warning(f"Metrics server start failed: {exc}")
         loss_lim = float(env_loader.get_env("LOSS_LIMIT", "0"))
         err_lim = int(env_loader.get_env("ERROR_LIMIT", "0"))
         self.safety = SafetyTrigger(loss_limit=loss_lim, error_limit=err_lim)
@@ -388,8 +410,6 @@ class JobRunner:
         # 注文マネージャーとパターン名リストを属性化
         self.order_mgr = order_mgr
         self.PATTERN_NAMES = PATTERN_NAMES
-        # DEFAULT_PAIR を属性として保持
-        self.DEFAULT_PAIR = env_loader.get_env("DEFAULT_PAIR", "USD_JPY")
         # ----- Additional runtime state --------------------------------
         # Toggle for higher‑timeframe reference levels (daily / H4)
         self.higher_tf_enabled = (
@@ -457,13 +477,14 @@ class JobRunner:
             self.current_params_file = "config/trend.yml"
         self.mode_reason = ""
         default_limit = int(env_loader.get_env("MAX_AI_CALLS_PER_LOOP", "1"))
-        set_call_limit(
+        self.ai_call_limit = (
             4 if self.trade_mode in ("scalp_momentum", "micro_scalp") else default_limit
         )
+        set_call_limit(self.ai_call_limit)
 
         # Restore TP adjustment flags based on existing TP order comment
         try:
-            pos = get_position_details(DEFAULT_PAIR)
+            pos = get_position_details(self.DEFAULT_PAIR)
             if pos:
                 er_raw = pos.get("entry_regime")
                 tp_comment = pos.get("tp_comment")
@@ -528,6 +549,7 @@ class JobRunner:
             return []
 
     def _update_portfolio_risk(self) -> None:
+        cfg = runtime_config.current()
         if not self.risk_mgr:
             return
         trade_pl = self._get_recent_trade_pl()
@@ -544,7 +566,7 @@ class JobRunner:
         self.risk_mgr.update_risk_metrics(trade_pl, open_pl)
         if self.risk_mgr.check_stop_conditions():
             logger.warning("Portfolio CVaR limit exceeded")
-            if env_loader.get_env("FORCE_CLOSE_ON_RISK", "false").lower() == "true":
+            if cfg.force_close_on_risk:
                 try:
                     order_mgr.close_all_positions()
                 except Exception as exc:  # pragma: no cover
@@ -552,9 +574,10 @@ class JobRunner:
 
     def _get_cond_indicators(self) -> dict:
         """Return indicators for market condition check."""
-        tf = env_loader.get_env("TREND_COND_TF", "M5").upper()
+        cfg = runtime_config.current()
+        tf = cfg.trend_cond_tf.upper()
         if self.trade_mode in ("scalp", "scalp_momentum", "micro_scalp"):
-            tf = env_loader.get_env("SCALP_COND_TF", self.scalp_cond_tf).upper()
+            tf = (cfg.scalp_cond_tf or self.scalp_cond_tf).upper()
         return getattr(self, f"indicators_{tf}", {}) or {}
 
     def reload_params_for_mode(self, mode: str) -> None:
@@ -584,14 +607,18 @@ class JobRunner:
         try:
             logger.info("Reloading params from %s", config_file)
             params_loader.load_params(path=config_file)
-            default_limit = int(env_loader.get_env("MAX_AI_CALLS_PER_LOOP", "1"))
-            set_call_limit(4 if mode in ("scalp_momentum", "micro_scalp") else default_limit)
+            cfg = runtime_config.refresh()
+            default_limit = cfg.max_ai_calls_per_loop
+            self.ai_call_limit = (
+                4 if mode in ("scalp_momentum", "micro_scalp") else default_limit
+            )
+            set_call_limit(self.ai_call_limit)
             self.current_params_file = config_file
         except Exception as exc:
             logger.error("Param reload failed: %s", exc)
             return
-        if env_loader.get_env("AUTO_RESTART", "false").lower() == "true":
-            interval = float(env_loader.get_env("RESTART_MIN_INTERVAL", "60"))
+        if cfg.auto_restart:
+            interval = cfg.restart_min_interval
             if can_restart(interval):
                 logger.info("AUTO_RESTART enabled – restarting process")
                 python = sys.executable
@@ -626,9 +653,10 @@ class JobRunner:
         self, instrument: str, indicators: dict, candles: list, tick_data: dict
     ):
         """Delegate to entry.manage_pending_limits."""
+        cfg = runtime_config.current()
         manage_pending_limits(self, instrument, indicators, candles, tick_data)
 
-        MAX_LIMIT_RETRY = int(env_loader.get_env("MAX_LIMIT_RETRY", "3"))
+        MAX_LIMIT_RETRY = cfg.max_limit_retry
         pend = get_pending_entry_order(instrument)
         if not pend:
             for key, info in list(_pending_limits.items()):
@@ -643,7 +671,7 @@ class JobRunner:
                 break
 
         if local_info:
-            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+            pip_size = cfg.pip_size
             price = (
                 float(tick_data["prices"][0]["bids"][0]["price"])
                 if local_info.get("side") == "long"
@@ -663,9 +691,7 @@ class JobRunner:
             else:
                 atr_pips = 0.0
 
-            threshold_ratio = float(
-                env_loader.get_env("LIMIT_THRESHOLD_ATR_RATIO", "0.3")
-            )
+            threshold_ratio = cfg.limit_threshold_atr_ratio
             adx_series = indicators.get("adx")
             adx_val = (
                 adx_series.iloc[-1]
@@ -708,6 +734,7 @@ class JobRunner:
                     "ema_slope": ema_slope_val,
                     "bb_width_pips": bb_width_pips,
                     "side": local_info.get("side"),
+                    "instrument": instrument,
                 }
                 try:
                     allow = should_convert_limit_to_market(ctx)
@@ -732,6 +759,7 @@ class JobRunner:
                                 detected_patterns=self.patterns_by_tf,
                                 trade_mode=self.trade_mode,
                                 mode_reason=self.mode_reason,
+                                instrument=instrument,
                             )
                             plan = parse_trade_plan(plan)
                             risk = plan.get("risk", {})
@@ -770,7 +798,7 @@ class JobRunner:
                                     for k, v in (self.indicators_H4 or {}).items()
                                 },
                             }
-                            market_cond = get_market_condition(ctx, {})
+                            market_cond = get_market_condition(ctx, {}, instrument=instrument)
                         except Exception as exc:
                             logger.warning(f"get_market_condition failed: {exc}")
                             market_cond = None
@@ -785,11 +813,9 @@ class JobRunner:
                             "market_cond": market_cond,
                             "ai_response": ai_raw,
                         }
-                        sl_val = params.get("sl_pips") or float(
-                            env_loader.get_env("INIT_SL_PIPS", "20")
-                        )
-                        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-                        pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+                        sl_val = params.get("sl_pips") or cfg.init_sl_pips
+                        risk_pct = cfg.entry_risk_pct
+                        pip_val = cfg.pip_value_jpy
                         lot = calc_lot_size(
                             self.account_balance,
                             risk_pct,
@@ -845,6 +871,7 @@ class JobRunner:
                 detected_patterns=self.patterns_by_tf,
                 trade_mode=self.trade_mode,
                 mode_reason=self.mode_reason,
+                instrument=instrument,
             )
             plan = parse_trade_plan(plan)
         except Exception as exc:
@@ -875,11 +902,9 @@ class JobRunner:
             "valid_for_sec": int(entry.get("valid_for_sec", self.max_limit_age_sec)),
             "risk": risk,
         }
-        sl_val = params.get("sl_pips") or float(
-            env_loader.get_env("INIT_SL_PIPS", "20")
-        )
-        risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-        pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+        sl_val = params.get("sl_pips") or cfg.init_sl_pips
+        risk_pct = cfg.entry_risk_pct
+        pip_val = cfg.pip_value_jpy
         lot = calc_lot_size(
             self.account_balance,
             risk_pct,
@@ -933,853 +958,645 @@ class JobRunner:
         """Delegate to exit.should_peak_exit."""
         return should_peak_exit(self, side, indicators, current_profit)
 
-    def run(self):
+    def _fetch_tick_data(self) -> dict | None:
+        """Return the latest pricing data from the stream or the REST API."""
+        with span("tick_fetch"):
+            if self.tick_source is not None:
+                data = self.tick_source.snapshot()
+                if data is not None:
+                    return data
+            return fetch_tick_data(self.DEFAULT_PAIR, include_liquidity=True)
+
+    def _wait_next_cycle(self) -> None:
+        """Sleep until the next evaluation (timer or stream trigger)."""
+        if self.scheduled:
+            self.next_run_delay = max(self.next_run_delay, self.interval_seconds)
+        elif self.tick_source is not None:
+            self.tick_source.wait()
+        else:
+            time.sleep(self.interval_seconds)
+
+    def _sleep(self, seconds: float) -> None:
+        """Back off for ``seconds`` without blocking a shared worker."""
+        if self.scheduled:
+            self.next_run_delay = max(self.next_run_delay, seconds)
+        else:
+            time.sleep(seconds)
+
+    def _sync_trades(self) -> None:
+        """Sync OANDA history; the scheduler does this once per round instead."""
+        if not self.scheduled:
+            with span("trade_sync"):
+                update_oanda_trades()
+
+    def run(self, *, max_loops: int | None = None) -> None:
+        """Run the job loop until ``stop`` is called or ``max_loops`` reached."""
         logger.info("Job Runner started.")
+        loops = 0
         while not self._stop:
             try:
-                reset_call_counter()
-                timer = PerfTimer("job_loop")
-                now = datetime.now(timezone.utc)
-                # ---- Market‑hours guard ---------------------------------
-                if not instrument_is_tradeable(DEFAULT_PAIR):
-                    logger.info(f"{DEFAULT_PAIR} market closed – sleeping 60 s")
-                    time.sleep(60)
-                    self.last_run = datetime.now(timezone.utc)
-                    timer.stop()
-                    continue
-                self._update_portfolio_risk()
-                scalp_manager.monitor_scalp_positions()
-                # Refresh POSITION_REVIEW_SEC dynamically each loop
-                self.review_sec = int(
-                    env_loader.get_env("POSITION_REVIEW_SEC", str(self.review_sec))
+                if self.run_cycle():
+                    loops += 1
+                    if max_loops is not None and loops >= max_loops:
+                        self._stop = True
+            except Exception as e:
+                logger.error(f"Error occurred during job execution: {e}", exc_info=True)
+                self.safety.record_error()
+                metrics_publisher.publish("job_error", 1)
+                self._wait_next_cycle()
+
+    def run_cycle(self) -> bool:
+        """Evaluate one cycle for ``self.DEFAULT_PAIR``.
+
+        Returns ``True`` when the cycle ran to the end and ``False`` when it
+        was cut short (market closed, filter skip, pending order …).  All
+        settings read during the cycle come from one
+        :mod:`~backend.config.runtime_config` snapshot, with ``pip_size``
+        pinned to the instrument's pip.
+        """
+        with runtime_config.pinned(pip_size=self.pip_size):
+            return self._run_cycle()
+
+    def _run_cycle(self) -> bool:
+        cfg = runtime_config.current()
+        # AI 呼び出し回数はランナー (ペア) ごとに数える
+        reset_call_counter(getattr(self, "ai_call_limit", None))
+        timer = PerfTimer("job_loop")
+        now = datetime.now(timezone.utc)
+        # ---- Market‑hours guard ---------------------------------
+        if not instrument_is_tradeable(self.DEFAULT_PAIR):
+            logger.info(f"{self.DEFAULT_PAIR} market closed – sleeping 60 s")
+            self._sleep(60)
+            self.last_run = datetime.now(timezone.utc)
+            timer.stop()
+            return False
+        self._update_portfolio_risk()
+        scalp_manager.monitor_scalp_positions()
+        # Refresh POSITION_REVIEW_SEC dynamically each loop
+        if cfg.position_review_sec is not None:
+            self.review_sec = cfg.position_review_sec
+        logger.debug(f"review_sec={self.review_sec}")
+        # Refresh HIGHER_TF_ENABLED dynamically
+        self.higher_tf_enabled = cfg.higher_tf_enabled
+        # Update trailing-stop enable flag each loop
+        self._refresh_trailing_status()
+        if (
+            self.tick_source is not None
+            or self.last_run is None
+            or (now - self.last_run) >= timedelta(
+                seconds=self.interval_seconds
+            )
+        ):
+            logger.info(f"Running job at {now.isoformat()}")
+
+            # ティックデータ取得（発注用）
+            tick_data = self._fetch_tick_data()
+            # ティックデータ詳細はDEBUGレベルで出力
+            logger.debug(f"Tick data fetched: {tick_data}")
+            try:
+                price = float(tick_data["prices"][0]["bids"][0]["price"])
+                bid_liq = float(
+                    tick_data["prices"][0]["bids"][0].get("liquidity", 0)
                 )
-                logger.debug(f"review_sec={self.review_sec}")
-                # Refresh HIGHER_TF_ENABLED dynamically
-                self.higher_tf_enabled = (
-                    env_loader.get_env("HIGHER_TF_ENABLED", "true").lower() == "true"
+                ask_liq = float(
+                    tick_data["prices"][0]["asks"][0].get("liquidity", 0)
                 )
-                # Update trailing-stop enable flag each loop
-                self._refresh_trailing_status()
-                if self.last_run is None or (now - self.last_run) >= timedelta(
-                    seconds=self.interval_seconds
-                ):
-                    logger.info(f"Running job at {now.isoformat()}")
-
-                    # ティックデータ取得（発注用）
-                    tick_data = fetch_tick_data(DEFAULT_PAIR, include_liquidity=True)
-                    # ティックデータ詳細はDEBUGレベルで出力
-                    logger.debug(f"Tick data fetched: {tick_data}")
-                    try:
-                        price = float(tick_data["prices"][0]["bids"][0]["price"])
-                        bid_liq = float(
-                            tick_data["prices"][0]["bids"][0].get("liquidity", 0)
-                        )
-                        ask_liq = float(
-                            tick_data["prices"][0]["asks"][0].get("liquidity", 0)
-                        )
-                        tick = {
-                            "high": price,
-                            "low": price,
-                            "close": price,
-                            "volume": bid_liq + ask_liq,
-                        }
-                        if self.cluster_regime:
-                            cr_res = self.cluster_regime.update(tick)
-                            if cr_res.get("transition"):
-                                self.last_ai_call = datetime.min
-                    except Exception as exc:
-                        logger.debug(f"ClusterRegime update failed: {exc}")
+                tick = {
+                    "high": price,
+                    "low": price,
+                    "close": price,
+                    "volume": bid_liq + ask_liq,
+                }
+                if self.cluster_regime:
+                    cr_res = self.cluster_regime.update(tick)
+                    if cr_res.get("transition"):
+                        self.last_ai_call = datetime.min
+            except Exception as exc:
+                logger.debug(f"ClusterRegime update failed: {exc}")
 
-                    # ---- Market closed guard (price feed says non‑tradeable) ----
-                    try:
-                        if (
-                            not tick_data["prices"][0].get("tradeable", True)
-                        ) or tick_data["prices"][0].get("status") == "non-tradeable":
-                            logger.info(
-                                f"{DEFAULT_PAIR} price feed marked non‑tradeable – sleeping 120 s"
-                            )
-                            time.sleep(120)
-                            self.last_run = datetime.now(timezone.utc)
-                            timer.stop()
-                            continue
-                    except (IndexError, KeyError, TypeError):
-                        # if structure unexpected, fall back to old check
-                        pass
+            # ---- Market closed guard (price feed says non‑tradeable) ----
+            try:
+                tradeable_status.observe(
+                    self.DEFAULT_PAIR,
+                    bool(tick_data["prices"][0].get("tradeable", True)),
+                )
+                if (
+                    not tick_data["prices"][0].get("tradeable", True)
+                ) or tick_data["prices"][0].get("status") == "non-tradeable":
+                    logger.info(
+                        f"{self.DEFAULT_PAIR} price feed marked non‑tradeable – sleeping 120 s"
+                    )
+                    self._sleep(120)
+                    self.last_run = datetime.now(timezone.utc)
+                    timer.stop()
+                    return False
+            except (IndexError, KeyError, TypeError):
+                # if structure unexpected, fall back to old check
+                pass
+
+            # ローソク足データ取得は一度だけ行い、後続処理で再利用する
+            # 指標計算・パターン検出は列指向の CandleFrame をそのまま使い、
+            # その他の処理には従来の dict リストを渡す
+            with span("candle_fetch"):
+                candle_frames = fetch_multiple_timeframes(self.DEFAULT_PAIR, as_frame=True)
+            candles_dict = {
+                tf: as_candle_list(frame) for tf, frame in candle_frames.items()
+            }
 
-                    # ローソク足データ取得は一度だけ行い、後続処理で再利用する
-                    candles_dict = fetch_multiple_timeframes(DEFAULT_PAIR)
+            # ---- Chart pattern detection per timeframe ----
+            with span("pattern_scan"):
+                self.patterns_by_tf = pattern_scanner.scan(
+                    candle_frames, PATTERN_NAMES, key=self.DEFAULT_PAIR
+                )
 
-                    # ---- Chart pattern detection per timeframe ----
-                    self.patterns_by_tf = pattern_scanner.scan(
-                        candles_dict, PATTERN_NAMES
+            candles_s10 = candles_dict.get("S10", [])
+            candles_m1 = candles_dict.get("M1", [])
+            candles_m5 = candles_dict.get("M5", [])
+            candles_h1 = candles_dict.get("H1", [])
+            candles_h4 = candles_dict.get("H4", [])
+            candles_d1 = candles_dict.get("D", [])
+            self.last_candles_m5 = candles_m5
+            candles = candles_m5  # backward compatibility
+            logger.info(
+                f"Candle M5 last: {candles_m5[-1] if candles_m5 else 'No candles'}"
+            )
+            if candles_m5:
+                last = candles_m5[-1]
+                try:
+                    from backend.strategy.signal_filter import (
+                        update_overshoot_window,
                     )
 
-                    candles_s10 = candles_dict.get("S10", [])
-                    candles_m1 = candles_dict.get("M1", [])
-                    candles_m5 = candles_dict.get("M5", [])
-                    candles_h1 = candles_dict.get("H1", [])
-                    candles_h4 = candles_dict.get("H4", [])
-                    candles_d1 = candles_dict.get("D", [])
-                    self.last_candles_m5 = candles_m5
-                    candles = candles_m5  # backward compatibility
-                    logger.info(
-                        f"Candle M5 last: {candles_m5[-1] if candles_m5 else 'No candles'}"
+                    update_overshoot_window(
+                        float(last["mid"]["h"]), float(last["mid"]["l"])
                     )
-                    if candles_m5:
-                        last = candles_m5[-1]
-                        try:
-                            from backend.strategy.signal_filter import (
-                                update_overshoot_window,
-                            )
+                except Exception:
+                    pass
 
-                            update_overshoot_window(
-                                float(last["mid"]["h"]), float(last["mid"]["l"])
-                            )
-                        except Exception:
-                            pass
+            # -------- Higher‑timeframe reference levels --------
+            higher_tf = {}
+            if self.higher_tf_enabled:
+                with span("higher_tf"):
+                    higher_tf = analyze_higher_tf(self.DEFAULT_PAIR)
+                logger.debug(f"Higher‑TF levels: {higher_tf}")
+
+            # 指標計算
+            with span("indicators"):
+                indicators_multi = calculate_indicators_multi(
+                    candle_frames,
+                    pair=self.DEFAULT_PAIR,
+                    allow_incomplete=True,
+                )
+            self.indicators_S10 = indicators_multi.get("S10")
+            self.indicators_M1 = indicators_multi.get("M1")
+            self.indicators_M5 = indicators_multi.get("M5")
+            self.indicators_M15 = indicators_multi.get("M15")
+            self.indicators_H1 = indicators_multi.get("H1")
+            self.indicators_H4 = indicators_multi.get("H4")
+            self.indicators_D = indicators_multi.get("D")
+            indicators = dict(self.indicators_M5 or {})
+            if self.indicators_H1:
+                indicators["ema_slope_h1"] = self.indicators_H1.get("ema_slope")
+                indicators["adx_h1"] = self.indicators_H1.get("adx")
+            if self.indicators_H4:
+                indicators["ema_slope_h4"] = self.indicators_H4.get("ema_slope")
+                indicators["adx_h4"] = self.indicators_H4.get("adx")
+
+            if self.indicators_M1:
+                indicators["M1"] = self.indicators_M1
+            if self.indicators_S10:
+                indicators["S10"] = self.indicators_S10
+
+            align = is_multi_tf_aligned(
+                {
+                    "M1": self.indicators_M1 or {},
+                    "M5": self.indicators_M5 or {},
+                    "H1": self.indicators_H1 or {},
+                }
+            )
+            if align is None and cfg.strict_tf_align:
+                logger.info("Multi‑TF alignment missing → skip entry")
+                log_entry_skip(self.DEFAULT_PAIR, None, "tf_align")
+                self.last_run = now
+                self._sync_trades()
+                self._wait_next_cycle()
+                timer.stop()
+                return False
+            logger.info(f"Multi‑TF alignment: {align}")
 
-                    # -------- Higher‑timeframe reference levels --------
-                    higher_tf = {}
-                    if self.higher_tf_enabled:
-                        higher_tf = analyze_higher_tf(DEFAULT_PAIR)
-                        logger.debug(f"Higher‑TF levels: {higher_tf}")
+            logger.info("Indicators calculation successful.")
 
-                    # 指標計算
-                    indicators_multi = calculate_indicators_multi(
-                        candles_dict,
-                        allow_incomplete=True,
+            # 指標からトレードモードを判定
+            new_mode, _score, reasons = decide_trade_mode_detail(
+                indicators, candles_m5
+            )
+            perf = recent_strategy_performance()
+            self.current_context = build_context(
+                indicators, perf
+            )
+            selected = self.strategy_selector.select(self.current_context)
+            self.current_strategy_name = selected.name
+            selected_mode = (
+                "trend_follow" if selected.name == "trend" else selected.name
+            )
+            if selected_mode != self.trade_mode:
+                self.reload_params_for_mode(selected_mode)
+                self.trade_mode = selected_mode
+            if new_mode != self.trade_mode:
+                info(
+                    "regime_change",
+                    new=new_mode,
+                    old=self.trade_mode,
+                    score=_score,
+                )
+                self.reload_params_for_mode(new_mode)
+                self.trade_mode = new_mode
+            self.mode_reason = "\n".join(f"- {r}" for r in reasons)
+            logger.info("Current trade mode: %s", self.trade_mode)
+
+            # チェック：保留LIMIT注文の更新
+            self._manage_pending_limits(
+                self.DEFAULT_PAIR, indicators, candles_m5, tick_data
+            )
+
+            pend_info = get_pending_entry_order(self.DEFAULT_PAIR)
+            if pend_info:
+                age = time.time() - pend_info.get("ts", 0)
+                if age < self.pending_grace_sec:
+                    logger.info(
+                        f"Pending LIMIT active ({age:.0f}s) – skip entry check"
                     )
-                    self.indicators_S10 = indicators_multi.get("S10")
-                    self.indicators_M1 = indicators_multi.get("M1")
-                    self.indicators_M5 = indicators_multi.get("M5")
-                    self.indicators_M15 = indicators_multi.get("M15")
-                    self.indicators_H1 = indicators_multi.get("H1")
-                    self.indicators_H4 = indicators_multi.get("H4")
-                    self.indicators_D = indicators_multi.get("D")
-                    indicators = dict(self.indicators_M5 or {})
-                    if self.indicators_H1:
-                        indicators["ema_slope_h1"] = self.indicators_H1.get("ema_slope")
-                        indicators["adx_h1"] = self.indicators_H1.get("adx")
-                    if self.indicators_H4:
-                        indicators["ema_slope_h4"] = self.indicators_H4.get("ema_slope")
-                        indicators["adx_h4"] = self.indicators_H4.get("adx")
-
-                    if self.indicators_M1:
-                        indicators["M1"] = self.indicators_M1
-                    if self.indicators_S10:
-                        indicators["S10"] = self.indicators_S10
-
-                    align = is_multi_tf_aligned(
-                        {
-                            "M1": self.indicators_M1 or {},
-                            "M5": self.indicators_M5 or {},
-                            "H1": self.indicators_H1 or {},
-                        }
+                    log_entry_skip(
+                        self.DEFAULT_PAIR,
+                        None,
+                        "pending_limit",
+                        f"{age:.0f}s < {self.pending_grace_sec}s",
                     )
-                    if (
-                        align is None
-                        and env_loader.get_env(
-                            "ALIGN_STRICT",
-                            env_loader.get_env("STRICT_TF_ALIGN", "false"),
-                        ).lower()
-                        == "true"
-                    ):
-                        logger.info("Multi‑TF alignment missing → skip entry")
-                        log_entry_skip(DEFAULT_PAIR, None, "tf_align")
-                        self.last_run = now
-                        update_oanda_trades()
-                        time.sleep(self.interval_seconds)
-                        timer.stop()
-                        continue
-                    logger.info(f"Multi‑TF alignment: {align}")
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
 
-                    logger.info("Indicators calculation successful.")
+            # ポジション確認
+            has_position = check_current_position(self.DEFAULT_PAIR)
+            logger.info(f"Current position status: {has_position}")
+            logger.info(f"Has open position for {self.DEFAULT_PAIR}: {has_position}")
 
-                    # 指標からトレードモードを判定
-                    new_mode, _score, reasons = decide_trade_mode_detail(
-                        indicators, candles_m5
-                    )
-                    perf = recent_strategy_performance()
-                    self.current_context = build_context(
-                        indicators, perf
-                    )
-                    selected = self.strategy_selector.select(self.current_context)
-                    self.current_strategy_name = selected.name
-                    selected_mode = (
-                        "trend_follow" if selected.name == "trend" else selected.name
-                    )
-                    if selected_mode != self.trade_mode:
-                        self.reload_params_for_mode(selected_mode)
-                        self.trade_mode = selected_mode
-                    if new_mode != self.trade_mode:
-                        info(
-                            "regime_change",
-                            new=new_mode,
-                            old=self.trade_mode,
-                            score=_score,
-                        )
-                        self.reload_params_for_mode(new_mode)
-                        self.trade_mode = new_mode
-                    self.mode_reason = "\n".join(f"- {r}" for r in reasons)
-                    logger.info("Current trade mode: %s", self.trade_mode)
-
-                    # チェック：保留LIMIT注文の更新
-                    self._manage_pending_limits(
-                        DEFAULT_PAIR, indicators, candles_m5, tick_data
-                    )
+            MIN_HOLD_SECONDS = cfg.min_hold_seconds
 
-                    pend_info = get_pending_entry_order(DEFAULT_PAIR)
-                    if pend_info:
-                        age = time.time() - pend_info.get("ts", 0)
-                        if age < self.pending_grace_sec:
-                            logger.info(
-                                f"Pending LIMIT active ({age:.0f}s) – skip entry check"
-                            )
-                            log_entry_skip(
-                                DEFAULT_PAIR,
-                                None,
-                                "pending_limit",
-                                f"{age:.0f}s < {self.pending_grace_sec}s",
-                            )
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
+            secs_since_entry = (
+                trade_age_seconds(has_position) if has_position else None
+            )
 
-                    # ポジション確認
-                    has_position = check_current_position(DEFAULT_PAIR)
-                    logger.info(f"Current position status: {has_position}")
-                    logger.info(f"Has open position for {DEFAULT_PAIR}: {has_position}")
+            if not has_position:
+                self.breakeven_reached = False
+                self.sl_reset_done = False
+                self.tp_extended = False
+                self.tp_reduced = False
+                self.max_profit_pips = 0.0
+                self.scale_count = 0
+
+            # ---- Dynamic cooldown (OPEN / FLAT) ---------------
+            # ポジション保有時はエグジット用、未保有時はエントリー用
+            if has_position:
+                self.ai_cooldown = self.ai_cooldown_flat
+            else:
+                self.ai_cooldown = self.ai_cooldown_open
 
-                    MIN_HOLD_SECONDS = int(env_loader.get_env("MIN_HOLD_SECONDS", "0"))
+            # Determine position_side for further logic
+            if (
+                has_position
+                and int(has_position.get("long", {}).get("units", 0)) != 0
+            ):
+                position_side = "long"
+            elif (
+                has_position
+                and int(has_position.get("short", {}).get("units", 0)) != 0
+            ):
+                position_side = "short"
+            else:
+                position_side = None
+
+            # Inserted logic for dynamic SL management and AI profit-taking consultation
+            if has_position and position_side:
+                current_price = (
+                    float(tick_data["prices"][0]["bids"][0]["price"])
+                    if position_side == "long"
+                    else float(tick_data["prices"][0]["asks"][0]["price"])
+                )
+                entry_price = float(
+                    has_position[position_side].get("averagePrice", 0.0)
+                )
 
-                    secs_since_entry = (
-                        trade_age_seconds(has_position) if has_position else None
-                    )
+                pip_size = cfg.pip_size
+                current_profit_pips = (
+                    (current_price - entry_price) / pip_size
+                    if position_side == "long"
+                    else (entry_price - current_price) / pip_size
+                )
+                self.max_profit_pips = max(
+                    self.max_profit_pips, current_profit_pips
+                )
 
-                    if not has_position:
-                        self.breakeven_reached = False
-                        self.sl_reset_done = False
-                        self.tp_extended = False
-                        self.tp_reduced = False
-                        self.max_profit_pips = 0.0
-                        self.scale_count = 0
+                BE_TRIGGER_PIPS = cfg.be_trigger_pips
+                BE_ATR_TRIGGER_MULT = cfg.be_atr_trigger_mult
+                BE_TRIGGER_R = cfg.be_trigger_r
+                atr_val = (
+                    indicators["atr"].iloc[-1]
+                    if hasattr(indicators["atr"], "iloc")
+                    else indicators["atr"][-1]
+                )
+                atr_pips = atr_val / pip_size
+                if BE_ATR_TRIGGER_MULT > 0:
+                    be_trigger = max(
+                        BE_TRIGGER_PIPS, atr_pips * BE_ATR_TRIGGER_MULT
+                    )
+                else:
+                    be_trigger = BE_TRIGGER_PIPS
+                if BE_TRIGGER_R > 0:
+                    sl_pips_val = has_position.get("sl_pips")
+                    if sl_pips_val is not None:
+                        try:
+                            sl_pips_val = float(sl_pips_val)
+                            be_trigger = max(
+                                be_trigger, sl_pips_val * BE_TRIGGER_R
+                            )
+                        except Exception:
+                            pass
+                TP_PIPS = cfg.init_tp_pips
+                AI_PROFIT_TRIGGER_RATIO = cfg.ai_profit_trigger_ratio
 
-                    # ---- Dynamic cooldown (OPEN / FLAT) ---------------
-                    # ポジション保有時はエグジット用、未保有時はエントリー用
-                    if has_position:
-                        self.ai_cooldown = self.ai_cooldown_flat
-                    else:
-                        self.ai_cooldown = self.ai_cooldown_open
+                logger.info(
+                    f"profit_pips={current_profit_pips:.1f}, "
+                    f"BE_trigger={be_trigger}, "
+                    f"AI_trigger={TP_PIPS * AI_PROFIT_TRIGGER_RATIO}"
+                )
 
-                    # Determine position_side for further logic
-                    if (
-                        has_position
-                        and int(has_position.get("long", {}).get("units", 0)) != 0
-                    ):
-                        position_side = "long"
-                    elif (
-                        has_position
-                        and int(has_position.get("short", {}).get("units", 0)) != 0
-                    ):
-                        position_side = "short"
+                if (
+                    current_profit_pips >= be_trigger
+                    and not self.breakeven_reached
+                ):
+                    adx_series = indicators.get("adx")
+                    adx_val = (
+                        adx_series.iloc[-1]
+                        if adx_series is not None
+                        and hasattr(adx_series, "iloc")
+                        else adx_series[-1] if adx_series else 0.0
+                    )
+                    vol_adx_min = cfg.be_vol_adx_min
+                    vol_sl_mult = cfg.be_vol_sl_mult
+                    if adx_val >= vol_adx_min:
+                        if position_side == "long":
+                            new_sl_price = entry_price - atr_val * vol_sl_mult
+                        else:
+                            new_sl_price = entry_price + atr_val * vol_sl_mult
                     else:
-                        position_side = None
-
-                    # Inserted logic for dynamic SL management and AI profit-taking consultation
-                    if has_position and position_side:
-                        current_price = (
-                            float(tick_data["prices"][0]["bids"][0]["price"])
-                            if position_side == "long"
-                            else float(tick_data["prices"][0]["asks"][0]["price"])
-                        )
-                        entry_price = float(
-                            has_position[position_side].get("averagePrice", 0.0)
+                        new_sl_price = entry_price
+                    trade_id = has_position[position_side]["tradeIDs"][0]
+                    result = order_mgr.update_trade_sl(
+                        trade_id, self.DEFAULT_PAIR, new_sl_price
+                    )
+                    if result is None:
+                        logger.warning(
+                            "SL update failed on first attempt; retrying"
                         )
-
-                        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                        current_profit_pips = (
-                            (current_price - entry_price) / pip_size
-                            if position_side == "long"
-                            else (entry_price - current_price) / pip_size
+                        result = order_mgr.update_trade_sl(
+                            trade_id, self.DEFAULT_PAIR, new_sl_price
                         )
-                        self.max_profit_pips = max(
-                            self.max_profit_pips, current_profit_pips
+                        if result is None:
+                            logger.error("SL update failed after retry")
+                    if result is not None:
+                        logger.info(
+                            f"SL updated to entry price to secure minimum profit: {new_sl_price}"
                         )
+                        self.breakeven_reached = True
+                        self.sl_reset_done = False
+                        # SLが実行された向きと時間を記録
+                        self.last_sl_side = position_side
+                        self.last_sl_time = datetime.now(timezone.utc)
 
-                        BE_TRIGGER_PIPS = float(
-                            env_loader.get_env("BE_TRIGGER_PIPS", "10")
-                        )
-                        BE_ATR_TRIGGER_MULT = float(
-                            env_loader.get_env("BE_ATR_TRIGGER_MULT", "0")
+                if self.breakeven_reached and not self.sl_reset_done:
+                    trade_id = has_position[position_side]["tradeIDs"][0]
+                    sl_missing = True
+                    try:
+                        trade_info = fetch_trade_details(trade_id) or {}
+                        trade = trade_info.get("trade", {})
+                        sl_price = float(
+                            trade.get("stopLossOrder", {}).get("price", 0)
                         )
-                        BE_TRIGGER_R = float(env_loader.get_env("BE_TRIGGER_R", "0"))
+                        sl_missing = sl_price == 0
+                    except Exception as exc:
+                        logger.warning(f"Failed to fetch trade details: {exc}")
+                    if sl_missing:
                         atr_val = (
                             indicators["atr"].iloc[-1]
                             if hasattr(indicators["atr"], "iloc")
                             else indicators["atr"][-1]
                         )
-                        atr_pips = atr_val / pip_size
-                        if BE_ATR_TRIGGER_MULT > 0:
-                            be_trigger = max(
-                                BE_TRIGGER_PIPS, atr_pips * BE_ATR_TRIGGER_MULT
-                            )
+                        if position_side == "long":
+                            new_sl_price = entry_price - atr_val * 2
                         else:
-                            be_trigger = BE_TRIGGER_PIPS
-                        if BE_TRIGGER_R > 0:
-                            sl_pips_val = has_position.get("sl_pips")
-                            if sl_pips_val is not None:
-                                try:
-                                    sl_pips_val = float(sl_pips_val)
-                                    be_trigger = max(
-                                        be_trigger, sl_pips_val * BE_TRIGGER_R
-                                    )
-                                except Exception:
-                                    pass
-                        TP_PIPS = float(env_loader.get_env("INIT_TP_PIPS", "30"))
-                        AI_PROFIT_TRIGGER_RATIO = float(
-                            env_loader.get_env("AI_PROFIT_TRIGGER_RATIO", "0.3")
+                            new_sl_price = entry_price + atr_val * 2
+                        result = order_mgr.update_trade_sl(
+                            trade_id, self.DEFAULT_PAIR, new_sl_price
                         )
+                        if result is None:
+                            logger.warning(
+                                "SL reapply failed on first attempt; retrying"
+                            )
+                            result = order_mgr.update_trade_sl(
+                                trade_id, self.DEFAULT_PAIR, new_sl_price
+                            )
+                        if result is not None:
+                            logger.info(f"SL reapplied at {new_sl_price}")
+                            self.sl_reset_done = True
+                            # SLが実行された向きと時間を記録
+                            self.last_sl_side = position_side
+                            self.last_sl_time = datetime.now(timezone.utc)
+
+                self._maybe_extend_tp(
+                    has_position, indicators, position_side, pip_size
+                )
+                self._maybe_reduce_tp(
+                    has_position, indicators, position_side, pip_size
+                )
 
-                        logger.info(
-                            f"profit_pips={current_profit_pips:.1f}, "
-                            f"BE_trigger={be_trigger}, "
-                            f"AI_trigger={TP_PIPS * AI_PROFIT_TRIGGER_RATIO}"
+                if self._should_peak_exit(
+                    position_side, indicators, current_profit_pips
+                ):
+                    logger.info("Peak exit triggered → closing position.")
+                    try:
+                        order_mgr.close_position(
+                            self.DEFAULT_PAIR, side=position_side
+                        )
+                        exit_time = datetime.now(timezone.utc).isoformat()
+                        log_trade(
+                            instrument=self.DEFAULT_PAIR,
+                            entry_time=has_position.get(
+                                "entry_time",
+                                has_position.get("openTime", exit_time),
+                            ),
+                            entry_price=entry_price,
+                            units=(
+                                int(has_position[position_side]["units"])
+                                if position_side == "long"
+                                else -int(has_position[position_side]["units"])
+                            ),
+                            exit_time=exit_time,
+                            exit_price=current_price,
+                            profit_loss=float(
+                                has_position.get(
+                                    "pl_corrected", has_position.get("pl", 0)
+                                )
+                            ),
+                            ai_reason="peak exit",
+                            exit_reason=ExitReason.RISK,
+                            is_manual=False,
+                        )
+                        pl = float(
+                            has_position.get(
+                                "pl_corrected", has_position.get("pl", 0)
+                            )
+                        )
+                        self.safety.record_loss(pl)
+                        metrics_publisher.publish(
+                            "trade_pl",
+                            pl,
+                            {"reason": "peak"},
+                        )
+                        self.last_close_ts = datetime.now(timezone.utc)
+                        send_line_message(
+                            f"【PEAK EXIT】{self.DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
                         )
+                        self._record_strategy_result(current_profit_pips)
+                    except Exception as exc:
+                        logger.warning(f"Peak exit failed: {exc}")
+                    self.max_profit_pips = 0.0
+                    self.breakeven_reached = False
+                    self.sl_reset_done = False
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
 
-                        if (
-                            current_profit_pips >= be_trigger
-                            and not self.breakeven_reached
-                        ):
-                            adx_series = indicators.get("adx")
-                            adx_val = (
-                                adx_series.iloc[-1]
-                                if adx_series is not None
-                                and hasattr(adx_series, "iloc")
-                                else adx_series[-1] if adx_series else 0.0
+                if current_profit_pips >= TP_PIPS * AI_PROFIT_TRIGGER_RATIO:
+                    if (
+                        secs_since_entry is not None
+                        and secs_since_entry < MIN_HOLD_SECONDS
+                    ):
+                        logger.info(
+                            f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
+                        )
+                    else:
+                        # EXITフィルターを評価し、フィルターNGの場合はAIの決済判断をスキップ
+                        if pass_exit_filter(indicators, position_side):
+                            logger.info(
+                                "Filter OK → Processing exit decision with AI."
                             )
-                            vol_adx_min = float(
-                                env_loader.get_env("BE_VOL_ADX_MIN", "30")
+                            self.last_ai_call = datetime.now()
+                            cond_ind = self._get_cond_indicators()
+                            exit_ctx = build_exit_context(
+                                has_position,
+                                tick_data,
+                                indicators,
+                                indicators_m1=self.indicators_M1,
                             )
-                            vol_sl_mult = float(
-                                env_loader.get_env("BE_VOL_SL_MULT", "2.0")
+                            # 市場判定と決済判断の LLM 呼び出しを並行実行する
+                            exit_task = llm_pool.submit(evaluate_exit_ai, exit_ctx)
+                            market_task = llm_pool.submit(
+                                get_market_condition,
+                                {
+                                    "indicators": {
+                                        key: (
+                                            float(val.iloc[-1])
+                                            if hasattr(val, "iloc")
+                                            and val.iloc[-1] is not None
+                                            else (
+                                                float(val)
+                                                if val is not None
+                                                else None
+                                            )
+                                        )
+                                        for key, val in cond_ind.items()
+                                    },
+                                    "indicators_h1": {
+                                        key: (
+                                            float(v.iloc[-1])
+                                            if hasattr(v, "iloc")
+                                            and v.iloc[-1] is not None
+                                            else (
+                                                float(v)
+                                                if v is not None
+                                                else None
+                                            )
+                                        )
+                                        for key, v in (
+                                            self.indicators_H1 or {}
+                                        ).items()
+                                    },
+                                    "indicators_h4": {
+                                        key: (
+                                            float(v.iloc[-1])
+                                            if hasattr(v, "iloc")
+                                            and v.iloc[-1] is not None
+                                            else (
+                                                float(v)
+                                                if v is not None
+                                                else None
+                                            )
+                                        )
+                                        for key, v in (
+                                            self.indicators_H4 or {}
+                                        ).items()
+                                    },
+                                    "candles_m1": candles_m1,
+                                    "candles_m5": candles_m5,
+                                    "candles_d1": candles_d1,
+                                },
+                                higher_tf,
+                                instrument=self.DEFAULT_PAIR,
                             )
-                            if adx_val >= vol_adx_min:
-                                if position_side == "long":
-                                    new_sl_price = entry_price - atr_val * vol_sl_mult
-                                else:
-                                    new_sl_price = entry_price + atr_val * vol_sl_mult
-                            else:
-                                new_sl_price = entry_price
-                            trade_id = has_position[position_side]["tradeIDs"][0]
-                            result = order_mgr.update_trade_sl(
-                                trade_id, DEFAULT_PAIR, new_sl_price
+                            market_cond = market_task.result()
+                            logger.debug(
+                                f"Market condition (exit): {market_cond}"
                             )
-                            if result is None:
-                                logger.warning(
-                                    "SL update failed on first attempt; retrying"
-                                )
-                                result = order_mgr.update_trade_sl(
-                                    trade_id, DEFAULT_PAIR, new_sl_price
-                                )
-                                if result is None:
-                                    logger.error("SL update failed after retry")
-                            if result is not None:
-                                logger.info(
-                                    f"SL updated to entry price to secure minimum profit: {new_sl_price}"
-                                )
-                                self.breakeven_reached = True
-                                self.sl_reset_done = False
-                                # SLが実行された向きと時間を記録
-                                self.last_sl_side = position_side
-                                self.last_sl_time = datetime.now(timezone.utc)
-
-                        if self.breakeven_reached and not self.sl_reset_done:
-                            trade_id = has_position[position_side]["tradeIDs"][0]
-                            sl_missing = True
                             try:
-                                trade_info = fetch_trade_details(trade_id) or {}
-                                trade = trade_info.get("trade", {})
-                                sl_price = float(
-                                    trade.get("stopLossOrder", {}).get("price", 0)
-                                )
-                                sl_missing = sl_price == 0
+                                ai_dec = exit_task.result()
                             except Exception as exc:
-                                logger.warning(f"Failed to fetch trade details: {exc}")
-                            if sl_missing:
-                                atr_val = (
-                                    indicators["atr"].iloc[-1]
-                                    if hasattr(indicators["atr"], "iloc")
-                                    else indicators["atr"][-1]
+                                logger.warning(
+                                    f"exit AI evaluation failed: {exc}"
                                 )
-                                if position_side == "long":
-                                    new_sl_price = entry_price - atr_val * 2
-                                else:
-                                    new_sl_price = entry_price + atr_val * 2
-                                result = order_mgr.update_trade_sl(
-                                    trade_id, DEFAULT_PAIR, new_sl_price
+                                ai_dec = None
+                            if ai_dec and ai_dec.action == "SCALE":
+                                pip_size = cfg.pip_size
+                                entry_price = float(
+                                    has_position[position_side].get(
+                                        "averagePrice", 0.0
+                                    )
                                 )
-                                if result is None:
-                                    logger.warning(
-                                        "SL reapply failed on first attempt; retrying"
+                                cur_price = (
+                                    float(
+                                        tick_data["prices"][0]["bids"][0][
+                                            "price"
+                                        ]
                                     )
-                                    result = order_mgr.update_trade_sl(
-                                        trade_id, DEFAULT_PAIR, new_sl_price
+                                    if position_side == "long"
+                                    else float(
+                                        tick_data["prices"][0]["asks"][0][
+                                            "price"
+                                        ]
                                     )
-                                if result is not None:
-                                    logger.info(f"SL reapplied at {new_sl_price}")
-                                    self.sl_reset_done = True
-                                    # SLが実行された向きと時間を記録
-                                    self.last_sl_side = position_side
-                                    self.last_sl_time = datetime.now(timezone.utc)
-
-                        self._maybe_extend_tp(
-                            has_position, indicators, position_side, pip_size
-                        )
-                        self._maybe_reduce_tp(
-                            has_position, indicators, position_side, pip_size
-                        )
-
-                        if self._should_peak_exit(
-                            position_side, indicators, current_profit_pips
-                        ):
-                            logger.info("Peak exit triggered → closing position.")
-                            try:
-                                order_mgr.close_position(
-                                    DEFAULT_PAIR, side=position_side
-                                )
-                                exit_time = datetime.now(timezone.utc).isoformat()
-                                log_trade(
-                                    instrument=DEFAULT_PAIR,
-                                    entry_time=has_position.get(
-                                        "entry_time",
-                                        has_position.get("openTime", exit_time),
-                                    ),
-                                    entry_price=entry_price,
-                                    units=(
-                                        int(has_position[position_side]["units"])
-                                        if position_side == "long"
-                                        else -int(has_position[position_side]["units"])
-                                    ),
-                                    exit_time=exit_time,
-                                    exit_price=current_price,
-                                    profit_loss=float(
-                                        has_position.get(
-                                            "pl_corrected", has_position.get("pl", 0)
-                                        )
-                                    ),
-                                    ai_reason="peak exit",
-                                    exit_reason=ExitReason.RISK,
-                                    is_manual=False,
                                 )
-                                pl = float(
-                                    has_position.get(
-                                        "pl_corrected", has_position.get("pl", 0)
-                                    )
+                                diff_pips = (
+                                    (cur_price - entry_price) / pip_size
+                                    if position_side == "long"
+                                    else (entry_price - cur_price) / pip_size
                                 )
-                                self.safety.record_loss(pl)
-                                metrics_publisher.publish(
-                                    "trade_pl",
-                                    pl,
-                                    {"reason": "peak"},
-                                )
-                                self.last_close_ts = datetime.now(timezone.utc)
-                                send_line_message(
-                                    f"【PEAK EXIT】{DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
-                                )
-                                self._record_strategy_result(current_profit_pips)
-                            except Exception as exc:
-                                logger.warning(f"Peak exit failed: {exc}")
-                            self.max_profit_pips = 0.0
-                            self.breakeven_reached = False
-                            self.sl_reset_done = False
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
-
-                        if current_profit_pips >= TP_PIPS * AI_PROFIT_TRIGGER_RATIO:
-                            if (
-                                secs_since_entry is not None
-                                and secs_since_entry < MIN_HOLD_SECONDS
-                            ):
-                                logger.info(
-                                    f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
-                                )
-                            else:
-                                # EXITフィルターを評価し、フィルターNGの場合はAIの決済判断をスキップ
-                                if pass_exit_filter(indicators, position_side):
-                                    logger.info(
-                                        "Filter OK → Processing exit decision with AI."
-                                    )
-                                    self.last_ai_call = datetime.now()
-                                    cond_ind = self._get_cond_indicators()
-                                    market_cond = get_market_condition(
-                                        {
-                                            "indicators": {
-                                                key: (
-                                                    float(val.iloc[-1])
-                                                    if hasattr(val, "iloc")
-                                                    and val.iloc[-1] is not None
-                                                    else (
-                                                        float(val)
-                                                        if val is not None
-                                                        else None
-                                                    )
-                                                )
-                                                for key, val in cond_ind.items()
-                                            },
-                                            "indicators_h1": {
-                                                key: (
-                                                    float(v.iloc[-1])
-                                                    if hasattr(v, "iloc")
-                                                    and v.iloc[-1] is not None
-                                                    else (
-                                                        float(v)
-                                                        if v is not None
-                                                        else None
-                                                    )
-                                                )
-                                                for key, v in (
-                                                    self.indicators_H1 or {}
-                                                ).items()
-                                            },
-                                            "indicators_h4": {
-                                                key: (
-                                                    float(v.iloc[-1])
-                                                    if hasattr(v, "iloc")
-                                                    and v.iloc[-1] is not None
-                                                    else (
-                                                        float(v)
-                                                        if v is not None
-                                                        else None
-                                                    )
-                                                )
-                                                for key, v in (
-                                                    self.indicators_H4 or {}
-                                                ).items()
-                                            },
-                                            "candles_m1": candles_m1,
-                                            "candles_m5": candles_m5,
-                                            "candles_d1": candles_d1,
-                                        },
-                                        higher_tf,
-                                    )
-                                    logger.debug(
-                                        f"Market condition (exit): {market_cond}"
-                                    )
-                                    exit_ctx = build_exit_context(
-                                        has_position,
-                                        tick_data,
-                                        indicators,
-                                        indicators_m1=self.indicators_M1,
-                                    )
-                                    try:
-                                        ai_dec = evaluate_exit_ai(exit_ctx)
-                                    except Exception as exc:
-                                        logger.warning(
-                                            f"exit AI evaluation failed: {exc}"
-                                        )
-                                        ai_dec = None
-                                    if ai_dec and ai_dec.action == "SCALE":
-                                        pip_size = float(
-                                            env_loader.get_env("PIP_SIZE", "0.01")
-                                        )
-                                        entry_price = float(
-                                            has_position[position_side].get(
-                                                "averagePrice", 0.0
-                                            )
-                                        )
-                                        cur_price = (
-                                            float(
-                                                tick_data["prices"][0]["bids"][0][
-                                                    "price"
-                                                ]
-                                            )
-                                            if position_side == "long"
-                                            else float(
-                                                tick_data["prices"][0]["asks"][0][
-                                                    "price"
-                                                ]
-                                            )
-                                        )
-                                        diff_pips = (
-                                            (cur_price - entry_price) / pip_size
-                                            if position_side == "long"
-                                            else (entry_price - cur_price) / pip_size
-                                        )
-                                        atr_val = (
-                                            indicators["atr"].iloc[-1]
-                                            if hasattr(indicators.get("atr"), "iloc")
-                                            else indicators.get("atr", [0])[-1]
-                                        )
-                                        allow_scale = True
-                                        if (
-                                            SCALE_MAX_POS > 0
-                                            and self.scale_count >= SCALE_MAX_POS
-                                        ):
-                                            logger.info(
-                                                "Scale limit reached → ignoring SCALE signal"
-                                            )
-                                            allow_scale = False
-                                        if (
-                                            allow_scale
-                                            and SCALE_TRIGGER_ATR > 0
-                                            and diff_pips
-                                            < (atr_val / pip_size) * SCALE_TRIGGER_ATR
-                                        ):
-                                            logger.info(
-                                                f"Scale trigger {diff_pips:.1f} < {(atr_val / pip_size) * SCALE_TRIGGER_ATR:.1f} pips"
-                                            )
-                                            allow_scale = False
-                                        if allow_scale:
-                                            try:
-                                                risk_pct = float(
-                                                    env_loader.get_env(
-                                                        "ENTRY_RISK_PCT", "0.01"
-                                                    )
-                                                )
-                                                pip_val = float(
-                                                    env_loader.get_env(
-                                                        "PIP_VALUE_JPY", "100"
-                                                    )
-                                                )
-                                                base_lot = calc_lot_size(
-                                                    self.account_balance,
-                                                    risk_pct,
-                                                    float(
-                                                        env_loader.get_env(
-                                                            "INIT_SL_PIPS", "20"
-                                                        )
-                                                    ),
-                                                    pip_val,
-                                                    risk_engine=self.risk_mgr,
-                                                )
-                                                lot_sz = min(SCALE_LOT_SIZE, base_lot)
-                                                order_mgr.enter_trade(
-                                                    side=position_side,
-                                                    lot_size=lot_sz,
-                                                    market_data=tick_data,
-                                                    strategy_params={
-                                                        "instrument": DEFAULT_PAIR,
-                                                        "mode": "market",
-                                                    },
-                                                )
-                                                logger.info(
-                                                    f"Scaled into position ({position_side}) by {SCALE_LOT_SIZE} lots"
-                                                )
-                                                self.scale_count += 1
-                                                has_position = check_current_position(
-                                                    DEFAULT_PAIR
-                                                )
-                                            except Exception as exc:
-                                                logger.warning(
-                                                    f"Failed to scale position: {exc}"
-                                                )
-                                            exit_executed = False
-                                        else:
-                                            exit_executed = process_exit(
-                                                indicators,
-                                                tick_data,
-                                                market_cond,
-                                                higher_tf,
-                                                indicators_m1=self.indicators_M1,
-                                                patterns=PATTERN_NAMES,
-                                                pattern_names=self.patterns_by_tf,
-                                            )
-                                    else:
-                                        exit_executed = process_exit(
-                                            indicators,
-                                            tick_data,
-                                            market_cond,
-                                            higher_tf,
-                                            indicators_m1=self.indicators_M1,
-                                            patterns=PATTERN_NAMES,
-                                            pattern_names=self.patterns_by_tf,
-                                        )
-                                    if exit_executed:
-                                        self.last_close_ts = datetime.now(timezone.utc)
-                                        logger.info(
-                                            "Position closed based on AI recommendation."
-                                        )
-                                        send_line_message(
-                                            f"【EXIT】{DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
-                                        )
-                                        self._record_strategy_result(
-                                            current_profit_pips
-                                        )
-                                        self.scale_count = 0
-                                        info(
-                                            "exit",
-                                            pair=DEFAULT_PAIR,
-                                            reason="AI",
-                                            price=current_price,
-                                            pnl=current_profit_pips,
-                                        )
-                                    else:
-                                        logger.info(
-                                            "AI decision was HOLD → No exit executed."
-                                        )
-                                else:
-                                    logger.info("Filter blocked → AI exit decision skipped.")
-
-                    # ---- Position‑review timing -----------------------------
-                    due_for_review = False
-                    elapsed_review = None
-                    if has_position and self.review_enabled:
-                        if self.last_position_review_ts is None:
-                            due_for_review = True
-                        else:
-                            elapsed_review = (
-                                now - self.last_position_review_ts
-                            ).total_seconds()
-                            due_for_review = elapsed_review >= self.review_sec
-                        logger.debug(
-                            "review check: ts=%s elapsed=%s review_sec=%s due=%s",
-                            self.last_position_review_ts,
-                            (
-                                f"{elapsed_review:.1f}"
-                                if elapsed_review is not None
-                                else "N/A"
-                            ),
-                            self.review_sec,
-                            due_for_review,
-                        )
-
-                    # --- Cool‑down check ------------------------------------
-                    elapsed_seconds = (
-                        datetime.now() - self.last_ai_call
-                    ).total_seconds()
-                    if (
-                        has_position
-                        and (not due_for_review)
-                        and elapsed_seconds < self.ai_cooldown
-                    ):
-                        logger.info(
-                            f"AI cooldown active ({elapsed_seconds:.1f}s < {self.ai_cooldown}s). Skipping AI call."
-                        )
-                        self.last_run = now
-                        # Update OANDA trade history every second
-                        update_oanda_trades()
-                        time.sleep(self.interval_seconds)
-                        timer.stop()
-                        continue
-
-                    # Periodic exit review
-                    if has_position and due_for_review:
-                        self.last_position_review_ts = now
-                        logger.debug(
-                            "last_position_review_ts updated to %s",
-                            self.last_position_review_ts,
-                        )
-                        if position_side:
-                            cur_price = (
-                                float(tick_data["prices"][0]["bids"][0]["price"])
-                                if position_side == "long"
-                                else float(tick_data["prices"][0]["asks"][0]["price"])
-                            )
-                            entry_price = float(
-                                has_position[position_side].get("averagePrice", 0.0)
-                            )
-                            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                            profit_pips = (
-                                (cur_price - entry_price) / pip_size
-                                if position_side == "long"
-                                else (entry_price - cur_price) / pip_size
-                            )
-                        else:
-                            cur_price = float(
-                                tick_data["prices"][0]["bids"][0]["price"]
-                            )
-                            pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                            profit_pips = 0.0
-
-                        if (
-                            secs_since_entry is not None
-                            and secs_since_entry < MIN_HOLD_SECONDS
-                        ):
-                            logger.info(
-                                f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
-                            )
-                            pass_exit = False
-                        else:
-                            pass_exit = pass_exit_filter(indicators, position_side)
-
-                        if pass_exit:
-                            logger.info(
-                                "Filter OK → Processing periodic exit decision with AI."
-                            )
-                            self.last_ai_call = datetime.now()
-                            cond_ind = self._get_cond_indicators()
-                            market_cond = get_market_condition(
-                                {
-                                    "indicators": {
-                                        key: (
-                                            float(val.iloc[-1])
-                                            if hasattr(val, "iloc")
-                                            and val.iloc[-1] is not None
-                                            else float(val) if val is not None else None
-                                        )
-                                        for key, val in cond_ind.items()
-                                    },
-                                    "indicators_h1": {
-                                        key: (
-                                            float(v.iloc[-1])
-                                            if hasattr(v, "iloc")
-                                            and v.iloc[-1] is not None
-                                            else float(v) if v is not None else None
-                                        )
-                                        for key, v in (self.indicators_H1 or {}).items()
-                                    },
-                                    "indicators_h4": {
-                                        key: (
-                                            float(v.iloc[-1])
-                                            if hasattr(v, "iloc")
-                                            and v.iloc[-1] is not None
-                                            else float(v) if v is not None else None
-                                        )
-                                        for key, v in (self.indicators_H4 or {}).items()
-                                    },
-                                    "candles_m1": candles_m1,
-                                    "candles_m5": candles_m5,
-                                    "candles_d1": candles_d1,
-                                },
-                                higher_tf,
-                            )
-                            logger.debug(f"Market condition (review): {market_cond}")
-                            exit_ctx = build_exit_context(
-                                has_position,
-                                tick_data,
-                                indicators,
-                                indicators_m1=self.indicators_M1,
-                            )
-                            try:
-                                ai_dec = evaluate_exit_ai(exit_ctx)
-                            except Exception as exc:
-                                logger.warning(f"exit AI evaluation failed: {exc}")
-                                ai_dec = None
-                            if ai_dec and ai_dec.action == "SCALE":
-                                pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
-                                entry_price = float(
-                                    has_position[position_side].get("averagePrice", 0.0)
-                                )
-                                cur_price = (
-                                    float(tick_data["prices"][0]["bids"][0]["price"])
-                                    if position_side == "long"
-                                    else float(
-                                        tick_data["prices"][0]["asks"][0]["price"]
-                                    )
-                                )
-                                diff_pips = (
-                                    (cur_price - entry_price) / pip_size
-                                    if position_side == "long"
-                                    else (entry_price - cur_price) / pip_size
-                                )
-                                atr_val = (
-                                    indicators["atr"].iloc[-1]
-                                    if hasattr(indicators.get("atr"), "iloc")
-                                    else indicators.get("atr", [0])[-1]
+                                atr_val = (
+                                    indicators["atr"].iloc[-1]
+                                    if hasattr(indicators.get("atr"), "iloc")
+                                    else indicators.get("atr", [0])[-1]
                                 )
                                 allow_scale = True
                                 if (
@@ -1802,18 +1619,12 @@ class JobRunner:
                                     allow_scale = False
                                 if allow_scale:
                                     try:
-                                        risk_pct = float(
-                                            env_loader.get_env("ENTRY_RISK_PCT", "0.01")
-                                        )
-                                        pip_val = float(
-                                            env_loader.get_env("PIP_VALUE_JPY", "100")
-                                        )
+                                        risk_pct = cfg.entry_risk_pct
+                                        pip_val = cfg.pip_value_jpy
                                         base_lot = calc_lot_size(
                                             self.account_balance,
                                             risk_pct,
-                                            float(
-                                                env_loader.get_env("INIT_SL_PIPS", "20")
-                                            ),
+                                            cfg.init_sl_pips,
                                             pip_val,
                                             risk_engine=self.risk_mgr,
                                         )
@@ -1823,7 +1634,7 @@ class JobRunner:
                                             lot_size=lot_sz,
                                             market_data=tick_data,
                                             strategy_params={
-                                                "instrument": DEFAULT_PAIR,
+                                                "instrument": self.DEFAULT_PAIR,
                                                 "mode": "market",
                                             },
                                         )
@@ -1832,7 +1643,7 @@ class JobRunner:
                                         )
                                         self.scale_count += 1
                                         has_position = check_current_position(
-                                            DEFAULT_PAIR
+                                            self.DEFAULT_PAIR
                                         )
                                     except Exception as exc:
                                         logger.warning(
@@ -1848,6 +1659,7 @@ class JobRunner:
                                         indicators_m1=self.indicators_M1,
                                         patterns=PATTERN_NAMES,
                                         pattern_names=self.patterns_by_tf,
+                                        instrument=self.DEFAULT_PAIR,
                                     )
                             else:
                                 exit_executed = process_exit(
@@ -1858,6 +1670,7 @@ class JobRunner:
                                     indicators_m1=self.indicators_M1,
                                     patterns=PATTERN_NAMES,
                                     pattern_names=self.patterns_by_tf,
+                                    instrument=self.DEFAULT_PAIR,
                                 )
                             if exit_executed:
                                 self.last_close_ts = datetime.now(timezone.utc)
@@ -1865,464 +1678,707 @@ class JobRunner:
                                     "Position closed based on AI recommendation."
                                 )
                                 send_line_message(
-                                    f"【EXIT】{DEFAULT_PAIR} {cur_price} で決済しました。PL={profit_pips * pip_size:.2f}"
+                                    f"【EXIT】{self.DEFAULT_PAIR} {current_price} で決済しました。PL={current_profit_pips:.1f}pips"
+                                )
+                                self._record_strategy_result(
+                                    current_profit_pips
                                 )
-                                self._record_strategy_result(profit_pips)
                                 self.scale_count = 0
                                 info(
                                     "exit",
-                                    pair=DEFAULT_PAIR,
+                                    pair=self.DEFAULT_PAIR,
                                     reason="AI",
-                                    price=cur_price,
-                                    pnl=profit_pips * pip_size,
+                                    price=current_price,
+                                    pnl=current_profit_pips,
                                 )
                             else:
-                                logger.info("AI decision was HOLD → No exit executed.")
+                                logger.info(
+                                    "AI decision was HOLD → No exit executed."
+                                )
                         else:
                             logger.info("Filter blocked → AI exit decision skipped.")
 
-                    # AIによるエントリー/エグジット判断
-                    if not has_position:
-                        self.tp_extended = False
-                        self.tp_reduced = False
-                        self.max_profit_pips = 0.0
-                        # 1) Entry cooldown check
-                        if (
-                            self.last_close_ts
-                            and (
-                                datetime.now(timezone.utc) - self.last_close_ts
-                            ).total_seconds()
-                            < self.entry_cooldown_sec
-                        ):
-                            logger.info(
-                                f"Entry cooldown active ({(datetime.now(timezone.utc) - self.last_close_ts).total_seconds():.1f}s < {self.entry_cooldown_sec}s). Skipping entry."
-                            )
-                            self.last_run = now
-                            update_oanda_trades()
-                            time.sleep(self.interval_seconds)
-                            timer.stop()
-                            continue
+            # ---- Position‑review timing -----------------------------
+            due_for_review = False
+            elapsed_review = None
+            if has_position and self.review_enabled:
+                if self.last_position_review_ts is None:
+                    due_for_review = True
+                else:
+                    elapsed_review = (
+                        now - self.last_position_review_ts
+                    ).total_seconds()
+                    due_for_review = elapsed_review >= self.review_sec
+                logger.debug(
+                    "review check: ts=%s elapsed=%s review_sec=%s due=%s",
+                    self.last_position_review_ts,
+                    (
+                        f"{elapsed_review:.1f}"
+                        if elapsed_review is not None
+                        else "N/A"
+                    ),
+                    self.review_sec,
+                    due_for_review,
+                )
 
-                        # ── Entry side ───────────────────────────────
-                        current_price = float(
-                            tick_data["prices"][0]["bids"][0]["price"]
-                        )
-                        filter_ctx = {}
-                        filter_ok = pass_entry_filter(
-                            indicators,
-                            current_price,
-                            self.indicators_M1,
-                            self.indicators_M15,
-                            self.indicators_H1,
-                            mode=self.trade_mode,
-                            context=filter_ctx,
-                        )
-                        force_ai = (
-                            env_loader.get_env("FORCE_ENTRY_AFTER_AI", "false").lower() == "true"
-                        )
-                        if not filter_ok:
-                            reason = filter_ctx.get("reason", "unknown")
-                            logger.info(f"Entry filter blocked: {reason}")
-                            if not force_ai:
-                                self.last_position_review_ts = None
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-                        if filter_ok or force_ai:
-                            if not filter_ok:
-                                logger.info(
-                                    "Filter blocked but FORCE_ENTRY_AFTER_AI → processing entry with AI."
-                                )
-                            self.ai_cooldown = 0
-                            adx_min_val = float(env_loader.get_env("ADX_MIN", "0"))
-                            adx_series = indicators.get("adx")
-                            adx_val = None
-                            if adx_series is not None and len(adx_series):
-                                adx_val = (
-                                    adx_series.iloc[-1]
-                                    if hasattr(adx_series, "iloc")
-                                    else adx_series[-1]
+            # --- Cool‑down check ------------------------------------
+            elapsed_seconds = (
+                datetime.now() - self.last_ai_call
+            ).total_seconds()
+            if (
+                has_position
+                and (not due_for_review)
+                and elapsed_seconds < self.ai_cooldown
+            ):
+                logger.info(
+                    f"AI cooldown active ({elapsed_seconds:.1f}s < {self.ai_cooldown}s). Skipping AI call."
+                )
+                self.last_run = now
+                # Update OANDA trade history every second
+                self._sync_trades()
+                self._wait_next_cycle()
+                timer.stop()
+                return False
+
+            # Periodic exit review
+            if has_position and due_for_review:
+                self.last_position_review_ts = now
+                logger.debug(
+                    "last_position_review_ts updated to %s",
+                    self.last_position_review_ts,
+                )
+                if position_side:
+                    cur_price = (
+                        float(tick_data["prices"][0]["bids"][0]["price"])
+                        if position_side == "long"
+                        else float(tick_data["prices"][0]["asks"][0]["price"])
+                    )
+                    entry_price = float(
+                        has_position[position_side].get("averagePrice", 0.0)
+                    )
+                    pip_size = cfg.pip_size
+                    profit_pips = (
+                        (cur_price - entry_price) / pip_size
+                        if position_side == "long"
+                        else (entry_price - cur_price) / pip_size
+                    )
+                else:
+                    cur_price = float(
+                        tick_data["prices"][0]["bids"][0]["price"]
+                    )
+                    pip_size = cfg.pip_size
+                    profit_pips = 0.0
+
+                if (
+                    secs_since_entry is not None
+                    and secs_since_entry < MIN_HOLD_SECONDS
+                ):
+                    logger.info(
+                        f"Hold time {secs_since_entry:.1f}s < {MIN_HOLD_SECONDS}s → skip exit call"
+                    )
+                    pass_exit = False
+                else:
+                    pass_exit = pass_exit_filter(indicators, position_side)
+
+                if pass_exit:
+                    logger.info(
+                        "Filter OK → Processing periodic exit decision with AI."
+                    )
+                    self.last_ai_call = datetime.now()
+                    cond_ind = self._get_cond_indicators()
+                    exit_ctx = build_exit_context(
+                        has_position,
+                        tick_data,
+                        indicators,
+                        indicators_m1=self.indicators_M1,
+                    )
+                    exit_task = llm_pool.submit(evaluate_exit_ai, exit_ctx)
+                    market_task = llm_pool.submit(
+                        get_market_condition,
+                        {
+                            "indicators": {
+                                key: (
+                                    float(val.iloc[-1])
+                                    if hasattr(val, "iloc")
+                                    and val.iloc[-1] is not None
+                                    else float(val) if val is not None else None
                                 )
-                            if (
-                                adx_min_val > 0
-                                and adx_val is not None
-                                and float(adx_val) < adx_min_val
-                            ):
-                                logger.info(
-                                    f"ADX {adx_val} < {adx_min_val} → skip AI entry"
+                                for key, val in cond_ind.items()
+                            },
+                            "indicators_h1": {
+                                key: (
+                                    float(v.iloc[-1])
+                                    if hasattr(v, "iloc")
+                                    and v.iloc[-1] is not None
+                                    else float(v) if v is not None else None
                                 )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-                            if not has_position:
-                                ema = indicators.get("ema_slope")
-                                if ema is not None:
-                                    val = (
-                                        ema.iloc[-1]
-                                        if hasattr(ema, "iloc")
-                                        else ema[-1]
-                                    )
-                                    side = "long" if float(val) >= 0 else "short"
-                                else:
-                                    side = "long"
-                                scalp_manager.enter_scalp_trade(
-                                    DEFAULT_PAIR,
-                                    side,
-                                    risk_mgr=self.risk_mgr,
+                                for key, v in (self.indicators_H1 or {}).items()
+                            },
+                            "indicators_h4": {
+                                key: (
+                                    float(v.iloc[-1])
+                                    if hasattr(v, "iloc")
+                                    and v.iloc[-1] is not None
+                                    else float(v) if v is not None else None
                                 )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-                            logger.info(
-                                "Filter OK → Processing entry decision with AI."
+                                for key, v in (self.indicators_H4 or {}).items()
+                            },
+                            "candles_m1": candles_m1,
+                            "candles_m5": candles_m5,
+                            "candles_d1": candles_d1,
+                        },
+                        higher_tf,
+                        instrument=self.DEFAULT_PAIR,
+                    )
+                    market_cond = market_task.result()
+                    logger.debug(f"Market condition (review): {market_cond}")
+                    try:
+                        ai_dec = exit_task.result()
+                    except Exception as exc:
+                        logger.warning(f"exit AI evaluation failed: {exc}")
+                        ai_dec = None
+                    if ai_dec and ai_dec.action == "SCALE":
+                        pip_size = cfg.pip_size
+                        entry_price = float(
+                            has_position[position_side].get("averagePrice", 0.0)
+                        )
+                        cur_price = (
+                            float(tick_data["prices"][0]["bids"][0]["price"])
+                            if position_side == "long"
+                            else float(
+                                tick_data["prices"][0]["asks"][0]["price"]
                             )
-                            cond_ind = self._get_cond_indicators()
-                            ema_trend = None
-                            ema_series = cond_ind.get("ema_slope")
-                            if ema_series is not None:
-                                try:
-                                    val = (
-                                        ema_series.iloc[-1]
-                                        if hasattr(ema_series, "iloc")
-                                        else ema_series[-1]
-                                    )
-                                    ema_trend = "long" if float(val) >= 0 else "short"
-                                except Exception:
-                                    ema_trend = None
-
-                            if filter_pre_ai(
-                                candles_m5, indicators, {"trend_direction": ema_trend}
-                            ):
-                                logger.info("Pre-AI filter triggered → skipping entry.")
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            self.last_ai_call = datetime.now()  # record AI call time *before* the call
-
-                            market_cond = get_market_condition(
-                                {
-                                    "indicators": {
-                                        key: (
-                                            float(val.iloc[-1])
-                                            if hasattr(val, "iloc") and val.iloc[-1] is not None
-                                            else float(val) if val is not None else None
-                                        )
-                                        for key, val in cond_ind.items()
-                                    },
-                                    "indicators_h1": {
-                                        key: (
-                                            float(v.iloc[-1])
-                                            if hasattr(v, "iloc") and v.iloc[-1] is not None
-                                            else float(v) if v is not None else None
-                                        )
-                                        for key, v in (self.indicators_H1 or {}).items()
-                                    },
-                                    "indicators_h4": {
-                                        key: (
-                                            float(v.iloc[-1])
-                                            if hasattr(v, "iloc") and v.iloc[-1] is not None
-                                            else float(v) if v is not None else None
-                                        )
-                                        for key, v in (self.indicators_H4 or {}).items()
-                                    },
-                                    "candles_m1": candles_m1,
-                                    "candles_m5": candles_m5,
-                                    "candles_d1": candles_d1,
-                                },
-                                higher_tf,
+                        )
+                        diff_pips = (
+                            (cur_price - entry_price) / pip_size
+                            if position_side == "long"
+                            else (entry_price - cur_price) / pip_size
+                        )
+                        atr_val = (
+                            indicators["atr"].iloc[-1]
+                            if hasattr(indicators.get("atr"), "iloc")
+                            else indicators.get("atr", [0])[-1]
+                        )
+                        allow_scale = True
+                        if (
+                            SCALE_MAX_POS > 0
+                            and self.scale_count >= SCALE_MAX_POS
+                        ):
+                            logger.info(
+                                "Scale limit reached → ignoring SCALE signal"
                             )
-                            logger.debug(
-                                f"Market condition (post‑filter): {market_cond}"
+                            allow_scale = False
+                        if (
+                            allow_scale
+                            and SCALE_TRIGGER_ATR > 0
+                            and diff_pips
+                            < (atr_val / pip_size) * SCALE_TRIGGER_ATR
+                        ):
+                            logger.info(
+                                f"Scale trigger {diff_pips:.1f} < {(atr_val / pip_size) * SCALE_TRIGGER_ATR:.1f} pips"
                             )
-
-                            climax_side = detect_climax_reversal(candles_m5, indicators)
-                            if climax_side and not has_position:
-                                logger.info(
-                                    f"Climax reversal detected → {climax_side} entry"
-                                )
-                                params = {
-                                    "instrument": DEFAULT_PAIR,
-                                    "side": climax_side,
-                                    "tp_pips": float(
-                                        env_loader.get_env("CLIMAX_TP_PIPS", "7")
-                                    ),
-                                    "sl_pips": float(
-                                        env_loader.get_env("CLIMAX_SL_PIPS", "10")
-                                    ),
-                                    "mode": "market",
-                                    "market_cond": market_cond,
-                                }
-                                risk_pct = float(
-                                    env_loader.get_env("ENTRY_RISK_PCT", "0.01")
-                                )
-                                pip_val = float(
-                                    env_loader.get_env("PIP_VALUE_JPY", "100")
-                                )
-                                lot = calc_lot_size(
+                            allow_scale = False
+                        if allow_scale:
+                            try:
+                                risk_pct = cfg.entry_risk_pct
+                                pip_val = cfg.pip_value_jpy
+                                base_lot = calc_lot_size(
                                     self.account_balance,
                                     risk_pct,
-                                    float(params["sl_pips"]),
+                                    cfg.init_sl_pips,
                                     pip_val,
                                     risk_engine=self.risk_mgr,
                                 )
+                                lot_sz = min(SCALE_LOT_SIZE, base_lot)
                                 order_mgr.enter_trade(
-                                    side=climax_side,
-                                    lot_size=lot if lot > 0 else 0.0,
+                                    side=position_side,
+                                    lot_size=lot_sz,
                                     market_data=tick_data,
-                                    strategy_params=params,
-                                )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            if (
-                                not has_position
-                                and market_cond.get("market_condition") == "break"
-                            ):
-                                try:
-                                    direction = market_cond.get("range_break")
-                                    follow = follow_breakout(
-                                        candles_m5, indicators, direction
-                                    )
-                                    logger.info(f"follow_breakout result: {follow}")
-                                except Exception as exc:
-                                    logger.warning(f"follow_breakout failed: {exc}")
-
-                            margin_used = get_margin_used()
-                            logger.info(f"marginUsed={margin_used}")
-                            if margin_used is None:
-                                logger.warning("Failed to obtain marginUsed")
-                            elif (
-                                MARGIN_WARNING_THRESHOLD > 0
-                                and margin_used > MARGIN_WARNING_THRESHOLD
-                            ):
-                                logger.warning(
-                                    f"marginUsed {margin_used} exceeds threshold {MARGIN_WARNING_THRESHOLD}"
-                                )
-
-                            # --- SL hit cooldown check ----------------------
-                            cooldown = int(
-                                env_loader.get_env(
-                                    "SL_COOLDOWN_SEC", str(self.sl_cooldown_sec)
+                                    strategy_params={
+                                        "instrument": self.DEFAULT_PAIR,
+                                        "mode": "market",
+                                    },
                                 )
-                            )
-                            if (
-                                self.last_sl_time
-                                and (now - self.last_sl_time).total_seconds() < cooldown
-                            ):
                                 logger.info(
-                                    f"Entry blocked: recent SL hit on {self.last_sl_side}. Cooldown {(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s"
+                                    f"Scaled into position ({position_side}) by {SCALE_LOT_SIZE} lots"
                                 )
-                                log_entry_skip(
-                                    DEFAULT_PAIR,
-                                    self.last_sl_side or "",
-                                    "sl_cooldown",
-                                    f"{(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s",
-                                )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            try:
-                                plan_check = get_trade_plan(
-                                    tick_data,
-                                    {"M5": indicators},
-                                    {"M1": candles_m1, "M5": candles_m5},
-                                    patterns=PATTERN_NAMES,
-                                    detected_patterns=self.patterns_by_tf,
-                                    trade_mode=self.trade_mode,
-                                    mode_reason=self.mode_reason,
-                                )
-                                plan_check = parse_trade_plan(plan_check)
-                                side = (
-                                    plan_check.get("entry", {})
-                                    .get("side", "no")
-                                    .lower()
+                                self.scale_count += 1
+                                has_position = check_current_position(
+                                    self.DEFAULT_PAIR
                                 )
                             except Exception as exc:
                                 logger.warning(
-                                    f"get_trade_plan failed for check: {exc}"
-                                )
-                                side = "no"
-
-                            if side in ("long", "short") and side == self.last_sl_side:
-                                if self.last_sl_time and (
-                                    now - self.last_sl_time
-                                ).total_seconds() < cooldown:
-                                    logger.info(
-                                        f"Entry blocked: recent SL hit on {side}. Cooldown {(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s"
-                                    )
-                                    log_entry_skip(
-                                        DEFAULT_PAIR,
-                                        side,
-                                        "sl_cooldown",
-                                        f"{(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s",
-                                    )
-                                    self.last_run = now
-                                    update_oanda_trades()
-                                    time.sleep(self.interval_seconds)
-                                    timer.stop()
-                                    continue
-
-                            if side == "long" and consecutive_lower_lows(candles_m5):
-                                logger.info(
-                                    "Entry blocked: consecutive lower lows detected"
-                                )
-                                log_entry_skip(DEFAULT_PAIR, side, "lower_lows")
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            if side == "short" and consecutive_higher_highs(candles_m5):
-                                logger.info(
-                                    "Entry blocked: consecutive higher highs detected"
+                                    f"Failed to scale position: {exc}"
                                 )
-                                log_entry_skip(DEFAULT_PAIR, side, "higher_highs")
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-
-                            tp_ratio = None
-                            is_counter = counter_trend_block(
-                                side,
-                                indicators,
-                                self.indicators_M15,
-                                self.indicators_H1,
-                            )
-                            if is_counter:
-                                if (
-                                    env_loader.get_env(
-                                        "BLOCK_COUNTER_TREND", "true"
-                                    ).lower()
-                                    == "true"
-                                ):
-                                    logger.info(
-                                        "Entry blocked: counter-trend condition"
-                                    )
-                                    log_entry_skip(DEFAULT_PAIR, side, "counter_trend")
-                                    self.last_run = now
-                                    update_oanda_trades()
-                                    time.sleep(self.interval_seconds)
-                                    timer.stop()
-                                    continue
-                                logger.info("Counter-trend detected → TP reduced")
-                                tp_ratio = float(
-                                    env_loader.get_env("COUNTER_TREND_TP_RATIO", "0.5")
-                                )
-
-                            entry_params = {"tp_ratio": tp_ratio} if tp_ratio else {}
-                            entry_params["filter_ctx"] = filter_ctx
-                            result = process_entry(
+                            exit_executed = False
+                        else:
+                            exit_executed = process_exit(
                                 indicators,
-                                candles_m5,
                                 tick_data,
                                 market_cond,
-                                entry_params,
-                                higher_tf=higher_tf,
+                                higher_tf,
+                                indicators_m1=self.indicators_M1,
                                 patterns=PATTERN_NAMES,
-                                candles_dict={"M1": candles_m1, "M5": candles_m5},
                                 pattern_names=self.patterns_by_tf,
-                                tf_align=align,
-                                indicators_multi={
-                                    "M1": self.indicators_M1 or {},
-                                    "M5": self.indicators_M5 or {},
-                                    "H1": self.indicators_H1 or {},
-                                },
-                                risk_engine=self.risk_mgr,
+                                instrument=self.DEFAULT_PAIR,
                             )
-                            if not result:
-                                pend = get_pending_entry_order(DEFAULT_PAIR)
-                                if pend and pend.get("order_id"):
-                                    age = time.time() - pend.get("ts", 0)
-                                    if age >= self.pending_grace_sec:
-                                        try:
-                                            order_mgr.cancel_order(pend["order_id"])
-                                            logger.info(
-                                                f"AI declined entry; canceled pending LIMIT {pend['order_id']}"
-                                            )
-                                        except Exception as exc:
-                                            logger.warning(
-                                                f"Failed to cancel pending LIMIT {pend['order_id']}: {exc}"
-                                            )
-                                        for key, pend_info in list(
-                                            _pending_limits.items()
-                                        ):
-                                            if (
-                                                pend_info.get("order_id")
-                                                == pend["order_id"]
-                                            ):
-                                                _pending_limits.pop(key, None)
-                                                break
-                                    else:
-                                        logger.info(
-                                            f"Pending LIMIT age {age:.0f}s < grace period; keeping order"
-                                        )
-                                logger.info(
-                                    "process_entry returned False → aborting entry and continuing loop"
-                                )
-                                self.last_run = now
-                                update_oanda_trades()
-                                time.sleep(self.interval_seconds)
-                                timer.stop()
-                                continue
-                            # Send LINE notification on entry
-                            price = float(tick_data["prices"][0]["bids"][0]["price"])
-                            send_line_message(
-                                f"【ENTRY】{DEFAULT_PAIR} {price} でエントリーしました。"
-                            )
-                            info(
-                                "entry",
-                                pair=DEFAULT_PAIR,
-                                side=side,
-                                price=price,
-                                lot=float(env_loader.get_env("TRADE_LOT_SIZE", "1.0")),
-                                regime=self.trade_mode,
+                    else:
+                        exit_executed = process_exit(
+                            indicators,
+                            tick_data,
+                            market_cond,
+                            higher_tf,
+                            indicators_m1=self.indicators_M1,
+                            patterns=PATTERN_NAMES,
+                            pattern_names=self.patterns_by_tf,
+                            instrument=self.DEFAULT_PAIR,
+                        )
+                    if exit_executed:
+                        self.last_close_ts = datetime.now(timezone.utc)
+                        logger.info(
+                            "Position closed based on AI recommendation."
+                        )
+                        send_line_message(
+                            f"【EXIT】{self.DEFAULT_PAIR} {cur_price} で決済しました。PL={profit_pips * pip_size:.2f}"
+                        )
+                        self._record_strategy_result(profit_pips)
+                        self.scale_count = 0
+                        info(
+                            "exit",
+                            pair=self.DEFAULT_PAIR,
+                            reason="AI",
+                            price=cur_price,
+                            pnl=profit_pips * pip_size,
+                        )
+                    else:
+                        logger.info("AI decision was HOLD → No exit executed.")
+                else:
+                    logger.info("Filter blocked → AI exit decision skipped.")
+
+            # AIによるエントリー/エグジット判断
+            if not has_position:
+                self.tp_extended = False
+                self.tp_reduced = False
+                self.max_profit_pips = 0.0
+                # 1) Entry cooldown check
+                if (
+                    self.last_close_ts
+                    and (
+                        datetime.now(timezone.utc) - self.last_close_ts
+                    ).total_seconds()
+                    < self.entry_cooldown_sec
+                ):
+                    logger.info(
+                        f"Entry cooldown active ({(datetime.now(timezone.utc) - self.last_close_ts).total_seconds():.1f}s < {self.entry_cooldown_sec}s). Skipping entry."
+                    )
+                    self.last_run = now
+                    self._sync_trades()
+                    self._wait_next_cycle()
+                    timer.stop()
+                    return False
+
+                # ── Entry side ───────────────────────────────
+                current_price = float(
+                    tick_data["prices"][0]["bids"][0]["price"]
+                )
+                filter_ctx = {}
+                with span("filters"):
+                    filter_ok = pass_entry_filter(
+                        indicators,
+                        current_price,
+                        self.indicators_M1,
+                        self.indicators_M15,
+                        self.indicators_H1,
+                        mode=self.trade_mode,
+                        context=filter_ctx,
+                    )
+                force_ai = cfg.force_entry_after_ai
+                if not filter_ok:
+                    reason = filter_ctx.get("reason", "unknown")
+                    logger.info(f"Entry filter blocked: {reason}")
+                    if not force_ai:
+                        self.last_position_review_ts = None
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+                if filter_ok or force_ai:
+                    if not filter_ok:
+                        logger.info(
+                            "Filter blocked but FORCE_ENTRY_AFTER_AI → processing entry with AI."
+                        )
+                    self.ai_cooldown = 0
+                    adx_min_val = cfg.adx_min
+                    adx_series = indicators.get("adx")
+                    adx_val = None
+                    if adx_series is not None and len(adx_series):
+                        adx_val = (
+                            adx_series.iloc[-1]
+                            if hasattr(adx_series, "iloc")
+                            else adx_series[-1]
+                        )
+                    if (
+                        adx_min_val > 0
+                        and adx_val is not None
+                        and float(adx_val) < adx_min_val
+                    ):
+                        logger.info(
+                            f"ADX {adx_val} < {adx_min_val} → skip AI entry"
+                        )
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+                    if not has_position:
+                        ema = indicators.get("ema_slope")
+                        if ema is not None:
+                            val = (
+                                ema.iloc[-1]
+                                if hasattr(ema, "iloc")
+                                else ema[-1]
                             )
-                            self.scale_count = 0
-                            self.last_entry_context = self.current_context
-                            self.last_entry_strategy = self.current_strategy_name
-                            set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                            side = "long" if float(val) >= 0 else "short"
                         else:
-                            reason = filter_ctx.get("reason", "unknown")
+                            side = "long"
+                        scalp_manager.enter_scalp_trade(
+                            self.DEFAULT_PAIR,
+                            side,
+                            risk_mgr=self.risk_mgr,
+                        )
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+                    logger.info(
+                        "Filter OK → Processing entry decision with AI."
+                    )
+                    cond_ind = self._get_cond_indicators()
+                    ema_trend = None
+                    ema_series = cond_ind.get("ema_slope")
+                    if ema_series is not None:
+                        try:
+                            val = (
+                                ema_series.iloc[-1]
+                                if hasattr(ema_series, "iloc")
+                                else ema_series[-1]
+                            )
+                            ema_trend = "long" if float(val) >= 0 else "short"
+                        except Exception:
+                            ema_trend = None
+
+                    if filter_pre_ai(
+                        candles_m5, indicators, {"trend_direction": ema_trend}
+                    ):
+                        logger.info("Pre-AI filter triggered → skipping entry.")
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+
+                    self.last_ai_call = datetime.now()  # record AI call time *before* the call
+
+                    market_cond = get_market_condition(
+                        {
+                            "indicators": {
+                                key: (
+                                    float(val.iloc[-1])
+                                    if hasattr(val, "iloc") and val.iloc[-1] is not None
+                                    else float(val) if val is not None else None
+                                )
+                                for key, val in cond_ind.items()
+                            },
+                            "indicators_h1": {
+                                key: (
+                                    float(v.iloc[-1])
+                                    if hasattr(v, "iloc") and v.iloc[-1] is not None
+                                    else float(v) if v is not None else None
+                                )
+                                for key, v in (self.indicators_H1 or {}).items()
+                            },
+                            "indicators_h4": {
+                                key: (
+                                    float(v.iloc[-1])
+                                    if hasattr(v, "iloc") and v.iloc[-1] is not None
+                                    else float(v) if v is not None else None
+                                )
+                                for key, v in (self.indicators_H4 or {}).items()
+                            },
+                            "candles_m1": candles_m1,
+                            "candles_m5": candles_m5,
+                            "candles_d1": candles_d1,
+                        },
+                        higher_tf,
+                        instrument=self.DEFAULT_PAIR,
+                    )
+                    logger.debug(
+                        f"Market condition (post‑filter): {market_cond}"
+                    )
+
+                    climax_side = detect_climax_reversal(candles_m5, indicators)
+                    if climax_side and not has_position:
+                        logger.info(
+                            f"Climax reversal detected → {climax_side} entry"
+                        )
+                        params = {
+                            "instrument": self.DEFAULT_PAIR,
+                            "side": climax_side,
+                            "tp_pips": cfg.climax_tp_pips,
+                            "sl_pips": cfg.climax_sl_pips,
+                            "mode": "market",
+                            "market_cond": market_cond,
+                        }
+                        risk_pct = cfg.entry_risk_pct
+                        pip_val = cfg.pip_value_jpy
+                        lot = calc_lot_size(
+                            self.account_balance,
+                            risk_pct,
+                            float(params["sl_pips"]),
+                            pip_val,
+                            risk_engine=self.risk_mgr,
+                        )
+                        order_mgr.enter_trade(
+                            side=climax_side,
+                            lot_size=lot if lot > 0 else 0.0,
+                            market_data=tick_data,
+                            strategy_params=params,
+                        )
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+
+                    if (
+                        not has_position
+                        and market_cond.get("market_condition") == "break"
+                    ):
+                        try:
+                            direction = market_cond.get("range_break")
+                            follow = follow_breakout(
+                                candles_m5, indicators, direction
+                            )
+                            logger.info(f"follow_breakout result: {follow}")
+                        except Exception as exc:
+                            logger.warning(f"follow_breakout failed: {exc}")
+
+                    margin_used = get_margin_used()
+                    logger.info(f"marginUsed={margin_used}")
+                    if margin_used is None:
+                        logger.warning("Failed to obtain marginUsed")
+                    elif (
+                        MARGIN_WARNING_THRESHOLD > 0
+                        and margin_used > MARGIN_WARNING_THRESHOLD
+                    ):
+                        logger.warning(
+                            f"marginUsed {margin_used} exceeds threshold {MARGIN_WARNING_THRESHOLD}"
+                        )
+
+                    # --- SL hit cooldown check ----------------------
+                    cooldown = (
+                        cfg.sl_cooldown_sec
+                        if cfg.sl_cooldown_sec is not None
+                        else self.sl_cooldown_sec
+                    )
+                    if (
+                        self.last_sl_time
+                        and (now - self.last_sl_time).total_seconds() < cooldown
+                    ):
+                        logger.info(
+                            f"Entry blocked: recent SL hit on {self.last_sl_side}. Cooldown {(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s"
+                        )
+                        log_entry_skip(
+                            self.DEFAULT_PAIR,
+                            self.last_sl_side or "",
+                            "sl_cooldown",
+                            f"{(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s",
+                        )
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+
+                    try:
+                        plan_check = get_trade_plan(
+                            tick_data,
+                            {"M5": indicators},
+                            {"M1": candles_m1, "M5": candles_m5},
+                            patterns=PATTERN_NAMES,
+                            detected_patterns=self.patterns_by_tf,
+                            trade_mode=self.trade_mode,
+                            mode_reason=self.mode_reason,
+                            instrument=self.DEFAULT_PAIR,
+                        )
+                        plan_check = parse_trade_plan(plan_check)
+                        side = (
+                            plan_check.get("entry", {})
+                            .get("side", "no")
+                            .lower()
+                        )
+                    except Exception as exc:
+                        logger.warning(
+                            f"get_trade_plan failed for check: {exc}"
+                        )
+                        side = "no"
+
+                    if side in ("long", "short") and side == self.last_sl_side:
+                        if self.last_sl_time and (
+                            now - self.last_sl_time
+                        ).total_seconds() < cooldown:
                             logger.info(
-                                f"Filter blocked ({reason}) → AI entry decision skipped."
+                                f"Entry blocked: recent SL hit on {side}. Cooldown {(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s"
                             )
-                            self.last_position_review_ts = None
-                    # (removed: periodic exit check block)
-                # Update OANDA trade history every second
-                self.last_run = now
+                            log_entry_skip(
+                                self.DEFAULT_PAIR,
+                                side,
+                                "sl_cooldown",
+                                f"{(now - self.last_sl_time).total_seconds():.0f}s < {cooldown}s",
+                            )
+                            self.last_run = now
+                            self._sync_trades()
+                            self._wait_next_cycle()
+                            timer.stop()
+                            return False
 
-                update_oanda_trades()
-                metrics_publisher.publish(
-                    "job_loop_success",
-                    1,
-                    {"mode": self.trade_mode or "unknown"},
-                )
-                time.sleep(self.interval_seconds)
-                timer.stop()
+                    if side == "long" and consecutive_lower_lows(candles_m5):
+                        logger.info(
+                            "Entry blocked: consecutive lower lows detected"
+                        )
+                        log_entry_skip(self.DEFAULT_PAIR, side, "lower_lows")
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
 
-            except Exception as e:
-                logger.error(f"Error occurred during job execution: {e}", exc_info=True)
-                self.safety.record_error()
-                metrics_publisher.publish("job_error", 1)
-                time.sleep(self.interval_seconds)
+                    if side == "short" and consecutive_higher_highs(candles_m5):
+                        logger.info(
+                            "Entry blocked: consecutive higher highs detected"
+                        )
+                        log_entry_skip(self.DEFAULT_PAIR, side, "higher_highs")
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+
+                    tp_ratio = None
+                    is_counter = counter_trend_block(
+                        side,
+                        indicators,
+                        self.indicators_M15,
+                        self.indicators_H1,
+                    )
+                    if is_counter:
+                        if cfg.block_counter_trend:
+                            logger.info(
+                                "Entry blocked: counter-trend condition"
+                            )
+                            log_entry_skip(self.DEFAULT_PAIR, side, "counter_trend")
+                            self.last_run = now
+                            self._sync_trades()
+                            self._wait_next_cycle()
+                            timer.stop()
+                            return False
+                        logger.info("Counter-trend detected → TP reduced")
+                        tp_ratio = cfg.counter_trend_tp_ratio
+
+                    entry_params = {"tp_ratio": tp_ratio} if tp_ratio else {}
+                    entry_params["filter_ctx"] = filter_ctx
+                    result = process_entry(
+                        indicators,
+                        candles_m5,
+                        tick_data,
+                        market_cond,
+                        entry_params,
+                        higher_tf=higher_tf,
+                        patterns=PATTERN_NAMES,
+                        candles_dict={"M1": candles_m1, "M5": candles_m5},
+                        pattern_names=self.patterns_by_tf,
+                        tf_align=align,
+                        indicators_multi={
+                            "M1": self.indicators_M1 or {},
+                            "M5": self.indicators_M5 or {},
+                            "H1": self.indicators_H1 or {},
+                        },
+                        risk_engine=self.risk_mgr,
+                        instrument=self.DEFAULT_PAIR,
+                    )
+                    if not result:
+                        pend = get_pending_entry_order(self.DEFAULT_PAIR)
+                        if pend and pend.get("order_id"):
+                            age = time.time() - pend.get("ts", 0)
+                            if age >= self.pending_grace_sec:
+                                try:
+                                    order_mgr.cancel_order(pend["order_id"])
+                                    logger.info(
+                                        f"AI declined entry; canceled pending LIMIT {pend['order_id']}"
+                                    )
+                                except Exception as exc:
+                                    logger.warning(
+                                        f"Failed to cancel pending LIMIT {pend['order_id']}: {exc}"
+                                    )
+                                for key, pend_info in list(
+                                    _pending_limits.items()
+                                ):
+                                    if (
+                                        pend_info.get("order_id")
+                                        == pend["order_id"]
+                                    ):
+                                        _pending_limits.pop(key, None)
+                                        break
+                            else:
+                                logger.info(
+                                    f"Pending LIMIT age {age:.0f}s < grace period; keeping order"
+                                )
+                        logger.info(
+                            "process_entry returned False → aborting entry and continuing loop"
+                        )
+                        self.last_run = now
+                        self._sync_trades()
+                        self._wait_next_cycle()
+                        timer.stop()
+                        return False
+                    # Send LINE notification on entry
+                    price = float(tick_data["prices"][0]["bids"][0]["price"])
+                    send_line_message(
+                        f"【ENTRY】{self.DEFAULT_PAIR} {price} でエントリーしました。"
+                    )
+                    info(
+                        "entry",
+                        pair=self.DEFAULT_PAIR,
+                        side=side,
+                        price=price,
+                        lot=cfg.trade_lot_size,
+                        regime=self.trade_mode,
+                    )
+                    self.scale_count = 0
+                    self.last_entry_context = self.current_context
+                    self.last_entry_strategy = self.current_strategy_name
+                    set_last_entry_info(self.last_entry_context, self.last_entry_strategy)
+                else:
+                    reason = filter_ctx.get("reason", "unknown")
+                    logger.info(
+                        f"Filter blocked ({reason}) → AI entry decision skipped."
+                    )
+                    self.last_position_review_ts = None
+            # (removed: periodic exit check block)
+        # Update OANDA trade history every second
+        self.last_run = now
+
+        self._sync_trades()
+        metrics_publisher.publish(
+            "job_loop_success",
+            1,
+            {"mode": self.trade_mode or "unknown"},
+        )
+        self._wait_next_cycle()
+        timer.stop()
+        return True
 
     def stop(self) -> None:
         """Signal the runner loop to exit."""
@@ -2331,7 +2387,12 @@ class JobRunner:
 
 def main() -> None:
     runner = JobRunner(interval_seconds=1)
-    runner.run()
+    if env_loader.get_env("RUNNER_MODE", "poll").lower() == "stream":
+        from backend.scheduler.tick_runner import StreamTickRunner
+
+        StreamTickRunner(runner).run()
+    else:
+        runner.run()
 
 
 if __name__ == "__main__":
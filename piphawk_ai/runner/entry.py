@@ -9,7 +9,7 @@ from typing import Any
 
 from backend.strategy.openai_analysis import get_market_condition, get_trade_plan, should_convert_limit_to_market
 from backend.strategy.risk_manager import calc_lot_size
-from backend.utils import env_loader
+from backend.config import runtime_config
 from backend.utils.ai_parse import parse_trade_plan
 from backend.utils.oanda_client import get_pending_entry_order
 
@@ -23,7 +23,8 @@ def manage_pending_limits(
     tick_data: dict,
 ) -> None:
     """Cancel or renew pending LIMIT orders."""
-    MAX_LIMIT_RETRY = int(env_loader.get_env("MAX_LIMIT_RETRY", "3"))
+    cfg = runtime_config.current()
+    MAX_LIMIT_RETRY = cfg.max_limit_retry
     pend = get_pending_entry_order(instrument)
     if not pend:
         for key, info in list(runner._pending_limits.items()):
@@ -42,7 +43,7 @@ def manage_pending_limits(
     order_mgr = runner.order_mgr
 
     if local_info:
-        pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+        pip_size = cfg.pip_size
         price = (
             float(tick_data["prices"][0]["bids"][0]["price"])
             if local_info.get("side") == "long"
@@ -58,7 +59,7 @@ def manage_pending_limits(
         else:
             atr_pips = 0.0
 
-        threshold_ratio = float(env_loader.get_env("LIMIT_THRESHOLD_ATR_RATIO", "0.3"))
+        threshold_ratio = cfg.limit_threshold_atr_ratio
         adx_series = indicators.get("adx")
         adx_val = adx_series.iloc[-1] if adx_series is not None and len(adx_series) else 0.0
 
@@ -87,6 +88,7 @@ def manage_pending_limits(
                 "ema_slope": ema_slope_val,
                 "bb_width_pips": bb_width_pips,
                 "side": local_info.get("side"),
+                "instrument": instrument,
             }
             try:
                 allow = should_convert_limit_to_market(ctx)
@@ -111,6 +113,7 @@ def manage_pending_limits(
                             detected_patterns=runner.patterns_by_tf,
                             trade_mode=runner.trade_mode,
                             mode_reason=runner.mode_reason,
+                            instrument=instrument,
                         )
                         plan = parse_trade_plan(plan)
                         risk = plan.get("risk", {})
@@ -136,7 +139,7 @@ def manage_pending_limits(
                                 for k, v in (runner.indicators_H4 or {}).items()
                             },
                         }
-                        market_cond = get_market_condition(ctx, {})
+                        market_cond = get_market_condition(ctx, {}, instrument=instrument)
                     except Exception as exc:
                         runner.logger.warning(f"get_market_condition failed: {exc}")
                         market_cond = None
@@ -151,9 +154,9 @@ def manage_pending_limits(
                         "market_cond": market_cond,
                         "ai_response": ai_raw,
                     }
-                    sl_val = params.get("sl_pips") or float(env_loader.get_env("INIT_SL_PIPS", "20"))
-                    risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-                    pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+                    sl_val = params.get("sl_pips") or cfg.init_sl_pips
+                    risk_pct = cfg.entry_risk_pct
+                    pip_val = cfg.pip_value_jpy
                     lot = calc_lot_size(
                         runner.account_balance,
                         risk_pct,
@@ -206,6 +209,7 @@ def manage_pending_limits(
             detected_patterns=runner.patterns_by_tf,
             trade_mode=runner.trade_mode,
             mode_reason=runner.mode_reason,
+            instrument=instrument,
         )
         plan = parse_trade_plan(plan)
     except Exception as exc:
@@ -236,9 +240,9 @@ def manage_pending_limits(
         "valid_for_sec": int(entry.get("valid_for_sec", runner.max_limit_age_sec)),
         "risk": risk,
     }
-    sl_val = params.get("sl_pips") or float(env_loader.get_env("INIT_SL_PIPS", "20"))
-    risk_pct = float(env_loader.get_env("ENTRY_RISK_PCT", "0.01"))
-    pip_val = float(env_loader.get_env("PIP_VALUE_JPY", "100"))
+    sl_val = params.get("sl_pips") or cfg.init_sl_pips
+    risk_pct = cfg.entry_risk_pct
+    pip_val = cfg.pip_value_jpy
     lot = calc_lot_size(
         runner.account_balance,
         risk_pct,
@@ -5,8 +5,8 @@ import json
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
+from backend.config import runtime_config
 from backend.strategy import exit_logic
-from backend.utils import env_loader
 
 __all__ = [
     "maybe_extend_tp",
@@ -102,18 +102,17 @@ def maybe_reduce_tp(runner: Any, position: dict, indicators: dict, side: str, pi
         runner.logger.warning(f"TP reduction failed: {exc}")
 
 def get_calendar_volatility_level() -> int:
-    try:
-        return int(env_loader.get_env("CALENDAR_VOLATILITY_LEVEL", "0"))
-    except (TypeError, ValueError):
-        return 0
+    cfg = runtime_config.current()
+    return cfg.calendar_volatility_level
 
 def refresh_trailing_status(runner: Any) -> None:
-    quiet_start = float(env_loader.get_env("QUIET_START_HOUR_JST", "3"))
-    quiet_end = float(env_loader.get_env("QUIET_END_HOUR_JST", "7"))
-    quiet2_enabled = env_loader.get_env("QUIET2_ENABLED", "false").lower() == "true"
+    cfg = runtime_config.current()
+    quiet_start = cfg.quiet_start_hour_jst
+    quiet_end = cfg.quiet_end_hour_jst
+    quiet2_enabled = cfg.quiet2_enabled
     if quiet2_enabled:
-        quiet2_start = float(env_loader.get_env("QUIET2_START_HOUR_JST", "23"))
-        quiet2_end = float(env_loader.get_env("QUIET2_END_HOUR_JST", "1"))
+        quiet2_start = cfg.quiet2_start_hour_jst
+        quiet2_end = cfg.quiet2_end_hour_jst
     else:
         quiet2_start = quiet2_end = None
 
@@ -134,7 +133,7 @@ def refresh_trailing_status(runner: Any) -> None:
     if in_quiet_hours or get_calendar_volatility_level() >= 3:
         exit_logic.TRAIL_ENABLED = False
     else:
-        exit_logic.TRAIL_ENABLED = env_loader.get_env("TRAIL_ENABLED", "true").lower() == "true"
+        exit_logic.TRAIL_ENABLED = cfg.trail_enabled
 
 def should_peak_exit(runner: Any, side: str, indicators: dict, current_profit: float) -> bool:
     if not runner.PEAK_EXIT_ENABLED:
@@ -144,7 +143,7 @@ def should_peak_exit(runner: Any, side: str, indicators: dict, current_profit: f
         atr_val = float(atr_val.iloc[-1])
     if atr_val is None:
         return False
-    pip_size = 0.01 if runner.DEFAULT_PAIR.endswith("_JPY") else 0.0001
+    pip_size = runner.pip_size
     allowed_draw = (atr_val / pip_size) * runner.MM_DRAW_MAX_ATR_RATIO
     if (runner.max_profit_pips - current_profit) < allowed_draw:
         return False
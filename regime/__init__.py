@@ -1,5 +1,6 @@
+from .batch_features import BatchFeatureExtractor
 from .features import RegimeFeatureExtractor
 from .gmm_detector import GMMRegimeDetector
 from .hdbscan_detector import HDBSCANRegimeDetector
 
-__all__ = ["GMMRegimeDetector", "HDBSCANRegimeDetector", "RegimeFeatureExtractor"]
+__all__ = ["BatchFeatureExtractor", "GMMRegimeDetector", "HDBSCANRegimeDetector", "RegimeFeatureExtractor"]
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+"""Vectorized regime features for offline training.
+
+:class:`BatchFeatureExtractor` computes the same four columns as
+:class:`regime.features.RegimeFeatureExtractor` (ATR ratio, ADX, BB-width
+ratio, volume ratio) for whole NumPy arrays.  Window means are taken over
+``sliding_window_view`` rows and the recursive EMA / ADX smoothing runs
+through ``scipy.signal.lfilter``, so there is no per-row Python work.
+
+The extractor is stateful: it keeps the last ``window - 1`` values of every
+rolling series plus the EMA / ADX state, so feeding a long history chunk by
+chunk gives the same result as a single call (and as the tick-by-tick
+rolling path, within float rounding).
+"""
+
+from typing import Iterable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# RollingBBWidth の既定値と同じ
+BB_AVG_LEN = 50
+
+
+class _Window:
+    """Tail of a rolling series carried between chunks."""
+
+    __slots__ = ("size", "tail")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.tail = np.empty(0, dtype=float)
+
+    def views(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(len(x), size)`` windows ending at each ``x`` and their counts.
+
+        Windows not yet full are left-padded with zeros.
+        """
+        k = len(self.tail)
+        ext = np.concatenate((self.tail, x))
+        padded = np.concatenate((np.zeros(self.size - 1), ext))
+        win = sliding_window_view(padded, self.size)[k:]
+        counts = np.minimum(np.arange(k + 1, k + len(x) + 1), self.size)
+        keep = self.size - 1
+        self.tail = ext[max(len(ext) - keep, 0):] if keep else ext[:0]
+        return win, counts
+
+    def means(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        win, counts = self.views(x)
+        return win.sum(axis=1) / counts, counts
+
+
+def _ema(x: np.ndarray, alpha: float, prev: float | None) -> np.ndarray:
+    """EMA ``y = prev + alpha * (x - prev)`` seeded with ``x[0]`` when ``prev`` is None."""
+    if not len(x):
+        return x
+    if prev is None:
+        out = np.empty_like(x)
+        out[0] = x[0]
+        out[1:] = _ema(x[1:], alpha, float(x[0]))
+        return out
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * prev])
+    return y
+
+
+def _true_range(h: np.ndarray, l: np.ndarray, prev_c: np.ndarray) -> np.ndarray:
+    return np.maximum(h - l, np.maximum(np.abs(h - prev_c), np.abs(l - prev_c)))
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray, default: float) -> np.ndarray:
+    out = np.full(np.broadcast(num, den).shape, default, dtype=float)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+class BatchFeatureExtractor:
+    """Array counterpart of :class:`RegimeFeatureExtractor`."""
+
+    def __init__(self, window: int = 20) -> None:
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.prev: tuple[float, float, float] | None = None
+        self.atr_tr = _Window(window)
+        self.atr_ema: float | None = None
+        self.adx_tr = _Window(window)
+        self.plus_dm = _Window(window)
+        self.minus_dm = _Window(window)
+        self.adx: float | None = None
+        self.prices = _Window(window)
+        self.widths = _Window(BB_AVG_LEN)
+        self.volumes = _Window(window)
+
+    def transform(
+        self,
+        high: Iterable[float],
+        low: Iterable[float],
+        close: Iterable[float],
+        volume: Iterable[float] | None = None,
+    ) -> np.ndarray:
+        """Return the ``(n, 4)`` feature matrix for the next ``n`` bars."""
+        h = np.asarray(high, dtype=float)
+        l = np.asarray(low, dtype=float)
+        c = np.asarray(close, dtype=float)
+        v = np.zeros_like(c) if volume is None else np.asarray(volume, dtype=float)
+        n = len(c)
+        if not n:
+            return np.empty((0, 4), dtype=float)
+
+        if self.prev is None:
+            ph = np.concatenate(([np.nan], h[:-1]))
+            pl = np.concatenate(([np.nan], l[:-1]))
+            pc = np.concatenate(([np.nan], c[:-1]))
+        else:
+            ph = np.concatenate(([self.prev[0]], h[:-1]))
+            pl = np.concatenate(([self.prev[1]], l[:-1]))
+            pc = np.concatenate(([self.prev[2]], c[:-1]))
+        # 最初の足は前足がないので TR = 高値 - 安値、ADX は前足の記録のみ
+        first = 1 if self.prev is None else 0
+        tr = _true_range(h, l, pc)
+        if first:
+            tr[0] = h[0] - l[0]
+        self.prev = (float(h[-1]), float(l[-1]), float(c[-1]))
+
+        feats = np.empty((n, 4), dtype=float)
+        feats[:, 0] = self._atr_ratio(tr)
+        feats[:, 1] = 0.0
+        feats[first:, 1] = self._adx(h[first:], l[first:], ph[first:], pl[first:], tr[first:])
+        feats[:, 2] = self._bb_ratio(c)
+        vol_avg, _ = self.volumes.means(v)
+        feats[:, 3] = _safe_div(v, vol_avg, 1.0)
+        return feats
+
+    # ------------------------------------------------------------------
+    def _atr_ratio(self, tr: np.ndarray) -> np.ndarray:
+        atr, _ = self.atr_tr.means(tr)
+        ema = _ema(atr, self.alpha, self.atr_ema)
+        self.atr_ema = float(ema[-1])
+        return _safe_div(atr, ema, 1.0)
+
+    def _adx(
+        self,
+        h: np.ndarray,
+        l: np.ndarray,
+        ph: np.ndarray,
+        pl: np.ndarray,
+        tr: np.ndarray,
+    ) -> np.ndarray:
+        out = np.zeros(len(h), dtype=float)
+        if not len(h):
+            return out
+        up = h - ph
+        down = pl - l
+        plus = np.where((up > down) & (up > 0), up, 0.0)
+        minus = np.where((down > up) & (down > 0), down, 0.0)
+        atr, counts = self.adx_tr.means(tr)
+        plus_avg, _ = self.plus_dm.means(plus)
+        minus_avg, _ = self.minus_dm.means(minus)
+        ready = counts >= self.window
+        if not ready.any():
+            return out
+        atr, plus_avg, minus_avg = atr[ready], plus_avg[ready], minus_avg[ready]
+        di_plus = _safe_div(100 * plus_avg, atr, 0.0)
+        di_minus = _safe_div(100 * minus_avg, atr, 0.0)
+        dx = _safe_div(100 * np.abs(di_plus - di_minus), di_plus + di_minus, 0.0)
+        adx = _ema(dx, 1 / self.window, self.adx)
+        self.adx = float(adx[-1])
+        out[ready] = adx
+        return out
+
+    def _bb_ratio(self, c: np.ndarray) -> np.ndarray:
+        win, counts = self.prices.views(c)
+        width = np.zeros(len(c), dtype=float)
+        full = counts >= self.window
+        if full.any():
+            rows = win[full]
+            std = rows.std(axis=1)
+            # 横ばいの窓は rolling 側と同じく幅ちょうど 0
+            std[rows.max(axis=1) == rows.min(axis=1)] = 0.0
+            width[full] = 4 * std
+        avg, _ = self.widths.means(width)
+        return _safe_div(width, avg, 0.0)
+
+
+def compute_features(
+    high: Iterable[float],
+    low: Iterable[float],
+    close: Iterable[float],
+    volume: Iterable[float] | None = None,
+    *,
+    window: int = 20,
+) -> np.ndarray:
+    """One-shot helper around :class:`BatchFeatureExtractor`."""
+    return BatchFeatureExtractor(window).transform(high, low, close, volume)
+
+
+__all__ = ["BatchFeatureExtractor", "compute_features"]
@@ -33,7 +33,15 @@ class RegimeFeatureExtractor:
 
     def process_all(self, data: list[Dict[str, Any]]) -> np.ndarray:
         """複数データポイントから特徴量行列を作成する."""
-        feats = [self.update(t) for t in data]
-        return np.vstack(feats)
+        if not data:
+            return np.empty((0, 4), dtype=float)
+        return np.column_stack(
+            (
+                self.atr.update_many(data),
+                self.adx.update_many(data)[:, 0],
+                self.bbwidth.update_many(data),
+                self.volume.update_many(data),
+            )
+        )
 
 __all__ = ["RegimeFeatureExtractor"]
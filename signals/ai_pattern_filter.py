@@ -3,11 +3,9 @@ from __future__ import annotations
 """AI-based pattern filter using CNN."""
 
 import logging
-from io import BytesIO
 from pathlib import Path
 from typing import Iterable, Mapping
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from ai.cnn_pattern import infer
@@ -21,22 +19,7 @@ logger = logging.getLogger(__name__)
 
 
 def _candles_to_image(candles: Iterable[Mapping]) -> np.ndarray:
-    ohlc = []
-    for i, row in enumerate(candles):
-        base = row.get("mid") if isinstance(row.get("mid"), Mapping) else row
-        ohlc.append((i, base.get("o"), base.get("h"), base.get("l"), base.get("c")))
-    fig, ax = plt.subplots(figsize=(1.28, 1.28), dpi=100)
-    ax.axis("off")
-    for x, o, h, l, c in ohlc:
-        color = "green" if c >= o else "red"
-        ax.plot([x, x], [l, h], color=color, linewidth=1)
-        ax.add_patch(plt.Rectangle((x - 0.3, min(o, c)), 0.6, abs(o - c), color=color))
-    buf = BytesIO()
-    fig.canvas.print_png(buf)
-    plt.close(fig)
-    buf.seek(0)
-    img = plt.imread(buf)
-    return (img[:, :, :3] * 255).astype(np.uint8)
+    return infer.render_chart(candles)
 
 
 def _decide_side(prob: float) -> str:
@@ -45,10 +28,8 @@ def _decide_side(prob: float) -> str:
     return "long" if prob >= 0.5 else "short"
 
 
-def decide_entry_side(candles: Iterable[Mapping]) -> tuple[str | None, float]:
-    """Return side ``"long"`` or ``"short"`` based on CNN probability."""
-    img = _candles_to_image(candles)
-
+def _model_available() -> bool:
+    """Return ``False`` when weights are missing and fallback is disabled."""
     allow_fb = env_loader.get_env("ALLOW_FALLBACK_PATTERN", "no").lower() == "yes"
     model_path = getattr(infer, "_MODEL_PATH", None)
     if model_path and not Path(model_path).exists():
@@ -58,7 +39,16 @@ def decide_entry_side(candles: Iterable[Mapping]) -> tuple[str | None, float]:
             logger.warning(msg)
         else:
             logger.error(msg)
-            return None, 0.0
+            return False
+    return True
+
+
+def decide_entry_side(candles: Iterable[Mapping]) -> tuple[str | None, float]:
+    """Return side ``"long"`` or ``"short"`` based on CNN probability."""
+    img = _candles_to_image(candles)
+
+    if not _model_available():
+        return None, 0.0
 
     res = infer.predict(img)
     prob = res.get("pattern", 0.0)
@@ -66,6 +56,28 @@ def decide_entry_side(candles: Iterable[Mapping]) -> tuple[str | None, float]:
     return side, prob
 
 
+def decide_entry_sides(
+    windows: Mapping[str, Iterable[Mapping]],
+) -> dict[str, tuple[str | None, float]]:
+    """Batch version of :func:`decide_entry_side` for several windows.
+
+    ``windows`` maps a label (e.g. timeframe) to its candles; all windows
+    are scored with one :func:`infer.predict_batch` call and get the same
+    probabilities :func:`decide_entry_side` would return.
+    """
+    if not windows:
+        return {}
+    if not _model_available():
+        return {key: (None, 0.0) for key in windows}
+    keys = list(windows)
+    results = infer.predict_batch([windows[k] for k in keys])
+    out = {}
+    for key, res in zip(keys, results):
+        prob = res.get("pattern", 0.0)
+        out[key] = (_decide_side(prob), prob)
+    return out
+
+
 def pass_pattern_filter(candles: Iterable[Mapping]) -> tuple[bool, float]:
     """Return ``(True, prob)`` when CNN probability exceeds ``PROB_THRESHOLD``."""
     side, prob = decide_entry_side(candles)
@@ -83,4 +95,4 @@ def pass_pattern_filter(candles: Iterable[Mapping]) -> tuple[bool, float]:
     return True, prob
 
 
-__all__ = ["decide_entry_side", "pass_pattern_filter"]
+__all__ = ["decide_entry_side", "decide_entry_sides", "pass_pattern_filter"]
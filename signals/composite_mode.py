@@ -121,6 +121,14 @@ _LAST_SWITCH: int = 0
 _RANGE_ADX_COUNTER: int = 0
 
 
+def reset_mode_state() -> None:
+    """Forget the hysteresis state kept between ``decide_trade_mode_detail`` calls."""
+    global _LAST_MODE, _LAST_SWITCH, _RANGE_ADX_COUNTER
+    _LAST_MODE = None
+    _LAST_SWITCH = 0
+    _RANGE_ADX_COUNTER = 0
+
+
 def _in_window(now: float, start: float, end: float) -> bool:
     """Return True if ``now`` hour is within start-end range (JST)."""
     if start <= end:
@@ -179,9 +187,15 @@ def _quantile(data: Iterable, q: float) -> float | None:
 
 
 def decide_trade_mode_detail(
-    indicators: dict, candles: Sequence[dict] | None = None
+    indicators: dict,
+    candles: Sequence[dict] | None = None,
+    *,
+    now: datetime.datetime | None = None,
 ) -> tuple[str, float, list[str]]:
-    """Return mode, score and reasons for the given indicators."""
+    """Return mode, score and reasons for the given indicators.
+
+    ``now`` overrides the wall clock for the session bonus (backtesting).
+    """
 
     m5 = indicators
     vols = m5.get("volume")
@@ -285,7 +299,8 @@ def decide_trade_mode_detail(
     )
 
     bonus = 0
-    now_jst = datetime.datetime.utcnow().timestamp() + 9 * 3600
+    ts = now.timestamp() if now is not None else datetime.datetime.utcnow().timestamp()
+    now_jst = ts + 9 * 3600
     hour = (now_jst % 86400) / 3600
     if _in_window(hour, MODE_BONUS_START_JST, MODE_BONUS_END_JST):
         bonus += 1
@@ -388,6 +403,7 @@ __all__ = [
     "decide_trade_mode",
     "map_llm",
     "decide_trade_mode_detail",
+    "reset_mode_state",
     "decide_trade_mode_matrix",
     "calculate_scores",
     "MODE_ATR_PIPS_MIN",
@@ -4,8 +4,8 @@ from __future__ import annotations
 
 from typing import Any
 
+from backend.config import runtime_config
 from backend.indicators.ema import get_ema_gradient
-from backend.utils import env_loader
 
 
 def exit_if_momentum_loss(indicators: dict[str, Any]) -> bool:
@@ -16,7 +16,7 @@ def exit_if_momentum_loss(indicators: dict[str, Any]) -> bool:
     if ema_fast is None or rsi_series is None or macd_hist is None:
         return False
 
-    pip_size = float(env_loader.get_env("PIP_SIZE", "0.01"))
+    pip_size = runtime_config.current().pip_size
     try:
         ema_dir = get_ema_gradient(ema_fast, pip_size=pip_size)
     except Exception:
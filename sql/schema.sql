@@ -87,6 +87,39 @@ CREATE TABLE IF NOT EXISTS trade_labels (
     label TEXT NOT NULL,
     timestamp TEXT NOT NULL
 );
+CREATE TABLE IF NOT EXISTS prompt_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    decision_type TEXT NOT NULL,
+    instrument TEXT,
+    prompt TEXT NOT NULL,
+    response TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS exit_adjust_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    action TEXT,
+    tp REAL,
+    sl REAL
+);
+
+-- Secondary indexes (backend/logs/migrations.py と同じ定義)
+CREATE INDEX IF NOT EXISTS idx_oanda_trades_instrument_open ON oanda_trades(instrument, open_time);
+CREATE INDEX IF NOT EXISTS idx_trades_unreconciled ON trades(trade_id) WHERE exit_time IS NULL;
+CREATE INDEX IF NOT EXISTS idx_oanda_trades_account_close ON oanda_trades(account_id, close_time, realized_pl);
+CREATE INDEX IF NOT EXISTS idx_trades_entry_closed ON trades(entry_time, exit_time, profit_loss) WHERE exit_time IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_trade_labels_label ON trade_labels(label, trade_id);
+CREATE INDEX IF NOT EXISTS idx_entry_skips_reason ON entry_skips(reason);
+CREATE INDEX IF NOT EXISTS idx_exit_adjust_calls_trade ON exit_adjust_calls(trade_id);
+CREATE INDEX IF NOT EXISTS idx_param_changes_time ON param_changes(timestamp, param_name, new_value);
+CREATE INDEX IF NOT EXISTS idx_ai_decisions_time ON ai_decisions(timestamp, decision_type, instrument);
+CREATE INDEX IF NOT EXISTS idx_prompt_logs_time ON prompt_logs(timestamp);
+PRAGMA user_version = 3;
 
 -- Tick data and archive tables
 CREATE TABLE IF NOT EXISTS ticks (
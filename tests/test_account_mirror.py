@@ -0,0 +1,284 @@
+import importlib
+import sys
+
+import pytest
+
+
+def _account():
+    return {
+        "lastTransactionID": "100",
+        "account": {
+            "balance": "1000.0",
+            "marginUsed": "10.0",
+            "positions": [
+                {
+                    "instrument": "USD_JPY",
+                    "unrealizedPL": "1.5",
+                    "long": {"units": "1000", "tradeIDs": ["11"]},
+                    "short": {"units": "0"},
+                },
+                {"instrument": "EUR_USD", "long": {"units": "0"}, "short": {"units": "0"}},
+            ],
+            "trades": [
+                {
+                    "id": "11",
+                    "instrument": "USD_JPY",
+                    "openTime": "2024-01-01T00:00:00Z",
+                    "currentUnits": "1000",
+                    "unrealizedPL": "1.5",
+                    "realizedPL": "0",
+                    "takeProfitOrderID": "12",
+                    "clientExtensions": {"comment": '{"tp": 10, "sl": 5}'},
+                }
+            ],
+            "orders": [
+                {
+                    "id": "12",
+                    "type": "TAKE_PROFIT",
+                    "tradeID": "11",
+                    "state": "PENDING",
+                    "clientExtensions": {"comment": "tp_comment"},
+                }
+            ],
+            "lastTransactionID": "100",
+        },
+    }
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+        self.changes = []
+        self.fail = False
+
+    def __call__(self, path, params):
+        self.calls.append((path, params))
+        if self.fail:
+            raise RuntimeError("boom")
+        if path == "":
+            return _account()
+        return self.changes.pop(0)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def am(monkeypatch):
+    monkeypatch.delitem(sys.modules, "backend.orders.account_mirror", raising=False)
+    return importlib.import_module("backend.orders.account_mirror")
+
+
+def _mirror(am):
+    api, clock = FakeApi(), Clock()
+    return am.AccountMirror(api, poll_sec=5, resync_sec=0, clock=clock), api, clock
+
+
+def test_bootstrap_once_and_share_polls(am):
+    mirror, api, clock = _mirror(am)
+    positions = mirror.open_positions()
+    assert [p["instrument"] for p in positions] == ["USD_JPY"]
+    assert mirror.summary_value("balance") == 1000.0
+    assert mirror.summary_value("marginUsed") == 10.0
+    trades = mirror.open_trades("USD_JPY")
+    assert trades[0]["takeProfitOrder"]["clientExtensions"]["comment"] == "tp_comment"
+    assert mirror.pending_orders("USD_JPY") == []
+    # 間隔内の参照は 1 回の取得を共有する
+    assert api.calls == [("", None)]
+    # 呼び出し側が変更しても内部状態は変わらない
+    positions[0]["instrument"] = "X"
+    assert mirror.open_positions()[0]["instrument"] == "USD_JPY"
+
+
+def test_applies_changes_since_last_transaction(am):
+    mirror, api, clock = _mirror(am)
+    mirror.refresh()
+    api.changes.append(
+        {
+            "lastTransactionID": "105",
+            "changes": {
+                "tradesClosed": [{"id": "11"}],
+                "tradesOpened": [
+                    {"id": "20", "instrument": "EUR_USD", "openTime": "t", "currentUnits": "-500"}
+                ],
+                "ordersFilled": [{"id": "12"}],
+                "ordersCreated": [
+                    {"id": "21", "type": "LIMIT", "instrument": "EUR_USD", "state": "PENDING"}
+                ],
+                "positions": [
+                    {"instrument": "USD_JPY", "long": {"units": "0"}, "short": {"units": "0"}},
+                    {"instrument": "EUR_USD", "long": {"units": "0"}, "short": {"units": "-500"}},
+                ],
+                "transactions": [{"id": "104", "type": "ORDER_FILL", "accountBalance": "1012.5"}],
+            },
+            "state": {
+                "marginUsed": "4.0",
+                "positions": [{"instrument": "EUR_USD", "netUnrealizedPL": "-0.7"}],
+                "trades": [{"id": "20", "unrealizedPL": "-0.7"}],
+            },
+        }
+    )
+    clock.now = 5.0
+    positions = mirror.open_positions()
+    assert api.calls[-1] == ("/changes", {"sinceTransactionID": "100"})
+    assert mirror.last_transaction_id == "105"
+    assert [(p["instrument"], p["unrealizedPL"]) for p in positions] == [("EUR_USD", "-0.7")]
+    assert [t["id"] for t in mirror.open_trades()] == ["20"]
+    assert mirror.trade("20")["unrealizedPL"] == "-0.7"
+    assert [o["id"] for o in mirror.pending_orders("EUR_USD")] == ["21"]
+    assert mirror.summary_value("balance") == 1012.5
+    assert mirror.summary_value("marginUsed") == 4.0
+
+
+def test_replaced_tp_sl_orders_follow_the_trade(am):
+    mirror, api, clock = _mirror(am)
+    mirror.refresh()
+    # TP/SL の変更は新しい注文の作成と旧注文の取消として届く
+    api.changes.append(
+        {
+            "lastTransactionID": "103",
+            "changes": {
+                "ordersCreated": [
+                    {
+                        "id": "13",
+                        "type": "TAKE_PROFIT",
+                        "tradeID": "11",
+                        "state": "PENDING",
+                        "price": "151.0",
+                        "clientExtensions": {"comment": "tp_comment2"},
+                    },
+                    {
+                        "id": "14",
+                        "type": "STOP_LOSS",
+                        "tradeID": "11",
+                        "state": "PENDING",
+                        "price": "149.0",
+                    },
+                ],
+                "ordersCancelled": [{"id": "12"}],
+            },
+            "state": {},
+        }
+    )
+    clock.now = 5.0
+    trade = mirror.trade("11")
+    assert trade["takeProfitOrderID"] == "13"
+    assert trade["takeProfitOrder"]["clientExtensions"]["comment"] == "tp_comment2"
+    assert trade["stopLossOrder"]["price"] == "149.0"
+
+    api.changes.append(
+        {
+            "lastTransactionID": "104",
+            "changes": {"ordersCancelled": [{"id": "14"}]},
+            "state": {},
+        }
+    )
+    clock.now = 10.0
+    trade = mirror.trade("11")
+    assert "stopLossOrderID" not in trade and "stopLossOrder" not in trade
+    assert trade["takeProfitOrder"]["id"] == "13"
+
+
+def test_mark_dirty_and_failure_fallback(am):
+    mirror, api, clock = _mirror(am)
+    mirror.refresh()
+    api.changes.append({"lastTransactionID": "101", "changes": {}, "state": {}})
+    mirror.mark_dirty()
+    mirror.open_positions()
+    assert api.calls[-1][0] == "/changes"
+
+    api.fail = True
+    mirror.mark_dirty()
+    assert mirror.open_positions() is None
+    # 失敗後は間隔を空けて口座全体を取り直す
+    assert mirror.summary_value("balance") is None
+    api.fail = False
+    clock.now = 5.0
+    assert mirror.summary_value("balance") == 1000.0
+    assert api.calls[-1] == ("", None)
+    assert mirror.bootstraps == 2
+
+
+def test_position_manager_reads_from_mirror(am, monkeypatch):
+    monkeypatch.setenv("OANDA_API_KEY", "k")
+    monkeypatch.setenv("OANDA_ACCOUNT_ID", "a")
+    monkeypatch.delitem(sys.modules, "backend.orders.position_manager", raising=False)
+    pm = importlib.import_module("backend.orders.position_manager")
+    mirror, api, _ = _mirror(am)
+    monkeypatch.setattr(pm, "get_account_mirror", lambda: mirror)
+
+    def no_rest(*_a, **_k):
+        raise AssertionError("REST call while mirror is available")
+
+    monkeypatch.setattr(pm.requests, "get", no_rest)
+    monkeypatch.setattr(pm, "request_with_retries", no_rest)
+
+    details = pm.check_current_position("USD_JPY")
+    assert details["entry_time"] == "2024-01-01T00:00:00Z"
+    assert details["pl_corrected"] == 1.5
+    assert details["tp_pips"] == 10.0 and details["sl_pips"] == 5.0
+    assert details["tp_comment"] == "tp_comment"
+    assert pm.check_current_position("EUR_USD") is None
+    assert pm.get_margin_used() == 10.0
+    assert pm.get_account_balance() == 1000.0
+    assert api.calls == [("", None)]
+
+
+def test_slow_request_runs_outside_the_lock(am):
+    import threading
+
+    mirror, api, clock = _mirror(am)
+    mirror.refresh()
+    started, release = threading.Event(), threading.Event()
+
+    def slow(path, params):
+        started.set()
+        release.wait(5)
+        return {"lastTransactionID": "101", "changes": {}, "state": {"marginUsed": "3.0"}}
+
+    mirror._fetch = slow
+    clock.now = 5.0
+    poller = threading.Thread(target=mirror.refresh)
+    poller.start()
+    assert started.wait(5)
+    # 取得中も他スレッドは待たされず、追加のリクエストも出さず現在の状態を読める
+    reader = threading.Thread(target=lambda: mirror.summary_value("marginUsed"))
+    reader.start()
+    reader.join(1)
+    assert not reader.is_alive()
+    assert mirror.summary_value("marginUsed") == 10.0
+    release.set()
+    poller.join(5)
+    assert mirror.summary_value("marginUsed") == 3.0
+    assert mirror.polls == 1
+
+
+def test_first_load_is_shared_by_concurrent_readers(am):
+    import threading
+
+    mirror, api, clock = _mirror(am)
+    release = threading.Event()
+
+    def slow(path, params):
+        release.wait(5)
+        return api(path, params)
+
+    mirror._fetch = slow
+    results = []
+    readers = [
+        threading.Thread(target=lambda: results.append(mirror.summary_value("balance")))
+        for _ in range(4)
+    ]
+    for t in readers:
+        t.start()
+    release.set()
+    for t in readers:
+        t.join(5)
+    # 起動直後は 1 スレッドだけが取得し、残りはその完了を待つ
+    assert results == [1000.0] * 4
+    assert api.calls == [("", None)]
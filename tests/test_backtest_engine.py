@@ -0,0 +1,310 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backtest import (
+    BacktestConfig,
+    BacktestEngine,
+    RecordedLLM,
+    SimulatedOrderManager,
+    load_candles,
+)
+from backend.indicators.calculate_indicators import compute_indicator_series
+from backend.market_data.candle_frame import CandleFrame
+
+
+def _frame(close, spread=0.02):
+    close = np.asarray(close, dtype="float64")
+    n = len(close)
+    o = np.r_[close[0], close[:-1]]
+    times = pd.date_range("2024-01-02", periods=n, freq="5min", tz="UTC")
+    return CandleFrame(
+        np.array([t.strftime("%Y-%m-%dT%H:%M:%S.000000000Z") for t in times], dtype=object),
+        o,
+        np.maximum(o, close) + spread / 2,
+        np.minimum(o, close) - spread / 2,
+        close,
+        np.full(n, 100.0),
+        np.ones(n, dtype=bool),
+    )
+
+
+class _AlwaysLong:
+    def __init__(self):
+        self.entry_calls = []
+
+    def entry_plan(self, indicators, candles, mode, time):
+        self.entry_calls.append(time)
+        return {"entry": {"side": "long"}, "risk": {"tp_pips": 30, "sl_pips": 10}}
+
+    def exit_decision(self, trade, indicators, time):
+        return {"action": "HOLD"}
+
+
+class TestSimulatedOrderManager(unittest.TestCase):
+    def setUp(self):
+        os.environ["MIN_RRR_AFTER_COST"] = "0"
+        self.om = SimulatedOrderManager(pip_size=0.01, spread_pips=0.0, slippage_pips=0.0)
+
+    def tearDown(self):
+        os.environ.pop("MIN_RRR_AFTER_COST", None)
+
+    def _enter(self, side="long", tp=10, sl=10):
+        return self.om.enter_trade(
+            0.1,
+            self.om.market_data("USD_JPY", 150.0),
+            {"instrument": "USD_JPY", "tp_pips": tp, "sl_pips": sl},
+            side=side,
+            time="t0",
+        )
+
+    def test_stop_loss_wins_when_both_levels_hit(self):
+        trade = self._enter()
+        self.om.on_bar("t1", 150.0, 150.2, 149.8)
+        self.assertEqual(trade.exit_reason, "sl")
+        self.assertAlmostEqual(trade.exit_price, 149.9)
+
+    def test_gap_fills_at_open(self):
+        trade = self._enter(side="short")
+        self.om.on_bar("t1", 150.3, 150.35, 150.25)
+        self.assertEqual(trade.exit_reason, "sl")
+        self.assertAlmostEqual(trade.exit_price, 150.3)
+        self.assertLess(trade.profit(), 0)
+
+    def test_rrr_after_cost_blocks_entry(self):
+        os.environ["MIN_RRR_AFTER_COST"] = "1.2"
+        os.environ["MIN_RRR"] = "0"
+        try:
+            self.assertIsNone(self._enter(tp=5, sl=10))
+        finally:
+            os.environ.pop("MIN_RRR", None)
+        self.assertFalse(self.om.open_trades)
+
+
+class TestBacktestEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.close = 150 + np.cumsum(rng.normal(0, 0.02, 400))
+        self.candles = _frame(self.close)
+
+    def test_indicator_windows_match_prefix_calculation(self):
+        engine = BacktestEngine(self.candles)
+        engine._precompute()
+        i = 250
+        ind = engine.indicators_at(i)
+        prefix = self.candles[: i + 1]
+        ref = compute_indicator_series(
+            prefix.c.tolist(), prefix.h.tolist(), prefix.l.tolist(), n_wave=False
+        )
+        for key in ("rsi", "ema_fast", "ema_slow", "atr", "adx", "bb_upper", "macd_hist"):
+            with self.subTest(key=key):
+                self.assertAlmostEqual(ind[key].iloc[-1], float(ref[key].iloc[-1]), places=9)
+                self.assertAlmostEqual(ind[key].iloc[-2], float(ref[key].iloc[-2]), places=9)
+
+    def test_orders_fill_at_next_bar_open(self):
+        os.environ["MIN_RRR_AFTER_COST"] = "0"
+        llm = _AlwaysLong()
+        try:
+            cfg = BacktestConfig(
+                use_entry_filter=False,
+                use_exit_filter=False,
+                spread_pips=0.0,
+                slippage_pips=0.0,
+                warmup=60,
+            )
+            result = BacktestEngine(self.candles, llm=llm, config=cfg).run()
+        finally:
+            os.environ.pop("MIN_RRR_AFTER_COST", None)
+        self.assertTrue(result.trades)
+        first = result.trades[0]
+        idx = list(self.candles.time).index(first["entry_time"])
+        self.assertEqual(idx, 61)
+        self.assertAlmostEqual(first["entry_price"], self.candles.o[idx])
+        self.assertEqual(len(result.equity), len(self.candles))
+        self.assertAlmostEqual(result.equity[-1] - cfg.initial_balance, result.summary["total_pl"])
+
+    def test_tp_sl_matches_live_process_entry(self):
+        env = {
+            "OANDA_API_KEY": "x",
+            "OANDA_ACCOUNT_ID": "x",
+            "MIN_RRR_AFTER_COST": "0",
+            # スキャル経路を外して通常の TP/SL 解決を通す
+            "SCALP_SUPPRESS_ADX_MAX": "0.001",
+        }
+        with mock.patch.dict(os.environ, env):
+            import backend.strategy.entry_logic as el
+            from backend.config import runtime_config
+
+            engine = BacktestEngine(self.candles, config=BacktestConfig(instrument="USD_JPY"))
+            engine._precompute()
+            i = 250
+            ind = engine.indicators_at(i)
+            window = self.candles[i + 1 - engine.config.window : i + 1]
+            price = float(self.candles.c[i])
+            market_data = {
+                "prices": [{
+                    "instrument": "USD_JPY",
+                    "bids": [{"price": str(price)}],
+                    "asks": [{"price": str(price)}],
+                }]
+            }
+            plans = (
+                {"entry": {"side": "long", "mode": "market"}, "risk": {}},
+                {"entry": {"side": "short", "mode": "market"}, "risk": {"tp_pips": 12, "sl_pips": 2}},
+            )
+            for plan in plans:
+                sent = {}
+
+                class _OM:
+                    def enter_trade(self, side, lot_size, market_data, strategy_params, **_k):
+                        sent.update(strategy_params)
+                        return {"order_id": "1"}
+
+                    def get_open_orders(self, *_a):
+                        return []
+
+                side = plan["entry"]["side"]
+                with self.subTest(side=side), mock.patch.object(
+                    el, "order_manager", _OM()
+                ), mock.patch.object(el, "log_trade", lambda *a, **k: None), mock.patch(
+                    "backend.strategy.openai_analysis.get_trade_plan", lambda *a, **k: plan
+                ), runtime_config.pinned(pip_size=engine.pip_size):
+                    self.assertTrue(
+                        el.process_entry(ind, list(window), market_data, instrument="USD_JPY")
+                    )
+                    tp, sl = engine._resolve_tp_sl(plan, "trend_follow", ind, window, side, price, None)
+                    self.assertAlmostEqual(sent["tp_pips"], tp)
+                    self.assertAlmostEqual(sent["sl_pips"], sl)
+
+    def test_risk_pct_sizes_each_fill_from_sl(self):
+        env = {"MIN_RRR_AFTER_COST": "0", "MIN_RRR": "0", "MAX_TRADE_LOT": "1000"}
+        with mock.patch.dict(os.environ, env):
+            cfg = BacktestConfig(
+                use_entry_filter=False,
+                use_exit_filter=False,
+                spread_pips=0.0,
+                slippage_pips=0.0,
+                risk_pct=0.001,
+            )
+            engine = BacktestEngine(self.candles, llm=_AlwaysLong(), config=cfg)
+            self.assertAlmostEqual(engine._lot_for(10, 10000.0), 0.1)
+            self.assertEqual(engine._lot_for(None, 10000.0), engine.lot_size)
+            result = engine.run()
+        first = result.trades[0]
+        lot = cfg.initial_balance * cfg.risk_pct / (first["sl_pips"] * 0.01 * 1000)
+        self.assertEqual(first["units"], int(lot * 1000))
+
+    def test_run_is_deterministic(self):
+        cfg = BacktestConfig(use_entry_filter=False)
+        a = BacktestEngine(self.candles, config=cfg).run()
+        b = BacktestEngine(self.candles, config=cfg).run()
+        self.assertEqual(a.trades, b.trades)
+        self.assertEqual(a.summary, b.summary)
+
+
+class TestRecordedLLM(unittest.TestCase):
+    def test_replays_latest_decision_within_age(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "trades.db")
+            conn = sqlite3.connect(db)
+            conn.execute(
+                "CREATE TABLE ai_decisions (decision_id INTEGER PRIMARY KEY, timestamp TEXT,"
+                " decision_type TEXT, instrument TEXT, ai_response TEXT)"
+            )
+            rows = [
+                ("2024-01-02T00:00:00+00:00", "ENTRY", "USD_JPY", json.dumps({"entry": {"side": "short"}})),
+                ("2024-01-02T00:04:00+00:00", "EXIT", "USD_JPY", json.dumps({"action": "EXIT"})),
+                ("2024-01-02T00:00:00+00:00", "ENTRY", "EUR_USD", json.dumps({"entry": {"side": "long"}})),
+            ]
+            conn.executemany(
+                "INSERT INTO ai_decisions (timestamp, decision_type, instrument, ai_response)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            conn.close()
+            llm = RecordedLLM.from_sqlite(db, instrument="USD_JPY", max_age_sec=120)
+
+        plan = llm.entry_plan({}, [], "trend_follow", "2024-01-02T00:01:00.000000000Z")
+        self.assertEqual(plan["entry"]["side"], "short")
+        stale = llm.entry_plan({}, [], "trend_follow", "2024-01-02T00:05:00Z")
+        self.assertEqual(stale["entry"]["side"], "no")
+        self.assertEqual(llm.exit_decision(None, {}, "2024-01-02T00:03:59Z")["action"], "HOLD")
+        self.assertEqual(llm.exit_decision(None, {}, "2024-01-02T00:04:30Z")["action"], "EXIT")
+
+
+class TestLoadCandles(unittest.TestCase):
+    def test_csv_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "c.csv")
+            pd.DataFrame(
+                {
+                    "time": ["2024-01-02T00:00:00Z", "2024-01-02T00:05:00Z"],
+                    "open": [1.0, 1.1],
+                    "high": [1.2, 1.3],
+                    "low": [0.9, 1.0],
+                    "close": [1.1, 1.2],
+                }
+            ).to_csv(path, index=False)
+            frame = load_candles(path)
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame.c.tolist(), [1.1, 1.2])
+        self.assertEqual(frame[1]["mid"]["h"], "1.3")
+
+
+class TestBacktestApi(unittest.TestCase):
+    def setUp(self):
+        pytest.importorskip("fastapi")
+        from fastapi import HTTPException
+
+        import backend.api.main as api
+
+        self.api = api
+        self.http_error = HTTPException
+
+    def test_unknown_strategy_is_rejected(self):
+        with self.assertRaises(self.http_error) as ctx:
+            self.api.backtest("2024-01-01", "2024-01-02", strategy="ema_cross")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_risk_pct_reaches_config(self):
+        seen = {}
+
+        def fake_run(candles, *, llm=None, config=None):
+            seen["config"] = config
+            return mock.Mock(equity_curve=lambda: [], summary={})
+
+        rng = np.random.default_rng(2)
+        frame = _frame(150 + np.cumsum(rng.normal(0, 0.02, 10)))
+        with mock.patch.dict(os.environ, {"BACKTEST_CANDLES_PATH": __file__}), mock.patch(
+            "backend.backtest.load_candles", lambda _p: frame
+        ), mock.patch("backend.backtest.run_backtest", fake_run):
+            self.api.backtest("2024-01-01", "2024-01-02", capital=5000.0, risk_pct=2.0)
+        self.assertEqual(seen["config"].initial_balance, 5000.0)
+        self.assertAlmostEqual(seen["config"].risk_pct, 0.02)
+        with self.assertRaises(self.http_error) as ctx:
+            self.api.backtest("2024-01-01", "2024-01-02", risk_pct=0)
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+class TestSimpleBacktest(unittest.TestCase):
+    def test_position_based_pnl(self):
+        from analysis.backtest_utils import run_simple_backtest
+
+        res = run_simple_backtest([100, 101, 103, 102], [1, 1, -1, 0])
+        # 100→101 long +1, 101→103 long +2, 103→102 short +1
+        self.assertEqual(res["equity_curve"], [0.0, 1.0, 3.0, 4.0])
+        self.assertEqual(res["final_equity"], 4.0)
+        self.assertEqual(res["trades"], 2)
+        self.assertEqual(res["max_drawdown"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+optuna = pytest.importorskip("optuna")
+if not hasattr(optuna, "create_study"):
+    # リポジトリ直下の optuna/ だけが見えている
+    pytest.skip("optuna is not installed", allow_module_level=True)
+joblib = pytest.importorskip("joblib")
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "optuna" / "bayes_filter_opt.py"
+
+
+@pytest.fixture
+def bfo(monkeypatch):
+    # リポジトリ内の optuna/ ディレクトリは本物の optuna と名前が重なるのでパス指定で読む
+    spec = importlib.util.spec_from_file_location("bayes_filter_opt", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "bayes_filter_opt", mod)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def dataset(bfo, tmp_path):
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+
+    rng = random.Random(0)
+    price, rows = 150.0, []
+    for _ in range(400):
+        close = price + rng.gauss(0, 0.05)
+        rows.append((price, max(price, close) + 0.01, min(price, close) - 0.01, close, rng.randint(20, 150)))
+        price = close
+    df = pd.DataFrame(rows, columns=["open", "high", "low", "close", "volume"])
+    data = tmp_path / "rates.csv"
+    df.to_csv(data, index=False)
+    X = pd.DataFrame({"feat1": df["close"] - df["open"], "feat2": df["high"] - df["low"]})
+    y = (df["close"].shift(-1) > df["close"]).astype(int)
+    model = tmp_path / "model.pkl"
+    joblib.dump(LogisticRegression().fit(X, y), model)
+    return bfo.load_dataset(data, model, n_folds=4)
+
+
+def test_study_resumes_from_sqlite(bfo, dataset, tmp_path):
+    storage = f"sqlite:///{tmp_path / 'study.db'}"
+    bfo.optimize(dataset, n_trials=8, n_jobs=2, storage=storage, seed=1)
+    study = bfo.optimize(dataset, n_trials=4, storage=storage, seed=1)
+    assert len(study.trials) == 12
+    assert study.best_value == bfo.evaluate(dataset, study.best_params)
+
+
+def test_changed_inputs_start_a_new_study(bfo, dataset, tmp_path):
+    storage = f"sqlite:///{tmp_path / 'study.db'}"
+    bfo.optimize(dataset, n_trials=4, storage=storage, seed=1)
+    # 同じパスでもデータが更新されたら別のスタディになる
+    data = tmp_path / "rates.csv"
+    data.write_text(data.read_text())
+    os.utime(data, ns=(0, 0))
+    changed = bfo.load_dataset(data, tmp_path / "model.pkl", n_folds=4)
+    assert changed.key != dataset.key
+    study = bfo.optimize(changed, n_trials=2, storage=storage, seed=1)
+    assert len(study.trials) == 2
+    assert len(optuna.get_all_study_summaries(storage)) == 2
+
+
+def test_weak_trial_is_pruned(bfo, dataset):
+    class Trial:
+        def __init__(self):
+            self.steps = []
+
+        def report(self, value, step):
+            self.steps.append(step)
+
+        def should_prune(self):
+            return len(self.steps) == 2
+
+    trial = Trial()
+    params = {"MIN_VOL_MA": 60, "VOL_MA_PERIOD": 5, "CNN_PROB_THRESHOLD": 0.5}
+    with pytest.raises(optuna.TrialPruned):
+        bfo.evaluate(dataset, params, trial)
+    assert trial.steps == [0, 1]
@@ -0,0 +1,119 @@
+import sys
+
+import numpy as np
+import pytest
+
+from ai.cnn_pattern import infer
+
+
+@pytest.fixture(autouse=True)
+def _real_numpy(monkeypatch):
+    # 他のテストが numpy をスタブ化していると matplotlib の描画が失敗する
+    if getattr(sys.modules.get("numpy"), "__version__", None) is None:
+        monkeypatch.setitem(sys.modules, "numpy", np)
+
+
+def _window(n, step):
+    rows = []
+    price = 1.0
+    for _ in range(n):
+        o, c = price, price + step
+        rows.append({"o": o, "h": max(o, c) + 0.002, "l": min(o, c) - 0.002, "c": c})
+        price = c
+    return rows
+
+
+def test_render_windows_into_preallocated_buffer():
+    out = np.zeros((3, 1, 128, 128), dtype=np.float32)
+    res = infer.render_windows([_window(30, 0.01), _window(10, -0.01), []], out=out)
+    assert res is out
+    assert out.dtype == np.float32
+    # 空ウィンドウは白のまま
+    assert out[2].min() == 1.0
+    up, down = out[0, 0], out[1, 0]
+    assert np.isclose(up.min(), 75 / 255) and (down.min() > up.min())
+    # 上昇ウィンドウは左下から右上へ描かれる
+    rows, cols = np.nonzero(up < 1.0)
+    assert np.corrcoef(rows, cols)[0, 1] < -0.9
+    # 描画は 128px の軸領域内に収まる
+    assert rows.min() > 10 and rows.max() < 118 and cols.min() > 10 and cols.max() < 120
+
+
+def test_render_accepts_oanda_candles_and_frames():
+    from backend.market_data.candle_frame import CandleFrame
+
+    rows = _window(20, 0.01)
+    oanda = [{"mid": {k: str(v) for k, v in r.items()}} for r in rows]
+    a = infer.render_windows([rows])
+    b = infer.render_windows([oanda])
+    c = infer.render_windows([CandleFrame.from_candles(oanda)])
+    assert np.array_equal(a, b) and np.array_equal(a, c)
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def get_inputs(self):
+        return [type("I", (), {"name": "image"})()]
+
+    def run(self, _outputs, feeds):
+        batch = feeds["image"]
+        self.calls.append(batch.shape)
+        assert batch.dtype == np.float32
+        return [batch.mean(axis=(1, 2, 3))]
+
+
+def test_predict_batch_single_forward_pass(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setenv("CNN_BACKEND", "onnx")
+    monkeypatch.setattr(infer, "_session", session)
+    windows = [_window(30, 0.01), _window(60, -0.005), _window(5, 0.0)]
+    res = infer.predict_batch(windows)
+    assert session.calls == [(3, 1, 128, 128)]
+    expected = infer.render_windows(windows).mean(axis=(1, 2, 3))
+    assert np.allclose([r["pattern"] for r in res], expected)
+    assert infer.predict_batch([]) == []
+
+
+def _pyplot_chart(rows):
+    # 学習画像を作った pyplot + PNG 経由の描画
+    from io import BytesIO
+
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(1.28, 1.28), dpi=100)
+    ax.axis("off")
+    for x, r in enumerate(rows):
+        color = "green" if r["c"] >= r["o"] else "red"
+        ax.plot([x, x], [r["l"], r["h"]], color=color, linewidth=1)
+        ax.add_patch(plt.Rectangle((x - 0.3, min(r["o"], r["c"])), 0.6, abs(r["o"] - r["c"]), color=color))
+    buf = BytesIO()
+    fig.canvas.print_png(buf)
+    plt.close(fig)
+    buf.seek(0)
+    return (plt.imread(buf)[:, :, :3] * 255).astype(np.uint8)
+
+
+def test_batch_input_matches_single_predict_input():
+    windows = [_window(30, 0.01), _window(12, -0.02), _window(45, 0.0)]
+    windows[2][10]["h"] += 0.05
+    batch = infer.render_windows(windows)
+    for i, window in enumerate(windows):
+        # predict() に渡していた画像と同じ入力になる
+        single = infer._to_gray(_pyplot_chart(window))
+        assert np.abs(batch[i, 0] - single).max() <= 1 / 255
+
+
+def test_numpy_gray_equals_predict_preprocessing():
+    windows = [_window(30, 0.01), _window(12, -0.02), _window(45, 0.0), []]
+    batch = infer.render_windows(windows)
+    for i, window in enumerate(windows):
+        # predict() の前処理 (_preprocess は _to_gray に次元を足すだけ)
+        ref = infer._to_gray(infer.render_chart(window))
+        assert np.array_equal(batch[i, 0], ref)
+    # size 四方でないキャンバスは PIL のリサイズ経路に落ちる
+    rgba = infer._draw(windows[0], 96)
+    out = np.empty((64, 64), dtype=np.float32)
+    infer._gray_into(rgba, out, 64)
+    assert np.array_equal(out, infer._to_gray(infer.render_chart(windows[0], size=96), 64))
@@ -45,7 +45,7 @@ def test_micro_scalp_on_ai_no(monkeypatch):
     # 依存関数のスタブ
     monkeypatch.setattr(el, "calc_lot_size", lambda *a, **k: 1.0)
     monkeypatch.setattr(el, "_calc_scalp_tp_sl", lambda *a, **k: (None, None))
-    monkeypatch.setattr(el, "_calc_reversion_tp_sl", lambda *a, **k: (None, None))
+    monkeypatch.setattr("backend.risk_manager.calc_reversion_tp_sl", lambda *a, **k: (None, None))
     monkeypatch.setattr(el, "false_break_skip", lambda *_a, **_k: False)
 
     indicators = {
@@ -0,0 +1,15 @@
+import os
+
+os.environ.setdefault("OANDA_API_KEY", "x")
+os.environ.setdefault("OANDA_ACCOUNT_ID", "x")
+
+import backend.strategy.exit_logic as el
+
+
+def test_process_exit_uses_runner_instrument(monkeypatch):
+    seen = []
+    monkeypatch.setenv("DEFAULT_PAIR", "USD_JPY")
+    monkeypatch.setattr(el, "get_position_details", lambda pair: seen.append(pair))
+    assert el.process_exit({}, {}, instrument="EUR_USD") is False
+    el.process_exit({}, {})
+    assert seen == ["EUR_USD", "USD_JPY"]
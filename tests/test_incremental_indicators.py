@@ -0,0 +1,245 @@
+import importlib
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend.indicators.calculate_indicators as ci
+import backend.indicators.incremental as inc
+
+_RELOAD = [
+    "indicators.bollinger",
+    "backend.market_data.candle_fetcher",
+    "backend.indicators.rsi",
+    "backend.indicators.ema",
+    "backend.indicators.macd",
+    "backend.indicators.atr",
+    "backend.indicators.adx",
+    "backend.indicators.polarity",
+    "backend.indicators.pivot",
+    "backend.indicators.percentile_cache",
+    "backend.indicators.n_wave",
+    "backend.indicators.calculate_indicators",
+    "backend.indicators.incremental",
+]
+
+
+def _make_candles(n, *, seed=0, start=None, incomplete_last=True):
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    price = 150.0
+    candles = []
+    for i in range(n):
+        o = price
+        c = o + rng.uniform(-0.2, 0.2)
+        h = max(o, c) + rng.uniform(0, 0.1)
+        l = min(o, c) - rng.uniform(0, 0.1)
+        price = c
+        candles.append(
+            {
+                "time": (start + timedelta(minutes=5 * i)).isoformat(),
+                "mid": {"o": f"{o:.3f}", "h": f"{h:.3f}", "l": f"{l:.3f}", "c": f"{c:.3f}"},
+                "volume": rng.randint(10, 200),
+                "complete": True,
+            }
+        )
+    if incomplete_last and candles:
+        candles[-1]["complete"] = False
+    return candles
+
+
+def _move_last(candles, delta):
+    last = dict(candles[-1])
+    mid = dict(last["mid"])
+    c = float(mid["c"]) + delta
+    mid["c"] = f"{c:.3f}"
+    mid["h"] = f"{max(float(mid['h']), c):.3f}"
+    mid["l"] = f"{min(float(mid['l']), c):.3f}"
+    last["mid"] = mid
+    last["volume"] = last["volume"] + 5
+    return candles[:-1] + [last]
+
+
+@pytest.fixture(autouse=True)
+def _daily_history(monkeypatch):
+    # 他テストが pandas などをスタブ化している場合に備えて実モジュールを読み直す
+    for name in ("numpy", "pandas"):
+        if getattr(sys.modules.get(name), "__version__", None) is None:
+            sys.modules.pop(name, None)
+            importlib.import_module(name)
+    for name in _RELOAD:
+        if getattr(sys.modules.get(name), "__file__", None) is None:
+            sys.modules.pop(name, None)
+        importlib.reload(importlib.import_module(name))
+    global ci, inc
+    ci = sys.modules["backend.indicators.calculate_indicators"]
+    inc = sys.modules["backend.indicators.incremental"]
+    daily = _make_candles(90, seed=99, incomplete_last=False)
+    monkeypatch.setattr(ci, "fetch_candles", lambda *a, **k: daily)
+
+
+def _assert_equivalent(expected, result):
+    pd = sys.modules["pandas"]
+    assert list(expected) == list(result)
+    for key, exp in expected.items():
+        got = result[key]
+        if isinstance(exp, pd.Series):
+            assert isinstance(got, pd.Series), key
+            assert len(got) == len(exp), key
+            np.testing.assert_allclose(
+                got.to_numpy(dtype=float),
+                exp.to_numpy(dtype=float),
+                rtol=1e-9,
+                atol=1e-9,
+                equal_nan=True,
+                err_msg=key,
+            )
+        elif exp is None:
+            assert got is None, key
+        else:
+            assert got == pytest.approx(exp, rel=1e-9, abs=1e-9, nan_ok=True), key
+
+
+@pytest.mark.parametrize("n", [1, 5, 15, 30, 120])
+def test_first_update_matches_pandas(n):
+    candles = _make_candles(n)
+    engine = inc.IncrementalIndicatorEngine()
+    expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=True)
+    result = engine.update("USD_JPY", "M5", candles, allow_incomplete=True)
+    _assert_equivalent(expected, result)
+
+
+def test_incomplete_bar_updates_are_incremental():
+    candles = _make_candles(60)
+    engine = inc.IncrementalIndicatorEngine()
+    engine.update("USD_JPY", "M5", candles, allow_incomplete=True)
+    for step in range(10):
+        candles = _move_last(candles, 0.03 if step % 2 else -0.05)
+        result = engine.update("USD_JPY", "M5", candles, allow_incomplete=True)
+        expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=True)
+        _assert_equivalent(expected, result)
+    assert engine.full_recomputes == 1
+    assert engine.incremental_updates == 10
+
+
+def test_growing_window_appends_bars():
+    full = _make_candles(80)
+    engine = inc.IncrementalIndicatorEngine()
+    for n in range(10, 81, 7):
+        candles = [dict(c, complete=True) for c in full[: n - 1]] + [dict(full[n - 1], complete=False)]
+        result = engine.update("USD_JPY", "M1", candles, allow_incomplete=True)
+        expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=True)
+        _assert_equivalent(expected, result)
+    assert engine.full_recomputes == 1
+
+
+def test_sliding_window_matches_pandas():
+    full = _make_candles(120)
+    engine = inc.IncrementalIndicatorEngine()
+    for start in range(0, 40, 3):
+        candles = full[start : start + 80]
+        candles = [dict(c, complete=True) for c in candles[:-1]] + [dict(candles[-1], complete=False)]
+        result = engine.update("USD_JPY", "H1", candles, allow_incomplete=True)
+        expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=True)
+        _assert_equivalent(expected, result)
+
+
+def test_complete_only_mode_ignores_incomplete_bar():
+    candles = _make_candles(50)
+    engine = inc.IncrementalIndicatorEngine()
+    engine.update("USD_JPY", "M5", candles, allow_incomplete=False)
+    candles = _move_last(candles, 0.2)
+    result = engine.update("USD_JPY", "M5", candles, allow_incomplete=False)
+    expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=False)
+    _assert_equivalent(expected, result)
+    assert len(result["rsi"]) == 49
+
+
+def test_period_change_resets_state(monkeypatch):
+    candles = _make_candles(60)
+    engine = inc.IncrementalIndicatorEngine()
+    engine.update("USD_JPY", "M5", candles, allow_incomplete=True)
+    monkeypatch.setenv("RSI_PERIOD", "7")
+    monkeypatch.setenv("BOLLINGER_WINDOW", "10")
+    candles = _move_last(candles, 0.1)
+    result = engine.update("USD_JPY", "M5", candles, allow_incomplete=True)
+    expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=True)
+    _assert_equivalent(expected, result)
+    assert engine.full_recomputes == 2
+
+
+def test_state_is_keyed_by_pair_and_timeframe():
+    engine = inc.IncrementalIndicatorEngine()
+    a = _make_candles(40, seed=1)
+    b = _make_candles(40, seed=2)
+    engine.update("USD_JPY", "M5", a, allow_incomplete=True)
+    engine.update("EUR_USD", "M5", b, allow_incomplete=True)
+    result = engine.update("USD_JPY", "M5", a, allow_incomplete=True)
+    expected = ci.calculate_indicators(a, pair="USD_JPY", allow_incomplete=True)
+    _assert_equivalent(expected, result)
+    assert engine.full_recomputes == 2
+
+
+def test_calculate_indicators_multi_keeps_pairs_apart(monkeypatch):
+    # 2つのランナーが同じ時刻のローソク足を交互に渡しても価格が混ざらない
+    engine = inc.IncrementalIndicatorEngine()
+    monkeypatch.setattr(inc, "get_engine", lambda: engine)
+    usd = {"M5": _make_candles(60, seed=5)}
+    eur = {"M5": _make_candles(60, seed=6)}
+    for step in range(4):
+        for pair, data in (("USD_JPY", usd), ("EUR_USD", eur)):
+            data["M5"] = _move_last(data["M5"], 0.02 * (step + 1))
+            result = ci.calculate_indicators_multi(data, pair=pair, allow_incomplete=True)
+            expected = ci.calculate_indicators(data["M5"], pair=pair, allow_incomplete=True)
+            _assert_equivalent(expected, result["M5"])
+    assert set(engine._states) == {("USD_JPY", "M5"), ("EUR_USD", "M5")}
+
+
+def test_calculate_indicators_multi_uses_engine():
+    data = {"M1": _make_candles(20, seed=3), "M5": _make_candles(50, seed=4)}
+    legacy = ci.calculate_indicators_multi(data, pair="USD_JPY", allow_incomplete=True, incremental=False)
+    fast = ci.calculate_indicators_multi(data, pair="USD_JPY", allow_incomplete=True, incremental=True)
+    assert list(legacy) == list(fast)
+    for tf in data:
+        _assert_equivalent(legacy[tf], fast[tf])
+
+
+def test_daily_history_fetched_once_per_pair(monkeypatch):
+    daily = _make_candles(90, seed=7, incomplete_last=False)
+    calls = []
+
+    def fetch(*a, **k):
+        calls.append(a)
+        return daily
+
+    monkeypatch.setattr(ci, "fetch_candles", fetch)
+    sys.modules["backend.indicators.percentile_cache"].daily_percentiles.invalidate()
+    data = {"M1": _make_candles(20, seed=3), "M5": _make_candles(50, seed=4), "H1": _make_candles(60, seed=5)}
+    result = ci.calculate_indicators_multi(data, pair="GBP_JPY", allow_incomplete=True)
+    assert len(calls) == 1
+    assert all(result[tf]["atr_pct"] is not None for tf in data)
+
+    monkeypatch.setenv("DAILY_PERCENTILE_CACHE", "false")
+    uncached = ci.calculate_indicators(data["M5"], pair="GBP_JPY", allow_incomplete=True)
+    assert uncached["atr_pct"] == result["M5"]["atr_pct"]
+    assert uncached["bb_width_pct"] == result["M5"]["bb_width_pct"]
+
+
+def test_candle_frame_input_matches_dict_input():
+    from backend.market_data.candle_frame import CandleFrame
+
+    candles = _make_candles(70, seed=11)
+    frame = CandleFrame.from_candles(candles)
+    for allow in (True, False):
+        expected = ci.calculate_indicators(candles, pair="USD_JPY", allow_incomplete=allow)
+        _assert_equivalent(expected, ci.calculate_indicators(frame, pair="USD_JPY", allow_incomplete=allow))
+        engine = inc.IncrementalIndicatorEngine()
+        _assert_equivalent(expected, engine.update("USD_JPY", "M5", frame, allow_incomplete=allow))
+        moved = CandleFrame.from_candles(_move_last(candles, 0.05))
+        _assert_equivalent(
+            ci.calculate_indicators(moved.to_candles(), pair="USD_JPY", allow_incomplete=allow),
+            engine.update("USD_JPY", "M5", moved, allow_incomplete=allow),
+        )
@@ -1,3 +1,4 @@
+from collections import deque
 from types import SimpleNamespace
 
 import monitoring.metrics_publisher as mp
@@ -23,6 +24,7 @@ class DummyGauge:
 
 def setup_module(module):
     mp._gauges.clear()
+    mp._handles.clear()
     mp._producer = None
 
 
@@ -31,6 +33,7 @@ def test_publish(monkeypatch):
     monkeypatch.setattr(mp, "_get_producer", lambda: prod)
     monkeypatch.setattr(mp, "Gauge", DummyGauge)
     mp.publish("test", 2.0, {"k": "v"})
+    mp.flush()
     assert prod.sent
     topic, data = prod.sent[0]
     assert topic == mp.METRICS_TOPIC
@@ -44,4 +47,40 @@ def test_record_latency(monkeypatch):
     monkeypatch.setattr(mp, "_get_producer", lambda: prod)
     monkeypatch.setattr(mp, "Gauge", DummyGauge)
     mp.record_latency("lat", 0.0, 0.01)
+    mp.flush()
     assert prod.sent
+
+
+def test_handle_is_cached_and_buffer_drops_oldest(monkeypatch):
+    monkeypatch.setattr(mp, "Gauge", DummyGauge)
+    monkeypatch.setattr(mp, "_buffer", deque(maxlen=2))
+    handle = mp.metric("buf", {"mode": "scalp"})
+    assert mp.metric("buf", {"mode": "scalp"}) is handle
+    # フラッシャーを止めた状態で溢れさせる
+    with mp._send_lock:
+        for v in (1.0, 2.0, 3.0):
+            handle.set(v)
+        assert [v for _h, v, _ts in mp._buffer] == [2.0, 3.0]
+
+
+def test_producer_failure_backs_off(monkeypatch):
+    calls = []
+
+    class FailingProducer:
+        def __init__(self, **kwargs):
+            calls.append(kwargs)
+            raise RuntimeError("no broker")
+
+    monkeypatch.setattr(mp, "KafkaProducer", FailingProducer)
+    monkeypatch.setattr(mp, "_producer", None)
+    monkeypatch.setattr(mp, "_retry_at", 0.0)
+    monkeypatch.setattr(mp, "_retry_delay", mp.RETRY_MIN_SEC)
+    assert mp._get_producer() is None
+    assert mp._get_producer() is None
+    assert len(calls) == 1
+    assert mp.stats()["breaker_open"]
+    # 待機時間が過ぎたら再試行し、失敗するたびに間隔を倍にする
+    monkeypatch.setattr(mp, "_retry_at", 0.0)
+    assert mp._get_producer() is None
+    assert len(calls) == 2
+    assert mp._retry_delay == mp.RETRY_MIN_SEC * 4
@@ -0,0 +1,165 @@
+import importlib
+import threading
+import time
+
+import pytest
+
+from backend.scheduler.multi_runner import MultiPairScheduler, parse_pairs
+
+
+class FakeRunner:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, pair, interval, *, delay=0.0, backoff=0.0, fail=False):
+        self.pair = pair
+        self.delay = delay
+        self.backoff = backoff
+        self.fail = fail
+        self.calls = 0
+        self.scheduled = False
+        self.next_run_delay = 0.0
+        self._stop = False
+
+    def run_cycle(self):
+        with FakeRunner.lock:
+            FakeRunner.active += 1
+            FakeRunner.peak = max(FakeRunner.peak, FakeRunner.active)
+        try:
+            self.calls += 1
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("boom")
+            if self.backoff:
+                self.next_run_delay = self.backoff
+                return False
+            return True
+        finally:
+            with FakeRunner.lock:
+                FakeRunner.active -= 1
+
+    def stop(self):
+        self._stop = True
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    FakeRunner.active = 0
+    FakeRunner.peak = 0
+
+
+def _scheduler(pairs, workers, syncs, **runner_kw):
+    runners = {}
+
+    def factory(pair, interval):
+        runners[pair] = FakeRunner(pair, interval, **runner_kw.get(pair, {}))
+        return runners[pair]
+
+    sched = MultiPairScheduler(
+        pairs,
+        interval_seconds=0.0,
+        max_workers=workers,
+        runner_factory=factory,
+        sync_trades=lambda: syncs.append(1),
+    )
+    return sched, runners
+
+
+def test_parse_pairs():
+    assert parse_pairs(" usd_jpy, EUR_USD,USD_JPY,,") == ["USD_JPY", "EUR_USD"]
+    assert parse_pairs(None) == []
+
+
+def test_rounds_cover_every_pair_with_bounded_workers():
+    syncs = []
+    pairs = ["USD_JPY", "EUR_USD", "GBP_JPY", "AUD_USD", "EUR_JPY"]
+    sched, runners = _scheduler(pairs, 2, syncs, **{p: {"delay": 0.01} for p in pairs})
+    sched.run(max_rounds=3)
+    assert all(r.scheduled for r in runners.values())
+    assert all(r.calls >= 3 for r in runners.values())
+    assert FakeRunner.peak <= 2
+    assert len(syncs) == 3
+    assert sched.stats()["USD_JPY"]["cycles"] >= 3
+
+
+def test_backoff_does_not_block_other_pairs():
+    syncs = []
+    sched, runners = _scheduler(
+        ["USD_JPY", "EUR_USD"], 1, syncs, USD_JPY={"backoff": 60.0}
+    )
+    threading.Timer(0.2, sched.stop).start()
+    sched.run()
+    assert runners["USD_JPY"].calls == 1
+    assert runners["EUR_USD"].calls > 5
+    assert sched.stats()["USD_JPY"]["skipped"] == 1
+    assert len(syncs) > 5
+
+
+def test_errors_are_isolated():
+    syncs = []
+    sched, runners = _scheduler(["USD_JPY", "EUR_USD"], 2, syncs, USD_JPY={"fail": True})
+    sched.run(max_rounds=2)
+    stats = sched.stats()
+    assert stats["USD_JPY"]["errors"] >= 2
+    assert stats["EUR_USD"]["cycles"] >= 2
+
+
+def test_stopped_runner_stops_scheduler():
+    syncs = []
+    sched, runners = _scheduler(["USD_JPY", "EUR_USD"], 2, syncs)
+    runners["EUR_USD"].stop()
+    sched.run(max_rounds=100)
+    assert runners["USD_JPY"].calls < 100
+
+
+def test_tech_pipeline_is_single_pair_only():
+    def factory(pair, interval):
+        runner = FakeRunner(pair, interval)
+        runner.uses_tech_pipeline = True
+        return runner
+
+    with pytest.raises(ValueError):
+        MultiPairScheduler(
+            ["USD_JPY", "EUR_USD"], runner_factory=factory, sync_trades=lambda: None
+        )
+    sched = MultiPairScheduler(["USD_JPY"], runner_factory=factory, sync_trades=lambda: None)
+    assert [s.instrument for s in sched.slots] == ["USD_JPY"]
+
+
+def test_jpy_and_non_jpy_pairs_use_their_own_pip(monkeypatch):
+    for key in ("OANDA_API_KEY", "OANDA_ACCOUNT_ID", "OPENAI_API_KEY"):
+        monkeypatch.setenv(key, "x")
+    monkeypatch.setenv("PIP_SIZE", "0.01")
+    jr = importlib.import_module("backend.scheduler.job_runner")
+    quotes = {"USD_JPY": ("150.000", "150.010"), "EUR_USD": ("1.10000", "1.10010")}
+    spreads = {}
+
+    def factory(pair, interval):
+        # __init__ は口座残高取得などを行うので、ペアとpipだけ設定する
+        runner = jr.JobRunner.__new__(jr.JobRunner)
+        runner.instrument = pair
+        runner.pip_size = jr.get_pip_size(pair)
+
+        def _run_cycle():
+            bid, ask = quotes[pair]
+            tick = {"prices": [{"bids": [{"price": bid}], "asks": [{"price": ask}]}]}
+            position = {"unrealizedPL": "0", "long": {"units": "1000", "averagePrice": bid}}
+            indicators = {"atr": [0.1], "rsi": [50.0], "ema_slope": [0.0]}
+            time.sleep(0.01)
+            spreads[pair] = jr.build_exit_context(position, tick, indicators)["spread_pips"]
+            return True
+
+        runner._run_cycle = _run_cycle
+        return runner
+
+    sched = MultiPairScheduler(
+        ["USD_JPY", "EUR_USD"],
+        interval_seconds=0.0,
+        max_workers=2,
+        runner_factory=factory,
+        sync_trades=lambda: None,
+    )
+    sched.run(max_rounds=1)
+    assert spreads["USD_JPY"] == pytest.approx(1.0)
+    assert spreads["EUR_USD"] == pytest.approx(1.0)
@@ -0,0 +1,145 @@
+import importlib
+import json
+import sys
+import threading
+import types
+
+import pytest
+
+
+@pytest.fixture
+def perf(monkeypatch, tmp_path):
+    sys.modules.pop("backend.logs.perf_stats_logger", None)
+    mod = importlib.import_module("backend.logs.perf_stats_logger")
+    monkeypatch.setattr(mod, "LOG_PATH", tmp_path / "perf_stats.jsonl")
+    monkeypatch.setattr(mod, "TRACE_PATH", tmp_path / "perf_traces.jsonl")
+    monkeypatch.setattr(mod, "PERF_STATS_LOG", False)
+    monkeypatch.setattr(mod, "TRACE_SAMPLE", 0.0)
+    yield mod
+    sys.modules.pop("backend.logs.perf_stats_logger", None)
+
+
+def test_nested_spans_are_aggregated_by_path(perf):
+    for _ in range(3):
+        timer = perf.PerfTimer("job_loop")
+        with perf.span("candle_fetch"):
+            pass
+        with perf.span("filters"):
+            with perf.span("llm"):
+                pass
+        timer.stop()
+        timer.stop()  # 二重 stop は無視される
+
+    stats = perf.span_stats()
+    assert stats["job_loop"]["count"] == 3
+    assert stats["job_loop.candle_fetch"]["count"] == 3
+    assert stats["job_loop.filters.llm"]["count"] == 3
+    assert stats["job_loop"]["total"] >= stats["job_loop.filters"]["total"]
+    assert not (perf.LOG_PATH).exists()
+
+
+def test_unclosed_root_does_not_leak_into_next_loop(perf):
+    perf.PerfTimer("job_loop")  # 例外で stop されなかった想定
+    timer = perf.PerfTimer("job_loop")
+    with perf.span("indicators"):
+        pass
+    timer.stop()
+    assert "job_loop.indicators" in perf.span_stats()
+    assert "job_loop.job_loop" not in perf.span_stats()
+
+
+def test_spans_are_per_thread(perf):
+    def work():
+        timer = perf.PerfTimer("job_loop")
+        with perf.span("tick_fetch"):
+            pass
+        timer.stop()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = perf.span_stats()
+    assert stats["job_loop.tick_fetch"]["count"] == 4
+    assert set(stats) == {"job_loop", "job_loop.tick_fetch"}
+
+
+def test_timed_decorator_and_histogram(perf, monkeypatch):
+    observed = []
+
+    class FakeHistogram:
+        def labels(self, stage):
+            return types.SimpleNamespace(observe=lambda v: observed.append((stage, v)))
+
+    monkeypatch.setattr(perf, "_histogram", FakeHistogram())
+
+    @perf.timed("process_entry")
+    def entry(x):
+        with perf.span("order_request"):
+            return x * 2
+
+    timer = perf.PerfTimer("job_loop")
+    assert entry(2) == 4
+    timer.stop()
+    assert perf.span_stats()["job_loop.process_entry.order_request"]["count"] == 1
+    assert [s for s, _ in observed] == [
+        "job_loop.process_entry.order_request",
+        "job_loop.process_entry",
+        "job_loop",
+    ]
+
+
+def test_sampled_trace_and_legacy_log(perf, monkeypatch):
+    monkeypatch.setattr(perf, "TRACE_SAMPLE", 1.0)
+    monkeypatch.setattr(perf, "PERF_STATS_LOG", True)
+    timer = perf.PerfTimer("job_loop")
+    with perf.span("candle_fetch"):
+        pass
+    timer.stop()
+
+    trace = json.loads(perf.TRACE_PATH.read_text().splitlines()[0])
+    assert trace["root"] == "job_loop"
+    assert [s["path"] for s in trace["spans"]] == ["job_loop", "job_loop.candle_fetch"]
+    legacy = json.loads(perf.LOG_PATH.read_text().splitlines()[0])
+    assert legacy["tag"] == "job_loop"
+
+
+def test_perf_seconds_is_published_without_file_log(perf, monkeypatch):
+    published = []
+    monkeypatch.setattr(perf, "publish_metric", lambda *a: published.append(a))
+    timer = perf.PerfTimer("job_loop")
+    timer.stop()
+    assert [(name, labels) for name, _v, labels in published] == [
+        ("perf_seconds", {"tag": "job_loop"})
+    ]
+    assert not perf.LOG_PATH.exists()
+
+
+def test_llm_call_on_pool_is_recorded_under_job_loop(perf, monkeypatch):
+    monkeypatch.setenv("LLM_CONCURRENCY", "2")
+    # perf を読み直したので、span を取り込むモジュールも読み直す
+    for name in ("backend.utils.llm_pool", "backend.utils.openai_client"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    pool = importlib.import_module("backend.utils.llm_pool")
+    oc = importlib.import_module("backend.utils.openai_client")
+    response = types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(content='{"ok": 1}'))]
+    )
+    client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=lambda **_k: response))
+    )
+    monkeypatch.setattr(oc, "_get_client", lambda: client)
+    monkeypatch.setattr(oc, "_semantic_get", lambda *a: (None, None))
+    oc.reset_call_counter()
+
+    timer = perf.PerfTimer("job_loop")
+    try:
+        fut = pool.submit(oc.ask_openai, "span test", model="gpt-test")
+        assert fut.result() == {"ok": 1}
+    finally:
+        timer.stop()
+        pool.shutdown()
+    stats = perf.span_stats()
+    assert stats["job_loop.llm"]["count"] == 1
+    assert "llm" not in stats
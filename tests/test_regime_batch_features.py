@@ -0,0 +1,98 @@
+import importlib
+import pickle
+import random
+import sys
+
+import numpy as np
+import pytest
+
+from regime.batch_features import BatchFeatureExtractor, compute_features
+from regime.features import RegimeFeatureExtractor
+
+
+@pytest.fixture
+def trm(monkeypatch):
+    # 他のテストが pandas をスタブ化していることがあるので実モジュールで読み込み直す
+    for name in ("pandas", "training.train_regime_model"):
+        mod = sys.modules.get(name)
+        if mod is not None and (name != "pandas" or not hasattr(mod, "read_csv")):
+            monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("training.train_regime_model")
+
+
+def _ticks(n, seed=0):
+    rng = random.Random(seed)
+    rows, price = [], 1.10
+    for i in range(n):
+        close = round(price + rng.gauss(0, 0.0005), 5)
+        high = max(price, close) + abs(rng.gauss(0, 0.0002))
+        low = min(price, close) - abs(rng.gauss(0, 0.0002))
+        vol = 0.0 if (i // 40) % 5 == 4 else float(rng.randint(1, 300))
+        if (i // 60) % 6 == 5:
+            high = low = close = price
+        rows.append({"high": high, "low": low, "close": close, "volume": vol})
+        price = close
+    return rows
+
+
+def _columns(rows):
+    return [np.array([r[k] for r in rows]) for k in ("high", "low", "close", "volume")]
+
+
+def test_matches_rolling_path_across_chunks():
+    rows = _ticks(3000)
+    expected = RegimeFeatureExtractor(window=14).process_all(rows)
+    h, l, c, v = _columns(rows)
+    ext = BatchFeatureExtractor(window=14)
+    # 窓より短いチャンクや空チャンクを挟んでも状態が引き継がれる
+    bounds = [0, 5, 5, 13, 400, 1777, 3000]
+    chunks = [
+        ext.transform(h[a:b], l[a:b], c[a:b], v[a:b]) for a, b in zip(bounds, bounds[1:])
+    ]
+    got = np.concatenate(chunks)
+    assert got.shape == expected.shape
+    assert np.allclose(got, expected, rtol=1e-9, atol=1e-12)
+    assert np.array_equal(got, compute_features(h, l, c, v, window=14))
+
+
+def test_build_features_from_csv_chunks(trm, tmp_path):
+    rows = _ticks(500, seed=1)
+    path = tmp_path / "bars.csv"
+    with path.open("w") as f:
+        f.write("time,h,l,c,v\n")
+        for i, r in enumerate(rows):
+            f.write(f"{i},{r['high']},{r['low']},{r['close']},{r['volume']}\n")
+        f.write("bad,x,y,z,0\n")
+    feats = trm.build_features(path, chunk_rows=64)
+    assert np.allclose(feats, RegimeFeatureExtractor().process_all(rows), rtol=1e-9, atol=1e-12)
+
+
+def test_build_features_from_parquet(trm, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    rows = _ticks(300, seed=2)
+    path = tmp_path / "bars.parquet"
+    pd.DataFrame(rows).to_parquet(path)
+    feats = trm.build_features(path, chunk_rows=50)
+    assert np.allclose(feats, RegimeFeatureExtractor().process_all(rows), rtol=1e-9, atol=1e-12)
+
+
+def test_fit_candidates_in_parallel_and_save(trm, tmp_path):
+    rng = np.random.default_rng(0)
+    feats = np.vstack([rng.normal(m, 0.1, size=(200, 4)) for m in (0.0, 3.0, 6.0)])
+    cands = [trm.Candidate("gmm", n) for n in (2, 3, 4)]
+    results = trm.fit_candidates(feats, cands, jobs=2, score_sample=300)
+    assert [c.param for c in results] == [2, 3, 4]
+    assert all(c.error is None and c.bic is not None for c in results)
+    assert trm.best_candidate(results).param == 3
+
+    csv = tmp_path / "bars.csv"
+    with csv.open("w") as f:
+        f.write("high,low,close,volume\n")
+        for r in _ticks(200, seed=3):
+            f.write(f"{r['high']},{r['low']},{r['close']},{r['volume']}\n")
+    out = tmp_path / "model.pkl"
+    trm.main([str(csv), "--gmm", "2,3", "--jobs", "2", "--output", str(out)])
+    with out.open("rb") as f:
+        assert hasattr(pickle.load(f), "predict")
@@ -0,0 +1,79 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def rc(monkeypatch):
+    monkeypatch.delitem(sys.modules, "backend.config.runtime_config", raising=False)
+    mod = importlib.import_module("backend.config.runtime_config")
+    monkeypatch.setattr(mod, "_STAT_INTERVAL_SEC", 0.0)
+    monkeypatch.setattr(mod, "_watched", {})
+    return mod
+
+
+def test_from_env_parses_types_and_fallback_keys(rc):
+    cfg = rc.RuntimeConfig.from_env(
+        {
+            "PIP_SIZE": "0.0001  # EUR_USD",
+            "MAX_LIMIT_RETRY": "5",
+            "HIGHER_TF_ENABLED": "FALSE",
+            "STRICT_TF_ALIGN": "true",
+            "SCALP_COND_TF": "",
+        }
+    )
+    assert cfg.pip_size == 0.0001
+    assert cfg.max_limit_retry == 5
+    assert cfg.higher_tf_enabled is False
+    assert cfg.strict_tf_align is True
+    assert cfg.scalp_cond_tf is None
+    assert cfg.init_sl_pips == 20.0
+    assert rc.RuntimeConfig.from_env(
+        {"ALIGN_STRICT": "false", "STRICT_TF_ALIGN": "true"}
+    ).strict_tf_align is False
+    with pytest.raises(ValueError, match="PIP_SIZE.*MIN_HOLD_SECONDS"):
+        rc.RuntimeConfig.from_env({"PIP_SIZE": "x", "MIN_HOLD_SECONDS": "1.5"})
+    with pytest.raises(AttributeError):
+        cfg.pip_size = 1.0
+
+
+def test_refresh_rebuilds_only_on_change(rc, monkeypatch):
+    monkeypatch.setenv("PIP_SIZE", "0.01")
+    first = rc.refresh()
+    assert rc.current() is first
+    monkeypatch.setenv("PIP_SIZE", "0.0001")
+    second = rc.refresh()
+    assert second.pip_size == 0.0001
+    assert second.generation == first.generation + 1
+    # 検証に失敗した値は反映せず、直前のスナップショットを使い続ける
+    monkeypatch.setenv("PIP_SIZE", "bad")
+    assert rc.refresh() is second
+
+
+def test_pinned_snapshot_is_stable_within_a_loop(rc, monkeypatch):
+    monkeypatch.setenv("ENTRY_RISK_PCT", "0.01")
+    with rc.pinned() as cfg:
+        monkeypatch.setenv("ENTRY_RISK_PCT", "0.02")
+        assert rc.current() is cfg
+        assert rc.current().entry_risk_pct == 0.01
+    assert rc.current().entry_risk_pct == 0.02
+
+
+def test_params_file_change_is_reloaded(rc, monkeypatch, tmp_path):
+    monkeypatch.delitem(sys.modules, "config.params_loader", raising=False)
+    params_loader = importlib.import_module("config.params_loader")
+    # load_params が書き込む値をテスト後に元へ戻す
+    monkeypatch.setenv("INIT_TP_PIPS", "30")
+    path = tmp_path / "params.yml"
+    path.write_text("init_tp_pips: 25\n")
+    params_loader.load_params(
+        path=path, strategy_path=None, settings_path=None, mode_path=None, filters_path=None
+    )
+    assert rc.refresh().init_tp_pips == 25.0
+
+    path.write_text("init_tp_pips: 35\n")
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+    assert rc.refresh().init_tp_pips == 35.0
@@ -0,0 +1,80 @@
+import importlib
+import sqlite3
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def uot(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRADES_DB_PATH", str(tmp_path / "trades.db"))
+    monkeypatch.setenv("OANDA_SYNC_PAGE_SIZE", "2")
+    monkeypatch.setenv("OANDA_SYNC_MAX_PAGES", "0")
+    for name in ("backend.logs.log_manager", "backend.logs.update_oanda_trades"):
+        sys.modules.pop(name, None)
+    mod = importlib.import_module("backend.logs.update_oanda_trades")
+    yield mod
+    sys.modules.pop("backend.logs.update_oanda_trades", None)
+
+
+def _fill(tid):
+    return {
+        "id": str(tid),
+        "type": "ORDER_FILL",
+        "instrument": "USD_JPY",
+        "units": "1000",
+        "price": "150.0",
+        "pl": "0.0",
+        "time": "2024-01-01T00:00:00Z",
+    }
+
+
+def _install_api(monkeypatch, uot, txs, last_id, fail_on=None):
+    calls = []
+
+    def fake_fetch(url, params=None):
+        if url.endswith("/summary"):
+            return {"account": {"lastTransactionID": str(last_id)}}
+        lo, hi = int(params["from"]), int(params["to"])
+        calls.append((lo, hi))
+        if fail_on is not None and lo <= fail_on <= hi:
+            raise RuntimeError("timeout")
+        return {
+            "transactions": [t for t in txs if lo <= int(t["id"]) <= hi],
+            "lastTransactionID": str(last_id),
+        }
+
+    monkeypatch.setattr(uot, "fetch_transactions", fake_fetch)
+    return calls
+
+
+def _trade_ids(db):
+    with sqlite3.connect(db) as conn:
+        return [r[0] for r in conn.execute("SELECT trade_id FROM oanda_trades ORDER BY trade_id")]
+
+
+def test_pages_until_account_last_id(uot, monkeypatch, tmp_path):
+    calls = _install_api(monkeypatch, uot, [_fill(i) for i in (1, 3, 4)], last_id=5)
+    uot.update_oanda_trades()
+    assert calls == [(1, 2), (3, 4), (5, 5)]
+    assert _trade_ids(tmp_path / "trades.db") == [1, 3, 4]
+    assert uot.get_last_transaction_id() == "5"
+
+
+def test_failed_page_resumes_without_reapplying(uot, monkeypatch, tmp_path):
+    txs = [_fill(i) for i in range(1, 6)]
+    _install_api(monkeypatch, uot, txs, last_id=5, fail_on=3)
+    uot.update_oanda_trades()
+    assert _trade_ids(tmp_path / "trades.db") == [1, 2]
+    assert uot.get_last_transaction_id() == "2"
+
+    calls = _install_api(monkeypatch, uot, txs, last_id=5)
+    uot.update_oanda_trades()
+    assert calls == [(3, 4), (5, 5)]
+    assert _trade_ids(tmp_path / "trades.db") == [1, 2, 3, 4, 5]
+
+
+def test_caught_up_skips_transaction_fetch(uot, monkeypatch):
+    calls = _install_api(monkeypatch, uot, [], last_id=0)
+    uot.update_oanda_trades()
+    assert calls == []
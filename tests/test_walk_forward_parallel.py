@@ -0,0 +1,82 @@
+import importlib
+import json
+import random
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def wf(monkeypatch):
+    # 他のテストが pandas をスタブ化していることがあるので実モジュールで読み込み直す
+    for name in ("pandas", "utils", "pipelines.walk_forward.run_walk_forward"):
+        mod = sys.modules.get(name)
+        if mod is not None and (name != "pandas" or not hasattr(mod, "read_csv")):
+            monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("pipelines.walk_forward.run_walk_forward")
+
+
+def _write_csv(path, n=120, seed=0):
+    rng = random.Random(seed)
+    price = 150.0
+    lines = ["time,open,high,low,close,volume"]
+    for i in range(n):
+        close = round(price + rng.gauss(0, 0.05), 3)
+        high = max(price, close) + 0.01
+        low = min(price, close) - 0.01
+        lines.append(f"{i},{price},{high},{low},{close},1")
+        price = close
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_parallel_matches_sequential(wf, tmp_path):
+    data = tmp_path / "ohlc.csv"
+    _write_csv(data)
+    kw = dict(train_size=30, test_size=10, seed=7)
+    seq = wf.walk_forward(data, tmp_path / "seq", jobs=1, **kw)
+    par = wf.walk_forward(data, tmp_path / "par", jobs=2, **kw)
+    assert list(seq["fold"]) == list(range(8))
+    assert seq.equals(par)
+    assert seq["seed"].nunique() == len(seq)
+
+
+def test_interrupted_run_resumes(wf, tmp_path, monkeypatch):
+    data = tmp_path / "ohlc.csv"
+    _write_csv(data)
+    outdir = tmp_path / "out"
+    kw = dict(train_size=30, test_size=10, seed=7, jobs=1)
+    full = wf.walk_forward(data, outdir, **kw)
+
+    log = outdir / "fold_metrics.jsonl"
+    lines = log.read_text().splitlines()
+    # 3フォール目の途中で止まった状態を再現する
+    log.write_text("\n".join(lines[:2]) + "\n" + lines[2][:10])
+
+    ran = []
+    run_fold = wf.run_fold
+    monkeypatch.setattr(wf, "run_fold", lambda fold, *a: ran.append(fold) or run_fold(fold, *a))
+    resumed = wf.walk_forward(data, outdir, **kw)
+    assert ran == list(range(2, 8))
+    assert resumed.equals(full)
+
+    # 設定が変われば記録は使わない
+    ran.clear()
+    wf.walk_forward(data, outdir, train_size=30, test_size=10, seed=8, jobs=1)
+    assert ran == list(range(8))
+    runs = [json.loads(line)["run"] for line in log.read_text().splitlines()]
+    assert len(runs) == 16 and len(set(runs)) == 2
+
+
+@pytest.mark.parametrize("suffix", [".feather", ".parquet"])
+def test_arrow_tables_match_csv(wf, tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    csv = tmp_path / "ohlc.csv"
+    _write_csv(csv)
+    table = tmp_path / f"ohlc{suffix}"
+    df = pd.read_csv(csv)
+    df.to_feather(table) if suffix == ".feather" else df.to_parquet(table)
+    kw = dict(train_size=30, test_size=10, seed=7, jobs=1)
+    from_csv = wf.walk_forward(csv, tmp_path / "csv", **kw)
+    assert from_csv.equals(wf.walk_forward(table, tmp_path / suffix[1:], **kw))
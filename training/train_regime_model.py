@@ -1,45 +1,234 @@
-import csv
+"""Train the regime classifier from CSV or Parquet candles.
+
+Features come from :class:`regime.batch_features.BatchFeatureExtractor`,
+which gives the same values as the live ``RegimeFeatureExtractor`` path
+but works on whole arrays.  Input is read in chunks (pandas for CSV,
+``pyarrow`` record batches for Parquet), so multi-year M1 files never have
+to fit in memory as Python dicts.
+
+Several GMM / HDBSCAN candidates can be fitted in parallel worker
+processes. The candidate with the best silhouette score on a fixed sample
+is saved.
+
+Usage::
+
+    python training/train_regime_model.py data/USD_JPY_M1.parquet \\
+        --gmm 2,3,4,5 --hdbscan 50,200 --jobs 4 --output models/regime.pkl
+"""
+
+from __future__ import annotations
+
+import argparse
 import pickle
-import sys
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from regime.batch_features import BatchFeatureExtractor
+
+_COLUMNS = {
+    "high": ("high", "h"),
+    "low": ("low", "l"),
+    "close": ("close", "c"),
+    "volume": ("volume", "v"),
+}
+
+Chunk = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _resolve(names: list[str]) -> dict[str, str | None]:
+    """Map ``high/low/close/volume`` to the file's column names."""
+    present = set(names)
+    return {
+        key: next((a for a in aliases if a in present), None)
+        for key, aliases in _COLUMNS.items()
+    }
+
+
+def _arrays(df: pd.DataFrame, cols: dict[str, str | None]) -> Chunk:
+    data = {}
+    for key, col in cols.items():
+        if col is None:
+            data[key] = np.zeros(len(df), dtype=float)
+        else:
+            data[key] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    # 数値に変換できない行は読み飛ばす
+    ok = ~(np.isnan(data["high"]) | np.isnan(data["low"]) | np.isnan(data["close"]))
+    data["volume"] = np.nan_to_num(data["volume"])
+    return data["high"][ok], data["low"][ok], data["close"][ok], data["volume"][ok]
+
+
+def iter_chunks(path: Path, chunk_rows: int = 200_000) -> Iterator[Chunk]:
+    """Yield ``(high, low, close, volume)`` arrays ``chunk_rows`` at a time."""
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        cols = _resolve(pf.schema_arrow.names)
+        wanted = [c for c in cols.values() if c is not None]
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=wanted):
+            yield _arrays(batch.to_pandas(), cols)
+        return
+    cols = None
+    for df in pd.read_csv(path, chunksize=chunk_rows):
+        if cols is None:
+            cols = _resolve(list(df.columns))
+        yield _arrays(df, cols)
+
+
+def build_features(path: Path, *, window: int = 20, chunk_rows: int = 200_000) -> np.ndarray:
+    """Return the feature matrix for every bar in ``path``."""
+    extractor = BatchFeatureExtractor(window)
+    parts = [extractor.transform(*chunk) for chunk in iter_chunks(path, chunk_rows)]
+    if not parts:
+        return np.empty((0, 4), dtype=float)
+    return np.concatenate(parts)
+
+
+# ----------------------------------------------------------------------
+# Candidate fitting
+# ----------------------------------------------------------------------
+
 
-from regime.features import RegimeFeatureExtractor
-from regime.gmm_detector import GMMRegimeDetector
-
-
-def load_data(path: Path) -> list[dict]:
-    data = []
-    with path.open() as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                item = {
-                    "high": float(row.get("high", row.get("h", 0)) or 0),
-                    "low": float(row.get("low", row.get("l", 0)) or 0),
-                    "close": float(row.get("close", row.get("c", 0)) or 0),
-                    "volume": float(row.get("volume", row.get("v", 0)) or 0),
-                }
-            except Exception:
-                continue
-            data.append(item)
-    return data
-
-
-def main() -> None:
-    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("tests/data/range_sample.csv")
-    model_path = Path("models/regime_gmm.pkl")
-    rows = load_data(csv_path)
-    if not rows:
+@dataclass
+class Candidate:
+    kind: str
+    param: int
+    score: float = float("nan")
+    bic: float | None = None
+    model: object | None = None
+    error: str | None = None
+
+    @property
+    def label(self) -> str:
+        name = "n_components" if self.kind == "gmm" else "min_cluster_size"
+        return f"{self.kind}({name}={self.param})"
+
+
+_features: np.ndarray | None = None
+_score_idx: np.ndarray | None = None
+
+
+def _init_worker(features: np.ndarray, score_idx: np.ndarray) -> None:
+    # 特徴量はワーカー起動時に一度だけ受け取る
+    global _features, _score_idx
+    _features = features
+    _score_idx = score_idx
+
+
+def _fit(cand: Candidate, random_state: int) -> Candidate:
+    from sklearn.metrics import silhouette_score
+
+    feats = _features
+    try:
+        if cand.kind == "gmm":
+            from regime.gmm_detector import GMMRegimeDetector
+
+            det = GMMRegimeDetector(n_components=cand.param, random_state=random_state)
+            det.fit(feats)
+            labels = det.predict(feats[_score_idx])
+            cand.bic = float(det.model.bic(feats))
+        else:
+            from regime.hdbscan_detector import HDBSCANRegimeDetector
+
+            det = HDBSCANRegimeDetector(min_cluster_size=cand.param)
+            det.fit(feats)
+            labels = det.model.labels_[_score_idx]
+        cand.model = det.model
+        clustered = labels >= 0
+        if len(set(labels[clustered].tolist())) > 1:
+            cand.score = float(
+                silhouette_score(feats[_score_idx][clustered], labels[clustered])
+            )
+    except Exception as exc:
+        cand.error = f"{type(exc).__name__}: {exc}"
+    return cand
+
+
+def fit_candidates(
+    features: np.ndarray,
+    candidates: list[Candidate],
+    *,
+    jobs: int = 1,
+    score_sample: int = 10_000,
+    random_state: int = 42,
+) -> list[Candidate]:
+    """Fit ``candidates`` (in ``jobs`` processes) and return them scored."""
+    size = min(score_sample, len(features))
+    score_idx = np.array(sorted(random.Random(random_state).sample(range(len(features)), size)))
+    if jobs <= 1 or len(candidates) <= 1:
+        _init_worker(features, score_idx)
+        return [_fit(c, random_state) for c in candidates]
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(candidates)),
+        initializer=_init_worker,
+        initargs=(features, score_idx),
+    ) as pool:
+        return list(pool.map(_fit, candidates, [random_state] * len(candidates)))
+
+
+def best_candidate(results: list[Candidate]) -> Candidate | None:
+    """Highest silhouette score; GMM BIC breaks ties / unscored runs."""
+    fitted = [c for c in results if c.model is not None]
+    if not fitted:
+        return None
+
+    def key(c: Candidate) -> tuple[float, float]:
+        score = c.score if not np.isnan(c.score) else -np.inf
+        return score, -(c.bic if c.bic is not None else np.inf)
+
+    return max(fitted, key=key)
+
+
+def _ints(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="tests/data/range_sample.csv")
+    parser.add_argument("--output", default="models/regime_gmm.pkl")
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--gmm", type=_ints, default=[3], help="n_components list")
+    parser.add_argument("--hdbscan", type=_ints, default=[], help="min_cluster_size list")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--score-sample", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    feats = build_features(Path(args.path), window=args.window, chunk_rows=args.chunk_rows)
+    if not len(feats):
         print("No data loaded")
         return
-    extractor = RegimeFeatureExtractor()
-    feats = extractor.process_all(rows)
-    detector = GMMRegimeDetector(n_components=3, random_state=42)
-    detector.fit(feats)
-    model_path.parent.mkdir(exist_ok=True)
+    candidates = [Candidate("gmm", n) for n in args.gmm]
+    candidates += [Candidate("hdbscan", n) for n in args.hdbscan]
+    results = fit_candidates(
+        feats,
+        candidates,
+        jobs=args.jobs,
+        score_sample=args.score_sample,
+        random_state=args.seed,
+    )
+    for c in results:
+        detail = c.error or f"silhouette={c.score:.4f}" + (
+            f" bic={c.bic:.1f}" if c.bic is not None else ""
+        )
+        print(f"{c.label}: {detail}")
+    best = best_candidate(results)
+    if best is None:
+        print("No candidate could be fitted")
+        return
+    model_path = Path(args.output)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
     with open(model_path, "wb") as f:
-        pickle.dump(detector.model, f)
-    print(f"Model saved to {model_path}")
+        pickle.dump(best.model, f)
+    print(f"Model saved to {model_path} ({best.label}, {len(feats):,} rows)")
 
 
 if __name__ == "__main__":